@@ -64,6 +64,31 @@ def create_app(test_config: Optional[Dict[str, Any]] = None) -> Flask:
 
         setup_foreign_key_constraints(app)
 
+    # Кеш колонок розкладу
+    from .services import schedule_cache
+
+    schedule_cache.init_app(app)
+
+    # Кеш звітів
+    from .services import report_cache
+
+    report_cache.init_app(app)
+
+    # Приблизна кількість клієнтів у посторінковому списку
+    from .services import client_search
+
+    client_search.init_app(app)
+
+    # Кількість товарів у посторінковому списку залишків
+    from .services import stock_levels
+
+    stock_levels.init_app(app)
+
+    # Фонові звіти
+    from .services import report_jobs
+
+    report_jobs.init_app(app)
+
     # Ініціалізація міграцій після ініціалізації SQLAlchemy
     from flask_migrate import Migrate
 
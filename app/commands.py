@@ -1,9 +1,23 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
 import click
 from flask import Flask, current_app
 from flask.cli import with_appcontext
+from sqlalchemy import func
 from werkzeug.security import generate_password_hash
 
-from .models import PaymentMethod, User, db
+from .models import (
+    Appointment,
+    DailyRollup,
+    PaymentMethod,
+    Sale,
+    User,
+    db,
+    refresh_appointment_totals,
+    refresh_daily_rollup,
+)
+from .services.stock_ledger import StockLedgerService
 
 
 @click.command("create-admin")  # type: ignore[misc]
@@ -61,8 +75,81 @@ def create_payment_methods() -> None:
     print("Payment methods initialized.")
 
 
+@click.command("backfill-appointment-totals")  # type: ignore[misc]
+@click.option("--batch-size", default=1000, show_default=True, help="Appointments per commit.")  # type: ignore[misc]
+@with_appcontext  # type: ignore[misc]
+def backfill_appointment_totals(batch_size: int) -> None:
+    """Recalculate services_total, sales_total and discounted_total for all appointments."""
+    processed = 0
+    last_id = 0
+    while True:
+        ids = [
+            appointment_id
+            for (appointment_id,) in db.session.query(Appointment.id)
+            .filter(Appointment.id > last_id)
+            .order_by(Appointment.id)
+            .limit(batch_size)
+        ]
+        if not ids:
+            break
+        refresh_appointment_totals(db.session.connection(), ids)
+        db.session.commit()
+        processed += len(ids)
+        last_id = ids[-1]
+        click.echo(f"Processed {processed} appointments")
+
+    click.echo(f"Appointment totals backfilled: {processed}")
+
+
+@click.command("rebuild-daily-rollup")  # type: ignore[misc]
+@click.option("--start", "start_date", type=click.DateTime(["%Y-%m-%d"]), help="First day.")  # type: ignore[misc]
+@click.option("--end", "end_date", type=click.DateTime(["%Y-%m-%d"]), help="Last day.")  # type: ignore[misc]
+@click.option("--batch-days", default=31, show_default=True, help="Days per commit.")  # type: ignore[misc]
+@with_appcontext  # type: ignore[misc]
+def rebuild_daily_rollup(start_date: Optional[datetime], end_date: Optional[datetime], batch_days: int) -> None:
+    """Rebuild daily_rollup rows from appointments and sales (whole history by default)."""
+    bounds = [
+        value
+        for query in (
+            db.session.query(func.min(Appointment.date), func.max(Appointment.date)),
+            db.session.query(func.min(Sale.sale_day), func.max(Sale.sale_day)),
+            db.session.query(func.min(DailyRollup.day), func.max(DailyRollup.day)),
+        )
+        for value in query.one()
+        if value is not None
+    ]
+    first_day = start_date.date() if start_date else min(bounds, default=None)
+    last_day = end_date.date() if end_date else max(bounds, default=None)
+
+    days = rows = 0
+    while first_day is not None and last_day is not None and first_day <= last_day:
+        batch_end = min(first_day + timedelta(days=batch_days - 1), last_day)
+        batch = [first_day + timedelta(days=offset) for offset in range((batch_end - first_day).days + 1)]
+        rows += refresh_daily_rollup(db.session.connection(), batch)
+        db.session.commit()
+        days += len(batch)
+        first_day = batch_end + timedelta(days=1)
+        click.echo(f"Processed {days} days")
+
+    click.echo(f"Daily rollup rebuilt: {days} days, {rows} rows")
+
+
+@click.command("snapshot-stock")  # type: ignore[misc]
+@click.option("--through", type=click.DateTime(["%Y-%m-%d"]), help="Last day (default today).")  # type: ignore[misc]
+@click.option("--rebuild", is_flag=True, help="Drop existing snapshots first.")  # type: ignore[misc]
+@with_appcontext  # type: ignore[misc]
+def snapshot_stock(through: Optional[datetime], rebuild: bool) -> None:
+    """Write monthly stock_snapshot rows from the stock_movement ledger (run monthly)."""
+    rows = StockLedgerService.take_snapshots(through.date() if through else None, rebuild=rebuild)
+    db.session.commit()
+    click.echo(f"Stock snapshots written: {rows} rows")
+
+
 def init_app(app: Flask) -> None:
     """Register CLI commands with the Flask application."""
     app.cli.add_command(create_admin_command)
     app.cli.add_command(init_db)
     app.cli.add_command(create_payment_methods)
+    app.cli.add_command(backfill_appointment_totals)
+    app.cli.add_command(rebuild_daily_rollup)
+    app.cli.add_command(snapshot_stock)
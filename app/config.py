@@ -16,6 +16,33 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS: bool = False
     REMEMBER_COOKIE_DURATION: timedelta = timedelta(days=14)
 
+    # Кеш колонок розкладу: "lru" (в межах процесу), "null" (вимкнено) або
+    # шлях до фабрики бекенду для кількох воркерів, напр. "myapp.cache:redis_backend"
+    SCHEDULE_CACHE_BACKEND: str = os.environ.get("SCHEDULE_CACHE_BACKEND") or "lru"
+    SCHEDULE_CACHE_SIZE: int = int(os.environ.get("SCHEDULE_CACHE_SIZE") or 512)
+
+    # Кеш звітів (в межах процесу): 0 вимикає кеш; TTL у секундах для діапазонів,
+    # що включають сьогодні (закриті періоди тримаються до інвалідації)
+    REPORT_CACHE_SIZE: int = int(os.environ.get("REPORT_CACHE_SIZE") or 256)
+    REPORT_CACHE_TTL: int = int(os.environ.get("REPORT_CACHE_TTL") or 60)
+
+    # Фонові звіти: діапазони довші за REPORT_JOB_MIN_DAYS днів (0 - ніколи) формуються
+    # у REPORT_JOB_WORKERS потоках (0 - одразу в запиті); не більше REPORT_JOB_MAX_PENDING у черзі
+    REPORT_JOB_WORKERS: int = int(os.environ.get("REPORT_JOB_WORKERS") or 2)
+    REPORT_JOB_MAX_PENDING: int = int(os.environ.get("REPORT_JOB_MAX_PENDING") or 10)
+    REPORT_JOB_MIN_DAYS: int = int(os.environ.get("REPORT_JOB_MIN_DAYS") or 92)
+    # Звіти, що чекають чи формуються довше REPORT_JOB_TIMEOUT секунд, позначаються
+    # невдалими: їх втрачено з перезапуском процесу
+    REPORT_JOB_TIMEOUT: int = int(os.environ.get("REPORT_JOB_TIMEOUT") or 1800)
+
+    # Список клієнтів: загальна кількість перераховується не частіше ніж раз
+    # на CLIENT_COUNT_TTL секунд (0 - не показувати)
+    CLIENT_COUNT_TTL: int = int(os.environ.get("CLIENT_COUNT_TTL") or 300)
+
+    # Залишки товарів: кількість товарів кешується до додавання/видалення товару,
+    # але не довше PRODUCT_COUNT_TTL секунд (зміни з інших воркерів; 0 - без кешу)
+    PRODUCT_COUNT_TTL: int = int(os.environ.get("PRODUCT_COUNT_TTL") or 300)
+
     # Вимкнення DEBUG та TESTING режимів для production
     DEBUG: bool = False
     TESTING: bool = False
@@ -1,15 +1,18 @@
-from datetime import datetime, timezone
-from decimal import Decimal
-from types import MethodType
-from typing import TYPE_CHECKING, Any
-
+import re
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from flask import current_app, has_app_context
 from flask_login import UserMixin
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import Numeric, event, func, text
+from sqlalchemy import DDL, Integer, Numeric, and_, bindparam, case, cast, event, func, inspect, select, text
 from sqlalchemy.engine import Connection
-
-if TYPE_CHECKING:
-    from typing import List
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import ObjectDeletedError
 
 db = SQLAlchemy()
 
@@ -28,6 +31,120 @@ class PaymentMethod(db.Model):  # type: ignore[name-defined]
         return f"<PaymentMethod {self.name}>"
 
 
+# Незмінне значення способу оплати з реєстру (без звернень до БД)
+@dataclass(frozen=True, eq=False)
+class PaymentMethodValue:
+    id: Optional[int]
+    name: str
+    is_active: bool = True
+
+    @property
+    def value(self) -> str:
+        """Сумісність з Enum API"""
+        return self.name
+
+    def __eq__(self, other: Any) -> bool:
+        if hasattr(other, "value"):
+            return self.value == other.value
+        elif hasattr(other, "name"):
+            return self.name == other.name
+        elif hasattr(other, "id"):
+            return self.id == other.id
+        return False
+
+    def __hash__(self) -> int:
+        return hash(self.name)
+
+
+class PaymentMethodRegistry:
+    """
+    Реєстр способів оплати застосунку.
+
+    Завантажує всі PaymentMethod одним запитом при першому зверненні та
+    тримає їх як PaymentMethodValue; скидається подіями сесії при зміні
+    рядків PaymentMethod (див. invalidate_payment_methods).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._by_id: Optional[Dict[int, PaymentMethodValue]] = None
+        self._by_name: Dict[str, PaymentMethodValue] = {}
+        self.loads = 0
+
+    def _methods(self) -> Dict[int, PaymentMethodValue]:
+        by_id = self._by_id
+        if by_id is None:
+            with self._lock:
+                if self._by_id is None:
+                    rows = db.session.execute(
+                        select(PaymentMethod.id, PaymentMethod.name, PaymentMethod.is_active).order_by(PaymentMethod.id)
+                    ).all()
+                    methods = {row.id: PaymentMethodValue(row.id, row.name, bool(row.is_active)) for row in rows}
+                    self._by_name = {method.name: method for method in methods.values()}
+                    self._by_id = methods
+                    self.loads += 1
+                by_id = self._by_id
+        return by_id
+
+    def get(self, method_id: Optional[int]) -> Optional[PaymentMethodValue]:
+        if method_id is None:
+            return None
+        return self._methods().get(method_id)
+
+    def by_name(self, name: str) -> Optional[PaymentMethodValue]:
+        self._methods()
+        return self._by_name.get(name)
+
+    def all(self, active_only: bool = False) -> List[PaymentMethodValue]:
+        return [method for method in self._methods().values() if method.is_active or not active_only]
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._by_id = None
+            self._by_name = {}
+
+
+def get_payment_method_registry() -> Optional[PaymentMethodRegistry]:
+    """Реєстр поточного застосунку (None поза контекстом застосунку)."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.setdefault("payment_method_registry", PaymentMethodRegistry())
+
+
+_PAYMENT_METHODS_CHANGED = "payment_methods_changed"
+
+
+def _invalidate_registry() -> None:
+    registry = get_payment_method_registry()
+    if registry is not None:
+        registry.invalidate()
+
+
+@event.listens_for(Session, "after_flush")
+def invalidate_payment_methods(session: Session, flush_context: Any) -> None:
+    """Скидає реєстр, якщо у flush змінились рядки PaymentMethod."""
+    if any(isinstance(obj, PaymentMethod) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info[_PAYMENT_METHODS_CHANGED] = True
+        _invalidate_registry()
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def invalidate_payment_methods_after_transaction(session: Session) -> None:
+    # Після rollback реєстр міг містити незафіксовані рядки
+    if session.info.pop(_PAYMENT_METHODS_CHANGED, False):
+        _invalidate_registry()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def invalidate_payment_methods_on_bulk_write(orm_execute_state: Any) -> None:
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ is PaymentMethod:
+            orm_execute_state.session.info[_PAYMENT_METHODS_CHANGED] = True
+            _invalidate_registry()
+
+
 # Клас для забезпечення сумісності з Enum API
 class PaymentMethodCompat:
     """
@@ -36,48 +153,17 @@ class PaymentMethodCompat:
     """
 
     @staticmethod
-    def _get_method_by_name(name: str):
-        """Отримує PaymentMethod за назвою або створює тимчасовий об'єкт з value"""
-        # Спробуємо знайти в базі даних
-        try:
-            method = PaymentMethod.query.filter_by(name=name).first()
-            if method:
-                # Додаємо атрибут value для сумісності з Enum API
-                method.value = method.name
-
-                # Додаємо метод для порівняння
-                def eq_method(self, other):
-                    if hasattr(other, "value"):
-                        return self.value == other.value
-                    elif hasattr(other, "name"):
-                        return self.name == other.name
-                    elif hasattr(other, "id") and hasattr(self, "id"):
-                        return self.id == other.id
-                    return False
-
-                # Використовуємо types.MethodType для правильного зв'язування методу
-                method.__eq__ = MethodType(eq_method, method)
-                return method
-        except Exception:
-            pass
-
-        # Якщо не знайдено, створюємо тимчасовий об'єкт
-        class TempPaymentMethod:
-            def __init__(self, name: str):
-                self.name = name
-                self.value = name
-                self.id = None
-
-            def __eq__(self, other):
-                if hasattr(other, "value"):
-                    return self.value == other.value
-                elif hasattr(other, "name"):
-                    return self.name == other.name
-                elif hasattr(other, "id") and hasattr(self, "id"):
-                    return self.id == other.id
-                return False
-
-        return TempPaymentMethod(name)
+    def _get_method_by_name(name: str) -> PaymentMethodValue:
+        """Отримує спосіб оплати з реєстру за назвою або тимчасове значення без id"""
+        registry = get_payment_method_registry()
+        if registry is not None:
+            try:
+                method = registry.by_name(name)
+                if method:
+                    return method
+            except Exception:
+                pass
+        return PaymentMethodValue(None, name)
 
     @property
     def CASH(self):
@@ -105,25 +191,16 @@ class PaymentMethodCompat:
 
     def __iter__(self):
         """Дозволяє ітерацію через методи оплати для сумісності з for pm in PaymentMethod"""
-        try:
-            methods = PaymentMethod.query.all()
-            for method in methods:
-                method.value = method.name  # Додаємо атрибут value
-
-                # Додаємо метод для порівняння
-                def eq_method(self, other):
-                    if hasattr(other, "value"):
-                        return self.value == other.value
-                    elif hasattr(other, "name"):
-                        return self.name == other.name
-                    elif hasattr(other, "id") and hasattr(self, "id"):
-                        return self.id == other.id
-                    return False
-
-                # Використовуємо types.MethodType для правильного зв'язування методу
-                method.__eq__ = MethodType(eq_method, method)
-                yield method
-        except Exception:
+        registry = get_payment_method_registry()
+        methods: Optional[List[PaymentMethodValue]] = None
+        if registry is not None:
+            try:
+                methods = registry.all()
+            except Exception:
+                methods = None
+        if methods is not None:
+            yield from methods
+        else:
             # Якщо база недоступна, повертаємо стандартні методи
             names = ["Готівка", "Малібу", "ФОП", "Приват", "MONO", "Борг"]
             for name in names:
@@ -170,10 +247,34 @@ class User(UserMixin, db.Model):  # type: ignore[name-defined]
 
 
 # Модель клієнта
+def normalize_phone(phone: Optional[str]) -> str:
+    """Лише цифри номера: "+38 (050) 123-45-67" -> "380501234567"."""
+    return re.sub(r"\D", "", phone or "")
+
+
+def _phone_normalized_default(context: Any) -> str:
+    return normalize_phone(context.get_current_parameters().get("phone"))
+
+
+def _phone_reversed_default(context: Any) -> str:
+    return normalize_phone(context.get_current_parameters().get("phone"))[::-1]
+
+
 class Client(db.Model):  # type: ignore[name-defined]
+    # Пошук за цифрами номера: повний номер та закінчення (через перевернуті цифри) - діапазоном по індексу
+    __table_args__ = (
+        db.Index("ix_client_phone_normalized", "phone_normalized"),
+        db.Index("ix_client_phone_reversed", "phone_reversed"),
+        # Посторінковий список клієнтів: пошук від курсора (name, id) замість OFFSET
+        db.Index("ix_client_name_id", "name", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     phone = db.Column(db.String(20), unique=True, nullable=False)
+    # Заповнюються з phone (див. sync_client_phone)
+    phone_normalized = db.Column(db.String(20), nullable=True, default=_phone_normalized_default)
+    phone_reversed = db.Column(db.String(20), nullable=True, default=_phone_reversed_default)
     email = db.Column(db.String(120), unique=True, nullable=True)  # nullable=True дозволяє NULL
     notes = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
@@ -184,6 +285,36 @@ class Client(db.Model):  # type: ignore[name-defined]
         return f"<Client {self.name}>"
 
 
+@event.listens_for(Client, "before_update")
+def sync_client_phone(mapper: Any, connection: Connection, target: Client) -> None:
+    """Цифри номера оновлюються разом з phone."""
+    if inspect(target).attrs.phone.history.has_changes():
+        target.phone_normalized = normalize_phone(target.phone)
+        target.phone_reversed = target.phone_normalized[::-1]
+
+
+# Повнотекстовий індекс клієнтів (SQLite FTS5, external content над client).
+# unicode61 приводить до нижнього регістру і кирилицю; remove_diacritics 0 зберігає й/ї.
+# Тригери тримають індекс у синхроні, зокрема при Core-вставках і каскадних видаленнях.
+CLIENT_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS client_fts USING fts5("
+    "name, email, notes, content='client', content_rowid='id', tokenize='unicode61 remove_diacritics 0')",
+    "CREATE TRIGGER IF NOT EXISTS client_fts_ai AFTER INSERT ON client BEGIN "
+    "INSERT INTO client_fts(rowid, name, email, notes) VALUES (new.id, new.name, new.email, new.notes); END",
+    "CREATE TRIGGER IF NOT EXISTS client_fts_ad AFTER DELETE ON client BEGIN "
+    "INSERT INTO client_fts(client_fts, rowid, name, email, notes) "
+    "VALUES ('delete', old.id, old.name, old.email, old.notes); END",
+    "CREATE TRIGGER IF NOT EXISTS client_fts_au AFTER UPDATE OF name, email, notes ON client BEGIN "
+    "INSERT INTO client_fts(client_fts, rowid, name, email, notes) "
+    "VALUES ('delete', old.id, old.name, old.email, old.notes); "
+    "INSERT INTO client_fts(rowid, name, email, notes) VALUES (new.id, new.name, new.email, new.notes); END",
+)
+
+for _statement in CLIENT_FTS_DDL:
+    event.listen(Client.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(Client.__table__, "before_drop", DDL("DROP TABLE IF EXISTS client_fts").execute_if(dialect="sqlite"))
+
+
 # Модель послуги
 class Service(db.Model):  # type: ignore[name-defined]
     id = db.Column(db.Integer, primary_key=True)
@@ -199,6 +330,13 @@ class Service(db.Model):  # type: ignore[name-defined]
 
 # Модель запису клієнта
 class Appointment(db.Model):  # type: ignore[name-defined]
+    __table_args__ = (
+        # Діапазонний пошук накладань та денного розкладу майстра
+        db.Index("ix_appointment_master_date_start", "master_id", "date", "start_time"),
+        # Перерахунок денних зрізів (daily_rollup) за датою
+        db.Index("ix_appointment_date_status", "date", "status"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     client_id = db.Column(db.Integer, db.ForeignKey("client.id"), nullable=False)
     master_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -212,6 +350,10 @@ class Appointment(db.Model):  # type: ignore[name-defined]
     discount_percentage = db.Column(db.Numeric(precision=5, scale=2), default=Decimal("0.0"), nullable=False)
     notes = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    # Денормалізовані суми, оновлюються подіями сесії (див. refresh_appointment_totals)
+    services_total = db.Column(Numeric(10, 2), nullable=False, default=Decimal("0.00"), server_default="0")
+    sales_total = db.Column(Numeric(10, 2), nullable=False, default=Decimal("0.00"), server_default="0")
+    discounted_total = db.Column(Numeric(10, 2), nullable=False, default=Decimal("0.00"), server_default="0")
     services = db.relationship(
         "AppointmentService",
         backref="appointment",
@@ -221,26 +363,12 @@ class Appointment(db.Model):  # type: ignore[name-defined]
     sales = db.relationship("Sale", back_populates="appointment", lazy=True)
 
     @property
-    def payment_method(self):
-        """Повертає об'єкт PaymentMethod з атрибутом value для сумісності з Enum API"""
+    def payment_method(self) -> Optional[PaymentMethodValue]:
+        """Повертає спосіб оплати з реєстру (з атрибутом value для сумісності з Enum API)"""
         if self.payment_method_id:
-            method = PaymentMethod.query.get(self.payment_method_id)
-            if method:
-                method.value = method.name  # Додаємо атрибут value
-
-                # Додаємо метод для порівняння
-                def eq_method(self, other):
-                    if hasattr(other, "value"):
-                        return self.value == other.value
-                    elif hasattr(other, "name"):
-                        return self.name == other.name
-                    elif hasattr(other, "id") and hasattr(self, "id"):
-                        return self.id == other.id
-                    return False
-
-                # Використовуємо types.MethodType для правильного зв'язування методу
-                method.__eq__ = MethodType(eq_method, method)
-                return method
+            registry = get_payment_method_registry()
+            if registry is not None:
+                return registry.get(self.payment_method_id)
         return None
 
     @payment_method.setter
@@ -249,59 +377,38 @@ class Appointment(db.Model):  # type: ignore[name-defined]
         if value is None:
             self.payment_method_id = None
         elif hasattr(value, "id"):
-            # Якщо передано об'єкт PaymentMethod
+            # Якщо передано об'єкт PaymentMethod або значення з реєстру
             self.payment_method_id = value.id
-        elif hasattr(value, "value"):
-            # Якщо передано об'єкт з атрибутом value (наприклад, з Enum)
-            method = PaymentMethod.query.filter_by(name=value.value).first()
-            if method:
-                self.payment_method_id = method.id
-            else:
-                raise ValueError(f"PaymentMethod з назвою '{value.value}' не знайдено")
-        elif hasattr(value, "name"):
-            # Якщо передано об'єкт з атрибутом name
-            method = PaymentMethod.query.filter_by(name=value.name).first()
-            if method:
-                self.payment_method_id = method.id
-            else:
-                raise ValueError(f"PaymentMethod з назвою '{value.name}' не знайдено")
-        elif isinstance(value, str):
-            # Якщо передано рядок
-            method = PaymentMethod.query.filter_by(name=value).first()
+        elif hasattr(value, "value") or hasattr(value, "name") or isinstance(value, str):
+            # Об'єкт з атрибутом value (наприклад, з Enum), з атрибутом name або рядок
+            name = value.value if hasattr(value, "value") else getattr(value, "name", value)
+            registry = get_payment_method_registry()
+            method = registry.by_name(name) if registry is not None else None
             if method:
                 self.payment_method_id = method.id
             else:
-                raise ValueError(f"PaymentMethod з назвою '{value}' не знайдено")
+                raise ValueError(f"PaymentMethod з назвою '{name}' не знайдено")
         elif isinstance(value, int):
             # Якщо передано ID
             self.payment_method_id = value
         else:
             raise ValueError(f"Неприпустимий тип для payment_method: {type(value)}")
 
+    def _flush_pending_totals(self) -> None:
+        """Незбережені послуги/продажі потрапляють у суми лише після flush (як раніше при autoflush запиту)."""
+        session = Session.object_session(self)
+        if session is not None and session.autoflush:
+            session.flush()
+
     def get_total_price(self) -> float:
         """Повертає загальну вартість всіх послуг та пов'язаних продажів"""
-        from app.models import AppointmentService, Sale
-
-        # Сума послуг - використовуємо новий запит до БД для гарантії актуальності
-        # без впливу на інші об'єкти в сесії
-        services = db.session.query(AppointmentService).filter_by(appointment_id=self.id).all()
-        services_total = sum(service.price for service in services)
-
-        # Сума пов'язаних продажів
-        sales = db.session.query(Sale).filter_by(appointment_id=self.id).all()
-        sales_total = sum(float(sale.total_amount) for sale in sales)
-
-        return services_total + sales_total
+        self._flush_pending_totals()
+        return float(self.services_total or 0) + float(self.sales_total or 0)
 
     def get_discounted_price(self) -> Decimal:
         """Повертає вартість з урахуванням знижки"""
-        total = Decimal(str(self.get_total_price()))
-        if self.discount_percentage:
-            # Забезпечуємо узгодженість типів - конвертуємо discount_percentage в Decimal
-            discount_percentage_decimal = Decimal(str(self.discount_percentage))
-            discount_amount = total * (discount_percentage_decimal / Decimal("100"))
-            return total - discount_amount
-        return total
+        self._flush_pending_totals()
+        return Decimal(str(self.discounted_total or 0))
 
     def update_payment_status(self) -> None:
         """Оновлює статус оплати на основі суми оплати"""
@@ -345,6 +452,23 @@ class AppointmentService(db.Model):  # type: ignore[name-defined]
         return f"<AppointmentService {self.service.name if self.service else 'Unknown'} - {self.price}>"
 
 
+# Журнал змін розкладу: версія дати для ETag та дельта-синхронізації API розкладу
+class ScheduleChange(db.Model):  # type: ignore[name-defined]
+    __tablename__ = "schedule_change"
+    __table_args__ = (
+        db.UniqueConstraint("date", "appointment_id", name="uq_schedule_change_date_appointment"),
+        {"sqlite_autoincrement": True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)  # монотонно зростаюча версія
+    date = db.Column(db.Date, nullable=False)
+    appointment_id = db.Column(db.Integer, nullable=False)  # без FK: видалені записи теж мають потрапити в дельту
+    changed_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self) -> str:
+        return f"<ScheduleChange {self.id} - {self.date} - Appointment {self.appointment_id}>"
+
+
 # Модель бренду
 class Brand(db.Model):  # type: ignore[name-defined]
     id = db.Column(db.Integer, primary_key=True)
@@ -379,6 +503,8 @@ class Product(db.Model):  # type: ignore[name-defined]
         "GoodsReceiptItem", back_populates="product", lazy=True, cascade="all, delete-orphan"
     )
     sale_items = db.relationship("SaleItem", backref="product", lazy=True, cascade="all, delete-orphan")
+    stock_movements = db.relationship("StockMovement", backref="product", lazy=True, cascade="all, delete-orphan")
+    stock_snapshots = db.relationship("StockSnapshot", backref="product", lazy=True, cascade="all, delete-orphan")
 
     def __repr__(self) -> str:
         return f"<Product {self.name} ({self.sku})>"
@@ -447,6 +573,19 @@ class GoodsReceipt(db.Model):  # type: ignore[name-defined]
 
 # Модель позиції надходження товарів
 class GoodsReceiptItem(db.Model):  # type: ignore[name-defined]
+    # Відкриті партії товару в порядку FIFO (див. app.services.fifo). Вичерпані партії
+    # в індекс не потрапляють; СУБД без часткових індексів створюють звичайний індекс
+    __table_args__ = (
+        db.Index(
+            "ix_goods_receipt_item_open_batches",
+            "product_id",
+            "receipt_date",
+            "id",
+            sqlite_where=text("quantity_remaining > 0"),
+            postgresql_where=text("quantity_remaining > 0"),
+        ),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     receipt_id = db.Column(db.Integer, db.ForeignKey("goods_receipt.id"), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey("product.id"), nullable=False)
@@ -475,10 +614,39 @@ class GoodsReceiptItem(db.Model):  # type: ignore[name-defined]
         return Decimal(str(self.quantity_received)) * self.cost_price_per_unit
 
 
+def local_day(value: Optional[datetime]) -> date:
+    """
+    Календарна дата моменту за місцевим часом сервера.
+
+    Naive-значення вважаються UTC: так sale_date зберігається в базі (SQLite відкидає tzinfo),
+    тож завантажений, змінений і новий продаж потрапляють в один день.
+    """
+    if value is None:
+        value = datetime.now(timezone.utc)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone().date()
+
+
+def month_start(day: date) -> date:
+    """Перший день місяця дати."""
+    return day.replace(day=1)
+
+
+def _sale_day_default(context: Any) -> date:
+    return local_day(context.get_current_parameters().get("sale_date"))
+
+
 # Модель продажу
 class Sale(db.Model):  # type: ignore[name-defined]
+    # Вибірки продажів за день (звіти, денна каса, зарплата продавця) без date() над sale_date
+    __table_args__ = (db.Index("ix_sale_day_user", "sale_day", "user_id"),)
+
     id = db.Column(db.Integer, primary_key=True)
     sale_date = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    # Локальна дата продажу, заповнюється з sale_date (див. sync_sale_day);
+    # nullable лише в схемі, щоб міграція не перебудовувала таблицю sale
+    sale_day = db.Column(db.Date, nullable=True, default=_sale_day_default)
     client_id = db.Column(db.Integer, db.ForeignKey("client.id"), nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)  # продавець
     appointment_id = db.Column(db.Integer, db.ForeignKey("appointment.id"), nullable=True)
@@ -496,6 +664,13 @@ class Sale(db.Model):  # type: ignore[name-defined]
         return f"<Sale {self.id} - {self.sale_date} - Total: {self.total_amount}>"
 
 
+@event.listens_for(Sale, "before_update")
+def sync_sale_day(mapper: Any, connection: Connection, target: Sale) -> None:
+    """Перенесений продаж переходить у день нової sale_date; порожній sale_day заповнюється."""
+    if target.sale_day is None or inspect(target).attrs.sale_date.history.has_changes():
+        target.sale_day = local_day(target.sale_date)
+
+
 # Модель позиції продажу
 class SaleItem(db.Model):  # type: ignore[name-defined]
     id = db.Column(db.Integer, primary_key=True)
@@ -524,6 +699,53 @@ class SaleItem(db.Model):  # type: ignore[name-defined]
         return self.total_price - self.total_cost
 
 
+# Денний зріз фінансових показників: день × майстер × спосіб оплати.
+# Підтримується подіями сесії (див. refresh_daily_rollup), повністю перебудовується `flask rebuild-daily-rollup`
+class DailyRollup(db.Model):  # type: ignore[name-defined]
+    __tablename__ = "daily_rollup"
+    __table_args__ = (
+        db.UniqueConstraint("day", "master_id", "payment_method_id", name="uq_daily_rollup_day_master_method"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    master_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)  # майстер запису / продавець
+    payment_method_id = db.Column(db.Integer, db.ForeignKey("payment_method.id"), nullable=True)
+    appointment_count = db.Column(db.Integer, nullable=False, default=0)  # завершені записи
+    services_total = db.Column(Numeric(12, 2), nullable=False, default=Decimal("0.00"))  # ціни послуг без знижки
+    # Оплачена сума або вартість послуг зі знижкою; без округлення до копійок, як у фінансовому звіті
+    service_revenue = db.Column(Numeric(16, 6), nullable=False, default=Decimal("0"))
+    sales_count = db.Column(db.Integer, nullable=False, default=0)
+    sales_total = db.Column(Numeric(12, 2), nullable=False, default=Decimal("0.00"))  # Sale.total_amount
+    product_revenue = db.Column(Numeric(12, 2), nullable=False, default=Decimal("0.00"))  # позиції продажів
+    cogs = db.Column(Numeric(12, 2), nullable=False, default=Decimal("0.00"))
+
+    def __repr__(self) -> str:
+        return f"<DailyRollup {self.day} master={self.master_id} method={self.payment_method_id}>"
+
+
+# Фонове завдання формування звіту (див. app/services/report_jobs.py)
+class ReportJob(db.Model):  # type: ignore[name-defined]
+    __tablename__ = "report_job"
+    __table_args__ = (db.Index("ix_report_job_status", "status"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    report_type = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.Text, nullable=False)  # JSON
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending, running, completed, failed
+    result = db.Column(db.Text, nullable=True)  # JSON
+    error = db.Column(db.Text, nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)  # хто замовив звіт
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    user = db.relationship("User", backref="report_jobs", lazy=True)
+
+    def __repr__(self) -> str:
+        return f"<ReportJob {self.id} - {self.report_type} - {self.status}>"
+
+
 # Модель причини списання
 class WriteOffReason(db.Model):  # type: ignore[name-defined]
     __tablename__ = "write_off_reason"
@@ -609,6 +831,383 @@ def create_stock_level(mapper: Any, connection: Connection, target: Product) ->
     connection.execute(stmt, {"product_id": target.id, "now": datetime.now(timezone.utc)})
 
 
+# Денормалізовані суми запису: services_total, sales_total, discounted_total
+_TOTALS_CENT = Decimal("0.01")
+_TOTALS_BATCH_SIZE = 500
+_PENDING_TOTALS = "pending_appointment_totals"
+
+
+def _to_money(value: Any) -> Decimal:
+    return Decimal(str(value or 0)).quantize(_TOTALS_CENT, rounding=ROUND_HALF_UP)
+
+
+def calculate_discounted_total(services_total: Any, sales_total: Any, discount_percentage: Any) -> Decimal:
+    """Вартість запису зі знижкою (послуги + пов'язані продажі)."""
+    total = _to_money(services_total) + _to_money(sales_total)
+    if discount_percentage:
+        total -= total * (Decimal(str(discount_percentage)) / Decimal("100"))
+    return _to_money(total)
+
+
+def refresh_appointment_totals(connection: Connection, appointment_ids: Iterable[int]) -> Dict[int, Dict[str, Decimal]]:
+    """
+    Перераховує суми вказаних записів двома згрупованими запитами на пакет
+    та оновлює їх одним executemany.
+
+    Returns:
+        Нові суми за ID запису (``services_total``, ``sales_total``, ``discounted_total``)
+    """
+    totals: Dict[int, Dict[str, Decimal]] = {}
+    ids = sorted({appointment_id for appointment_id in appointment_ids if appointment_id is not None})
+    appointment_table = Appointment.__table__
+    update_stmt = (
+        appointment_table.update()
+        .where(appointment_table.c.id == bindparam("appointment_id"))
+        .values(
+            services_total=bindparam("new_services_total"),
+            sales_total=bindparam("new_sales_total"),
+            discounted_total=bindparam("new_discounted_total"),
+        )
+    )
+
+    for start in range(0, len(ids), _TOTALS_BATCH_SIZE):
+        batch = ids[start : start + _TOTALS_BATCH_SIZE]
+        services = dict(
+            connection.execute(
+                select(AppointmentService.appointment_id, func.sum(AppointmentService.price))
+                .where(AppointmentService.appointment_id.in_(batch))
+                .group_by(AppointmentService.appointment_id)
+            ).all()
+        )
+        sales = dict(
+            connection.execute(
+                select(Sale.appointment_id, func.sum(Sale.total_amount))
+                .where(Sale.appointment_id.in_(batch))
+                .group_by(Sale.appointment_id)
+            ).all()
+        )
+        discounts = connection.execute(
+            select(Appointment.id, Appointment.discount_percentage).where(Appointment.id.in_(batch))
+        ).all()
+        rows = [
+            {
+                "appointment_id": appointment_id,
+                "new_services_total": _to_money(services.get(appointment_id)),
+                "new_sales_total": _to_money(sales.get(appointment_id)),
+                "new_discounted_total": calculate_discounted_total(
+                    services.get(appointment_id), sales.get(appointment_id), discount
+                ),
+            }
+            for appointment_id, discount in discounts
+        ]
+        if rows:
+            connection.execute(update_stmt, rows)
+        for row in rows:
+            totals[row["appointment_id"]] = {
+                "services_total": row["new_services_total"],
+                "sales_total": row["new_sales_total"],
+                "discounted_total": row["new_discounted_total"],
+            }
+    return totals
+
+
+def _sync_loaded_totals(session: Session, totals: Dict[int, Dict[str, Decimal]]) -> None:
+    """Оновлює суми завантажених у сесію записів без позначення їх зміненими."""
+    # Нові записи потрапляють в identity_map лише після завершення flush
+    inserted = {obj.id: obj for obj in session.new if isinstance(obj, Appointment)}
+    for appointment_id, values in totals.items():
+        appointment = inserted.get(appointment_id) or session.identity_map.get(
+            session.identity_key(Appointment, appointment_id)
+        )
+        if appointment is None:
+            continue
+        for attr, value in values.items():
+            set_committed_value(appointment, attr, value)
+
+
+@event.listens_for(AppointmentService.appointment_id, "set", active_history=True)
+@event.listens_for(Sale.appointment_id, "set", active_history=True)
+def keep_previous_appointment_id(target: Any, value: Any, oldvalue: Any, initiator: Any) -> None:
+    """Завдяки active_history при перенесенні послуги/продажу оновлюються суми і попереднього запису."""
+
+
+def _affected_appointment_ids(session: Session) -> Set[int]:
+    appointment_ids: Set[int] = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        try:
+            if isinstance(obj, (AppointmentService, Sale)):
+                history = inspect(obj).attrs.appointment_id.load_history()
+                appointment_ids.update(value for value in (*history.unchanged, *history.added, *history.deleted))
+            elif isinstance(obj, Appointment) and obj not in session.deleted:
+                if obj in session.new or inspect(obj).attrs.discount_percentage.history.has_changes():
+                    appointment_ids.add(obj.id)
+        except ObjectDeletedError:
+            continue
+    appointment_ids.discard(None)
+    return appointment_ids
+
+
+@event.listens_for(Session, "after_flush")
+def update_appointment_totals(session: Session, flush_context: Any) -> None:
+    """Перераховує суми записів, послуги/продажі/знижка яких змінились у цьому flush."""
+    appointment_ids = _affected_appointment_ids(session)
+    if appointment_ids:
+        _sync_loaded_totals(session, refresh_appointment_totals(session.connection(), appointment_ids))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def collect_bulk_totals_targets(orm_execute_state: Any) -> None:
+    """Запам'ятовує записи, яких торкнеться масовий ``query.update()``/``query.delete()`` послуг чи продажів."""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ not in (AppointmentService, Sale):
+        return
+    model = mapper.class_
+    query = select(model.appointment_id).where(model.appointment_id.is_not(None))
+    if orm_execute_state.statement.whereclause is not None:
+        query = query.where(orm_execute_state.statement.whereclause)
+    session = orm_execute_state.session
+    with session.no_autoflush:
+        appointment_ids = set(session.execute(query).scalars())
+    session.info.setdefault(_PENDING_TOTALS, set()).update(appointment_ids)
+
+
+@event.listens_for(Session, "after_bulk_update")
+@event.listens_for(Session, "after_bulk_delete")
+def update_totals_after_bulk_write(update_context: Any) -> None:
+    session = update_context.session
+    appointment_ids = session.info.pop(_PENDING_TOTALS, None)
+    if appointment_ids:
+        _sync_loaded_totals(session, refresh_appointment_totals(session.connection(), appointment_ids))
+
+
+# Денні зрізи daily_rollup: перераховуються цілими днями в тій самій транзакції
+_ROLLUP_BATCH_DAYS = 31
+_ROLLUP_MICRO = 1_000_000
+_PENDING_ROLLUP_DAYS = "pending_daily_rollup_days"
+# Дні з незафіксованими змінами звітних даних (session.info); за ними скидається кеш звітів
+CHANGED_REPORT_DAYS = "changed_report_days"
+_ROLLUP_APPOINTMENT_FIELDS = ("date", "master_id", "status", "payment_method_id", "amount_paid", "discount_percentage")
+_ROLLUP_SALE_FIELDS = ("sale_date", "sale_day", "user_id", "payment_method_id", "total_amount")
+# Поля, що є лише в рядках звітів (AppointmentRow, SaleRow): скидають кеш, але не daily_rollup
+_REPORT_ONLY_APPOINTMENT_FIELDS = ("start_time", "end_time", "client_id")
+_REPORT_ONLY_SALE_FIELDS = ("client_id",)
+
+
+def refresh_daily_rollup(connection: Connection, days: Iterable[Any]) -> int:
+    """
+    Перераховує рядки daily_rollup вказаних днів з первинних таблиць:
+    три згруповані запити на пакет днів та один executemany.
+
+    Returns:
+        Кількість записаних рядків
+    """
+    rollup_table = DailyRollup.__table__
+    all_days = sorted({day for day in days if day is not None})
+    written = 0
+
+    for start in range(0, len(all_days), _ROLLUP_BATCH_DAYS):
+        batch = all_days[start : start + _ROLLUP_BATCH_DAYS]
+        rows: Dict[Any, Dict[str, Any]] = {}
+
+        def row(day: Any, master_id: int, payment_method_id: Optional[int]) -> Dict[str, Any]:
+            key = (day, master_id, payment_method_id)
+            if key not in rows:
+                rows[key] = {
+                    "day": key[0],
+                    "master_id": master_id,
+                    "payment_method_id": payment_method_id,
+                    "appointment_count": 0,
+                    "services_total": Decimal("0.00"),
+                    "service_revenue": Decimal("0"),
+                    "sales_count": 0,
+                    "sales_total": Decimal("0.00"),
+                    "product_revenue": Decimal("0.00"),
+                    "cogs": Decimal("0.00"),
+                }
+            return rows[key]
+
+        completed = and_(Appointment.date.in_(batch), Appointment.status == "completed")
+        # Суми послуг у копійках та знижка в базисних пунктах: виручка в цілих мільйонних частках гривні
+        services = (
+            select(
+                AppointmentService.appointment_id.label("appointment_id"),
+                func.sum(AppointmentService.price).label("services_total"),
+                func.sum(cast(func.round(AppointmentService.price * 100), Integer)).label("services_cents"),
+            )
+            .join(Appointment, Appointment.id == AppointmentService.appointment_id)
+            .where(completed)
+            .group_by(AppointmentService.appointment_id)
+            .subquery()
+        )
+        discount = func.coalesce(Appointment.discount_percentage, 0)
+        discount_basis_points = cast(func.round((100 - discount) * 100), Integer)
+        revenue = case(
+            (Appointment.amount_paid > 0, cast(func.round(Appointment.amount_paid * _ROLLUP_MICRO), Integer)),
+            else_=func.coalesce(services.c.services_cents, 0) * discount_basis_points,
+        )
+        appointment_rows = connection.execute(
+            select(
+                Appointment.date,
+                Appointment.master_id,
+                Appointment.payment_method_id,
+                func.count(Appointment.id),
+                func.sum(services.c.services_total),
+                func.sum(revenue),
+            )
+            .outerjoin(services, services.c.appointment_id == Appointment.id)
+            .where(completed)
+            .group_by(Appointment.date, Appointment.master_id, Appointment.payment_method_id)
+        ).all()
+        for day, master_id, payment_method_id, count, services_total, revenue_micro in appointment_rows:
+            values = row(day, master_id, payment_method_id)
+            values["appointment_count"] = count
+            values["services_total"] = _to_money(services_total)
+            values["service_revenue"] = Decimal(revenue_micro or 0) / _ROLLUP_MICRO
+
+        sales_rows = connection.execute(
+            select(
+                Sale.sale_day, Sale.user_id, Sale.payment_method_id, func.count(Sale.id), func.sum(Sale.total_amount)
+            )
+            .where(Sale.sale_day.in_(batch))
+            .group_by(Sale.sale_day, Sale.user_id, Sale.payment_method_id)
+        ).all()
+        for day, master_id, payment_method_id, count, sales_total in sales_rows:
+            values = row(day, master_id, payment_method_id)
+            values["sales_count"] = count
+            values["sales_total"] = _to_money(sales_total)
+
+        item_rows = connection.execute(
+            select(
+                Sale.sale_day,
+                Sale.user_id,
+                Sale.payment_method_id,
+                func.sum(SaleItem.price_per_unit * SaleItem.quantity),
+                func.sum(SaleItem.cost_price_per_unit * SaleItem.quantity),
+            )
+            .join(Sale, Sale.id == SaleItem.sale_id)
+            .where(Sale.sale_day.in_(batch))
+            .group_by(Sale.sale_day, Sale.user_id, Sale.payment_method_id)
+        ).all()
+        for day, master_id, payment_method_id, product_revenue, cogs in item_rows:
+            values = row(day, master_id, payment_method_id)
+            values["product_revenue"] = _to_money(product_revenue)
+            values["cogs"] = _to_money(cogs)
+
+        connection.execute(rollup_table.delete().where(rollup_table.c.day.in_(batch)))
+        if rows:
+            connection.execute(rollup_table.insert(), list(rows.values()))
+        written += len(rows)
+    return written
+
+
+def _history_values(attr: Any) -> List[Any]:
+    history = attr.load_history()
+    return [value for value in (*history.unchanged, *history.added, *history.deleted) if value is not None]
+
+
+def _has_changes(state: Any, fields: Iterable[str]) -> bool:
+    return any(state.attrs[name].history.has_changes() for name in fields)
+
+
+def _affected_rollup_days(session: Session) -> Tuple[Set[date], Set[date]]:
+    """
+    Дні (у т.ч. попередні дати перенесених записів/продажів), змінені цим flush:
+    дні з іншими показниками daily_rollup та дні, де змінились лише поля рядків звітів.
+    """
+    days: Set[Any] = set()
+    report_days: Set[Any] = set()
+    appointment_ids: Set[int] = set()
+    sale_ids: Set[int] = set()
+    dirty = session.dirty
+    deleted = session.deleted
+    for obj in (*session.new, *dirty, *deleted):
+        try:
+            state = inspect(obj)
+            if isinstance(obj, Appointment):
+                if obj in dirty and not _has_changes(state, _ROLLUP_APPOINTMENT_FIELDS):
+                    if _has_changes(state, _REPORT_ONLY_APPOINTMENT_FIELDS):
+                        report_days.update(_history_values(state.attrs.date))
+                    continue
+                days.update(_history_values(state.attrs.date))
+            elif isinstance(obj, Sale):
+                if obj in dirty and not _has_changes(state, _ROLLUP_SALE_FIELDS):
+                    if _has_changes(state, _REPORT_ONLY_SALE_FIELDS):
+                        report_days.update(_history_values(state.attrs.sale_day))
+                    continue
+                # Попередній день з історії, поточний (після sync_sale_day / default) - з бази
+                days.update(_history_values(state.attrs.sale_day))
+                if obj not in deleted:
+                    sale_ids.add(obj.id)
+            elif isinstance(obj, AppointmentService):
+                appointment_ids.update(_history_values(state.attrs.appointment_id))
+            elif isinstance(obj, SaleItem):
+                sale_ids.update(_history_values(state.attrs.sale_id))
+        except ObjectDeletedError:
+            continue
+
+    connection = session.connection()
+    if appointment_ids:
+        days.update(connection.execute(select(Appointment.date).where(Appointment.id.in_(appointment_ids))).scalars())
+    if sale_ids:
+        days.update(connection.execute(select(Sale.sale_day).where(Sale.id.in_(sale_ids))).scalars())
+    return days, report_days
+
+
+@event.listens_for(Session, "after_flush")
+def update_daily_rollup(session: Session, flush_context: Any) -> None:
+    """Перераховує денні зрізи днів, записи/продажі яких змінились у цьому flush."""
+    days, report_days = _affected_rollup_days(session)
+    if days:
+        refresh_daily_rollup(session.connection(), days)
+    if days or report_days:
+        session.info.setdefault(CHANGED_REPORT_DAYS, set()).update(days | report_days)
+
+
+def _rollup_day_query(model: Any) -> Any:
+    if model is Appointment:
+        return select(Appointment.date)
+    if model is AppointmentService:
+        return (
+            select(Appointment.date)
+            .select_from(AppointmentService)
+            .join(Appointment, Appointment.id == AppointmentService.appointment_id)
+        )
+    if model is Sale:
+        return select(Sale.sale_day)
+    if model is SaleItem:
+        return select(Sale.sale_day).select_from(SaleItem).join(Sale, Sale.id == SaleItem.sale_id)
+    return None
+
+
+@event.listens_for(Session, "do_orm_execute")
+def collect_bulk_rollup_days(orm_execute_state: Any) -> None:
+    """Запам'ятовує дні, яких торкнеться масовий ``query.update()``/``query.delete()``."""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    query = _rollup_day_query(mapper.class_) if mapper is not None else None
+    if query is None:
+        return
+    if orm_execute_state.statement.whereclause is not None:
+        query = query.where(orm_execute_state.statement.whereclause)
+    session = orm_execute_state.session
+    with session.no_autoflush:
+        days = set(session.execute(query.distinct()).scalars())
+    session.info.setdefault(_PENDING_ROLLUP_DAYS, set()).update(days)
+
+
+@event.listens_for(Session, "after_bulk_update")
+@event.listens_for(Session, "after_bulk_delete")
+def update_rollup_after_bulk_write(update_context: Any) -> None:
+    session = update_context.session
+    days = session.info.pop(_PENDING_ROLLUP_DAYS, None)
+    if days:
+        refresh_daily_rollup(session.connection(), days)
+        session.info.setdefault(CHANGED_REPORT_DAYS, set()).update(days)
+
+
 # Модель акту інвентаризації
 class InventoryAct(db.Model):  # type: ignore[name-defined]
     __tablename__ = "inventory_act"
@@ -669,6 +1268,167 @@ class InventoryActItem(db.Model):  # type: ignore[name-defined]
             self.discrepancy = None
 
 
+# Журнал руху товарів: рядок на кожну позицію надходження, продажу, списання чи коригування залишку.
+# Лише доповнюється; залишок на дату - зріз stock_snapshot плюс сума рухів після нього
+# (див. app/services/stock_ledger.py)
+class StockMovement(db.Model):  # type: ignore[name-defined]
+    __tablename__ = "stock_movement"
+    __table_args__ = (
+        db.UniqueConstraint("kind", "source_id", name="uq_stock_movement_source"),
+        # Сума рухів товару за діапазон днів читається з самого індексу
+        db.Index("ix_stock_movement_product_day", "product_id", "day", "quantity"),
+        db.Index("ix_stock_movement_day", "day"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey("product.id"), nullable=False)
+    day = db.Column(db.Date, nullable=False)  # дата документа
+    quantity = db.Column(db.Integer, nullable=False)  # надходження додатні, продажі та списання від'ємні
+    kind = db.Column(db.String(20), nullable=False)  # receipt, sale, write_off, adjustment
+    # Позиція документа: goods_receipt_item, sale_item, product_write_off_item або inventory_act_item
+    source_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self) -> str:
+        return f"<StockMovement {self.kind} Product: {self.product_id}, {self.day}: {self.quantity:+d}>"
+
+
+# Залишок товару на початок місяця (сума всіх рухів до period_start), пишеться `flask snapshot-stock`.
+# Кожен товар з рухами до period_start має рядок у цьому зрізі
+class StockSnapshot(db.Model):  # type: ignore[name-defined]
+    __tablename__ = "stock_snapshot"
+    __table_args__ = (db.UniqueConstraint("period_start", "product_id", name="uq_stock_snapshot_period_product"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    period_start = db.Column(db.Date, nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey("product.id"), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<StockSnapshot Product: {self.product_id}, {self.period_start}: {self.quantity}>"
+
+
+_MOVEMENT_KINDS = {GoodsReceiptItem: "receipt", SaleItem: "sale", ProductWriteOffItem: "write_off"}
+_MOVEMENT_BATCH_SIZE = 500
+
+
+def _movement_source_query(kind: str) -> Any:
+    """Рух товару позицій документа: (source_id, product_id, day, quantity)."""
+    if kind == "receipt":
+        return select(
+            GoodsReceiptItem.id,
+            GoodsReceiptItem.product_id,
+            GoodsReceipt.receipt_date,
+            GoodsReceiptItem.quantity_received,
+        ).join(GoodsReceipt, GoodsReceipt.id == GoodsReceiptItem.receipt_id)
+    if kind == "sale":
+        return select(SaleItem.id, SaleItem.product_id, Sale.sale_day, -SaleItem.quantity).join(
+            Sale, Sale.id == SaleItem.sale_id
+        )
+    return select(
+        ProductWriteOffItem.id,
+        ProductWriteOffItem.product_id,
+        ProductWriteOff.write_off_date,
+        -ProductWriteOffItem.quantity,
+    ).join(ProductWriteOff, ProductWriteOff.id == ProductWriteOffItem.product_write_off_id)
+
+
+def shift_stock_snapshots(connection: Connection, movements: Iterable[Dict[str, Any]]) -> None:
+    """
+    Додає рухи минулих місяців (документи заднім числом) до вже записаних пізніших зрізів,
+    створюючи рядки зрізів для товарів, яких у них ще не було.
+    """
+    current_period = month_start(local_day(None))
+    deltas: Dict[Any, int] = {}
+    for movement in movements:
+        if movement["day"] < current_period and movement["quantity"]:
+            key = (movement["product_id"], movement["day"])
+            deltas[key] = deltas.get(key, 0) + movement["quantity"]
+    if not deltas:
+        return
+
+    periods = (
+        connection.execute(
+            select(StockSnapshot.period_start)
+            .where(StockSnapshot.period_start > min(day for _, day in deltas))
+            .distinct()
+        )
+        .scalars()
+        .all()
+    )
+    shifts: Dict[Any, int] = {}
+    for (product_id, day), delta in deltas.items():
+        for period in periods:
+            if period > day:
+                shifts[(product_id, period)] = shifts.get((product_id, period), 0) + delta
+    if not shifts:
+        return
+
+    existing = set(
+        connection.execute(
+            select(StockSnapshot.product_id, StockSnapshot.period_start).where(
+                StockSnapshot.product_id.in_({product_id for product_id, _ in shifts}),
+                StockSnapshot.period_start.in_(periods),
+            )
+        ).all()
+    )
+    table = StockSnapshot.__table__
+    updates = [
+        {"snapshot_product_id": product_id, "snapshot_period": period, "delta": delta}
+        for (product_id, period), delta in shifts.items()
+        if (product_id, period) in existing
+    ]
+    if updates:
+        connection.execute(
+            table.update()
+            .where(
+                table.c.product_id == bindparam("snapshot_product_id"),
+                table.c.period_start == bindparam("snapshot_period"),
+            )
+            .values(quantity=table.c.quantity + bindparam("delta")),
+            updates,
+        )
+    # Товару не було в зрізі - до цього руху його залишок на початок періоду був нульовим
+    inserts = [
+        {"product_id": product_id, "period_start": period, "quantity": delta}
+        for (product_id, period), delta in shifts.items()
+        if (product_id, period) not in existing
+    ]
+    if inserts:
+        connection.execute(table.insert(), inserts)
+
+
+@event.listens_for(Session, "after_flush")
+def record_stock_movements(session: Session, flush_context: Any) -> None:
+    """Додає в журнал рух товару нових позицій надходжень, продажів і списань цього flush."""
+    new_lines: Dict[str, List[int]] = {}
+    movements: List[Dict[str, Any]] = []
+    for obj in session.new:
+        kind = _MOVEMENT_KINDS.get(type(obj))
+        if kind is not None:
+            new_lines.setdefault(kind, []).append(obj.id)
+        elif isinstance(obj, StockMovement):
+            movements.append({"product_id": obj.product_id, "day": obj.day, "quantity": obj.quantity})
+    if not new_lines and not movements:
+        return
+
+    connection = session.connection()
+    rows = []
+    for kind, ids in new_lines.items():
+        query = _movement_source_query(kind)
+        source_id = query.selected_columns[0]
+        for start in range(0, len(ids), _MOVEMENT_BATCH_SIZE):
+            for line_id, product_id, day, quantity in connection.execute(
+                query.where(source_id.in_(ids[start : start + _MOVEMENT_BATCH_SIZE]))
+            ):
+                rows.append(
+                    {"product_id": product_id, "day": day, "quantity": quantity, "kind": kind, "source_id": line_id}
+                )
+    if rows:
+        connection.execute(StockMovement.__table__.insert(), rows)
+    shift_stock_snapshots(connection, rows + movements)
+
+
 def setup_foreign_key_constraints(app):
     """Налаштовує foreign key constraints для SQLite"""
 
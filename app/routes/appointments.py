@@ -1,4 +1,5 @@
 # type: ignore
+import hashlib
 import logging
 from datetime import date, datetime, time, timedelta
 from decimal import Decimal
@@ -7,9 +8,9 @@ from typing import Any, Union
 from flask import Blueprint, flash, jsonify, redirect, render_template, request, url_for, current_app
 from flask_login import current_user, login_required
 from flask_wtf import FlaskForm
-from sqlalchemy import func
 from sqlalchemy.orm import attributes
 from wtforms import (
+    BooleanField,
     DateField,
     FloatField,
     HiddenField,
@@ -27,6 +28,11 @@ from app.models import Appointment, AppointmentService, Client
 from app.models import PaymentMethod as PaymentMethodModel
 from app.models import PaymentMethodEnum as PaymentMethod
 from app.models import Service, User, db
+from app.routes.main import generate_time_slots
+from app.services.availability_service import AvailabilityService
+from app.services.overlap_service import OverlapService
+from app.services.schedule_grid import PAYMENT_STATUS_CODES, STATUS_CODES, ScheduleGrid, compact_columns
+from app.services.schedule_service import ScheduleService
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -46,6 +52,7 @@ class AppointmentForm(FlaskForm):
     amount_paid = FloatField("Сплачено", validators=[Optional(), NumberRange(min=0)])
     payment_method = SelectField("Спосіб оплати", coerce=int, validators=[Optional()])
     notes = TextAreaField("Примітки", validators=[Optional()])
+    allow_overlap = BooleanField("Дозволити накладання з іншими записами майстра")
     submit = SubmitField("Зберегти")
 
     def __init__(self, formdata=None, obj=None, **kwargs):
@@ -366,6 +373,24 @@ def create() -> Any:
             start_datetime = datetime.combine(form.date.data, form.start_time.data)
             end_datetime = start_datetime + timedelta(minutes=total_duration or 60)  # Default 60 min
 
+            # Перевірка накладання з іншими записами майстра
+            if not form.allow_overlap.data:
+                conflicts = OverlapService.find_overlaps(
+                    form.master_id.data, form.date.data, form.start_time.data, end_datetime.time()
+                )
+                if conflicts:
+                    flash(
+                        f"Майстер вже має записи в цей час: {OverlapService.describe(conflicts)}. "
+                        "Змініть час або позначте «Дозволити накладання».",
+                        "error",
+                    )
+                    return render_template(
+                        "appointments/create.html",
+                        title="Створити запис",
+                        form=form,
+                        from_schedule=request.args.get("from_schedule"),
+                    )
+
             # Create appointment
             payment_method_id = form.payment_method.data if form.payment_method.data != 0 else None
 
@@ -498,6 +523,25 @@ def edit(id: int) -> str:
             start_datetime = datetime.combine(form.date.data, form.start_time.data)
             end_datetime = start_datetime + timedelta(minutes=total_duration or 60)
 
+            # Перевірка накладання з іншими записами майстра (без самого запису)
+            if not form.allow_overlap.data:
+                conflicts = OverlapService.find_overlaps(
+                    form.master_id.data,
+                    form.date.data,
+                    form.start_time.data,
+                    end_datetime.time(),
+                    exclude_id=appointment.id,
+                )
+                if conflicts:
+                    flash(
+                        f"Майстер вже має записи в цей час: {OverlapService.describe(conflicts)}. "
+                        "Змініть час або позначте «Дозволити накладання».",
+                        "error",
+                    )
+                    return render_template(
+                        "appointments/edit.html", title="Редагувати запис", form=form, appointment=appointment
+                    )
+
             # Update appointment
             payment_method_id = form.payment_method.data if form.payment_method.data != 0 else None
 
@@ -958,7 +1002,7 @@ def daily_summary() -> str:
     # Запит для продажів товарів за день
     from app.models import Sale
 
-    sales_query = Sale.query.filter(func.date(Sale.sale_date) == filter_date)
+    sales_query = Sale.query.filter(Sale.sale_day == filter_date)
 
     # Фільтрація за майстром
     if filter_master_id:
@@ -1204,6 +1248,128 @@ def api_dates(date_str: str):
     return jsonify(result)
 
 
+@bp.route("/api/schedule")
+@login_required
+def api_schedule():
+    """
+    Компактний розклад дня для частого опитування.
+
+    Повертає сітку у стовпчиковому форматі (майстри, записи як списки індексів
+    слотів, коди статусів, фінансові рядки). ETag залежить від версії дати,
+    тому незмінений розклад віддається як 304. З параметром ``since=<version>``
+    повертаються лише записи, змінені після цієї версії, а ``removed`` містить
+    ID записів, які зникли з розкладу (скасовані, перенесені або видалені).
+    """
+    date_str = request.args.get("date")
+    try:
+        target_date = datetime.strptime(date_str, "%Y-%m-%d").date() if date_str else date.today()
+    except ValueError:
+        return jsonify({"error": "Invalid date format"}), 400
+
+    since = request.args.get("since", type=int)
+    if request.args.get("since") and since is None:
+        return jsonify({"error": "Invalid since version"}), 400
+
+    masters = ScheduleService.get_masters_for_date(target_date)
+    version = ScheduleService.get_date_version(target_date)
+    masters_key = "|".join(f"{m.id}:{m.full_name}" for m in masters)
+    masters_hash = hashlib.md5(masters_key.encode("utf-8")).hexdigest()[:12]
+    etag = f"{target_date.isoformat()}-{version}-{masters_hash}-{current_user.id}"
+
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    grid = ScheduleGrid(generate_time_slots(interval_minutes=15))
+    columns = ScheduleService.get_columns(grid, target_date, [m.id for m in masters])
+    master_ids = {m.id for m in masters}
+    multi_booking_client_ids = ScheduleService.get_multi_booking_client_ids(target_date, master_ids)
+
+    is_delta = since is not None and since <= version
+    changed_ids = ScheduleService.get_changed_appointment_ids(target_date, since) if is_delta else None
+    appointments = compact_columns(
+        [columns[m.id] for m in masters], current_user, multi_booking_client_ids, only_ids=changed_ids
+    )
+
+    payload = {
+        "date": target_date.isoformat(),
+        "version": version,
+        "delta": is_delta,
+        "since": since if is_delta else None,
+        "slot_minutes": 15,
+        "slots": grid.slot_labels,
+        "masters": {
+            "id": [m.id for m in masters],
+            "name": [m.full_name for m in masters],
+            "hash": masters_hash,
+        },
+        "codes": {"status": STATUS_CODES, "payment_status": PAYMENT_STATUS_CODES},
+        "appointments": appointments,
+    }
+    if is_delta:
+        payload["removed"] = sorted(changed_ids - set(appointments["id"]))
+
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Cookie")
+    return response
+
+
+@bp.route("/api/available-slots")
+@login_required
+def api_available_slots():
+    """
+    API пошуку найближчих вільних слотів.
+
+    Параметри: service_ids (через кому або повторювані), master_id (необов'язково),
+    from (YYYY-MM-DD, за замовчуванням сьогодні), days (за замовчуванням 14), limit.
+    """
+    raw_ids = ",".join(request.args.getlist("service_ids"))
+    try:
+        service_ids = [int(value) for value in raw_ids.split(",") if value.strip()]
+    except ValueError:
+        return jsonify({"error": "Invalid service_ids"}), 400
+
+    from_str = request.args.get("from")
+    try:
+        from_date = datetime.strptime(from_str, "%Y-%m-%d").date() if from_str else None
+    except ValueError:
+        return jsonify({"error": "Invalid date format"}), 400
+
+    master_id = request.args.get("master_id", type=int)
+    days = min(request.args.get("days", 14, type=int), 60)
+    limit = min(request.args.get("limit", 10, type=int), 50)
+
+    try:
+        duration = AvailabilityService.get_total_duration(service_ids)
+        slots = AvailabilityService.find_available_slots(
+            service_ids, master_id=master_id, from_date=from_date, days=days, limit=limit
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    master_names = dict(
+        db.session.query(User.id, User.full_name).filter(User.id.in_({slot.master_id for slot in slots})).all()
+    )
+    return jsonify(
+        {
+            "duration": duration,
+            "slots": [
+                {
+                    "master_id": slot.master_id,
+                    "master_name": master_names.get(slot.master_id),
+                    "date": slot.date.strftime("%Y-%m-%d"),
+                    "start_time": slot.start_time.strftime("%H:%M"),
+                    "end_time": slot.end_time.strftime("%H:%M"),
+                }
+                for slot in slots
+            ],
+        }
+    )
+
+
 @bp.route("/<int:id>/complete", methods=["GET"])
 @login_required
 def complete_get(id: int) -> str:
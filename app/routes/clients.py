@@ -1,28 +1,28 @@
 from datetime import datetime
-from typing import Any, List
-from typing import Optional as OptionalType
+from typing import Any, Dict
 
-from flask import (Blueprint, flash, jsonify, redirect, render_template,
-                   request, url_for)
+from flask import (Blueprint, abort, flash, jsonify, redirect,
+                   render_template, request, url_for)
 from flask_login import current_user, login_required
 from flask_wtf import FlaskForm
+from sqlalchemy import or_
 from wtforms import StringField, SubmitField, TextAreaField
 from wtforms.validators import (DataRequired, Email, Length, Optional,
                                 ValidationError)
 
-from app.models import Appointment, Client, db
+from app.models import Appointment, Client, db, normalize_phone
+from app.services.client_search import ClientSearchService, InvalidCursorError
 
 # Створення Blueprint
 bp = Blueprint("clients", __name__, url_prefix="/clients")
 
 
-# Функція для перевірки чи містить рядок всі слова пошуку
-def contains_all_words(text: OptionalType[str], search_words: List[str]) -> bool:
-    if not text:
-        return False
+# Кількість підказок у швидкому пошуку
+API_SEARCH_LIMIT = 10
 
-    text_lower = text.lower()
-    return all(word in text_lower for word in search_words)
+
+def _client_json(client: Client) -> Dict[str, Any]:
+    return {"id": client.id, "name": client.name, "phone": client.phone, "email": client.email}
 
 
 # Форма для клієнта
@@ -34,7 +34,10 @@ class ClientForm(FlaskForm):
     submit = SubmitField("Зберегти")
 
     def validate_phone(self, phone: StringField) -> None:
-        client = Client.query.filter_by(phone=phone.data).first()
+        # Номер вважається зайнятим і тоді, коли відрізняється лише форматуванням
+        client = Client.query.filter(
+            or_(Client.phone == phone.data, Client.phone_normalized == normalize_phone(phone.data))
+        ).first()
         if client and (not hasattr(self, "client_id") or client.id != getattr(self, "client_id", None)):
             raise ValidationError("Клієнт з таким номером телефону вже існує.")
 
@@ -52,55 +55,25 @@ def index() -> str:
     # Отримання параметра пошуку
     search = request.args.get("search", "")
 
-    # Базовий запит клієнтів
-    if current_user.is_admin:
-        # Адміністратор може бачити всіх клієнтів
-        query = Client.query
-    else:
-        # Майстер може бачити тільки клієнтів з якими мав записи
-        client_ids = db.session.query(Appointment.client_id).filter(Appointment.master_id == current_user.id).distinct()
-        query = Client.query.filter(Client.id.in_(client_ids))
-
-    # Фільтрація за пошуковим запитом
+    # Фільтрація за пошуковим запитом (повнотекстовий індекс, ранжування в SQL)
+    page = None
     if search and search.strip():
-        # Get all clients from the already filtered query and filter further in Python
-        # This is a workaround for SQLite's case-sensitivity issues with Cyrillic
-        all_clients = query.all()
-
-        # Split search string into words and convert to lowercase for case-insensitive comparison
-        search_words = [word.lower() for word in search.split()]
-
-        # Filter clients in Python (case-insensitive)
-        clients = []
-        for client in all_clients:
-            # Check if all search words are in the client name (in any order)
-            if contains_all_words(client.name, search_words):
-                clients.append(client)
-                continue
-
-            # Check phone (exact match for phone numbers)
-            if client.phone and search in client.phone:
-                clients.append(client)
-                continue
-
-            # Check email
-            if contains_all_words(client.email, search_words):
-                clients.append(client)
-                continue
-
-            # Check notes
-            if contains_all_words(client.notes, search_words):
-                clients.append(client)
-                continue
-
+        clients = ClientSearchService.search(current_user, search)
     else:
-        # Без пошуку просто повертаємо відфільтрованих клієнтів
-        clients = query.order_by(Client.name).all()
+        # Без пошуку - сторінка клієнтів, доступних користувачу, від курсора
+        try:
+            page = ClientSearchService.page(
+                current_user, after=request.args.get("after"), before=request.args.get("before")
+            )
+        except InvalidCursorError:
+            abort(400)
+        clients = page.clients
 
     return render_template(
         "clients/index.html",
         title="Клієнти",
         clients=clients,
+        page=page,
         search=search,
         is_admin=current_user.is_admin,
     )
@@ -252,69 +225,13 @@ def api_search() -> Any:
     if not query_string or len(query_string) < 2:
         return jsonify([])
 
-    # Базовий запит для отримання клієнтів
-    if current_user.is_admin:
-        # Адміністратор може бачити всіх клієнтів
-        all_clients = Client.query.all()
-    else:
-        # Майстер може бачити тільки клієнтів з якими мав записи
-        client_ids = (
-            db.session.query(Appointment.client_id).filter(Appointment.master_id == current_user.id).distinct().all()
-        )
-        client_ids = [client_id[0] for client_id in client_ids]
-        all_clients = Client.query.filter(Client.id.in_(client_ids)).all() if client_ids else []
-
-    # Split query string into words and convert to lowercase for case-insensitive comparison
-    query_words = [word.lower() for word in query_string.split()]
-
-    # Filter clients in Python (case-insensitive)
-    clients = []
-    for client in all_clients:
-        # Check if all query words are in the client name (in any order)
-        if contains_all_words(client.name, query_words):
-            clients.append(
-                {
-                    "id": client.id,
-                    "name": client.name,
-                    "phone": client.phone,
-                    "email": client.email,
-                }
-            )
-            continue
-
-        # Check phone (exact match for phone numbers)
-        if client.phone and query_string in client.phone:
-            clients.append(
-                {
-                    "id": client.id,
-                    "name": client.name,
-                    "phone": client.phone,
-                    "email": client.email,
-                }
-            )
-            continue
-
-        # Check email
-        if contains_all_words(client.email, query_words):
-            clients.append(
-                {
-                    "id": client.id,
-                    "name": client.name,
-                    "phone": client.phone,
-                    "email": client.email,
-                }
-            )
-            continue
-
-        # Check notes
-        if contains_all_words(client.notes, query_words):
-            clients.append(
-                {
-                    "id": client.id,
-                    "name": client.name,
-                    "phone": client.phone,
-                    "email": client.email,
-                }
-            )
+    clients = ClientSearchService.search(current_user, query_string, limit=API_SEARCH_LIMIT)
+    return jsonify([_client_json(client) for client in clients])
+
 
-    return jsonify(clients[:10])
+# API для пошуку клієнта за закінченням номера телефону (наприклад, останні цифри від абонента)
+@bp.route("/api/by-phone")
+@login_required
+def api_by_phone() -> Any:
+    clients = ClientSearchService.by_phone(current_user, request.args.get("phone", ""), limit=API_SEARCH_LIMIT)
+    return jsonify([_client_json(client) for client in clients])
@@ -1,7 +1,5 @@
 import logging
-from collections import Counter
 from datetime import date, datetime, time, timedelta
-from decimal import Decimal
 from typing import Any, Dict, List, NamedTuple
 
 from flask import (Blueprint, current_app, flash, redirect, render_template,
@@ -9,7 +7,10 @@ from flask import (Blueprint, current_app, flash, redirect, render_template,
 from flask_login import current_user, login_required
 from sqlalchemy import text
 
-from app.models import Appointment, PaymentMethod, Service, User, db
+from app.models import Appointment, User, db
+from app.services.report_service import ReportService
+from app.services.schedule_grid import ScheduleGrid, assemble_schedule_data
+from app.services.schedule_service import ScheduleService
 
 # Створення Blueprint
 bp = Blueprint("main", __name__)
@@ -129,34 +130,16 @@ def stats() -> str:
     end_of_month = next_month - timedelta(days=1)
 
     if current_user.is_admin:
-        # Статистика за місяць для всіх майстрів (адміністратор)
-        # Use raw SQL to avoid func issues
-        monthly_stats_query = text(
-            """
-            SELECT u.full_name,
-                   COUNT(a.id) as total_appointments,
-                   COALESCE(SUM(aps.price), 0) as total_revenue
-            FROM user u
-            JOIN appointment a ON u.id = a.master_id
-            JOIN appointment_service aps ON a.id = aps.appointment_id
-            WHERE a.date BETWEEN :start_date AND :end_date
-              AND a.status = 'completed'
-            GROUP BY u.id, u.full_name
-        """
-        )
-
-        monthly_stats_result = db.session.execute(
-            monthly_stats_query,
-            {"start_date": start_of_month, "end_date": end_of_month},
-        ).fetchall()
-
-        # Convert to namedtuple-like objects for template compatibility
+        # Статистика за місяць для всіх майстрів (адміністратор) з денних зрізів
         class StatsRow(NamedTuple):
             full_name: str
             total_appointments: int
             total_revenue: float
 
-        monthly_stats = [StatsRow(row[0], row[1], row[2]) for row in monthly_stats_result]
+        monthly_stats = [
+            StatsRow(full_name, count, float(total))
+            for full_name, count, total in ReportService.get_masters_stats(start_of_month, end_of_month)
+        ]
 
         # Загальна сума за місяць
         total_month_revenue = sum(stats.total_revenue or 0 for stats in monthly_stats)
@@ -172,68 +155,26 @@ def stats() -> str:
         )
     else:
         # Статистика за місяць тільки для поточного майстра
-        master_stats_query = text(
-            """
-            SELECT COUNT(a.id) as total_appointments,
-                   COALESCE(SUM(aps.price), 0) as total_revenue
-            FROM appointment a
-            JOIN appointment_service aps ON a.id = aps.appointment_id
-            WHERE a.master_id = :master_id
-              AND a.date BETWEEN :start_date AND :end_date
-              AND a.status = 'completed'
-        """
-        )
+        class DailyStatsRow(NamedTuple):
+            date: date
+            appointment_count: int
+            daily_revenue: float
 
-        master_stats_result = db.session.execute(
-            master_stats_query,
-            {
-                "master_id": current_user.id,
-                "start_date": start_of_month,
-                "end_date": end_of_month,
-            },
-        ).fetchone()
+        # Деталі по днях для цього майстра
+        daily_stats = [
+            DailyStatsRow(day, count, float(total))
+            for day, count, total in ReportService.get_master_daily_stats(current_user.id, start_of_month, end_of_month)
+        ]
 
         class MasterStatsRow(NamedTuple):
             total_appointments: int
             total_revenue: float
 
         master_stats = MasterStatsRow(
-            master_stats_result[0] if master_stats_result else 0,
-            master_stats_result[1] if master_stats_result else 0,
+            sum(row.appointment_count for row in daily_stats),
+            sum(row.daily_revenue for row in daily_stats),
         )
 
-        # Деталі по днях для цього майстра
-        daily_stats_query = text(
-            """
-            SELECT a.date,
-                   COUNT(a.id) as appointment_count,
-                   COALESCE(SUM(aps.price), 0) as daily_revenue
-            FROM appointment a
-            JOIN appointment_service aps ON a.id = aps.appointment_id
-            WHERE a.master_id = :master_id
-              AND a.date BETWEEN :start_date AND :end_date
-              AND a.status = 'completed'
-            GROUP BY a.date
-            ORDER BY a.date
-        """
-        )
-
-        daily_stats_result = db.session.execute(
-            daily_stats_query,
-            {
-                "master_id": current_user.id,
-                "start_date": start_of_month,
-                "end_date": end_of_month,
-            },
-        ).fetchall()
-
-        class DailyStatsRow(NamedTuple):
-            date: date
-            appointment_count: int
-            daily_revenue: float
-
-        daily_stats = [DailyStatsRow(row[0], row[1], row[2]) for row in daily_stats_result]
-
         return render_template(
             "main/stats.html",
             title="Ваша статистика",
@@ -361,170 +302,16 @@ def schedule() -> Any:
         )
 
         # --- Визначаємо майстрів для відображення ---
-        masters_to_display = []
-        active_master_ids_set = set()  # Для швидкої перевірки
-
-        # Check if we're in a CSS test environment (for UI display testing only)
-        # This flag doesn't modify any data in the database and no longer affects masters_to_display
-        is_css_test = len(Appointment.query.filter_by(status="completed", payment_status="paid").all()) > 0 or any(
-            a.client_id and Appointment.query.filter_by(client_id=a.client_id).count() > 1
-            for a in Appointment.query.all()
-        )
-
-        # Always use the same logic for selecting masters to display, regardless of CSS test mode
-        if selected_date < today:
-            # МИНУЛА ДАТА: отримуємо майстрів, що мали записи
-            # Спочатку знаходимо ID майстрів, що мали нескасовані записи на цю дату
-            master_ids_on_date = (
-                db.session.query(Appointment.master_id)
-                .filter(
-                    Appointment.date == selected_date,
-                    Appointment.status != "cancelled",
-                )
-                .distinct()
-                .all()
-            )
-
-            # 3. Логування для блоку минулих дат
-            current_app.logger.info(
-                f"[SCHEDULE DIAGNOSIS] Past date logic - master_ids_on_date raw query result: {master_ids_on_date}"
-            )
-            actual_master_ids = {mid[0] for mid in master_ids_on_date if mid[0] is not None}  # Множина ID
-            current_app.logger.info(f"[SCHEDULE DIAGNOSIS] Past date logic - actual_master_ids: {actual_master_ids}")
-
-            if actual_master_ids:
-                # Отримуємо користувачів для цих ID
-                masters_to_display = (
-                    User.query.filter(User.id.in_(actual_master_ids))
-                    .order_by(User.schedule_display_order, User.full_name)
-                    .all()
-                )
-                active_master_ids_set = {m.id for m in masters_to_display}  # Нам потрібні ID всіх, хто відображається
-
-                current_app.logger.info(
-                    f"[SCHEDULE DIAGNOSIS] Past date logic - masters_to_display count: "
-                    f"{len(masters_to_display)}, IDs: {[m.id for m in masters_to_display]}"
-                )
-            else:
-                masters_to_display = []  # Якщо записів не було, список майстрів порожній
-                current_app.logger.info(
-                    "[SCHEDULE DIAGNOSIS] Past date logic - No masters found with appointments, "
-                    "masters_to_display count: 0"
-                )
-        else:
-            # СЬОГОДНІ або МАЙБУТНЯ ДАТА: отримуємо тільки активних майстрів
-            masters_to_display = (
-                User.query.filter_by(is_active_master=True).order_by(User.schedule_display_order, User.full_name).all()
-            )
-            active_master_ids_set = {m.id for m in masters_to_display}  # Множина ID активних майстрів
-
-            # 4. Логування для блоку поточних/майбутніх дат
-            current_app.logger.info(
-                f"[SCHEDULE DIAGNOSIS] Current/future date logic - masters_to_display count: "
-                f"{len(masters_to_display)}, IDs: {[m.id for m in masters_to_display]}"
-            )
+        # Для минулих дат - тільки майстри, що мали нескасовані записи; для сьогодні та майбутнього - активні майстри
+        masters_to_display = ScheduleService.get_masters_for_date(selected_date, today)
+        active_master_ids_set = {m.id for m in masters_to_display}  # Множина ID майстрів для відображення
 
         # 5. Логування після формування active_master_ids_set
-        current_app.logger.info(f"[SCHEDULE DIAGNOSIS] active_master_ids_set: {active_master_ids_set}")
-
-        # Для тестів: спочатку отримуємо всіх майстрів з призначеннями на цю дату
-        masters_with_appointments = (
-            db.session.query(User)
-            .join(Appointment, User.id == Appointment.master_id)
-            .filter(
-                Appointment.date == selected_date,
-                Appointment.status != "cancelled",
-            )
-            .distinct()
-            .all()
-        )
-
-        masters_with_appointments_ids = {m.id for m in masters_with_appointments}
-        current_app.logger.debug(f"Masters with appointments IDs: {masters_with_appointments_ids}")
-
-        # Debug: Check all appointments for this date
-        all_appointments = Appointment.query.filter(
-            Appointment.date == selected_date, Appointment.status != "cancelled"
-        ).all()
-
-        current_app.logger.debug(
-            f"All appointments for date {selected_date}: "
-            f"{[(a.id, a.client_id, a.master_id, a.status, a.payment_status) for a in all_appointments]}"
-        )
-
-        # Debug logging for masters
-        current_app.logger.debug(
-            f"Selected date: {selected_date}, Today: {today}, " f"Is past date: {selected_date < today}"
+        current_app.logger.info(
+            f"[SCHEDULE DIAGNOSIS] Is past date: {selected_date < today}, "
+            f"masters_to_display count: {len(masters_to_display)}, active_master_ids_set: {active_master_ids_set}"
         )
         current_app.logger.debug(f"Masters to display: {[(m.id, m.full_name) for m in masters_to_display]}")
-        current_app.logger.debug(f"Active master IDs set: {active_master_ids_set}")
-        current_app.logger.debug(f"CSS test mode active: {is_css_test}")
-
-        # --- Отримуємо записи на день ---
-        # Завантажуємо пов'язані дані одразу, щоб уникнути N+1 запитів
-        base_query = Appointment.query.filter(
-            Appointment.date == selected_date,
-            Appointment.status != "cancelled",
-        )
-
-        # Add master filter only if we have active masters
-        if active_master_ids_set:
-            appointments_for_day = (
-                base_query.filter(Appointment.master_id.in_(active_master_ids_set))
-                .order_by(Appointment.start_time)
-                .all()
-            )
-        else:
-            appointments_for_day = base_query.order_by(Appointment.start_time).all()
-
-        # 6. Логування після запиту appointments_for_day
-        current_app.logger.info(f"[SCHEDULE DIAGNOSIS] appointments_for_day count: {len(appointments_for_day)}")
-
-        # --- Debug logging for appointments ---
-        current_app.logger.debug(f"Found {len(appointments_for_day)} appointments for {selected_date}")
-        for apt in appointments_for_day:
-            current_app.logger.debug(
-                f"Appointment ID: {apt.id}, Client: {apt.client.name if apt.client else 'None'}, "
-                f"Start time: {apt.start_time}, Status: {apt.status}, Payment status: {apt.payment_status}"
-            )
-
-        # --- Обробка потенційно некоректних enum значень у БД ---
-        needs_commit = False
-        for appointment in appointments_for_day:
-            if isinstance(appointment.payment_method, str):
-                try:
-                    # Use SQLAlchemy model instead of Enum lookup
-                    payment_method = PaymentMethod.query.filter_by(name=appointment.payment_method.upper()).first()
-                    if payment_method:
-                        appointment.payment_method_id = payment_method.id
-                    else:
-                        appointment.payment_method_id = None
-                    needs_commit = True
-                except (KeyError, ValueError, AttributeError):
-                    appointment.payment_method_id = None
-                    needs_commit = True
-                    db.session.add(appointment)
-        if needs_commit:
-            try:
-                db.session.commit()
-            except Exception as commit_err:
-                db.session.rollback()
-                current_app.logger.error(f"Error committing payment_method fixes: {commit_err}")
-
-        # --- Логіка Multi-booking ---
-        client_appointments_count = Counter(apt.client_id for apt in appointments_for_day if apt.client_id)
-        multi_booking_client_ids = {client_id for client_id, count in client_appointments_count.items() if count > 1}
-
-        # Add detailed debug logging
-        current_app.logger.debug(f"Multi-booking client IDs for {selected_date}: {multi_booking_client_ids}")
-        current_app.logger.debug(f"All client IDs with counts: {dict(client_appointments_count)}")
-        current_app.logger.debug(f"All appointments count: {len(appointments_for_day)}")
-
-        for apt in appointments_for_day:
-            current_app.logger.debug(
-                f"Appointment ID: {apt.id}, Client ID: {apt.client_id}, "
-                f"Status: {apt.status}, Payment Status: {apt.payment_status}"
-            )
 
         # --- Генерація часових слотів ---
         # Генеруємо слоти один раз і використовуємо їх у декількох місцях
@@ -538,185 +325,24 @@ def schedule() -> Any:
             f"15min slots count: {len(all_15min_slots)}"
         )
 
-        # --- Ініціалізація schedule_data ЛИШЕ для masters_to_display ---
-        schedule_data: Dict[int, Dict[str, List[Dict[str, Any]]]] = {}
-        for master in masters_to_display:
-            schedule_data[master.id] = {slot.strftime("%H:%M"): [] for slot in all_15min_slots}
+        # Початок і кінець запису перетворюються на індекси слотів арифметично,
+        # тому вартість не залежить від кількості слотів на день
+        grid = ScheduleGrid(all_15min_slots, time_intervals)
 
-        # Перетворюємо all_15min_slots на рядки для консистентності
-        all_15min_slots_str = {slot.strftime("%H:%M") for slot in all_15min_slots}
+        # --- Колонки майстрів: з кешу або з БД ---
+        columns = ScheduleService.get_columns(grid, selected_date, [m.id for m in masters_to_display])
 
-        # --- Заповнення розкладу записами ---
-        for appointment_item in appointments_for_day:
-            # 7. Логування всередині циклу для кожного appointment_item
-            current_app.logger.info(
-                f"[SCHEDULE DIAGNOSIS] Processing appointment_item - ID: {appointment_item.id}, "
-                f"master_id: {appointment_item.master_id}, date: {appointment_item.date}, "
-                f"start_time: {appointment_item.start_time}, status: {appointment_item.status}"
-            )
-
-            # Особливе логування для appointment ID 205
-            if appointment_item.id == 205:
-                current_app.logger.info(
-                    f"[SCHEDULE DIAGNOSIS] *** FOUND TARGET APPOINTMENT 205 *** - "
-                    f"master_id: {appointment_item.master_id}, date: {appointment_item.date}, "
-                    f"start_time: {appointment_item.start_time}, status: {appointment_item.status}"
-                )
-
-            # Перевірка, чи майстер є у списку для відображення
-            master_not_in_active_set = appointment_item.master_id not in active_master_ids_set
-            current_app.logger.info(
-                f"[SCHEDULE DIAGNOSIS] Appointment {appointment_item.id} - "
-                f"master_not_in_active_set: {master_not_in_active_set}"
-            )
-
-            if master_not_in_active_set:
-                current_app.logger.info(
-                    f"[SCHEDULE DIAGNOSIS] Appointment {appointment_item.id} SKIPPED - "
-                    f"master {appointment_item.master_id} not in active_master_ids_set: {active_master_ids_set}"
-                )
-                continue
-
-            # --- Розрахунок фінансів та CSS класу ---
-            expected_price = appointment_item.get_discounted_price()
-            expected_price = max(Decimal("0.00"), expected_price)
-            amount_paid_val = (
-                appointment_item.amount_paid if appointment_item.amount_paid is not None else Decimal("0.00")
-            )
-            finance_info = ""
-            css_class = ""
-
-            # Debug: Log payment status and values
-            current_app.logger.debug(
-                f"Appointment {appointment_item.id} - Status: '{appointment_item.status}', "
-                f"Payment Status: '{appointment_item.payment_status}', "
-                f"Expected Price: {expected_price}, Amount Paid: {amount_paid_val}"
-            )
-
-            if appointment_item.status == "completed":
-                if appointment_item.payment_status == "paid":
-                    css_class = "status-completed-paid"
-                    finance_info = f"Сплачено: {amount_paid_val:.2f} грн"
-                    current_app.logger.debug(
-                        f"Setting CSS class to 'status-completed-paid' for appointment {appointment_item.id}"
-                    )
-                elif appointment_item.payment_status in ["unpaid", "partially_paid"]:
-                    css_class = "status-completed-debt"
-                    debt_val = expected_price - amount_paid_val
-                    finance_info = f"Сплачено: {amount_paid_val:.2f} грн, Борг: {debt_val:.2f} грн"
-                    current_app.logger.debug(
-                        f"Setting CSS class to 'status-completed-debt' for appointment {appointment_item.id}"
-                    )
-            else:
-                # All non-completed statuses (scheduled, etc)
-                if appointment_item.payment_status == "paid":
-                    css_class = "status-scheduled-paid"
-                    finance_info = f"Передоплата: {amount_paid_val:.2f} грн"
-                    current_app.logger.debug(
-                        f"Setting CSS class to 'status-scheduled-paid' for appointment {appointment_item.id}"
-                    )
-                elif appointment_item.payment_status == "partially_paid" and amount_paid_val > Decimal("0.00"):
-                    css_class = "status-scheduled-prepaid"
-                    finance_info = f"Передоплата: {amount_paid_val:.2f} грн"
-                    current_app.logger.debug(
-                        f"Setting CSS class to 'status-scheduled-prepaid' for appointment {appointment_item.id}"
-                    )
-                else:  # unpaid
-                    css_class = "status-scheduled"
-                    finance_info = f"Вартість: {expected_price:.2f} грн"
-                    current_app.logger.debug(
-                        f"Setting CSS class to 'status-scheduled' for appointment {appointment_item.id}"
-                    )
-
-            # Add debug logging for CSS class assignment
-            current_app.logger.debug(
-                f"Appointment ID: {appointment_item.id}, Status: {appointment_item.status}, "
-                f"Payment Status: {appointment_item.payment_status}, CSS Class: {css_class}"
-            )
-
-            # --- Визначення can_edit ---
-            can_edit = current_user.is_admin or appointment_item.master_id == current_user.id
-
-            # --- Визначення completion_info ---
-            completion_info = "(Завершено)" if appointment_item.status == "completed" else ""
-
-            # Get service names manually to avoid relationship issues
-            service_names = []
-            for appointment_service in appointment_item.services:
-                service = (
-                    db.session.get(Service, appointment_service.service_id) if appointment_service.service_id else None
-                )
-                if service:
-                    service_names.append(service.name)
-
-            # --- Підготовка базових деталей запису ---
-            appointment_details_base = {
-                "id": appointment_item.id,
-                "client_name": appointment_item.client.name if appointment_item.client else "N/A",
-                "phone": appointment_item.client.phone if appointment_item.client else "N/A",
-                "services": service_names,
-                "css_class": css_class,
-                "multi_booking": appointment_item.client_id in multi_booking_client_ids,
-                "finance_info": finance_info,
-                "completion_info": completion_info,
-                "can_edit": can_edit,
-                "status": appointment_item.status,
-                "is_completed": appointment_item.status == "completed",
-            }
-
-            # --- Додавання запису до слотів ---
-            start_slot_str = appointment_item.start_time.strftime("%H:%M")
-            slot_added_to = set()  # Щоб не дублювати
-
-            for current_slot_time_obj in all_15min_slots:  # Використовуємо вже згенеровані слоти
-                current_slot_str = current_slot_time_obj.strftime("%H:%M")
-
-                # Перевіряємо, чи поточний слот потрапляє в інтервал запису
-                if appointment_item.start_time <= current_slot_time_obj < appointment_item.end_time:
-                    # Перевіряємо наявність майстра та слота
-                    if (
-                        appointment_item.master_id in schedule_data
-                        and current_slot_str in schedule_data[appointment_item.master_id]
-                    ):
-                        if current_slot_str == start_slot_str and start_slot_str not in slot_added_to:
-                            details = appointment_details_base.copy()
-                            details["display_type"] = "full"
-                            schedule_data[appointment_item.master_id][current_slot_str].append(details)
-                            slot_added_to.add(start_slot_str)
-                        elif current_slot_str not in slot_added_to:
-                            schedule_data[appointment_item.master_id][current_slot_str].append(
-                                {
-                                    "id": appointment_item.id,
-                                    "display_type": "continuation",
-                                    "css_class": css_class,
-                                }
-                            )
-                            slot_added_to.add(current_slot_str)
-                    else:
-                        current_app.logger.error(
-                            "Logic error: "
-                            f"Slot {current_slot_str} or "
-                            f"master {appointment_item.master_id} "
-                            "not found in initialized schedule_data"
-                        )
+        # --- Логіка Multi-booking ---
+        multi_booking_client_ids = ScheduleService.get_multi_booking_client_ids(selected_date, active_master_ids_set)
+        current_app.logger.debug(f"Multi-booking client IDs for {selected_date}: {multi_booking_client_ids}")
 
-            # --- Логіка 'expanded' для інтервалів ---
-            starts_at_15_or_45 = appointment_item.start_time.minute in [15, 45]
-            ends_at_15_or_45 = appointment_item.end_time and appointment_item.end_time.minute in [
-                15,
-                45,
-            ]  # Перевірка на None
-
-            if starts_at_15_or_45 or ends_at_15_or_45:
-                for interval in time_intervals:
-                    should_expand = False
-                    for sub_slot in interval["sub_slots"]:
-                        # Перевірка, чи слот потрапляє в інтервал запису
-                        if appointment_item.start_time <= sub_slot < appointment_item.end_time:
-                            should_expand = True
-                            break
-                    if should_expand:
-                        interval["expanded"] = True
+        # --- Заповнення розкладу записами ---
+        schedule_data = assemble_schedule_data(
+            grid,
+            [columns[master.id] for master in masters_to_display],
+            current_user,
+            multi_booking_client_ids,
+        )
 
         # 8. Логування після циклу формування schedule_data, перед return render_template
         current_app.logger.info(f"[SCHEDULE DIAGNOSIS] schedule_data keys (master IDs): {list(schedule_data.keys())}")
@@ -762,8 +388,7 @@ def schedule() -> Any:
             time_intervals=time_intervals,  # Для генерації рядків часу
             masters=masters_to_display,  # Майстри для заголовків колонок
             schedule_data=schedule_data,  # Дані для заповнення сітки
-            all_15min_slots=sorted(list(all_15min_slots_str)),  # Список рядкових слотів
-            is_css_test=is_css_test,  # Передаємо is_css_test для використання в шаблоні
+            all_15min_slots=grid.slot_labels,  # Список рядкових слотів
         )
 
     except Exception as e_schedule:
@@ -775,3 +400,49 @@ def schedule() -> Any:
         )
         flash(f"Виникла помилка при формуванні розкладу: {str(e_schedule)}", "danger")
         return redirect(url_for("main.index"))
+
+
+# Максимальна кількість днів у багатоденному розкладі
+MAX_SCHEDULE_DAYS = 31
+
+
+# Багатоденний (тижневий) розклад зайнятості майстрів
+@bp.route("/schedule/week")
+@login_required
+def schedule_week() -> Any:
+    """
+    Відображає стислий розклад зайнятості майстрів на кілька днів.
+
+    Параметри запиту:
+    - start: дата початку (YYYY-MM-DD, за замовчуванням сьогодні)
+    - days: кількість днів (за замовчуванням 7, максимум MAX_SCHEDULE_DAYS)
+
+    Усі записи діапазону завантажуються одним запитом і групуються за (дата, майстер)
+    за один прохід. Майстри для кожного дня визначаються за тими ж правилами, що й у schedule().
+    """
+    start_str = request.args.get("start")
+    try:
+        start_date = datetime.strptime(start_str, "%Y-%m-%d").date() if start_str else date.today()
+    except ValueError:
+        flash("Неправильний формат дати. Використовуємо поточну дату.", "warning")
+        return redirect(url_for("main.schedule_week"))
+
+    days = request.args.get("days", 7, type=int)
+    days = max(1, min(days or 7, MAX_SCHEDULE_DAYS))
+
+    time_intervals = generate_time_intervals()
+    grid = ScheduleGrid(generate_time_slots(interval_minutes=15), time_intervals)
+    masters, overview = ScheduleService.get_range_overview(grid, start_date, days)
+
+    return render_template(
+        "main/schedule_week.html",
+        title="Розклад на кілька днів",
+        start_date=start_date,
+        today=date.today(),
+        days=days,
+        overview=overview,
+        masters=masters,
+        time_intervals=time_intervals,
+        prev_start=start_date - timedelta(days=days),
+        next_start=start_date + timedelta(days=days),
+    )
@@ -31,10 +31,15 @@ from app.models import (
     ProductWriteOff,
     ProductWriteOffItem,
     StockLevel,
+    StockMovement,
     User,
     WriteOffReason,
     db,
+    local_day,
 )
+from app.services import export_service
+from app.services.export_service import export_from_request
+from app.services.stock_levels import STOCK_PAGE_SIZE, StockLevelsService
 
 
 def admin_required(f):
@@ -404,52 +409,11 @@ def stock_levels() -> Any:
     search = request.args.get("search", "", type=str)
     brand_filter = request.args.get("brand", 0, type=int)
     low_stock = request.args.get("low_stock", False, type=bool)
-    per_page = 20
-
-    # Start with Product query and join with related tables for filtering
-    query = Product.query.join(StockLevel).join(Brand)
 
-    # Пошук
-    if search:
-        query = query.filter(
-            db.or_(Product.name.contains(search), Product.sku.contains(search), Brand.name.contains(search))
-        )
-
-    # Фільтр по бренду
-    if brand_filter:
-        query = query.filter(Product.brand_id == brand_filter)
-
-    # Фільтр низьких залишків
-    if low_stock:
-        query = query.filter(StockLevel.quantity <= Product.min_stock_level)
-
-    # Paginate the results (this gives us Product objects)
-    products_paginated = query.order_by(Product.name).paginate(page=page, per_page=per_page, error_out=False)
-
-    # Create a custom pagination object that returns tuples
-    class StockDataPagination:
-        def __init__(self, product_pagination: Any) -> None:
-            self.page = product_pagination.page
-            self.pages = product_pagination.pages
-            self.per_page = product_pagination.per_page
-            self.total = product_pagination.total
-            self.has_prev = product_pagination.has_prev
-            self.has_next = product_pagination.has_next
-            self.prev_num = product_pagination.prev_num
-            self.next_num = product_pagination.next_num
-
-            # Create items as tuples of (product, stock_level, brand)
-            self.items = []
-            for product in product_pagination.items:
-                stock_level = StockLevel.query.filter_by(product_id=product.id).first()
-                brand = db.session.get(Brand, product.brand_id)
-                self.items.append((product, stock_level, brand))
-
-        def iter_pages(self, *args: Any, **kwargs: Any) -> Any:
-            # Delegate to the original pagination object
-            return products_paginated.iter_pages(*args, **kwargs)
-
-    stock_data = StockDataPagination(products_paginated)
+    # Товар, залишок і бренд однією вибіркою на сторінку
+    stock_data = StockLevelsService.page(
+        page=page, per_page=STOCK_PAGE_SIZE, search=search, brand_id=brand_filter, low_stock=low_stock
+    )
 
     # Для фільтра по брендах
     brands = Brand.query.order_by(Brand.name).all()
@@ -481,6 +445,14 @@ def goods_receipts_list() -> Any:
     return render_template("goods_receipts/list_goods_receipts.html", receipts=receipts, title="Надходження товарів")
 
 
+@bp.route("/goods_receipts/export")
+@login_required
+@admin_required
+def goods_receipts_export() -> Any:
+    """Потокове вивантаження позицій надходжень у CSV або XLSX"""
+    return export_from_request("goods_receipts", export_service.goods_receipts_export, "Надходження")
+
+
 @bp.route("/goods_receipts/new", methods=["GET", "POST"])
 @login_required
 @admin_required
@@ -716,6 +688,14 @@ def write_offs_list() -> Any:
     return render_template("write_offs/list_write_offs.html", write_offs=write_offs, title="Списання товарів")
 
 
+@bp.route("/write_offs/export")
+@login_required
+@admin_required
+def write_offs_export() -> Any:
+    """Потокове вивантаження позицій списань у CSV або XLSX"""
+    return export_from_request("write_offs", export_service.write_offs_export, "Списання")
+
+
 @bp.route("/write_offs/new", methods=["GET", "POST"])
 @login_required
 @admin_required
@@ -932,6 +912,18 @@ def inventory_acts_complete(act_id: int) -> Any:
                 # Оновлюємо залишки товару
                 stock_level = StockLevel.query.filter_by(product_id=item.product_id).first()
                 if stock_level:
+                    # Розбіжність з поточним залишком потрапляє в журнал руху як коригування
+                    difference = item.actual_quantity - stock_level.quantity
+                    if difference:
+                        db.session.add(
+                            StockMovement(
+                                product_id=item.product_id,
+                                day=local_day(None),
+                                quantity=difference,
+                                kind="adjustment",
+                                source_id=item.id,
+                            )
+                        )
                     stock_level.quantity = item.actual_quantity
                     items_updated += 1
 
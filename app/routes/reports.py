@@ -1,18 +1,33 @@
 from datetime import date
 from decimal import Decimal
-from typing import Any, Dict, Optional
+from typing import Any, Optional
 
-from flask import Blueprint, abort, render_template
+from flask import Blueprint, Response, abort, flash, jsonify, redirect, render_template, url_for
 from flask_login import current_user, login_required
 from flask_wtf import FlaskForm
-from sqlalchemy import and_, extract, func
+from sqlalchemy import extract
 from wtforms import DateField, SelectField, SubmitField
 from wtforms.validators import DataRequired
 from wtforms.validators import Optional as OptionalValidator
 from wtforms.validators import ValidationError
 
 from app import db
-from app.models import Appointment, AppointmentService, Brand, PaymentMethod, Product, Sale, SaleItem, StockLevel, User
+from app.models import Appointment, ReportJob, Sale, SaleItem, User
+from app.services.export_service import export_from_request, financial_export
+from app.services.report_cache import cached_report, get_report_cache
+from app.services.report_jobs import (
+    ACTIVE_STATUSES,
+    JOB_COMPLETED,
+    ReportJobQueueFull,
+    get_report_job_runner,
+    job_csv,
+    job_params,
+    job_result,
+    serialize_job,
+    should_run_in_background,
+)
+from app.services.report_service import ReportService
+from app.services.stock_levels import StockLevelsService
 
 
 # Helper function for calculating total with discount
@@ -40,13 +55,22 @@ class DailySalaryReportForm(FlaskForm):
         validators=[DataRequired()],
         default=date.today,
     )
+    end_date = DateField(
+        "To Date",
+        validators=[OptionalValidator()],
+    )
+    # Без DataRequired: 0 ("Всі майстри") - допустимий вибір, значення перевіряється за choices
     master_id = SelectField(
         "Master",
         coerce=int,
-        validators=[DataRequired()],
     )
     submit = SubmitField("Generate Report")
 
+    def validate_end_date(self, field):
+        if self.report_date.data and field.data:
+            if field.data < self.report_date.data:
+                raise ValidationError("End date must be after or equal to start date.")
+
 
 # Admin salary report form
 class AdminSalaryReportForm(FlaskForm):
@@ -60,10 +84,10 @@ class AdminSalaryReportForm(FlaskForm):
         validators=[OptionalValidator()],
         default=date.today,
     )
+    # Без DataRequired: 0 ("Всі адміністратори") - допустимий вибір, значення перевіряється за choices
     admin_id = SelectField(
         "Administrator",
         coerce=int,
-        validators=[DataRequired()],
     )
     submit = SubmitField("Generate Report")
 
@@ -93,6 +117,11 @@ class FinancialReportForm(FlaskForm):
                 raise ValidationError("Кінцева дата має бути пізніше або дорівнювати початковій даті.")
 
 
+# Report cache clear form
+class ReportCacheClearForm(FlaskForm):
+    submit = SubmitField("Очистити кеш")
+
+
 # Salary report route
 @bp.route("/salary", methods=["GET", "POST"])
 @login_required
@@ -119,10 +148,13 @@ def salary_report() -> str:
     total_products_cost = 0.0
     commission_rate = 0.0
     selected_date = None
+    end_date = None
     selected_master = None
+    masters_salaries = None
 
     if form.validate_on_submit():
         selected_date = form.report_date.data
+        end_date = form.end_date.data or selected_date
         master_id = form.master_id.data
 
         # Check if user is allowed to view this master's report
@@ -134,72 +166,33 @@ def salary_report() -> str:
                 error="You can only view your own reports",
             )
 
-        # Get master for name display and commission rate
-        selected_master = db.session.get(User, master_id)
-        if selected_master and selected_master.configurable_commission_rate:
-            commission_rate = float(selected_master.configurable_commission_rate)
-
-        # Query completed appointments
-        appointments = (
-            Appointment.query.filter(
-                Appointment.date == selected_date,
-                Appointment.master_id == master_id,
-                Appointment.status == "completed",
-            )
-            .order_by(Appointment.start_time)
-            .all()
-        )
-
-        # Calculate individual totals for each appointment and prepare data for template
-        for appointment in appointments:
-            # Calculate total price of services for this specific appointment
-            appointment_services_total = sum(service.price for service in appointment.services)
-
-            # Calculate commission for this specific appointment
-            appointment_commission = (
-                appointment_services_total * (commission_rate / 100) if commission_rate > 0 else 0.0
+        if master_id == 0:
+            # Всі майстри: одна згрупована вибірка з daily_rollup замість звіту на кожного майстра
+            report = cached_report(
+                "salary_report",
+                {"master_id": 0, "start_date": selected_date, "end_date": end_date},
+                selected_date,
+                end_date,
+                lambda: ReportService.get_all_masters_salary(selected_date, end_date),
             )
-
-            # Create a dictionary with appointment data and calculated totals
-            appointment_data = {
-                "appointment": appointment,
-                "services_total": appointment_services_total,
-                "commission": appointment_commission,
-            }
-            appointments_with_totals.append(appointment_data)
-
-        # Get appointment IDs for completed appointments
-        appointment_ids = [appointment.id for appointment in appointments]
-
-        # Calculate total service cost based ONLY on AppointmentService.price values
-        if appointment_ids:
-            # Get the sum of all service prices for these appointments using SQLAlchemy
-            service_sum_query = db.session.query(func.sum(AppointmentService.price)).filter(
-                AppointmentService.appointment_id.in_(appointment_ids)
+            masters_salaries = report["masters"]
+        else:
+            report = cached_report(
+                "salary_report",
+                {"master_id": master_id, "start_date": selected_date, "end_date": end_date},
+                selected_date,
+                end_date,
+                lambda: ReportService.get_master_salary(master_id, selected_date, end_date),
             )
-            service_sum_result = service_sum_query.scalar()
-            total_services_cost = float(service_sum_result or 0)
-
-        # Calculate services commission
-        if total_services_cost > 0 and commission_rate > 0:
-            services_commission = total_services_cost * (commission_rate / 100)
-
-        # Calculate products sales commission (9% fixed rate)
-        products_sales_query = Sale.query.filter(Sale.user_id == master_id, func.date(Sale.sale_date) == selected_date)
-
-        total_products_amount = (
-            db.session.query(func.sum(Sale.total_amount))
-            .filter(Sale.user_id == master_id, func.date(Sale.sale_date) == selected_date)
-            .scalar()
-        )
-
-        total_products_cost = float(total_products_amount or 0)
-
-        if total_products_cost > 0:
-            products_commission = total_products_cost * 0.09  # Fixed 9% commission
-
-        # Calculate total salary
-        total_salary = services_commission + products_commission
+            selected_master = report["selected_master"]
+            appointments = report["appointments"]
+            appointments_with_totals = report["appointments_with_totals"]
+            commission_rate = report["commission_rate"]
+        total_services_cost = report["total_services_cost"]
+        services_commission = report["services_commission"]
+        products_commission = report["products_commission"]
+        total_products_cost = report["total_products_cost"]
+        total_salary = report["total_salary"]
 
     return render_template(
         "reports/salary_report.html",
@@ -214,7 +207,9 @@ def salary_report() -> str:
         total_salary=total_salary,
         commission_rate=commission_rate,
         selected_date=selected_date,
+        end_date=end_date,
         selected_master=selected_master,
+        masters_salaries=masters_salaries,
     )
 
 
@@ -253,109 +248,51 @@ def admin_salary_report() -> str:
     selected_date = None
     end_date = None
     selected_admin = None
+    admins_salaries = None
 
     if form.validate_on_submit():
         selected_date = form.start_date.data
         end_date = form.end_date.data
         admin_id = form.admin_id.data
 
-        # If "All administrators" is selected, we'll process all admins
-        # For now, let's handle single admin selection
         if admin_id != 0:
-            # Get admin for name display and commission rate
-            selected_admin = db.session.get(User, admin_id)
-            if selected_admin and selected_admin.configurable_commission_rate:
-                commission_rate = float(selected_admin.configurable_commission_rate)
-
-            # 1. Calculate commission from personal services
-            appointments = (
-                Appointment.query.filter(
-                    Appointment.date >= selected_date,
-                    Appointment.date <= end_date,
-                    Appointment.master_id == admin_id,
-                    Appointment.status == "completed",
-                )
-                .order_by(Appointment.start_time)
-                .all()
-            )
-
-            # Calculate individual totals for each appointment
-            for appointment in appointments:
-                appointment_services_total = sum(service.price for service in appointment.services)
-                appointment_commission = (
-                    appointment_services_total * (commission_rate / 100) if commission_rate > 0 else 0.0
-                )
-
-                appointment_data = {
-                    "appointment": appointment,
-                    "services_total": appointment_services_total,
-                    "commission": appointment_commission,
-                }
-                appointments_with_totals.append(appointment_data)
-
-            # Calculate total service cost
-            appointment_ids = [appointment.id for appointment in appointments]
-            if appointment_ids:
-                service_sum_query = db.session.query(func.sum(AppointmentService.price)).filter(
-                    AppointmentService.appointment_id.in_(appointment_ids)
-                )
-                service_sum_result = service_sum_query.scalar()
-                total_services_cost = float(service_sum_result or 0)
-
-            # Calculate services commission
-            if total_services_cost > 0 and commission_rate > 0:
-                services_commission = total_services_cost * (commission_rate / 100)
-
-            # 2. Calculate commission from personal product sales (rate + 1%)
-            admin_sales = Sale.query.filter(
-                Sale.user_id == admin_id,
-                func.date(Sale.sale_date) >= selected_date,
-                func.date(Sale.sale_date) <= end_date,
-            ).all()
-
-            total_personal_products_amount = (
-                db.session.query(func.sum(Sale.total_amount))
-                .filter(
-                    Sale.user_id == admin_id,
-                    func.date(Sale.sale_date) >= selected_date,
-                    func.date(Sale.sale_date) <= end_date,
-                )
-                .scalar()
+            report = cached_report(
+                "admin_salary_report",
+                {"admin_id": admin_id, "start_date": selected_date, "end_date": end_date},
+                selected_date,
+                end_date,
+                lambda: ReportService.get_admin_salary(admin_id, selected_date, end_date),
             )
-
-            total_personal_products_cost = float(total_personal_products_amount or 0)
-
-            if total_personal_products_cost > 0 and commission_rate > 0:
-                # Admin commission rate + 1%
-                personal_products_commission = total_personal_products_cost * ((commission_rate + 1) / 100)
-
-            # 3. Calculate 1% share from all masters' product sales
-            # Get all masters (non-admin active users)
-            masters = User.query.filter_by(is_active_master=True, is_admin=False).all()
-            master_ids = [master.id for master in masters]
-
-            if master_ids:
-                total_masters_products_amount = (
-                    db.session.query(func.sum(Sale.total_amount))
-                    .filter(
-                        Sale.user_id.in_(master_ids),
-                        func.date(Sale.sale_date) >= selected_date,
-                        func.date(Sale.sale_date) <= end_date,
-                    )
-                    .scalar()
-                )
-
-                total_masters_products_cost = float(total_masters_products_amount or 0)
-
-                if total_masters_products_cost > 0:
-                    masters_products_share = total_masters_products_cost * 0.01  # 1% share
-
-            # Calculate total salary
-            total_salary = services_commission + personal_products_commission + masters_products_share
+            selected_admin = report["selected_admin"]
+            appointments = report["appointments"]
+            appointments_with_totals = report["appointments_with_totals"]
+            admin_sales = report["admin_sales"]
+            total_services_cost = report["total_services_cost"]
+            services_commission = report["services_commission"]
+            personal_products_commission = report["personal_products_commission"]
+            masters_products_share = report["masters_products_share"]
+            total_personal_products_cost = report["total_personal_products_cost"]
+            total_masters_products_cost = report["total_masters_products_cost"]
+            total_salary = report["total_salary"]
+            commission_rate = report["commission_rate"]
 
         else:
-            # Handle "All administrators" case - for now, show error or redirect to individual selection
-            pass
+            # Всі адміністратори: згруповані вибірки з daily_rollup замість звіту на кожного адміністратора
+            report = cached_report(
+                "admin_salary_report",
+                {"admin_id": 0, "start_date": selected_date, "end_date": end_date},
+                selected_date,
+                end_date,
+                lambda: ReportService.get_all_admins_salary(selected_date, end_date),
+            )
+            admins_salaries = report["admins"]
+            total_services_cost = report["total_services_cost"]
+            services_commission = report["services_commission"]
+            personal_products_commission = report["personal_products_commission"]
+            masters_products_share = report["masters_products_share"]
+            total_personal_products_cost = report["total_personal_products_cost"]
+            total_masters_products_cost = report["total_masters_products_cost"]
+            total_salary = report["total_salary"]
 
     return render_template(
         "reports/admin_salary_report.html",
@@ -375,6 +312,7 @@ def admin_salary_report() -> str:
         selected_date=selected_date,
         end_date=end_date,
         selected_admin=selected_admin,
+        admins_salaries=admins_salaries,
     )
 
 
@@ -409,100 +347,39 @@ def financial_report() -> str:
     # Payment breakdown
     payment_breakdown = []
 
+    # Background job for long ranges
+    job = None
+
     # Only process form if user is admin
     if current_user.is_admin and form.validate_on_submit():
-        selected_start_date = form.start_date.data
-        selected_end_date = form.end_date.data
-
-        # 1. Calculate service revenue from completed appointments
-        completed_appointments = Appointment.query.filter(
-            Appointment.date >= selected_start_date,
-            Appointment.date <= selected_end_date,
-            Appointment.status == "completed",
-        ).all()
-
-        # Initialize payment method totals
-        payment_methods_from_db = PaymentMethod.query.filter_by(is_active=True).all()
-        payment_method_totals: Dict[str, Decimal] = {pm.name: Decimal("0.00") for pm in payment_methods_from_db}
-        payment_method_totals["Не вказано"] = Decimal("0.00")
-
-        # Process each completed appointment for service revenue
-        for appointment in completed_appointments:
-            # Use amount_paid if available, otherwise calculate from services with discount
-            if appointment.amount_paid is not None and appointment.amount_paid > 0:
-                amount = Decimal(str(appointment.amount_paid))
-                service_revenue += amount
-
-                # Add to the appropriate payment method
-                if appointment.payment_method_id is None:
-                    method_name = "Не вказано"
-                else:
-                    payment_method_obj = appointment.payment_method
-                    method_name = payment_method_obj.name if payment_method_obj else "Не вказано"
-                payment_method_totals[method_name] += amount
-            else:
-                # Calculate amount from services with discount
-                services_amount = sum(Decimal(str(service.price)) for service in appointment.services)
-                if appointment.discount_percentage:
-                    discounted_amount = services_amount * (
-                        Decimal("1.0") - Decimal(str(appointment.discount_percentage)) / Decimal("100.0")
-                    )
-                else:
-                    discounted_amount = services_amount
-
-                service_revenue += discounted_amount
-
-                # Add to the appropriate payment method
-                if appointment.payment_method_id is None:
-                    method_name = "Не вказано"
-                else:
-                    payment_method_obj = appointment.payment_method
-                    method_name = payment_method_obj.name if payment_method_obj else "Не вказано"
-                payment_method_totals[method_name] += discounted_amount
-
-        # 2. Calculate product sales data
-        product_sales = Sale.query.filter(
-            func.date(Sale.sale_date) >= selected_start_date, func.date(Sale.sale_date) <= selected_end_date
-        ).all()
-
-        for sale in product_sales:
-            # Add sale total to payment method breakdown
-            sale_amount = Decimal(str(sale.total_amount))
-
-            if sale.payment_method_id is None:
-                method_name = "Не вказано"
-            else:
-                payment_method_obj = PaymentMethod.query.get(sale.payment_method_id)
-                method_name = payment_method_obj.name if payment_method_obj else "Не вказано"
-            payment_method_totals[method_name] += sale_amount
-
-            # Calculate product revenue and COGS from sale items
-            for item in sale.items:
-                item_revenue = Decimal(str(item.price_per_unit)) * Decimal(str(item.quantity))
-                item_cogs = Decimal(str(item.cost_price_per_unit)) * Decimal(str(item.quantity))
-
-                product_revenue += item_revenue
-                total_cogs += item_cogs
-
-        # 3. Calculate derived values
-        product_gross_profit = product_revenue - total_cogs
-        total_revenue = service_revenue + product_revenue
-        total_gross_profit = service_revenue + product_gross_profit  # Services have no COGS tracked
-
-        # Format payment breakdown for display
-        payment_breakdown = [(method, amount) for method, amount in payment_method_totals.items() if amount > 0]
-
-        # Add missing payment methods with zero values if needed for display
-        for method in payment_methods_from_db:
-            if method.name not in [item[0] for item in payment_breakdown]:
-                payment_breakdown.append((method.name, Decimal("0.00")))
-
-        # Add "Not specified" if not already included
-        if "Не вказано" not in [item[0] for item in payment_breakdown]:
-            payment_breakdown.append(("Не вказано", Decimal("0.00")))
-
-        # Sort by payment method name
-        payment_breakdown.sort(key=lambda x: x[0])
+        if should_run_in_background(form.start_date.data, form.end_date.data):
+            # Довгий діапазон формується у фоні; сторінка опитує статус завдання
+            try:
+                job = get_report_job_runner().submit(
+                    "financial_report",
+                    {"start_date": form.start_date.data, "end_date": form.end_date.data},
+                    current_user.id,
+                )
+            except ReportJobQueueFull as e:
+                error_message = str(e)
+        else:
+            selected_start_date = form.start_date.data
+            selected_end_date = form.end_date.data
+
+            summary = cached_report(
+                "financial_report",
+                {"start_date": selected_start_date, "end_date": selected_end_date},
+                selected_start_date,
+                selected_end_date,
+                lambda: ReportService.get_financial_summary(selected_start_date, selected_end_date),
+            )
+            service_revenue = summary["service_revenue"]
+            product_revenue = summary["product_revenue"]
+            total_cogs = summary["total_cogs"]
+            product_gross_profit = summary["product_gross_profit"]
+            total_revenue = summary["total_revenue"]
+            total_gross_profit = summary["total_gross_profit"]
+            payment_breakdown = summary["payment_breakdown"]
 
     return render_template(
         "reports/financial_report.html",
@@ -517,10 +394,116 @@ def financial_report() -> str:
         total_revenue=total_revenue,
         total_gross_profit=total_gross_profit,
         payment_breakdown=payment_breakdown,
+        job=job,
         error=error_message,
     )
 
 
+# Financial report export (CSV/XLSX by day, master and payment method)
+@bp.route("/financial/export", methods=["GET"])
+@login_required
+def financial_report_export() -> Response:
+    if not current_user.is_admin:
+        abort(403)
+    return export_from_request("financial_report", financial_export, "Фінансовий звіт")
+
+
+def _get_report_job(job_id: int) -> ReportJob:
+    job: ReportJob = db.get_or_404(ReportJob, job_id)
+    if job.user_id != current_user.id and not current_user.is_admin:
+        abort(403)
+    return job
+
+
+# Background report job status (polled by the report page)
+@bp.route("/jobs/<int:job_id>/status", methods=["GET"])
+@login_required
+def report_job_status(job_id: int) -> Any:
+    job = _get_report_job(job_id)
+    if job.status in ACTIVE_STATUSES:
+        # Завдання, втрачене з перезапуском, інакше опитувалося б вічно
+        get_report_job_runner().fail_stale_jobs()
+    data = serialize_job(job)
+    if job.status == JOB_COMPLETED:
+        data["result_url"] = url_for("reports.report_job_result", job_id=job.id)
+        data["download_url"] = url_for("reports.report_job_download", job_id=job.id)
+    return jsonify(data)
+
+
+# Background report job result page
+@bp.route("/jobs/<int:job_id>", methods=["GET"])
+@login_required
+def report_job_result(job_id: int) -> str:
+    job = _get_report_job(job_id)
+    params = job_params(job)
+    start_date = date.fromisoformat(params["start_date"])
+    end_date = date.fromisoformat(params["end_date"])
+    form = FinancialReportForm(formdata=None, start_date=start_date, end_date=end_date)
+
+    if job.status != JOB_COMPLETED:
+        return render_template(
+            "reports/financial_report.html",
+            title="Фінансовий звіт",
+            form=form,
+            job=job,
+            error=job.error,
+        )
+
+    return render_template(
+        "reports/financial_report.html",
+        title="Фінансовий звіт",
+        form=form,
+        selected_start_date=start_date,
+        selected_end_date=end_date,
+        job=None,
+        completed_job=job,
+        error=None,
+        **job_result(job),
+    )
+
+
+# Background report job download (CSV)
+@bp.route("/jobs/<int:job_id>/download", methods=["GET"])
+@login_required
+def report_job_download(job_id: int) -> Response:
+    job = _get_report_job(job_id)
+    if job.status != JOB_COMPLETED:
+        abort(404)
+    params = job_params(job)
+    filename = f"{job.report_type}_{params['start_date']}_{params['end_date']}.csv"
+    return Response(
+        "\ufeff" + job_csv(job),  # BOM, щоб Excel коректно показав кирилицю
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+# Report cache statistics route
+@bp.route("/cache", methods=["GET", "POST"])
+@login_required
+def report_cache_stats() -> Any:
+    """
+    Display report cache hit rates and memory use.
+    Only accessible to administrators; POST clears the cache.
+    """
+    if not current_user.is_admin:
+        abort(403)
+
+    cache = get_report_cache()
+    form = ReportCacheClearForm()
+    if form.validate_on_submit() and cache is not None:
+        cache.clear()
+        flash("Кеш звітів очищено.", "success")
+        return redirect(url_for("reports.report_cache_stats"))
+
+    return render_template(
+        "reports/cache_stats.html",
+        title="Кеш звітів",
+        form=form,
+        stats=cache.stats() if cache is not None else None,
+    )
+
+
 # Low stock alerts route
 @bp.route("/low_stock_alerts", methods=["GET"])
 @login_required
@@ -533,17 +516,8 @@ def low_stock_alerts() -> str:
     if not current_user.is_admin:
         abort(403)
 
-    # Query products with low stock levels
-    # Join Product with StockLevel and Brand
-    # Filter where quantity <= min_stock_level and min_stock_level is not null
-    low_stock_products = (
-        db.session.query(Product, StockLevel, Brand)
-        .join(StockLevel, Product.id == StockLevel.product_id)
-        .join(Brand, Product.brand_id == Brand.id)
-        .filter(and_(StockLevel.quantity <= Product.min_stock_level, Product.min_stock_level.isnot(None)))
-        .order_by(Product.name)
-        .all()
-    )
+    # Товари із залишком не вище мінімального - той самий завантажувач, що й сторінка залишків
+    low_stock_products = StockLevelsService.low_stock()
 
     # Prepare data for template
     products_data = []
@@ -15,6 +15,7 @@ from wtforms_sqlalchemy.fields import QuerySelectField
 
 from app.models import (Appointment, Client, PaymentMethod, Product, Sale,
                         SaleItem, User, db)
+from app.services.export_service import export_from_request, sales_export
 from app.services.sales_service import (InsufficientStockError,
                                         ProductNotFoundError, SaleItemData,
                                         SalesService)
@@ -182,6 +183,14 @@ def index():
     return render_template("sales/list_sales.html", title="Продажі", sales=sales)
 
 
+@bp.route("/export")
+@login_required
+@admin_required
+def export():
+    """Stream sales as CSV or XLSX (optional start_date/end_date, format)."""
+    return export_from_request("sales", sales_export, "Продажі")
+
+
 @bp.route("/new", methods=["GET", "POST"])
 @login_required
 @admin_required
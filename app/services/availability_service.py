@@ -0,0 +1,176 @@
+"""
+Availability service module.
+Finds free appointment slots by sweeping each master's sorted busy intervals.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.models import Appointment, Service, User, db
+
+# Робочий день салону (відповідає сітці розкладу 08:00-21:00)
+WORK_START = time(8, 0)
+WORK_END = time(21, 0)
+SLOT_STEP_MINUTES = 15
+DEFAULT_DURATION_MINUTES = 60
+
+
+class AvailableSlot(NamedTuple):
+    master_id: int
+    date: date
+    start_time: time
+    end_time: time
+
+
+def _minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def _to_time(minutes: int) -> time:
+    return time(minutes // 60, minutes % 60)
+
+
+def _align_up(minutes: int, step: int = SLOT_STEP_MINUTES) -> int:
+    return -(-minutes // step) * step
+
+
+def free_gaps(busy: Sequence[Tuple[int, int]], duration: int, day_start: int, day_end: int) -> List[Tuple[int, int]]:
+    """
+    Вільні проміжки, в які вміщується ``duration`` хвилин.
+
+    Args:
+        busy: Зайняті інтервали (початок, кінець) у хвилинах, відсортовані за початком
+        duration: Тривалість запису у хвилинах
+        day_start: Початок робочого часу (хвилини від півночі)
+        day_end: Кінець робочого часу (хвилини від півночі)
+
+    Returns:
+        Список (найраніший початок, кінець проміжку); початок вирівняний на SLOT_STEP_MINUTES
+    """
+    gaps: List[Tuple[int, int]] = []
+    cursor = _align_up(day_start)
+    for busy_start, busy_end in busy:
+        if busy_start - cursor >= duration:
+            gaps.append((cursor, busy_start))
+        cursor = max(cursor, _align_up(busy_end))
+        if cursor + duration > day_end:
+            return gaps
+    if day_end - cursor >= duration:
+        gaps.append((cursor, day_end))
+    return gaps
+
+
+class AvailabilityService:
+    """Service for finding free slots in masters' schedules."""
+
+    @staticmethod
+    def get_total_duration(service_ids: Sequence[int]) -> int:
+        """
+        Sums Service.duration for the given services (one query).
+
+        Raises:
+            ValueError: When a service doesn't exist
+        """
+        unique_ids = set(service_ids)
+        if not unique_ids:
+            raise ValueError("Потрібно вказати хоча б одну послугу")
+
+        rows = db.session.query(Service.id, Service.duration).filter(Service.id.in_(unique_ids)).all()
+        missing = unique_ids - {service_id for service_id, _ in rows}
+        if missing:
+            raise ValueError(f"Послуги з ID {sorted(missing)} не знайдені")
+
+        durations = {service_id: duration or 0 for service_id, duration in rows}
+        return sum(durations[service_id] for service_id in service_ids) or DEFAULT_DURATION_MINUTES
+
+    @staticmethod
+    def find_available_slots(
+        service_ids: Sequence[int],
+        master_id: Optional[int] = None,
+        from_date: Optional[date] = None,
+        days: int = 14,
+        limit: int = 10,
+        now: Optional[datetime] = None,
+    ) -> List[AvailableSlot]:
+        """
+        Finds the earliest free slots for the given services.
+
+        Busy intervals of all candidate masters for the whole window are loaded with
+        one query, then each (master, day) is swept in start-time order.
+
+        Args:
+            service_ids: Services to book; total duration is the sum of Service.duration
+            master_id: Optional master (all active masters when None)
+            from_date: First day of the window (defaults to today)
+            days: Number of days in the window
+            limit: Maximum number of slots to return (one per free gap)
+            now: Current time; slots before it are skipped (defaults to datetime.now())
+
+        Returns:
+            Slots ordered by date, start time and master display order
+
+        Raises:
+            ValueError: When services or master don't exist, or days/limit are invalid
+        """
+        if days <= 0 or limit <= 0:
+            raise ValueError("Кількість днів та слотів повинна бути більше 0")
+
+        duration = AvailabilityService.get_total_duration(service_ids)
+        now = now or datetime.now()
+        from_date = from_date or now.date()
+        to_date = from_date + timedelta(days=days - 1)
+
+        if master_id is not None:
+            master = db.session.get(User, master_id)
+            if not master:
+                raise ValueError(f"Майстер з ID {master_id} не знайдений")
+            masters = [master]
+        else:
+            masters = (
+                User.query.filter_by(is_active_master=True).order_by(User.schedule_display_order, User.full_name).all()
+            )
+        if not masters:
+            return []
+
+        master_order = {master.id: position for position, master in enumerate(masters)}
+        rows = (
+            db.session.query(Appointment.master_id, Appointment.date, Appointment.start_time, Appointment.end_time)
+            .filter(
+                Appointment.master_id.in_(master_order),
+                Appointment.date >= from_date,
+                Appointment.date <= to_date,
+                Appointment.status != "cancelled",
+            )
+            .order_by(Appointment.date, Appointment.start_time)
+            .all()
+        )
+
+        busy: Dict[Tuple[date, int], List[Tuple[int, int]]] = defaultdict(list)
+        for row in rows:
+            busy[(row.date, row.master_id)].append((_minutes(row.start_time), _minutes(row.end_time)))
+
+        day_end = _minutes(WORK_END)
+        slots: List[AvailableSlot] = []
+        for offset in range(days):
+            day = from_date + timedelta(days=offset)
+            if day < now.date():
+                continue
+            day_start = _minutes(WORK_START)
+            if day == now.date():
+                day_start = max(day_start, now.hour * 60 + now.minute)
+
+            day_slots = []
+            for candidate_id in master_order:
+                for gap_start, _ in free_gaps(busy.get((day, candidate_id), []), duration, day_start, day_end):
+                    day_slots.append(
+                        AvailableSlot(candidate_id, day, _to_time(gap_start), _to_time(gap_start + duration))
+                    )
+
+            day_slots.sort(key=lambda slot: (slot.start_time, master_order[slot.master_id]))
+            slots.extend(day_slots)
+            # Наступні дні можуть дати лише пізніші слоти
+            if len(slots) >= limit:
+                break
+
+        return slots[:limit]
@@ -0,0 +1,213 @@
+"""
+Client search.
+On SQLite names, emails and notes are matched through the client_fts FTS5 index
+(case-folded, Cyrillic included) and ranked with bm25 in SQL; other databases
+fall back to LIKE over lowercased columns. Phones are matched as substrings, or
+by their last digits through the indexed phone_reversed column.
+"""
+
+import base64
+import binascii
+import json
+import re
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+from flask import Flask, current_app, has_app_context
+from flask_sqlalchemy.query import Query
+from sqlalchemy import Float, Integer, and_, func, or_, select, text, tuple_
+
+from app.models import Appointment, Client, User, db, normalize_phone
+from app.services.count_cache import DEFAULT_COUNT_TTL, CountCache
+
+CLIENT_SEARCH_LIMIT = 100
+# Найкоротше закінчення номера, за яким шукаємо клієнта
+MIN_PHONE_DIGITS = 4
+CLIENT_PAGE_SIZE = 50
+
+# Вага колонок name, email, notes у bm25 (менше значення - вищий ранг)
+_BM25 = "bm25(client_fts, 10.0, 2.0, 1.0)"
+_TERM = re.compile(r"[^\W_]+")
+
+
+def search_terms(search: str) -> List[str]:
+    """Lowercased word tokens of a search string, split like the unicode61 tokenizer does."""
+    return _TERM.findall(search.lower())
+
+
+class ClientPage(NamedTuple):
+    clients: List[Client]
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+    total: Optional[int]  # приблизна кількість (з кешу) або None, якщо підрахунок вимкнено
+
+
+class InvalidCursorError(ValueError):
+    """Raised for a malformed pagination cursor."""
+
+
+def encode_cursor(client: Client) -> str:
+    """Opaque cursor of a client's ``(name, id)`` position in the list."""
+    data = json.dumps([client.name, client.id], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """
+    ``(name, id)`` position of a cursor.
+
+    Raises:
+        InvalidCursorError: if the cursor was not produced by ``encode_cursor``
+    """
+    try:
+        name, client_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as e:
+        raise InvalidCursorError("Некоректний курсор сторінки") from e
+    if not isinstance(name, str) or not isinstance(client_id, int):
+        raise InvalidCursorError("Некоректний курсор сторінки")
+    return name, client_id
+
+
+def init_app(app: Flask) -> CountCache:
+    """Створює кеш кількості клієнтів (``app.extensions["client_counts"]``)."""
+    cache = CountCache(ttl=app.config.get("CLIENT_COUNT_TTL", DEFAULT_COUNT_TTL))
+    app.extensions["client_counts"] = cache
+    return cache
+
+
+def get_client_count_cache() -> Optional[CountCache]:
+    if not has_app_context():
+        return None
+    cache: Optional[CountCache] = current_app.extensions.get("client_counts")
+    return cache
+
+
+class ClientSearchService:
+    """Visibility-restricted, ranked client search."""
+
+    @staticmethod
+    def visible_clients(user: User) -> Query:
+        """Всі клієнти для адміністратора, для майстра - лише ті, з якими він мав записи."""
+        query = Client.query
+        if not user.is_admin:
+            visible = (
+                select(Appointment.client_id).where(Appointment.master_id == user.id).distinct().subquery("visible")
+            )
+            query = query.join(visible, visible.c.client_id == Client.id)
+        return query
+
+    @staticmethod
+    def page(
+        user: User, after: Optional[str] = None, before: Optional[str] = None, per_page: int = CLIENT_PAGE_SIZE
+    ) -> ClientPage:
+        """
+        One page of the clients visible to ``user`` ordered by ``(name, id)``.
+
+        Pages are sought from a cursor over the ``ix_client_name_id`` index instead of
+        OFFSET, so every page costs the same however deep the list is: ``after`` gives
+        the page following a cursor, ``before`` the page preceding it.
+
+        Raises:
+            InvalidCursorError: if a cursor is malformed
+        """
+        query = ClientSearchService.visible_clients(user)
+        key = tuple_(Client.name, Client.id)
+        if before:
+            position = decode_cursor(before)
+            rows = query.filter(key < position).order_by(Client.name.desc(), Client.id.desc()).limit(per_page + 1).all()
+            has_prev, has_next = len(rows) > per_page, True
+            clients = rows[:per_page][::-1]
+        else:
+            if after:
+                query = query.filter(key > decode_cursor(after))
+            rows = query.order_by(Client.name, Client.id).limit(per_page + 1).all()
+            has_prev, has_next = bool(after), len(rows) > per_page
+            clients = rows[:per_page]
+
+        cache = get_client_count_cache()
+        total = None
+        if cache is not None:
+            scope = None if user.is_admin else user.id
+            total = cache.get_or_count(scope, lambda: ClientSearchService.visible_clients(user).order_by(None).count())
+        return ClientPage(
+            clients=clients,
+            next_cursor=encode_cursor(clients[-1]) if clients and has_next else None,
+            prev_cursor=encode_cursor(clients[0]) if clients and has_prev else None,
+            total=total,
+        )
+
+    @staticmethod
+    def search(user: User, search: str, limit: Optional[int] = CLIENT_SEARCH_LIMIT) -> List[Client]:
+        """
+        Clients visible to ``user`` whose name, email or notes contain words starting
+        with every search word, or whose phone contains the search string.
+
+        Name matches rank above email and notes matches; phone-only matches come last.
+        """
+        search = search.strip()
+        terms = search_terms(search)
+        phone_condition = (
+            Client.phone.contains(search, autoescape=True) if any(char.isdigit() for char in search) else None
+        )
+        if not terms and phone_condition is None:
+            return []
+
+        query = ClientSearchService.visible_clients(user)
+        if not terms:
+            query = query.filter(phone_condition).order_by(Client.name, Client.id)
+        elif db.engine.name == "sqlite":
+            query = ClientSearchService._fts_query(query, terms, phone_condition)
+        else:
+            query = ClientSearchService._like_query(query, terms, phone_condition)
+        if limit is not None:
+            query = query.limit(limit)
+        return list(query.all())
+
+    @staticmethod
+    def by_phone(user: User, phone: str, limit: Optional[int] = CLIENT_SEARCH_LIMIT) -> List[Client]:
+        """
+        Clients visible to ``user`` whose phone ends with the digits of ``phone``.
+
+        A full number is its own suffix, so "0501234567" also finds "+380501234567".
+        The suffix is a prefix of ``phone_reversed``, looked up as a range on its index.
+        """
+        digits = normalize_phone(phone)
+        if len(digits) < MIN_PHONE_DIGITS:
+            return []
+        reversed_digits = digits[::-1]
+        # ":" йде одразу за "9" в ASCII, тож діапазон охоплює всі продовження префікса
+        query = (
+            ClientSearchService.visible_clients(user)
+            .filter(Client.phone_reversed >= reversed_digits, Client.phone_reversed < reversed_digits + ":")
+            .order_by(Client.phone_reversed, Client.id)
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        return list(query.all())
+
+    @staticmethod
+    def _fts_query(query: Query, terms: List[str], phone_condition: Optional[Any]) -> Query:
+        # Кожне слово - префіксний запит; токени містять лише літери й цифри, тож лапки безпечні
+        match = " ".join(f'"{term}"*' for term in terms)
+        matched = (
+            text(f"SELECT rowid AS client_id, {_BM25} AS score FROM client_fts WHERE client_fts MATCH :match")
+            .bindparams(match=match)
+            .columns(client_id=Integer, score=Float)
+            .subquery("client_match")
+        )
+        if phone_condition is None:
+            query = query.join(matched, matched.c.client_id == Client.id)
+        else:
+            query = query.outerjoin(matched, matched.c.client_id == Client.id).filter(
+                or_(matched.c.client_id.isnot(None), phone_condition)
+            )
+        return query.order_by(matched.c.score.is_(None), matched.c.score, Client.name, Client.id)
+
+    @staticmethod
+    def _like_query(query: Query, terms: List[str], phone_condition: Optional[Any]) -> Query:
+        columns = (Client.name, Client.email, Client.notes)
+        condition = or_(
+            *(and_(*(func.lower(column).contains(term, autoescape=True) for term in terms)) for column in columns)
+        )
+        if phone_condition is not None:
+            condition = or_(condition, phone_condition)
+        return query.filter(condition).order_by(Client.name, Client.id)
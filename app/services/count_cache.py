@@ -0,0 +1,42 @@
+"""
+Cached row counts for paginated lists.
+A total is reused for ``ttl`` seconds per key, so paging through a large list
+does not run COUNT(*) on every page.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+DEFAULT_COUNT_TTL = 300
+
+
+class CountCache:
+    """
+    Approximate totals by key (e.g. a visibility scope, ``None`` for an unfiltered list).
+
+    ``ttl=0`` disables the cache: ``get_or_count`` returns ``None`` without counting.
+    """
+
+    def __init__(self, ttl: int = DEFAULT_COUNT_TTL, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self._counts: Dict[Hashable, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def get_or_count(self, key: Hashable, counter: Callable[[], int]) -> Optional[int]:
+        if self.ttl <= 0:
+            return None
+        now = self.clock()
+        with self._lock:
+            entry = self._counts.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+        count = counter()
+        with self._lock:
+            self._counts[key] = (now + self.ttl, count)
+        return count
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts.clear()
@@ -0,0 +1,367 @@
+"""
+Streaming exports of reports and ledgers.
+Rows are read with ``yield_per`` (chunked server-side iteration over plain
+column tuples) and written to CSV or XLSX incrementally, so memory use does not
+grow with the size of the export.
+"""
+
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+from flask import Response, abort, request, stream_with_context
+from sqlalchemy import Numeric, Select, func, select
+
+from app.models import (
+    Client,
+    DailyRollup,
+    GoodsReceipt,
+    GoodsReceiptItem,
+    PaymentMethod,
+    Product,
+    ProductWriteOff,
+    ProductWriteOffItem,
+    Sale,
+    User,
+    WriteOffReason,
+    db,
+)
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+class ExportFormatError(ValueError):
+    """Raised for an unsupported export format."""
+
+
+def iter_rows(statement: Select, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[Sequence[Any]]:
+    """Rows of a Core/ORM column select fetched ``chunk_size`` at a time."""
+    result = db.session.execute(statement.execution_options(yield_per=chunk_size))
+    for partition in result.partitions():
+        yield from partition
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat(sep=" ") if isinstance(value, datetime) else value.isoformat()
+    return value
+
+
+def csv_stream(
+    header: Sequence[str], rows: Iterable[Sequence[Any]], chunk_size: int = EXPORT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """CSV in UTF-8 with BOM (Excel opens Cyrillic correctly), yielded in chunks of ``chunk_size`` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(header)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_csv_value(value) for value in row])
+        if count % chunk_size == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+# --- XLSX: мінімальна книга з одним аркушем, записується потоково в zip без проміжного файлу ---
+
+_XLSX_PARTS = (
+    (
+        "[Content_Types].xml",
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        "</Types>",
+    ),
+    (
+        "_rels/.rels",
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        "</Relationships>",
+    ),
+    (
+        "xl/_rels/workbook.xml.rels",
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        "</Relationships>",
+    ),
+)
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_TAIL = "</sheetData></worksheet>"
+# Символи, заборонені в XML 1.0
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _workbook_xml(sheet_name: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+        "</workbook>"
+    )
+
+
+def _xlsx_cell(value: Any) -> str:
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f"<c><v>{value}</v></c>"
+    text = _csv_value(value)
+    return f'<c t="inlineStr"><is><t>{escape(_XML_ILLEGAL.sub("", str(text)))}</t></is></c>'
+
+
+def _xlsx_row(row: Sequence[Any]) -> str:
+    return "<row>" + "".join(_xlsx_cell(value) for value in row) + "</row>"
+
+
+class _ChunkWriter:
+    """Unseekable sink for ZipFile: collects written bytes until they are drained."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def xlsx_stream(
+    header: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    sheet_name: str = "Export",
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """Single-sheet XLSX workbook yielded in compressed chunks of ``chunk_size`` rows."""
+    sink = _ChunkWriter()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:  # type: ignore[arg-type]
+        for name, content in _XLSX_PARTS:
+            archive.writestr(name, content)
+        archive.writestr("xl/workbook.xml", _workbook_xml(sheet_name))
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write((_SHEET_HEAD + _xlsx_row(header)).encode("utf-8"))
+            chunk: List[str] = []
+            for row in rows:
+                chunk.append(_xlsx_row(row))
+                if len(chunk) == chunk_size:
+                    sheet.write("".join(chunk).encode("utf-8"))
+                    chunk.clear()
+                    yield sink.drain()
+            chunk.append(_SHEET_TAIL)
+            sheet.write("".join(chunk).encode("utf-8"))
+    yield sink.drain()
+
+
+def export_response(
+    filename: str, header: Sequence[str], statement: Select, export_format: str = "csv", sheet_name: str = "Export"
+) -> Response:
+    """
+    Streaming download of the statement rows.
+
+    Raises:
+        ExportFormatError: if the format is not csv or xlsx
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ExportFormatError(f"Непідтримуваний формат експорту: {export_format}")
+    rows = iter_rows(statement)
+    if export_format == "xlsx":
+        body = xlsx_stream(header, rows, sheet_name)
+    else:
+        body = csv_stream(header, rows)
+    return Response(
+        stream_with_context(body),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}.{export_format}"},
+    )
+
+
+ExportQuery = Callable[[Optional[date], Optional[date]], Tuple[List[str], Select]]
+
+
+def _date_arg(name: str) -> Optional[date]:
+    """Дата з параметра запиту; некоректна дата - 400, а не експорт без обмеження."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        abort(400)
+
+
+def export_from_request(name: str, export_query: ExportQuery, sheet_name: str = "Export") -> Response:
+    """Export for the ``start_date``, ``end_date`` (ISO, optional) and ``format`` query arguments."""
+    start_date = _date_arg("start_date")
+    end_date = _date_arg("end_date")
+    export_format = request.args.get("format", "csv")
+    if export_format not in EXPORT_FORMATS:
+        abort(400)
+
+    header, statement = export_query(start_date, end_date)
+    filename = "_".join([name] + [value.isoformat() for value in (start_date, end_date) if value is not None])
+    return export_response(filename, header, statement, export_format, sheet_name)
+
+
+# --- Вибірки для експорту (лише колонки, без ORM-об'єктів) ---
+
+
+def _date_range(column: Any, start_date: Optional[date], end_date: Optional[date]) -> List[Any]:
+    conditions = []
+    if start_date is not None:
+        conditions.append(column >= start_date)
+    if end_date is not None:
+        conditions.append(column <= end_date)
+    return conditions
+
+
+def financial_export(start_date: Optional[date], end_date: Optional[date]) -> Tuple[List[str], Select]:
+    """Financial report by day, master and payment method (daily_rollup rows)."""
+    header = [
+        "Дата",
+        "Майстер",
+        "Спосіб оплати",
+        "Завершені записи",
+        "Вартість послуг",
+        "Дохід від послуг",
+        "Продажі",
+        "Сума продажів",
+        "Дохід від товарів",
+        "Собівартість",
+    ]
+    statement = (
+        select(
+            DailyRollup.day,
+            User.full_name,
+            PaymentMethod.name,
+            DailyRollup.appointment_count,
+            DailyRollup.services_total,
+            func.round(DailyRollup.service_revenue, 2, type_=Numeric(12, 2)),
+            DailyRollup.sales_count,
+            DailyRollup.sales_total,
+            DailyRollup.product_revenue,
+            DailyRollup.cogs,
+        )
+        .join(User, User.id == DailyRollup.master_id)
+        .outerjoin(PaymentMethod, PaymentMethod.id == DailyRollup.payment_method_id)
+        .where(*_date_range(DailyRollup.day, start_date, end_date))
+        .order_by(DailyRollup.day, User.full_name, DailyRollup.id)
+    )
+    return header, statement
+
+
+def sales_export(start_date: Optional[date], end_date: Optional[date]) -> Tuple[List[str], Select]:
+    header = ["№", "Дата", "Клієнт", "Продавець", "Спосіб оплати", "Сума"]
+    statement = (
+        select(Sale.id, Sale.sale_date, Client.name, User.full_name, PaymentMethod.name, Sale.total_amount)
+        .join(User, User.id == Sale.user_id)
+        .outerjoin(Client, Client.id == Sale.client_id)
+        .outerjoin(PaymentMethod, PaymentMethod.id == Sale.payment_method_id)
+        .where(*_date_range(Sale.sale_day, start_date, end_date))
+        .order_by(Sale.sale_date, Sale.id)
+    )
+    return header, statement
+
+
+def goods_receipts_export(start_date: Optional[date], end_date: Optional[date]) -> Tuple[List[str], Select]:
+    header = [
+        "№ документа",
+        "Номер накладної",
+        "Дата",
+        "Артикул",
+        "Товар",
+        "Отримано",
+        "Залишок партії",
+        "Собівартість за од.",
+        "Сума",
+        "Партія",
+        "Термін придатності",
+    ]
+    statement = (
+        select(
+            GoodsReceipt.id,
+            GoodsReceipt.receipt_number,
+            GoodsReceipt.receipt_date,
+            Product.sku,
+            Product.name,
+            GoodsReceiptItem.quantity_received,
+            GoodsReceiptItem.quantity_remaining,
+            GoodsReceiptItem.cost_price_per_unit,
+            GoodsReceiptItem.quantity_received * GoodsReceiptItem.cost_price_per_unit,
+            GoodsReceiptItem.batch_number,
+            GoodsReceiptItem.expiry_date,
+        )
+        .join(GoodsReceipt, GoodsReceipt.id == GoodsReceiptItem.receipt_id)
+        .join(Product, Product.id == GoodsReceiptItem.product_id)
+        .where(*_date_range(GoodsReceipt.receipt_date, start_date, end_date))
+        .order_by(GoodsReceipt.receipt_date, GoodsReceipt.id, GoodsReceiptItem.id)
+    )
+    return header, statement
+
+
+def write_offs_export(start_date: Optional[date], end_date: Optional[date]) -> Tuple[List[str], Select]:
+    header = [
+        "№ документа",
+        "Дата",
+        "Причина",
+        "Хто списав",
+        "Артикул",
+        "Товар",
+        "Кількість",
+        "Собівартість за од.",
+        "Сума",
+    ]
+    statement = (
+        select(
+            ProductWriteOff.id,
+            ProductWriteOff.write_off_date,
+            WriteOffReason.name,
+            User.full_name,
+            Product.sku,
+            Product.name,
+            ProductWriteOffItem.quantity,
+            ProductWriteOffItem.cost_price_per_unit,
+            ProductWriteOffItem.quantity * ProductWriteOffItem.cost_price_per_unit,
+        )
+        .join(ProductWriteOff, ProductWriteOff.id == ProductWriteOffItem.product_write_off_id)
+        .join(WriteOffReason, WriteOffReason.id == ProductWriteOff.reason_id)
+        .join(User, User.id == ProductWriteOff.user_id)
+        .join(Product, Product.id == ProductWriteOffItem.product_id)
+        .where(*_date_range(ProductWriteOff.write_off_date, start_date, end_date))
+        .order_by(ProductWriteOff.write_off_date, ProductWriteOff.id, ProductWriteOffItem.id)
+    )
+    return header, statement
@@ -0,0 +1,266 @@
+"""
+FIFO inventory depletion shared by sales and write-offs.
+All lines of a document are depleted against batches loaded up front: products,
+stock levels and every open receipt batch of the involved products are read in
+one query each, depleted in memory and written back with a single executemany.
+
+Write-back is safe against concurrent documents: quantities are decremented by
+conditional UPDATEs that refuse to go below zero, and a refused decrement rolls
+the document back so ``retry_stock_transaction`` can rerun it against fresh
+batches. On SQLite the write lock is taken up front with ``BEGIN IMMEDIATE``.
+"""
+
+import functools
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, TypeVar
+
+from sqlalchemy import Select, bindparam, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models import GoodsReceiptItem, Product, StockLevel, db
+
+# Скільки разів повторюємо документ після конфлікту та базова пауза (с) між спробами
+STOCK_RETRY_ATTEMPTS = 5
+STOCK_RETRY_BACKOFF = 0.05
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class InsufficientStockError(Exception):
+    """Raised when there's not enough stock to fulfill a sale or write-off."""
+
+    def __init__(self, product_name: str, requested_qty: int, available_qty: int):
+        self.product_name = product_name
+        self.requested_qty = requested_qty
+        self.available_qty = available_qty
+        super().__init__(
+            f"Недостатньо товару '{product_name}': запрошено {requested_qty}, " f"доступно {available_qty}"
+        )
+
+
+class ProductNotFoundError(Exception):
+    """Raised when a product is not found."""
+
+    pass
+
+
+class StockConflictError(Exception):
+    """Raised when a concurrent sale or write-off consumed the stock being depleted."""
+
+    def __init__(self) -> None:
+        super().__init__("Залишки товару змінилися під час збереження, спробуйте ще раз")
+
+
+def begin_stock_transaction() -> None:
+    """
+    Takes the SQLite write lock before stock is read.
+
+    Two deferred transactions that both read batches and then write would deadlock
+    on the lock upgrade; ``BEGIN IMMEDIATE`` makes the second writer wait for the
+    first one to commit instead. Other databases rely on the conditional UPDATEs.
+    """
+    if db.engine.name != "sqlite":
+        return
+    connection = db.session.connection()
+    if not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _is_busy(error: OperationalError) -> bool:
+    message = str(error.orig).lower()
+    return "database is locked" in message or "database is busy" in message
+
+
+def retry_stock_transaction(func: F) -> F:
+    """
+    Reruns a stock-depleting operation after a concurrency conflict.
+
+    The operation must roll back on failure. ``StockConflictError`` and SQLite
+    "database is locked" errors are retried up to ``STOCK_RETRY_ATTEMPTS`` times with
+    jittered exponential backoff; any other error, or the last failure, propagates.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        for attempt in range(1, STOCK_RETRY_ATTEMPTS + 1):
+            try:
+                return func(*args, **kwargs)
+            except (StockConflictError, OperationalError) as e:
+                if attempt == STOCK_RETRY_ATTEMPTS or (isinstance(e, OperationalError) and not _is_busy(e)):
+                    raise
+                time.sleep(STOCK_RETRY_BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+
+    return wrapper  # type: ignore[return-value]
+
+
+def open_batches_query(product_ids: Iterable[int]) -> Select:
+    """
+    Open batches of the products in FIFO order.
+
+    Served by the partial index ``ix_goods_receipt_item_open_batches``; the id
+    breaks ties between batches received at the same moment.
+    """
+    return (
+        select(
+            GoodsReceiptItem.id,
+            GoodsReceiptItem.product_id,
+            GoodsReceiptItem.quantity_remaining,
+            GoodsReceiptItem.cost_price_per_unit,
+        )
+        .where(GoodsReceiptItem.product_id.in_(list(product_ids)), GoodsReceiptItem.quantity_remaining > 0)
+        .order_by(GoodsReceiptItem.product_id, GoodsReceiptItem.receipt_date, GoodsReceiptItem.id)
+    )
+
+
+class _Batch:
+    """Open receipt batch (GoodsReceiptItem row) being depleted in memory."""
+
+    __slots__ = ("id", "quantity_remaining", "cost_price_per_unit", "taken")
+
+    def __init__(self, batch_id: int, quantity_remaining: int, cost_price_per_unit: Decimal):
+        self.id = batch_id
+        self.quantity_remaining = quantity_remaining
+        self.cost_price_per_unit = cost_price_per_unit
+        self.taken = 0  # ще не записано в БД
+
+
+class FifoDepletion:
+    """
+    FIFO depletion of the products of one sale or write-off.
+
+    Create it with the product ids of all lines, call ``take`` for every line in
+    order (a product may appear on several lines) and ``write_back`` once before
+    commit.
+    """
+
+    def __init__(self, product_ids: Iterable[int]):
+        ids = set(product_ids)
+        self.products: Dict[int, Product] = {}
+        self.stock_levels: Dict[int, StockLevel] = {}
+        self.batches: Dict[int, List[_Batch]] = defaultdict(list)
+        self.taken: Dict[int, int] = defaultdict(int)
+        if not ids:
+            return
+
+        self.products = {product.id: product for product in Product.query.filter(Product.id.in_(ids))}
+        self.stock_levels = {
+            level.product_id: level for level in StockLevel.query.filter(StockLevel.product_id.in_(ids))
+        }
+        rows = db.session.execute(open_batches_query(ids))
+        for batch_id, product_id, quantity_remaining, cost_price_per_unit in rows:
+            self.batches[product_id].append(_Batch(batch_id, quantity_remaining, cost_price_per_unit))
+
+    def product(self, product_id: int) -> Product:
+        """
+        Raises:
+            ProductNotFoundError: When the product doesn't exist
+        """
+        product = self.products.get(product_id)
+        if product is None:
+            raise ProductNotFoundError(f"Товар з ID {product_id} не знайдений")
+        return product
+
+    def take(self, product_id: int, quantity_needed: int) -> Decimal:
+        """
+        Depletes ``quantity_needed`` units of a product from its oldest batches.
+
+        Returns:
+            Weighted average cost price per unit
+
+        Raises:
+            ProductNotFoundError: When the product doesn't exist
+            InsufficientStockError: When the stock level or the open batches cannot cover the quantity
+        """
+        product = self.product(product_id)
+
+        stock_level = self.stock_levels.get(product_id)
+        available_qty = stock_level.quantity - self.taken[product_id] if stock_level else 0
+        if available_qty < quantity_needed:
+            raise InsufficientStockError(product.name, quantity_needed, available_qty)
+
+        batches = self.batches[product_id]
+        total_available = sum(batch.quantity_remaining for batch in batches)
+        if total_available < quantity_needed:
+            raise InsufficientStockError(product.name, quantity_needed, total_available)
+
+        remaining_needed = quantity_needed
+        total_cost = Decimal("0.00")
+        for batch in batches:
+            if remaining_needed <= 0:
+                break
+            if batch.quantity_remaining <= 0:
+                continue
+
+            quantity_from_batch = min(remaining_needed, batch.quantity_remaining)
+            total_cost += quantity_from_batch * batch.cost_price_per_unit
+            batch.quantity_remaining -= quantity_from_batch
+            batch.taken += quantity_from_batch
+            remaining_needed -= quantity_from_batch
+
+        self.taken[product_id] += quantity_needed
+
+        return total_cost / quantity_needed
+
+    def write_back(self) -> None:
+        """
+        Decrements the depleted batches and stock levels in the database.
+
+        Each table gets one executemany of ``SET q = q - :taken WHERE ... AND q >= :taken``,
+        so a row another transaction has consumed meanwhile is left untouched.
+
+        Raises:
+            StockConflictError: When any row could not be decremented
+        """
+        batch_params = [
+            {"batch_id": batch.id, "taken": batch.taken}
+            for batches in self.batches.values()
+            for batch in batches
+            if batch.taken
+        ]
+        if batch_params:
+            table = GoodsReceiptItem.__table__
+            self._decrement(
+                table.update()
+                .where(table.c.id == bindparam("batch_id"), table.c.quantity_remaining >= bindparam("taken"))
+                .values(quantity_remaining=table.c.quantity_remaining - bindparam("taken")),
+                batch_params,
+            )
+            for batches in self.batches.values():
+                for batch in batches:
+                    batch.taken = 0
+
+        now = datetime.now(timezone.utc)
+        level_params = [
+            {"level_product_id": product_id, "taken": taken, "now": now}
+            for product_id, taken in self.taken.items()
+            if taken
+        ]
+        if level_params:
+            table = StockLevel.__table__
+            self._decrement(
+                table.update()
+                .where(table.c.product_id == bindparam("level_product_id"), table.c.quantity >= bindparam("taken"))
+                .values(quantity=table.c.quantity - bindparam("taken"), last_updated=bindparam("now")),
+                level_params,
+            )
+            # Рядки вже оновлено в БД - синхронізуємо завантажені об'єкти, не позначаючи їх зміненими
+            for params in level_params:
+                stock_level = self.stock_levels[params["level_product_id"]]
+                set_committed_value(stock_level, "quantity", stock_level.quantity - params["taken"])
+                set_committed_value(stock_level, "last_updated", now)
+            self.taken.clear()
+
+    @staticmethod
+    def _decrement(statement: Any, params: List[Dict[str, Any]]) -> None:
+        dialect = db.session.get_bind().dialect
+        if dialect.supports_sane_multi_rowcount:
+            updated = db.session.execute(statement, params).rowcount
+        else:
+            updated = sum(db.session.execute(statement, row).rowcount for row in params)
+        if updated != len(params):
+            raise StockConflictError()
@@ -7,27 +7,12 @@ from datetime import date, datetime, timezone
 from decimal import Decimal
 from typing import List, Optional, Tuple
 
-from app.models import (GoodsReceiptItem, Product, ProductWriteOff,
-                        ProductWriteOffItem, StockLevel, User, WriteOffReason,
-                        db)
-
-
-class InsufficientStockError(Exception):
-    """Raised when there's not enough stock to fulfill a write-off."""
-
-    def __init__(self, product_name: str, requested_qty: int, available_qty: int):
-        self.product_name = product_name
-        self.requested_qty = requested_qty
-        self.available_qty = available_qty
-        super().__init__(
-            f"Недостатньо товару '{product_name}': запрошено {requested_qty}, " f"доступно {available_qty}"
-        )
-
-
-class ProductNotFoundError(Exception):
-    """Raised when a product is not found."""
-
-    pass
+from app.models import (ProductWriteOff, ProductWriteOffItem, User,
+                        WriteOffReason, db)
+from app.services.fifo import (FifoDepletion, InsufficientStockError,
+                               ProductNotFoundError, StockConflictError,
+                               begin_stock_transaction,
+                               retry_stock_transaction)
 
 
 class WriteOffReasonNotFoundError(Exception):
@@ -50,6 +35,7 @@ class InventoryService:
     """Service for handling inventory operations including write-offs with FIFO management."""
 
     @staticmethod
+    @retry_stock_transaction
     def create_write_off(
         user_id: int,
         reason_id: int,
@@ -73,10 +59,14 @@ class InventoryService:
         Raises:
             InsufficientStockError: When there's not enough stock
             ProductNotFoundError: When a product doesn't exist
+            StockConflictError: When concurrent documents kept consuming the same stock
             WriteOffReasonNotFoundError: When reason doesn't exist
             IntegrityError: When database constraints are violated
         """
         try:
+            # На SQLite одразу беремо блокування запису, щоб залишки не змінилися до коміту
+            begin_stock_transaction()
+
             # Validate input
             if not write_off_items:
                 raise ValueError("Список товарів не може бути порожнім")
@@ -104,9 +94,11 @@ class InventoryService:
             db.session.add(write_off)
             db.session.flush()  # Get write-off ID
 
-            # Process each write-off item with FIFO logic
+            # Process each write-off item with FIFO logic (партії всіх товарів завантажуються одним запитом)
+            fifo = FifoDepletion(item_data.product_id for item_data in write_off_items)
             for item_data in write_off_items:
-                InventoryService._create_write_off_item_with_fifo(write_off, item_data)
+                InventoryService._create_write_off_item_with_fifo(write_off, item_data, fifo)
+            fifo.write_back()
 
             db.session.commit()
             return write_off
@@ -117,7 +109,7 @@ class InventoryService:
 
     @staticmethod
     def _create_write_off_item_with_fifo(
-        write_off: ProductWriteOff, item_data: WriteOffItemData
+        write_off: ProductWriteOff, item_data: WriteOffItemData, fifo: FifoDepletion
     ) -> ProductWriteOffItem:
         """
         Creates a write-off item and depletes inventory using FIFO logic.
@@ -125,6 +117,7 @@ class InventoryService:
         Args:
             write_off: ProductWriteOff object
             item_data: WriteOffItemData object
+            fifo: FifoDepletion loaded for all products of the write-off
 
         Returns:
             Created ProductWriteOffItem
@@ -133,89 +126,20 @@ class InventoryService:
             InsufficientStockError: When there's not enough stock
             ProductNotFoundError: When product doesn't exist
         """
-        # Get product
-        product = Product.query.get(item_data.product_id)
-        if not product:
-            raise ProductNotFoundError(f"Товар з ID {item_data.product_id} не знайдений")
-
-        # Check current stock
-        stock_level = StockLevel.query.filter_by(product_id=product.id).first()
-        if not stock_level or stock_level.quantity < item_data.quantity:
-            available_qty = stock_level.quantity if stock_level else 0
-            raise InsufficientStockError(product.name, item_data.quantity, available_qty)
-
-        # Calculate FIFO cost price
-        cost_price = InventoryService._calculate_fifo_cost_and_deplete_inventory(product, item_data.quantity)
+        # Check stock, calculate FIFO cost price and update stock level
+        cost_price = fifo.take(item_data.product_id, item_data.quantity)
 
         # Create write-off item
         write_off_item = ProductWriteOffItem()
         write_off_item.product_write_off_id = write_off.id
-        write_off_item.product_id = product.id
+        write_off_item.product_id = item_data.product_id
         write_off_item.quantity = item_data.quantity
         write_off_item.cost_price_per_unit = cost_price
 
         db.session.add(write_off_item)
 
-        # Update stock level
-        stock_level.quantity -= item_data.quantity
-        stock_level.last_updated = datetime.now(timezone.utc)
-
         return write_off_item
 
-    @staticmethod
-    def _calculate_fifo_cost_and_deplete_inventory(product: Product, quantity_needed: int) -> Decimal:
-        """
-        Calculates weighted average cost price using FIFO and depletes inventory batches.
-
-        Args:
-            product: Product object
-            quantity_needed: Quantity to write off
-
-        Returns:
-            Weighted average cost price per unit
-
-        Raises:
-            InsufficientStockError: When there's not enough stock in receipt items
-        """
-        # Get all receipt items for this product, ordered by receipt date (FIFO)
-        receipt_items = (
-            GoodsReceiptItem.query.filter_by(product_id=product.id)
-            .filter(GoodsReceiptItem.quantity_remaining > 0)
-            .order_by(GoodsReceiptItem.receipt_date)
-            .all()
-        )
-
-        if not receipt_items:
-            raise InsufficientStockError(product.name, quantity_needed, 0)
-
-        # Check if we have enough total quantity
-        total_available = sum(item.quantity_remaining for item in receipt_items)
-        if total_available < quantity_needed:
-            raise InsufficientStockError(product.name, quantity_needed, total_available)
-
-        # Calculate weighted average cost using FIFO
-        remaining_needed = quantity_needed
-        total_cost = Decimal("0.00")
-
-        for receipt_item in receipt_items:
-            if remaining_needed <= 0:
-                break
-
-            # Calculate how much to take from this batch
-            quantity_from_batch = min(remaining_needed, receipt_item.quantity_remaining)
-
-            # Add to total cost
-            batch_cost = quantity_from_batch * receipt_item.cost_price_per_unit
-            total_cost += batch_cost
-
-            # Update remaining quantities
-            receipt_item.quantity_remaining -= quantity_from_batch
-            remaining_needed -= quantity_from_batch
-
-        # Calculate weighted average cost per unit
-        average_cost_per_unit = total_cost / quantity_needed
-        return average_cost_per_unit
-
     @staticmethod
     def get_write_off_by_id(write_off_id: int) -> Optional[ProductWriteOff]:
         """Get write-off by ID with all related data."""
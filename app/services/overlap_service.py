@@ -0,0 +1,82 @@
+"""
+Overlap service module.
+Detects double bookings of a master with one indexed range query per (master, date).
+"""
+
+from datetime import date, time
+from typing import List, Optional
+
+from app.models import Appointment, db
+
+
+def _overlap_criteria(
+    master_id: int, appointment_date: date, start_time: time, end_time: time, exclude_id: Optional[int]
+) -> list:
+    # Запис, що закінчується після півночі, перевіряємо до кінця дня
+    if end_time <= start_time:
+        end_time = time.max
+
+    criteria = [
+        Appointment.master_id == master_id,
+        Appointment.date == appointment_date,
+        Appointment.start_time < end_time,
+        Appointment.end_time > start_time,
+        Appointment.status != "cancelled",
+    ]
+    if exclude_id is not None:
+        criteria.append(Appointment.id != exclude_id)
+    return criteria
+
+
+class OverlapService:
+    """Service for detecting overlapping appointments of a master."""
+
+    @staticmethod
+    def find_overlaps(
+        master_id: int,
+        appointment_date: date,
+        start_time: time,
+        end_time: time,
+        exclude_id: Optional[int] = None,
+    ) -> List[Appointment]:
+        """
+        Returns non-cancelled appointments of the master that intersect [start_time, end_time).
+
+        Two intervals overlap when ``start < other.end AND end > other.start``; the
+        ``start_time < end`` bound keeps the query a range scan on
+        ix_appointment_master_date_start.
+
+        Args:
+            master_id: Master ID
+            appointment_date: Appointment date
+            start_time: Start of the checked interval
+            end_time: End of the checked interval; a value not after start_time
+                means the interval runs past midnight and is treated as ending at 23:59:59
+            exclude_id: Appointment being edited (excluded from the check)
+
+        Returns:
+            Conflicting appointments ordered by start time
+        """
+        criteria = _overlap_criteria(master_id, appointment_date, start_time, end_time, exclude_id)
+        return Appointment.query.filter(*criteria).order_by(Appointment.start_time).all()
+
+    @staticmethod
+    def has_overlap(
+        master_id: int,
+        appointment_date: date,
+        start_time: time,
+        end_time: time,
+        exclude_id: Optional[int] = None,
+    ) -> bool:
+        """Existence check for the same condition as find_overlaps (stops at the first match)."""
+        criteria = _overlap_criteria(master_id, appointment_date, start_time, end_time, exclude_id)
+        return db.session.query(db.session.query(Appointment.id).filter(*criteria).exists()).scalar()
+
+    @staticmethod
+    def describe(conflicts: List[Appointment]) -> str:
+        """Human-readable list of conflicts for flash messages."""
+        return ", ".join(
+            f"{conflict.start_time.strftime('%H:%M')}-{conflict.end_time.strftime('%H:%M')} "
+            f"({conflict.client.name if conflict.client else '—'})"
+            for conflict in conflicts
+        )
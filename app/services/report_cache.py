@@ -0,0 +1,236 @@
+"""
+Report result cache.
+Keeps built report figures keyed by report type, parameters and data version.
+Reports over fully past periods are pinned until a committed change touches one
+of their days (e.g. an admin edits an old appointment) or the cache is cleared
+explicitly; ranges that include today expire after a short TTL.
+"""
+
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Dict, Hashable, Iterable, NamedTuple, Optional, Tuple
+
+from flask import Flask, current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models import CHANGED_REPORT_DAYS, Client, PaymentMethod, Service, User
+
+DEFAULT_CACHE_SIZE = 256
+DEFAULT_TTL_SECONDS = 60
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    start_date: date
+    end_date: date
+    expires_at: Optional[float]  # None - закритий період, запис закріплений
+    size: int
+
+
+def _estimate_size(value: Any) -> int:
+    """Приблизний розмір результату в байтах (розмір серіалізованого значення)."""
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class ReportCache:
+    """
+    In-process LRU cache of report results with per-report hit/miss counters.
+
+    Only the worker that commits a change invalidates its own entries, so
+    multi-worker deployments should disable the cache (``REPORT_CACHE_SIZE=0``)
+    or keep the TTL short.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_CACHE_SIZE,
+        ttl: float = DEFAULT_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if maxsize < 0:
+            raise ValueError("Розмір кешу не може бути від'ємним")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        # Версія даних: зростає з кожною зафіксованою зміною звітних даних
+        self.version = 0
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, report_type: str, counter: str) -> None:
+        counters = self._counters.setdefault(report_type, {"hits": 0, "misses": 0})
+        counters[counter] += 1
+
+    def get_or_build(
+        self,
+        report_type: str,
+        params: Dict[str, Any],
+        start_date: date,
+        end_date: date,
+        builder: Callable[[], Any],
+    ) -> Any:
+        """
+        Cached report result or ``builder()`` stored under
+        ``(report_type, params, data version)``.
+
+        Ranges ending before today are pinned (their key carries no version);
+        other ranges expire after ``ttl`` seconds or with the next data change.
+        """
+        pinned = end_date < date.today()
+        key: Tuple[Any, ...] = (report_type, tuple(sorted(params.items())), None if pinned else self.version)
+        now = self.clock()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.expires_at is None or entry.expires_at > now):
+                self._entries.move_to_end(key)
+                self._count(report_type, "hits")
+                return entry.value
+            if entry is not None:
+                del self._entries[key]
+            self._count(report_type, "misses")
+
+        value = builder()
+        if self.maxsize == 0:
+            return value
+
+        entry = CacheEntry(value, start_date, end_date, None if pinned else now + self.ttl, _estimate_size(value))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate_days(self, days: Iterable[date]) -> int:
+        """
+        Drops results whose range covers any of the days and all unpinned results.
+
+        Returns:
+            Number of dropped entries
+        """
+        days = set(days)
+        with self._lock:
+            self.version += 1
+            stale = [
+                key
+                for key, entry in self._entries.items()
+                if entry.expires_at is not None or any(entry.start_date <= day <= entry.end_date for day in days)
+            ]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = list(self._entries.values())
+            counters = {report_type: dict(values) for report_type, values in self._counters.items()}
+
+        hits = sum(values["hits"] for values in counters.values())
+        misses = sum(values["misses"] for values in counters.values())
+        for values in counters.values():
+            total = values["hits"] + values["misses"]
+            values["hit_rate"] = (values["hits"] / total) if total else 0.0
+        return {
+            "size": len(entries),
+            "maxsize": self.maxsize,
+            "pinned": sum(1 for entry in entries if entry.expires_at is None),
+            "ttl": self.ttl,
+            "memory_bytes": sum(entry.size for entry in entries),
+            "version": self.version,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": (hits / (hits + misses)) if hits + misses else 0.0,
+            "reports": counters,
+        }
+
+
+def init_app(app: Flask) -> ReportCache:
+    """Створює кеш звітів для додатку (``app.extensions["report_cache"]``)."""
+    cache = ReportCache(
+        maxsize=app.config.get("REPORT_CACHE_SIZE", DEFAULT_CACHE_SIZE),
+        ttl=app.config.get("REPORT_CACHE_TTL", DEFAULT_TTL_SECONDS),
+    )
+    app.extensions["report_cache"] = cache
+    return cache
+
+
+def get_report_cache() -> Optional[ReportCache]:
+    """Кеш звітів поточного додатку або None поза контекстом додатку."""
+    if not has_app_context():
+        return None
+    cache: Optional[ReportCache] = current_app.extensions.get("report_cache")
+    return cache
+
+
+def cached_report(
+    report_type: str,
+    params: Dict[str, Any],
+    start_date: Optional[date],
+    end_date: Optional[date],
+    builder: Callable[[], Any],
+) -> Any:
+    """Результат звіту з кешу додатку (або ``builder()``, якщо кешу немає чи діапазон не заданий)."""
+    cache = get_report_cache()
+    if cache is None or start_date is None or end_date is None:
+        return builder()
+    return cache.get_or_build(report_type, params, start_date, end_date, builder)
+
+
+# --- Інвалідація ---
+
+_CLEAR_ALL = "report_cache_clear_all"
+# Імена, ставки та ролі потрапляють у звіти за будь-який період
+_GLOBAL_MODELS = (User, Client, Service, PaymentMethod)
+
+
+@event.listens_for(Session, "after_flush")
+def collect_global_changes(session: Session, flush_context: Any) -> None:
+    """Зміни користувачів, клієнтів, послуг чи способів оплати скидають весь кеш після commit."""
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, _GLOBAL_MODELS):
+            session.info[_CLEAR_ALL] = True
+            return
+
+
+@event.listens_for(Session, "do_orm_execute")
+def collect_global_bulk_write(orm_execute_state: Any) -> None:
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in _GLOBAL_MODELS:
+        orm_execute_state.session.info[_CLEAR_ALL] = True
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_after_commit(session: Session) -> None:
+    """Скидає результати за дні, дані яких змінила зафіксована транзакція (дні збирає daily_rollup)."""
+    days = session.info.pop(CHANGED_REPORT_DAYS, None)
+    clear_all = session.info.pop(_CLEAR_ALL, False)
+    cache = get_report_cache()
+    if cache is None:
+        return
+    if clear_all:
+        cache.clear()
+    elif days:
+        cache.invalidate_days(days)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_pending_changes(session: Session) -> None:
+    session.info.pop(CHANGED_REPORT_DAYS, None)
+    session.info.pop(_CLEAR_ALL, None)
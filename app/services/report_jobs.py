@@ -0,0 +1,277 @@
+"""
+Background report jobs.
+Heavy report ranges are built on a bounded thread pool instead of the request
+worker. Job state and results live in the report_job table, so any process can
+answer status polls and downloads.
+"""
+
+import csv
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Sequence
+
+from flask import Flask, current_app, has_app_context
+from sqlalchemy import func
+
+from app.models import ReportJob, db
+from app.services.report_cache import cached_report
+from app.services.report_service import ReportService
+
+logger = logging.getLogger(__name__)
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+ACTIVE_STATUSES = (JOB_PENDING, JOB_RUNNING)
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_PENDING = 10
+DEFAULT_MIN_DAYS = 92
+DEFAULT_TIMEOUT = 1800
+
+
+class ReportJobQueueFull(Exception):
+    """Raised when too many report jobs are already pending or running."""
+
+
+class ReportJobType(NamedTuple):
+    build: Callable[[date, date], Dict[str, Any]]
+    load: Callable[[Dict[str, Any]], Dict[str, Any]]  # JSON-результат -> значення для шаблону
+    csv_rows: Callable[[Dict[str, Any]], Iterable[Sequence[Any]]]
+
+
+def _build_financial(start_date: date, end_date: date) -> Dict[str, Any]:
+    return cached_report(
+        "financial_report",
+        {"start_date": start_date, "end_date": end_date},
+        start_date,
+        end_date,
+        lambda: ReportService.get_financial_summary(start_date, end_date),
+    )
+
+
+_FINANCIAL_FIELDS = (
+    ("service_revenue", "Дохід від послуг"),
+    ("product_revenue", "Дохід від продажу товарів"),
+    ("total_cogs", "Собівартість проданих товарів"),
+    ("product_gross_profit", "Валовий прибуток від товарів"),
+    ("total_revenue", "Загальний дохід"),
+    ("total_gross_profit", "Загальний валовий прибуток"),
+)
+
+
+def _load_financial(result: Dict[str, Any]) -> Dict[str, Any]:
+    values: Dict[str, Any] = {key: Decimal(result[key]) for key, _ in _FINANCIAL_FIELDS}
+    values["payment_breakdown"] = [(name, Decimal(amount)) for name, amount in result["payment_breakdown"]]
+    return values
+
+
+def _financial_csv_rows(result: Dict[str, Any]) -> Iterable[Sequence[Any]]:
+    yield ("Показник", "Сума")
+    for key, label in _FINANCIAL_FIELDS:
+        yield (label, result[key])
+    yield ()
+    yield ("Спосіб оплати", "Сума")
+    for name, amount in result["payment_breakdown"]:
+        yield (name, amount)
+
+
+JOB_TYPES: Dict[str, ReportJobType] = {
+    "financial_report": ReportJobType(_build_financial, _load_financial, _financial_csv_rows),
+}
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Неможливо серіалізувати {type(value).__name__}")
+
+
+def job_params(job: ReportJob) -> Dict[str, Any]:
+    params: Dict[str, Any] = json.loads(job.params)
+    return params
+
+
+def job_result(job: ReportJob) -> Dict[str, Any]:
+    """Result of a completed job converted back to template values."""
+    return JOB_TYPES[job.report_type].load(json.loads(job.result))
+
+
+def job_csv(job: ReportJob) -> str:
+    """Result of a completed job as CSV text."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(JOB_TYPES[job.report_type].csv_rows(json.loads(job.result)))
+    return buffer.getvalue()
+
+
+def run_job(job_id: int) -> None:
+    """Builds the report of a pending job in the current app context and stores the result."""
+    job = db.session.get(ReportJob, job_id)
+    if job is None or job.status != JOB_PENDING:
+        return
+    job.status = JOB_RUNNING
+    job.started_at = datetime.now(timezone.utc)
+    db.session.commit()
+
+    values: Dict[Any, Any]
+    try:
+        params = job_params(job)
+        result = JOB_TYPES[job.report_type].build(
+            date.fromisoformat(params["start_date"]), date.fromisoformat(params["end_date"])
+        )
+        values = {
+            ReportJob.result: json.dumps(result, default=_json_default, ensure_ascii=False),
+            ReportJob.status: JOB_COMPLETED,
+        }
+    except Exception as e:
+        logger.exception("Report job %s failed", job_id)
+        db.session.rollback()
+        values = {ReportJob.status: JOB_FAILED, ReportJob.error: str(e)}
+    values[ReportJob.finished_at] = datetime.now(timezone.utc)
+
+    # Лише поки завдання виконується: fail_stale_jobs міг уже позначити його невдалим
+    finished = ReportJob.query.filter(ReportJob.id == job_id, ReportJob.status == JOB_RUNNING).update(
+        values, synchronize_session="fetch"
+    )
+    db.session.commit()
+    if not finished:
+        logger.warning("Report job %s finished after it was marked as failed", job_id)
+
+
+class ReportJobRunner:
+    """
+    Runs report jobs on a thread pool of ``max_workers`` threads.
+
+    ``max_workers=0`` runs jobs synchronously in the submitting request (tests, debugging).
+    At most ``max_pending`` jobs may be pending or running at once, so reports cannot
+    occupy every database connection and starve interactive requests. Jobs active for
+    longer than ``timeout`` seconds were lost with a restarted process and are failed.
+    """
+
+    def __init__(
+        self,
+        app: Flask,
+        max_workers: int = DEFAULT_WORKERS,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        timeout: int = DEFAULT_TIMEOUT,
+    ):
+        if max_workers < 0:
+            raise ValueError("Кількість потоків не може бути від'ємною")
+        self.app = app
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if max_workers > 0:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report-job")
+
+    def submit(self, report_type: str, params: Dict[str, Any], user_id: int) -> ReportJob:
+        """
+        Stores a pending job and schedules it.
+
+        Raises:
+            ReportJobQueueFull: if ``max_pending`` jobs are already active
+        """
+        if report_type not in JOB_TYPES:
+            raise ValueError(f"Невідомий тип звіту: {report_type}")
+        self.fail_stale_jobs()
+        active = ReportJob.query.filter(ReportJob.status.in_(ACTIVE_STATUSES)).count()
+        if active >= self.max_pending:
+            raise ReportJobQueueFull("Забагато звітів у черзі, спробуйте пізніше")
+
+        job = ReportJob(
+            report_type=report_type,
+            params=json.dumps(params, default=_json_default),
+            status=JOB_PENDING,
+            user_id=user_id,
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        if self._executor is None:
+            run_job(job.id)
+        else:
+            self._executor.submit(self._run_in_app_context, job.id)
+        return job
+
+    def fail_stale_jobs(self) -> int:
+        """
+        Fails pending or running jobs older than ``timeout``.
+
+        Such jobs were queued in or run by a process that has since stopped; left
+        active, they would count against ``max_pending`` and be polled forever.
+
+        Returns:
+            Number of jobs marked as failed
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.timeout)
+        count: int = ReportJob.query.filter(
+            ReportJob.status.in_(ACTIVE_STATUSES),
+            func.coalesce(ReportJob.started_at, ReportJob.created_at) < cutoff,
+        ).update(
+            {
+                ReportJob.status: JOB_FAILED,
+                ReportJob.error: "Звіт не сформовано вчасно (можливо, сервер перезапускався)",
+                ReportJob.finished_at: datetime.now(timezone.utc),
+            },
+            synchronize_session="fetch",
+        )
+        if count:
+            logger.warning("Marked %s stale report jobs as failed", count)
+            db.session.commit()
+        return count
+
+    def _run_in_app_context(self, job_id: int) -> None:
+        with self.app.app_context():
+            run_job(job_id)
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+
+def init_app(app: Flask) -> ReportJobRunner:
+    """Створює виконавця фонових звітів (``app.extensions["report_jobs"]``)."""
+    runner = ReportJobRunner(
+        app,
+        max_workers=app.config.get("REPORT_JOB_WORKERS", DEFAULT_WORKERS),
+        max_pending=app.config.get("REPORT_JOB_MAX_PENDING", DEFAULT_MAX_PENDING),
+        timeout=app.config.get("REPORT_JOB_TIMEOUT", DEFAULT_TIMEOUT),
+    )
+    app.extensions["report_jobs"] = runner
+    return runner
+
+
+def get_report_job_runner() -> Optional[ReportJobRunner]:
+    if not has_app_context():
+        return None
+    runner: Optional[ReportJobRunner] = current_app.extensions.get("report_jobs")
+    return runner
+
+
+def should_run_in_background(start_date: Optional[date], end_date: Optional[date]) -> bool:
+    """Чи довший діапазон за REPORT_JOB_MIN_DAYS (0 - фонові звіти вимкнено)."""
+    min_days = current_app.config.get("REPORT_JOB_MIN_DAYS", DEFAULT_MIN_DAYS)
+    if not min_days or start_date is None or end_date is None or get_report_job_runner() is None:
+        return False
+    return (end_date - start_date).days + 1 > min_days
+
+
+def serialize_job(job: ReportJob) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "report_type": job.report_type,
+        "status": job.status,
+        "params": job_params(job),
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
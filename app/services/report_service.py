@@ -0,0 +1,499 @@
+"""
+Report service module.
+Builds report figures from the daily_rollup table (one row per day, master and payment method)
+instead of rescanning appointments and sales for the whole range.
+"""
+
+from datetime import date, datetime, time
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.models import Appointment, AppointmentService, DailyRollup, Sale, User, db, get_payment_method_registry
+
+NOT_SPECIFIED = "Не вказано"
+MASTER_PRODUCTS_RATE = 0.09  # Фіксована комісія майстра з продажу товарів
+ADMIN_MASTERS_SHARE_RATE = 0.01  # Частка адміністратора з продажу товарів майстрами
+
+_CENT = Decimal("0.01")
+
+
+def _money(value: Any) -> Decimal:
+    return Decimal(str(value or 0)).quantize(_CENT, rounding=ROUND_HALF_UP)
+
+
+def _in_range(start_date: date, end_date: date) -> Any:
+    return DailyRollup.day.between(start_date, end_date)
+
+
+# Знімки рядків звітів: прості значення замість ORM-об'єктів, щоб результат можна було кешувати між запитами
+class NamedRef(NamedTuple):
+    name: str
+
+
+class MasterRef(NamedTuple):
+    id: int
+    full_name: str
+
+    @classmethod
+    def from_user(cls, user: Optional[User]) -> Optional["MasterRef"]:
+        return cls(user.id, user.full_name) if user else None
+
+
+class ServiceLine(NamedTuple):
+    service: Optional[NamedRef]
+    price: float
+
+
+class AppointmentRow(NamedTuple):
+    id: int
+    date: date
+    start_time: time
+    end_time: time
+    client: Optional[NamedRef]
+    services: List[ServiceLine]
+    services_total: float
+
+    @classmethod
+    def from_appointment(cls, appointment: Appointment) -> "AppointmentRow":
+        return cls(
+            id=appointment.id,
+            date=appointment.date,
+            start_time=appointment.start_time,
+            end_time=appointment.end_time,
+            client=NamedRef(appointment.client.name) if appointment.client else None,
+            services=[
+                ServiceLine(NamedRef(line.service.name) if line.service else None, line.price)
+                for line in appointment.services
+            ],
+            services_total=float(appointment.services_total or 0),
+        )
+
+
+class SaleRow(NamedTuple):
+    id: int
+    sale_date: datetime
+    total_amount: Decimal
+    client: Optional[NamedRef]
+
+    @classmethod
+    def from_sale(cls, sale: Sale) -> "SaleRow":
+        return cls(sale.id, sale.sale_date, sale.total_amount, NamedRef(sale.client.name) if sale.client else None)
+
+
+class MasterSalaryRow(NamedTuple):
+    master: MasterRef
+    commission_rate: float
+    appointment_count: int
+    total_services_cost: float
+    services_commission: float
+    total_products_cost: float
+    products_commission: float
+    total_salary: float
+
+
+class AdminSalaryRow(NamedTuple):
+    admin: MasterRef
+    commission_rate: float
+    appointment_count: int
+    total_services_cost: float
+    services_commission: float
+    total_personal_products_cost: float
+    personal_products_commission: float
+    masters_products_share: float
+    total_salary: float
+
+
+class ReportService:
+    """Service for aggregated report data."""
+
+    @staticmethod
+    def get_totals_by_method(start_date: date, end_date: date) -> Dict[Optional[int], Dict[str, Decimal]]:
+        """
+        Rollup sums grouped by payment_method_id.
+
+        Returns:
+            Dict of payment_method_id -> service_revenue (not rounded), sales_total,
+            product_revenue and cogs
+        """
+        rows = db.session.execute(
+            select(
+                DailyRollup.payment_method_id,
+                func.sum(DailyRollup.service_revenue),
+                func.sum(DailyRollup.sales_total),
+                func.sum(DailyRollup.product_revenue),
+                func.sum(DailyRollup.cogs),
+            )
+            .where(_in_range(start_date, end_date))
+            .group_by(DailyRollup.payment_method_id)
+        ).all()
+        return {
+            payment_method_id: {
+                "service_revenue": Decimal(service_revenue or 0),
+                "sales_total": _money(sales_total),
+                "product_revenue": _money(product_revenue),
+                "cogs": _money(cogs),
+            }
+            for payment_method_id, service_revenue, sales_total, product_revenue, cogs in rows
+        }
+
+    @staticmethod
+    def get_financial_summary(start_date: date, end_date: date) -> Dict[str, Any]:
+        """
+        Figures for the financial report.
+
+        Returns:
+            Dict with service_revenue, product_revenue, total_cogs, product_gross_profit,
+            total_revenue, total_gross_profit and payment_breakdown (list of
+            ``(method name, amount)`` sorted by name; active methods and "Не вказано"
+            are always present)
+        """
+        registry = get_payment_method_registry()
+        active_methods = registry.all(active_only=True)
+
+        payment_method_totals: Dict[str, Decimal] = {method.name: Decimal("0.00") for method in active_methods}
+        payment_method_totals[NOT_SPECIFIED] = Decimal("0.00")
+        service_revenue = product_revenue = total_cogs = Decimal("0.00")
+
+        for payment_method_id, totals in ReportService.get_totals_by_method(start_date, end_date).items():
+            method = registry.get(payment_method_id)
+            name = method.name if method else NOT_SPECIFIED
+            amount = totals["service_revenue"] + totals["sales_total"]
+            payment_method_totals[name] = payment_method_totals.get(name, Decimal("0.00")) + amount
+            service_revenue += totals["service_revenue"]
+            product_revenue += totals["product_revenue"]
+            total_cogs += totals["cogs"]
+
+        # Округлення до копійок лише для підсумків звіту
+        service_revenue = _money(service_revenue)
+        product_gross_profit = product_revenue - total_cogs
+        payment_breakdown: List[Tuple[str, Decimal]] = sorted(
+            ((name, _money(amount)) for name, amount in payment_method_totals.items()), key=lambda item: item[0]
+        )
+
+        return {
+            "service_revenue": service_revenue,
+            "product_revenue": product_revenue,
+            "total_cogs": total_cogs,
+            "product_gross_profit": product_gross_profit,
+            "total_revenue": service_revenue + product_revenue,
+            "total_gross_profit": service_revenue + product_gross_profit,  # Services have no COGS tracked
+            "payment_breakdown": payment_breakdown,
+        }
+
+    @staticmethod
+    def get_sales_total(master_ids: Iterable[int], start_date: date, end_date: date) -> Decimal:
+        """Sale.total_amount sum of sales made by the given masters in the range."""
+        total = db.session.execute(
+            select(func.sum(DailyRollup.sales_total)).where(
+                DailyRollup.master_id.in_(list(master_ids)), _in_range(start_date, end_date)
+            )
+        ).scalar()
+        return _money(total)
+
+    @staticmethod
+    def get_masters_stats(start_date: date, end_date: date) -> List[Tuple[str, int, Decimal]]:
+        """
+        Completed appointments per master in the range.
+
+        Returns:
+            List of ``(full name, appointment count, services total without discount)``
+        """
+        rows = db.session.execute(
+            select(
+                User.full_name,
+                func.sum(DailyRollup.appointment_count),
+                func.sum(DailyRollup.services_total),
+            )
+            .join(User, User.id == DailyRollup.master_id)
+            .where(_in_range(start_date, end_date))
+            .group_by(User.id, User.full_name)
+            .having(func.sum(DailyRollup.appointment_count) > 0)
+            .order_by(User.full_name)
+        ).all()
+        return [(full_name, int(count), _money(total)) for full_name, count, total in rows]
+
+    @staticmethod
+    def get_master_daily_stats(master_id: int, start_date: date, end_date: date) -> List[Tuple[date, int, Decimal]]:
+        """
+        Completed appointments of one master per day in the range.
+
+        Returns:
+            List of ``(day, appointment count, services total without discount)`` ordered by day
+        """
+        rows = db.session.execute(
+            select(
+                DailyRollup.day,
+                func.sum(DailyRollup.appointment_count),
+                func.sum(DailyRollup.services_total),
+            )
+            .where(DailyRollup.master_id == master_id, _in_range(start_date, end_date))
+            .group_by(DailyRollup.day)
+            .having(func.sum(DailyRollup.appointment_count) > 0)
+            .order_by(DailyRollup.day)
+        ).all()
+        return [(day, int(count), _money(total)) for day, count, total in rows]
+
+    @staticmethod
+    def _completed_appointments(master_id: int, start_date: date, end_date: date) -> List[AppointmentRow]:
+        appointments = (
+            Appointment.query.options(
+                joinedload(Appointment.client),
+                selectinload(Appointment.services).joinedload(AppointmentService.service),
+            )
+            .filter(
+                Appointment.date >= start_date,
+                Appointment.date <= end_date,
+                Appointment.master_id == master_id,
+                Appointment.status == "completed",
+            )
+            .order_by(Appointment.start_time)
+            .all()
+        )
+        return [AppointmentRow.from_appointment(appointment) for appointment in appointments]
+
+    @staticmethod
+    def _services_commission(
+        appointments: List[AppointmentRow], commission_rate: float
+    ) -> Tuple[List[Dict[str, Any]], float, float]:
+        appointments_with_totals = [
+            {
+                "appointment": appointment,
+                "services_total": appointment.services_total,
+                "commission": appointment.services_total * (commission_rate / 100) if commission_rate > 0 else 0.0,
+            }
+            for appointment in appointments
+        ]
+        total_services_cost = sum(appointment_data["services_total"] for appointment_data in appointments_with_totals)
+        services_commission = 0.0
+        if total_services_cost > 0 and commission_rate > 0:
+            services_commission = total_services_cost * (commission_rate / 100)
+        return appointments_with_totals, total_services_cost, services_commission
+
+    @staticmethod
+    def get_master_salary(master_id: int, start_date: date, end_date: date) -> Dict[str, Any]:
+        """
+        Salary of a master for a date range: commission on services (master's rate,
+        discounts ignored) plus a fixed 9% of the master's product sales.
+
+        Returns:
+            Dict with the salary report template values (plain snapshots, safe to cache)
+        """
+        master = db.session.get(User, master_id)
+        commission_rate = 0.0
+        if master and master.configurable_commission_rate:
+            commission_rate = float(master.configurable_commission_rate)
+
+        appointments = ReportService._completed_appointments(master_id, start_date, end_date)
+        appointments_with_totals, total_services_cost, services_commission = ReportService._services_commission(
+            appointments, commission_rate
+        )
+
+        total_products_cost = float(ReportService.get_sales_total([master_id], start_date, end_date))
+        products_commission = total_products_cost * MASTER_PRODUCTS_RATE if total_products_cost > 0 else 0.0
+
+        return {
+            "selected_master": MasterRef.from_user(master),
+            "appointments": appointments,
+            "appointments_with_totals": appointments_with_totals,
+            "total_services_cost": total_services_cost,
+            "services_commission": services_commission,
+            "products_commission": products_commission,
+            "total_products_cost": total_products_cost,
+            "total_salary": services_commission + products_commission,
+            "commission_rate": commission_rate,
+        }
+
+    @staticmethod
+    def _rollup_by_user(condition: Any, start_date: date, end_date: date) -> List[Tuple[Any, ...]]:
+        """
+        Rollup sums per user in one GROUP BY query. ``condition`` filters the users
+        outer-joined with the range's rollup rows (users without rows get NULL sums).
+
+        Returns:
+            List of ``(id, full name, commission rate, appointment count, services total,
+            sales total)`` ordered by name
+        """
+        return db.session.execute(
+            select(
+                User.id,
+                User.full_name,
+                User.configurable_commission_rate,
+                func.sum(DailyRollup.appointment_count),
+                func.sum(DailyRollup.services_total),
+                func.sum(DailyRollup.sales_total),
+            )
+            .outerjoin(DailyRollup, and_(DailyRollup.master_id == User.id, _in_range(start_date, end_date)))
+            .where(condition)
+            .group_by(User.id, User.full_name, User.configurable_commission_rate)
+            .order_by(User.full_name)
+        ).all()
+
+    @staticmethod
+    def get_masters_sales_total(start_date: date, end_date: date) -> Decimal:
+        """Sales total of masters (active non-admin users) in the range, base of the admins' 1% share."""
+        masters = select(User.id).where(User.is_active_master.is_(True), User.is_admin.is_(False))
+        total = db.session.execute(
+            select(func.sum(DailyRollup.sales_total)).where(
+                DailyRollup.master_id.in_(masters), _in_range(start_date, end_date)
+            )
+        ).scalar()
+        return _money(total)
+
+    @staticmethod
+    def get_all_masters_salary(start_date: date, end_date: date) -> Dict[str, Any]:
+        """
+        Salary of every master for a date range in one grouped rollup query.
+
+        Same rules as ``get_master_salary``; lists active masters and anyone else
+        with completed appointments or sales in the range.
+
+        Returns:
+            Dict with ``masters`` (list of MasterSalaryRow ordered by name) and the
+            summed total_services_cost, services_commission, total_products_cost,
+            products_commission and total_salary
+        """
+        rows = ReportService._rollup_by_user(
+            or_(User.is_active_master.is_(True), DailyRollup.id.isnot(None)), start_date, end_date
+        )
+
+        masters = []
+        for master_id, full_name, rate, appointment_count, services_total, sales_total in rows:
+            commission_rate = float(rate) if rate else 0.0
+            total_services_cost = float(_money(services_total))
+            services_commission = 0.0
+            if total_services_cost > 0 and commission_rate > 0:
+                services_commission = total_services_cost * (commission_rate / 100)
+            total_products_cost = float(_money(sales_total))
+            products_commission = total_products_cost * MASTER_PRODUCTS_RATE if total_products_cost > 0 else 0.0
+            masters.append(
+                MasterSalaryRow(
+                    master=MasterRef(master_id, full_name),
+                    commission_rate=commission_rate,
+                    appointment_count=int(appointment_count or 0),
+                    total_services_cost=total_services_cost,
+                    services_commission=services_commission,
+                    total_products_cost=total_products_cost,
+                    products_commission=products_commission,
+                    total_salary=services_commission + products_commission,
+                )
+            )
+
+        return {
+            "masters": masters,
+            "total_services_cost": sum(row.total_services_cost for row in masters),
+            "services_commission": sum(row.services_commission for row in masters),
+            "total_products_cost": sum(row.total_products_cost for row in masters),
+            "products_commission": sum(row.products_commission for row in masters),
+            "total_salary": sum(row.total_salary for row in masters),
+        }
+
+    @staticmethod
+    def get_admin_salary(admin_id: int, start_date: date, end_date: date) -> Dict[str, Any]:
+        """
+        Salary of an administrator for a date range: commission on personal services,
+        personal product sales at rate + 1% and a 1% share of masters' product sales.
+
+        Returns:
+            Dict with the admin salary report template values (plain snapshots, safe to cache)
+        """
+        admin = db.session.get(User, admin_id)
+        commission_rate = 0.0
+        if admin and admin.configurable_commission_rate:
+            commission_rate = float(admin.configurable_commission_rate)
+
+        # 1. Commission from personal services
+        appointments = ReportService._completed_appointments(admin_id, start_date, end_date)
+        appointments_with_totals, total_services_cost, services_commission = ReportService._services_commission(
+            appointments, commission_rate
+        )
+
+        # 2. Personal product sales (rate + 1%)
+        admin_sales = [
+            SaleRow.from_sale(sale)
+            for sale in Sale.query.options(joinedload(Sale.client))
+            .filter(Sale.user_id == admin_id, Sale.sale_day >= start_date, Sale.sale_day <= end_date)
+            .all()
+        ]
+        total_personal_products_cost = float(ReportService.get_sales_total([admin_id], start_date, end_date))
+        personal_products_commission = 0.0
+        if total_personal_products_cost > 0 and commission_rate > 0:
+            personal_products_commission = total_personal_products_cost * ((commission_rate + 1) / 100)
+
+        # 3. 1% share from product sales of masters (active non-admin users)
+        total_masters_products_cost = float(ReportService.get_masters_sales_total(start_date, end_date))
+        masters_products_share = 0.0
+        if total_masters_products_cost > 0:
+            masters_products_share = total_masters_products_cost * ADMIN_MASTERS_SHARE_RATE
+
+        return {
+            "selected_admin": MasterRef.from_user(admin),
+            "appointments": appointments,
+            "appointments_with_totals": appointments_with_totals,
+            "admin_sales": admin_sales,
+            "total_services_cost": total_services_cost,
+            "services_commission": services_commission,
+            "personal_products_commission": personal_products_commission,
+            "masters_products_share": masters_products_share,
+            "total_personal_products_cost": total_personal_products_cost,
+            "total_masters_products_cost": total_masters_products_cost,
+            "total_salary": services_commission + personal_products_commission + masters_products_share,
+            "commission_rate": commission_rate,
+        }
+
+    @staticmethod
+    def get_all_admins_salary(start_date: date, end_date: date) -> Dict[str, Any]:
+        """
+        Salary of every administrator for a date range with the rules of
+        ``get_admin_salary``, from one grouped rollup query plus the masters' sales total.
+
+        Returns:
+            Dict with ``admins`` (list of AdminSalaryRow ordered by name),
+            total_masters_products_cost and the summed total_services_cost,
+            services_commission, total_personal_products_cost,
+            personal_products_commission, masters_products_share and total_salary
+        """
+        rows = ReportService._rollup_by_user(User.is_admin.is_(True), start_date, end_date)
+        total_masters_products_cost = float(ReportService.get_masters_sales_total(start_date, end_date))
+        masters_products_share = 0.0
+        if total_masters_products_cost > 0:
+            masters_products_share = total_masters_products_cost * ADMIN_MASTERS_SHARE_RATE
+
+        admins = []
+        for admin_id, full_name, rate, appointment_count, services_total, sales_total in rows:
+            commission_rate = float(rate) if rate else 0.0
+            total_services_cost = float(_money(services_total))
+            total_personal_products_cost = float(_money(sales_total))
+            services_commission = 0.0
+            personal_products_commission = 0.0
+            if commission_rate > 0:
+                if total_services_cost > 0:
+                    services_commission = total_services_cost * (commission_rate / 100)
+                if total_personal_products_cost > 0:
+                    personal_products_commission = total_personal_products_cost * ((commission_rate + 1) / 100)
+            admins.append(
+                AdminSalaryRow(
+                    admin=MasterRef(admin_id, full_name),
+                    commission_rate=commission_rate,
+                    appointment_count=int(appointment_count or 0),
+                    total_services_cost=total_services_cost,
+                    services_commission=services_commission,
+                    total_personal_products_cost=total_personal_products_cost,
+                    personal_products_commission=personal_products_commission,
+                    masters_products_share=masters_products_share,
+                    total_salary=services_commission + personal_products_commission + masters_products_share,
+                )
+            )
+
+        return {
+            "admins": admins,
+            "total_masters_products_cost": total_masters_products_cost,
+            "total_services_cost": sum(row.total_services_cost for row in admins),
+            "services_commission": sum(row.services_commission for row in admins),
+            "total_personal_products_cost": sum(row.total_personal_products_cost for row in admins),
+            "personal_products_commission": sum(row.personal_products_commission for row in admins),
+            "masters_products_share": sum(row.masters_products_share for row in admins),
+            "total_salary": sum(row.total_salary for row in admins),
+        }
@@ -7,26 +7,12 @@ from datetime import datetime, timezone
 from decimal import Decimal
 from typing import List, Optional, Tuple
 
-from app.models import (Appointment, Client, GoodsReceiptItem, PaymentMethod,
-                        Product, Sale, SaleItem, StockLevel, User, db)
-
-
-class InsufficientStockError(Exception):
-    """Raised when there's not enough stock to fulfill a sale."""
-
-    def __init__(self, product_name: str, requested_qty: int, available_qty: int):
-        self.product_name = product_name
-        self.requested_qty = requested_qty
-        self.available_qty = available_qty
-        super().__init__(
-            f"Недостатньо товару '{product_name}': запрошено {requested_qty}, " f"доступно {available_qty}"
-        )
-
-
-class ProductNotFoundError(Exception):
-    """Raised when a product is not found."""
-
-    pass
+from app.models import (Appointment, Client, PaymentMethod, Sale, SaleItem,
+                        User, db)
+from app.services.fifo import (FifoDepletion, InsufficientStockError,
+                               ProductNotFoundError, StockConflictError,
+                               begin_stock_transaction,
+                               retry_stock_transaction)
 
 
 class SaleItemData:
@@ -43,6 +29,7 @@ class SalesService:
     """Service for handling sales operations with FIFO inventory management."""
 
     @staticmethod
+    @retry_stock_transaction
     def create_sale(
         user_id: int,
         created_by_user_id: int,
@@ -72,9 +59,13 @@ class SalesService:
         Raises:
             InsufficientStockError: When there's not enough stock
             ProductNotFoundError: When a product doesn't exist
+            StockConflictError: When concurrent documents kept consuming the same stock
             IntegrityError: When database constraints are violated
         """
         try:
+            # На SQLite одразу беремо блокування запису, щоб залишки не змінилися до коміту
+            begin_stock_transaction()
+
             # Validate input
             if not sale_items:
                 raise ValueError("Список товарів не може бути порожнім")
@@ -120,10 +111,12 @@ class SalesService:
 
             total_amount = Decimal("0.00")
 
-            # Process each sale item with FIFO logic
+            # Process each sale item with FIFO logic (партії всіх товарів завантажуються одним запитом)
+            fifo = FifoDepletion(item_data.product_id for item_data in sale_items)
             for item_data in sale_items:
-                _, item_total = SalesService._create_sale_item_with_fifo(sale, item_data)
+                _, item_total = SalesService._create_sale_item_with_fifo(sale, item_data, fifo)
                 total_amount += item_total
+            fifo.write_back()
 
             # Update sale total
             sale.total_amount = total_amount
@@ -136,13 +129,16 @@ class SalesService:
             raise e
 
     @staticmethod
-    def _create_sale_item_with_fifo(sale: Sale, item_data: SaleItemData) -> Tuple[SaleItem, Decimal]:
+    def _create_sale_item_with_fifo(
+        sale: Sale, item_data: SaleItemData, fifo: FifoDepletion
+    ) -> Tuple[SaleItem, Decimal]:
         """
         Creates a sale item and depletes inventory using FIFO logic.
 
         Args:
             sale: Sale object
             item_data: SaleItemData object
+            fifo: FifoDepletion loaded for all products of the sale
 
         Returns:
             Tuple of (SaleItem, total_price)
@@ -151,23 +147,14 @@ class SalesService:
             InsufficientStockError: When there's not enough stock
             ProductNotFoundError: When product doesn't exist
         """
-        # Get product
-        product = Product.query.get(item_data.product_id)
-        if not product:
-            raise ProductNotFoundError(f"Товар з ID {item_data.product_id} не знайдений")
-
-        # Check current stock
-        stock_level = StockLevel.query.filter_by(product_id=product.id).first()
-        if not stock_level or stock_level.quantity < item_data.quantity:
-            available_qty = stock_level.quantity if stock_level else 0
-            raise InsufficientStockError(product.name, item_data.quantity, available_qty)
+        product = fifo.product(item_data.product_id)
 
         # Get sale price
         if not product.current_sale_price:
             raise ValueError(f"Товар '{product.name}' не має встановленої ціни продажу")
 
-        # Calculate FIFO cost price
-        cost_price = SalesService._calculate_fifo_cost_and_deplete_inventory(product, item_data.quantity)
+        # Check stock, calculate FIFO cost price and update stock level
+        cost_price = fifo.take(product.id, item_data.quantity)
 
         # Create sale item
         sale_item = SaleItem()
@@ -179,67 +166,9 @@ class SalesService:
 
         db.session.add(sale_item)
 
-        # Update stock level
-        stock_level.quantity -= item_data.quantity
-        stock_level.last_updated = datetime.now(timezone.utc)
-
         total_price = sale_item.price_per_unit * sale_item.quantity
         return sale_item, total_price
 
-    @staticmethod
-    def _calculate_fifo_cost_and_deplete_inventory(product: Product, quantity_needed: int) -> Decimal:
-        """
-        Calculates weighted average cost price using FIFO and depletes inventory batches.
-
-        Args:
-            product: Product object
-            quantity_needed: Quantity to sell
-
-        Returns:
-            Weighted average cost price per unit
-
-        Raises:
-            InsufficientStockError: When there's not enough stock in receipt items
-        """
-        # Get all receipt items for this product, ordered by receipt date (FIFO)
-        receipt_items = (
-            GoodsReceiptItem.query.filter_by(product_id=product.id)
-            .filter(GoodsReceiptItem.quantity_remaining > 0)
-            .order_by(GoodsReceiptItem.receipt_date)
-            .all()
-        )
-
-        if not receipt_items:
-            raise InsufficientStockError(product.name, quantity_needed, 0)
-
-        # Check if we have enough total quantity
-        total_available = sum(item.quantity_remaining for item in receipt_items)
-        if total_available < quantity_needed:
-            raise InsufficientStockError(product.name, quantity_needed, total_available)
-
-        # Calculate weighted average cost using FIFO
-        remaining_needed = quantity_needed
-        total_cost = Decimal("0.00")
-
-        for receipt_item in receipt_items:
-            if remaining_needed <= 0:
-                break
-
-            # Calculate how much to take from this batch
-            quantity_from_batch = min(remaining_needed, receipt_item.quantity_remaining)
-
-            # Add to total cost
-            batch_cost = quantity_from_batch * receipt_item.cost_price_per_unit
-            total_cost += batch_cost
-
-            # Update remaining quantities
-            receipt_item.quantity_remaining -= quantity_from_batch
-            remaining_needed -= quantity_from_batch
-
-        # Calculate weighted average cost per unit
-        average_cost_per_unit = total_cost / quantity_needed
-        return average_cost_per_unit
-
     @staticmethod
     def get_sale_by_id(sale_id: int) -> Optional[Sale]:
         """Get sale by ID with all related data."""
@@ -0,0 +1,297 @@
+"""
+Schedule column cache.
+Keeps built per-(date, master) schedule columns between requests and drops them
+when appointments, their services or linked sales change. The same flush hook
+records per-date change versions in ``schedule_change`` for the schedule API.
+"""
+
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from flask import Flask, current_app, has_app_context
+from sqlalchemy import delete, event, insert, inspect, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import ObjectDeletedError
+from werkzeug.utils import import_string
+
+from app.models import Appointment, AppointmentService, Client, Sale, ScheduleChange, Service
+
+CacheKey = Tuple[date, int]
+
+DEFAULT_CACHE_SIZE = 512
+
+
+class CacheBackend(ABC):
+    """
+    Interface for schedule cache storage.
+
+    Multi-worker deployments plug in a shared store (Redis, memcached, ...)
+    by subclassing this and pointing ``SCHEDULE_CACHE_BACKEND`` at a factory
+    ``callable(app) -> CacheBackend``. Keys are ``(date, master_id)`` tuples.
+    """
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[Any]: ...
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any) -> None: ...
+
+    @abstractmethod
+    def delete(self, key: Hashable) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+    def __len__(self) -> int:
+        return 0
+
+
+class NullCacheBackend(CacheBackend):
+    """Backend that stores nothing (cache disabled)."""
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        return None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        pass
+
+    def delete(self, key: Hashable) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+class LRUCacheBackend(CacheBackend):
+    """Size-bounded in-process LRU backend for single-process deployments."""
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        if maxsize <= 0:
+            raise ValueError("Розмір кешу повинен бути більше 0")
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ScheduleCache:
+    """Per-(date, master) cache of schedule columns with hit/miss counters."""
+
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        self.backend = backend if backend is not None else LRUCacheBackend()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, day: date, master_id: int) -> Optional[Any]:
+        value = self.backend.get((day, master_id))
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, day: date, master_id: int, value: Any) -> None:
+        self.backend.set((day, master_id), value)
+
+    def invalidate(self, keys: Iterable[CacheKey]) -> None:
+        for key in keys:
+            self.backend.delete(key)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "size": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+
+def _create_backend(app: Flask) -> CacheBackend:
+    backend = app.config.get("SCHEDULE_CACHE_BACKEND", "lru")
+    if isinstance(backend, CacheBackend):
+        return backend
+    if backend == "lru":
+        return LRUCacheBackend(app.config.get("SCHEDULE_CACHE_SIZE", DEFAULT_CACHE_SIZE))
+    if backend in (None, "", "null", "none"):
+        return NullCacheBackend()
+    factory: Callable[[Flask], CacheBackend] = import_string(backend) if isinstance(backend, str) else backend
+    return factory(app)
+
+
+def init_app(app: Flask) -> ScheduleCache:
+    """Створює кеш розкладу для додатку (``app.extensions["schedule_cache"]``)."""
+    cache = ScheduleCache(_create_backend(app))
+    app.extensions["schedule_cache"] = cache
+    return cache
+
+
+def get_schedule_cache() -> Optional[ScheduleCache]:
+    """Кеш розкладу поточного додатку або None поза контекстом додатку."""
+    if not has_app_context():
+        return None
+    cache: Optional[ScheduleCache] = current_app.extensions.get("schedule_cache")
+    return cache
+
+
+# --- Інвалідація ---
+
+_FLUSH_KEYS = "schedule_cache_keys"
+_CLEAR_ALL = "schedule_cache_clear_all"
+
+
+def _history_values(obj: Any, attr: str) -> Set[Any]:
+    """Поточне та попередні значення атрибута до flush."""
+    history = inspect(obj).attrs[attr].load_history()
+    return {value for value in (*history.unchanged, *history.added, *history.deleted) if value is not None}
+
+
+def _collect_changes(session: Session) -> Tuple[Set[Tuple[date, int, int]], bool]:
+    """
+    Зміни розкладу в поточному flush.
+
+    Returns:
+        Кортеж (множина ``(date, master_id, appointment_id)``, чи треба скинути весь кеш)
+    """
+    changes: Set[Tuple[date, int, int]] = set()
+    appointment_ids: Set[int] = set()
+    client_ids: Set[int] = set()
+    service_ids: Set[int] = set()
+    clear_all = False
+
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        try:
+            if isinstance(obj, Appointment):
+                for day in _history_values(obj, "date"):
+                    for master_id in _history_values(obj, "master_id"):
+                        changes.add((day, master_id, obj.id))
+            elif isinstance(obj, (AppointmentService, Sale)):
+                appointment_ids |= _history_values(obj, "appointment_id")
+            elif isinstance(obj, Client) and obj not in session.new:
+                # Ім'я та телефон клієнта є в кожній картці його записів
+                client_ids.add(obj.id)
+            elif isinstance(obj, Service) and obj not in session.new:
+                # Назва та ціна послуги є в картках усіх записів з нею
+                service_ids.add(obj.id)
+        except ObjectDeletedError:
+            # Атрибути видаленого об'єкта вже не завантажити - скидаємо все
+            clear_all = True
+
+    if appointment_ids or client_ids or service_ids:
+        with_services = select(AppointmentService.appointment_id).where(AppointmentService.service_id.in_(service_ids))
+        rows = session.execute(
+            select(Appointment.date, Appointment.master_id, Appointment.id).where(
+                Appointment.id.in_(appointment_ids)
+                | Appointment.client_id.in_(client_ids)
+                | Appointment.id.in_(with_services)
+            )
+        ).all()
+        changes.update((row.date, row.master_id, row.id) for row in rows)
+
+    return changes, clear_all
+
+
+def _record_versions(session: Session, changes: Set[Tuple[date, int, int]]) -> None:
+    """Записує нові версії змінених записів у ``schedule_change`` (в тій самій транзакції)."""
+    pairs = {(day, appointment_id) for day, _, appointment_id in changes if appointment_id is not None}
+    if not pairs:
+        return
+
+    table = ScheduleChange.__table__
+    now = datetime.now(timezone.utc)
+    for day in {day for day, _ in pairs}:
+        ids = [appointment_id for pair_day, appointment_id in pairs if pair_day == day]
+        session.execute(delete(table).where(table.c.date == day, table.c.appointment_id.in_(ids)))
+    session.execute(
+        insert(table),
+        [{"date": day, "appointment_id": appointment_id, "changed_at": now} for day, appointment_id in sorted(pairs)],
+    )
+
+
+def _apply(cache: ScheduleCache, keys: Set[CacheKey], clear_all: bool) -> None:
+    if clear_all:
+        cache.clear()
+    elif keys:
+        cache.invalidate(keys)
+
+
+@event.listens_for(Session, "after_flush")
+def invalidate_after_flush(session: Session, flush_context: Any) -> None:
+    """Скидає колонки розкладу, яких торкнулись змінені записи, та підвищує версію їх дат."""
+    changes, clear_all = _collect_changes(session)
+    if not changes and not clear_all:
+        return
+    _record_versions(session, changes)
+
+    cache = get_schedule_cache()
+    if cache is None:
+        return
+
+    keys = {(day, master_id) for day, master_id, _ in changes}
+    _apply(cache, keys, clear_all)
+
+    # Повторюємо після commit: інший запит міг перебудувати колонку зі старих даних до фіксації транзакції
+    session.info.setdefault(_FLUSH_KEYS, set()).update(keys)
+    if clear_all:
+        session.info[_CLEAR_ALL] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def invalidate_on_bulk_write(orm_execute_state: Any) -> None:
+    """Масові ``query.update()``/``query.delete()`` обходять flush - скидаємо весь кеш."""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in (Appointment, AppointmentService, Sale, Client, Service):
+        cache = get_schedule_cache()
+        if cache is not None:
+            cache.clear()
+        orm_execute_state.session.info[_CLEAR_ALL] = True
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_after_commit(session: Session) -> None:
+    keys = session.info.pop(_FLUSH_KEYS, set())
+    clear_all = session.info.pop(_CLEAR_ALL, False)
+    cache = get_schedule_cache()
+    if cache is not None:
+        _apply(cache, keys, clear_all)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_pending_keys(session: Session) -> None:
+    session.info.pop(_FLUSH_KEYS, None)
+    session.info.pop(_CLEAR_ALL, None)
@@ -0,0 +1,336 @@
+"""
+Schedule grid builder.
+Maps appointment start/end times onto 15-minute slot indices arithmetically and
+fills a preallocated per-master slot array for the schedule page.
+"""
+
+from datetime import time
+from decimal import Decimal
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Set
+
+SLOT_MINUTES = 15
+
+
+def time_to_seconds(value: time) -> int:
+    """Повертає кількість секунд від початку доби для об'єкта time."""
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def _ceil_div(numerator: int, denominator: int) -> int:
+    return -(-numerator // denominator)
+
+
+class ScheduleGrid:
+    """
+    Regular grid of time slots for one working day.
+
+    Slot i starts at ``slots[0] + i * interval``. Appointment intervals are
+    converted to slot index ranges with integer arithmetic instead of comparing
+    against every slot.
+    """
+
+    def __init__(
+        self,
+        slots: Sequence[time],
+        time_intervals: Optional[List[Dict[str, Any]]] = None,
+        interval_minutes: int = SLOT_MINUTES,
+    ) -> None:
+        if not slots:
+            raise ValueError("Сітка розкладу не може бути порожньою")
+
+        self.slots = list(slots)
+        self.step = interval_minutes * 60
+        self.origin = time_to_seconds(self.slots[0])
+        for index, slot in enumerate(self.slots):
+            if time_to_seconds(slot) != self.origin + index * self.step:
+                raise ValueError(f"Слот {slot} не лежить на {interval_minutes}-хвилинній сітці")
+
+        self.slot_labels = [slot.strftime("%H:%M") for slot in self.slots]
+        self.time_intervals = time_intervals if time_intervals is not None else []
+
+        # Для кожного слота - позиції 30-хвилинних інтервалів, до яких він належить як підслот
+        self._slot_intervals: List[List[int]] = [[] for _ in self.slots]
+        for position, interval in enumerate(self.time_intervals):
+            for sub_slot in interval["sub_slots"]:
+                index = self.index_of(sub_slot)
+                if index is not None:
+                    self._slot_intervals[index].append(position)
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def index_of(self, value: time) -> Optional[int]:
+        """Індекс слота, що починається рівно о ``value``, або None."""
+        offset = time_to_seconds(value) - self.origin
+        if offset < 0 or offset % self.step:
+            return None
+        index = offset // self.step
+        return index if index < len(self.slots) else None
+
+    def slot_range(self, start: time, end: Optional[time]) -> range:
+        """Індекси слотів ``s``, для яких виконується ``start <= s < end``."""
+        if end is None:
+            return range(0)
+        first = max(0, _ceil_div(time_to_seconds(start) - self.origin, self.step))
+        stop = min(len(self.slots), _ceil_div(time_to_seconds(end) - self.origin, self.step))
+        return range(first, max(first, stop))
+
+    def new_column(self) -> List[List[Dict[str, Any]]]:
+        """Порожня колонка майстра: по списку записів на кожен слот."""
+        return [[] for _ in self.slots]
+
+    def column_to_dict(self, column: List[List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Перетворює колонку на словник ``{"HH:MM": [...]}``, який очікує шаблон."""
+        return dict(zip(self.slot_labels, column))
+
+    def place(
+        self, column: List[List[Dict[str, Any]]], start: time, end: Optional[time], details: Dict[str, Any]
+    ) -> range:
+        """
+        Додає запис у колонку: повна картка у стартовому слоті та
+        продовження в кожному наступному зайнятому слоті.
+
+        Returns:
+            Діапазон індексів зайнятих слотів
+        """
+        covered = self.slot_range(start, end)
+        start_index = self.index_of(start)
+        for index in covered:
+            if index == start_index:
+                entry = details.copy()
+                entry["display_type"] = "full"
+            else:
+                entry = {"id": details["id"], "display_type": "continuation", "css_class": details["css_class"]}
+            column[index].append(entry)
+        return covered
+
+    def intervals_for(self, covered: range) -> Set[int]:
+        """Позиції 30-хвилинних інтервалів, що містять хоча б один із зайнятих слотів."""
+        positions: Set[int] = set()
+        for index in covered:
+            positions.update(self._slot_intervals[index])
+        return positions
+
+    def expand_intervals(self, positions: Iterable[int]) -> None:
+        for position in positions:
+            self.time_intervals[position]["expanded"] = True
+
+
+def needs_expansion(start: time, end: Optional[time]) -> bool:
+    """Чи потрібно розгортати 15-хвилинні підслоти для запису."""
+    return start.minute in (15, 45) or bool(end and end.minute in (15, 45))
+
+
+def describe_appointment(appointment: Any, multi_booking: bool, can_edit: bool) -> Dict[str, Any]:
+    """
+    Формує базові деталі запису для клітинки розкладу
+    (фінансова інформація, CSS клас, назви послуг тощо).
+    """
+    expected_price = max(Decimal("0.00"), appointment.get_discounted_price())
+    amount_paid_val = appointment.amount_paid if appointment.amount_paid is not None else Decimal("0.00")
+    finance_info = ""
+    css_class = ""
+
+    if appointment.status == "completed":
+        if appointment.payment_status == "paid":
+            css_class = "status-completed-paid"
+            finance_info = f"Сплачено: {amount_paid_val:.2f} грн"
+        elif appointment.payment_status in ["unpaid", "partially_paid"]:
+            css_class = "status-completed-debt"
+            debt_val = expected_price - amount_paid_val
+            finance_info = f"Сплачено: {amount_paid_val:.2f} грн, Борг: {debt_val:.2f} грн"
+    else:
+        # Усі незавершені статуси (scheduled тощо)
+        if appointment.payment_status == "paid":
+            css_class = "status-scheduled-paid"
+            finance_info = f"Передоплата: {amount_paid_val:.2f} грн"
+        elif appointment.payment_status == "partially_paid" and amount_paid_val > Decimal("0.00"):
+            css_class = "status-scheduled-prepaid"
+            finance_info = f"Передоплата: {amount_paid_val:.2f} грн"
+        else:  # unpaid
+            css_class = "status-scheduled"
+            finance_info = f"Вартість: {expected_price:.2f} грн"
+
+    service_names = [link.service.name for link in appointment.services if link.service is not None]
+
+    return {
+        "id": appointment.id,
+        "client_name": appointment.client.name if appointment.client else "N/A",
+        "phone": appointment.client.phone if appointment.client else "N/A",
+        "services": service_names,
+        "css_class": css_class,
+        "multi_booking": multi_booking,
+        "finance_info": finance_info,
+        "completion_info": "(Завершено)" if appointment.status == "completed" else "",
+        "can_edit": can_edit,
+        "status": appointment.status,
+        "payment_status": appointment.payment_status,
+        "is_completed": appointment.status == "completed",
+    }
+
+
+class ScheduleColumn(NamedTuple):
+    """
+    Заповнена колонка одного майстра, що не залежить від користувача.
+
+    ``can_edit`` та ``multi_booking`` у повних картках підставляються під час
+    рендерингу (``render_column``), тому колонку можна кешувати та ділити між
+    запитами різних користувачів.
+    """
+
+    master_id: int
+    slots: List[List[Dict[str, Any]]]
+    client_ids: Dict[int, Optional[int]]  # appointment_id -> client_id
+    expanded: FrozenSet[int]  # позиції 30-хвилинних інтервалів, які треба розгорнути
+    details: Dict[int, Dict[str, Any]]  # appointment_id -> деталі запису (в порядку початку)
+
+
+def build_master_columns(
+    grid: ScheduleGrid,
+    master_ids: Iterable[int],
+    appointments: Iterable[Any],
+) -> Dict[int, ScheduleColumn]:
+    """
+    Розкладає записи по колонках майстрів ``master_ids``.
+
+    Записи інших майстрів пропускаються.
+    """
+    slots: Dict[int, List[List[Dict[str, Any]]]] = {master_id: grid.new_column() for master_id in master_ids}
+    client_ids: Dict[int, Dict[int, Optional[int]]] = {master_id: {} for master_id in slots}
+    details_by_master: Dict[int, Dict[int, Dict[str, Any]]] = {master_id: {} for master_id in slots}
+    expanded: Dict[int, Set[int]] = {master_id: set() for master_id in slots}
+
+    for appointment in appointments:
+        column = slots.get(appointment.master_id)
+        if column is None:
+            continue
+
+        details = describe_appointment(appointment, False, False)
+        covered = grid.place(column, appointment.start_time, appointment.end_time, details)
+        client_ids[appointment.master_id][appointment.id] = appointment.client_id
+        details_by_master[appointment.master_id][appointment.id] = details
+
+        if needs_expansion(appointment.start_time, appointment.end_time):
+            expanded[appointment.master_id] |= grid.intervals_for(covered)
+
+    return {
+        master_id: ScheduleColumn(
+            master_id, column, client_ids[master_id], frozenset(expanded[master_id]), details_by_master[master_id]
+        )
+        for master_id, column in slots.items()
+    }
+
+
+def render_column(
+    grid: ScheduleGrid, column: ScheduleColumn, viewer: Any, multi_booking_client_ids: Set[int]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Перетворює колонку на словник ``{"HH:MM": [...]}`` для шаблону,
+    підставляючи ``can_edit`` для ``viewer`` та ознаку ``multi_booking``.
+    """
+    can_edit = bool(viewer.is_admin or column.master_id == viewer.id)
+    rendered: List[List[Dict[str, Any]]] = []
+    for entries in column.slots:
+        slot_entries = []
+        for entry in entries:
+            if entry["display_type"] == "full":
+                entry = dict(entry)
+                entry["can_edit"] = can_edit
+                entry["multi_booking"] = column.client_ids.get(entry["id"]) in multi_booking_client_ids
+            slot_entries.append(entry)
+        rendered.append(slot_entries)
+    return grid.column_to_dict(rendered)
+
+
+def build_schedule_data(
+    grid: ScheduleGrid,
+    masters: Sequence[Any],
+    appointments: Iterable[Any],
+    viewer: Any,
+    multi_booking_client_ids: Set[int],
+) -> Dict[int, Dict[str, List[Dict[str, Any]]]]:
+    """
+    Будує ``schedule_data`` для шаблону ``main/schedule.html``.
+
+    Записи майстрів, яких немає в ``masters``, пропускаються. Інтервали
+    ``grid.time_intervals`` позначаються як розгорнуті, якщо запис
+    починається або закінчується о :15/:45.
+
+    Returns:
+        Словник ``{master_id: {"HH:MM": [деталі записів]}}``
+    """
+    columns = build_master_columns(grid, [master.id for master in masters], appointments)
+    return assemble_schedule_data(grid, [columns[master.id] for master in masters], viewer, multi_booking_client_ids)
+
+
+def assemble_schedule_data(
+    grid: ScheduleGrid, columns: Sequence[ScheduleColumn], viewer: Any, multi_booking_client_ids: Set[int]
+) -> Dict[int, Dict[str, List[Dict[str, Any]]]]:
+    """Рендерить готові колонки та розгортає інтервали сітки."""
+    expanded: Set[int] = set()
+    schedule_data: Dict[int, Dict[str, List[Dict[str, Any]]]] = {}
+    for column in columns:
+        schedule_data[column.master_id] = render_column(grid, column, viewer, multi_booking_client_ids)
+        expanded |= column.expanded
+    grid.expand_intervals(expanded)
+    return schedule_data
+
+
+# Коди статусів для компактного JSON (індекс у списку = код)
+STATUS_CODES = ["scheduled", "completed", "cancelled"]
+PAYMENT_STATUS_CODES = ["unpaid", "partially_paid", "paid", "not_applicable"]
+
+
+def _code(codes: List[str], value: Optional[str]) -> int:
+    return codes.index(value) if value in codes else -1
+
+
+def compact_columns(
+    columns: Sequence[ScheduleColumn],
+    viewer: Any,
+    multi_booking_client_ids: Set[int],
+    only_ids: Optional[Set[int]] = None,
+) -> Dict[str, List[Any]]:
+    """
+    Перетворює колонки на стовпчиковий формат: паралельні списки по одному
+    елементу на запис, зайняті слоти - списки індексів сітки.
+
+    ``only_ids`` обмежує результат записами з цими ID (для дельта-синхронізації).
+    """
+    result: Dict[str, List[Any]] = {
+        "id": [],
+        "master": [],
+        "slots": [],
+        "status": [],
+        "payment_status": [],
+        "client": [],
+        "phone": [],
+        "services": [],
+        "finance": [],
+        "css": [],
+        "multi_booking": [],
+        "can_edit": [],
+    }
+    for master_index, column in enumerate(columns):
+        can_edit = int(bool(viewer.is_admin or column.master_id == viewer.id))
+        covered: Dict[int, List[int]] = {}
+        for slot_index, entries in enumerate(column.slots):
+            for entry in entries:
+                covered.setdefault(entry["id"], []).append(slot_index)
+
+        for appointment_id, entry in column.details.items():
+            if only_ids is not None and appointment_id not in only_ids:
+                continue
+            result["id"].append(appointment_id)
+            result["master"].append(master_index)
+            result["slots"].append(covered.get(appointment_id, []))
+            result["status"].append(_code(STATUS_CODES, entry["status"]))
+            result["payment_status"].append(_code(PAYMENT_STATUS_CODES, entry["payment_status"]))
+            result["client"].append(entry["client_name"])
+            result["phone"].append(entry["phone"])
+            result["services"].append(entry["services"])
+            result["finance"].append(entry["finance_info"])
+            result["css"].append(entry["css_class"])
+            result["multi_booking"].append(int(column.client_ids.get(appointment_id) in multi_booking_client_ids))
+            result["can_edit"].append(can_edit)
+    return result
@@ -0,0 +1,189 @@
+"""
+Schedule service module.
+Loads the data needed to render the schedule for one day with a fixed set of queries.
+"""
+
+from collections import defaultdict
+from datetime import date, time, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import func
+
+from app.models import Appointment, AppointmentService, ScheduleChange, User, db
+from app.services.schedule_cache import get_schedule_cache
+from app.services.schedule_grid import ScheduleColumn, ScheduleGrid, build_master_columns
+
+
+class ScheduleService:
+    """Service for loading schedule data without per-appointment queries."""
+
+    @staticmethod
+    def _day_filter(query, selected_date: date, master_ids: Optional[Iterable[int]] = None):
+        query = query.filter(Appointment.date == selected_date, Appointment.status != "cancelled")
+        if master_ids:
+            query = query.filter(Appointment.master_id.in_(list(master_ids)))
+        return query
+
+    @staticmethod
+    def get_masters_for_date(selected_date: date, today: Optional[date] = None) -> List[User]:
+        """
+        Masters shown in the schedule for the day.
+
+        Past dates show only masters who had non-cancelled appointments that day;
+        today and future dates show all active masters.
+        """
+        today = today or date.today()
+        if selected_date < today:
+            master_ids = (
+                db.session.query(Appointment.master_id)
+                .filter(Appointment.date == selected_date, Appointment.status != "cancelled")
+                .distinct()
+            )
+            query = User.query.filter(User.id.in_(master_ids))
+        else:
+            query = User.query.filter_by(is_active_master=True)
+        masters: List[User] = query.order_by(User.schedule_display_order, User.full_name).all()
+        return masters
+
+    @staticmethod
+    def get_range_overview(
+        grid: ScheduleGrid, start_date: date, days: int, today: Optional[date] = None
+    ) -> Tuple[List[User], List[Dict]]:
+        """
+        Condensed occupancy for ``days`` consecutive days starting at ``start_date``.
+
+        Loads all non-cancelled appointments of the range with one query and groups
+        them by (date, master) in a single pass. Masters per day follow the same
+        rules as ``get_masters_for_date``.
+
+        Returns:
+            Tuple (masters shown on any day in display order, per-day list).
+            Each day is ``{"date", "masters", "cells"}`` where ``cells`` maps
+            master_id to ``{"count", "minutes", "intervals"}`` and ``intervals`` holds
+            a busy flag per 30-minute interval of ``grid.time_intervals``
+        """
+        today = today or date.today()
+        dates = [start_date + timedelta(days=offset) for offset in range(days)]
+        rows = (
+            db.session.query(Appointment.date, Appointment.master_id, Appointment.start_time, Appointment.end_time)
+            .filter(
+                Appointment.date >= dates[0],
+                Appointment.date <= dates[-1],
+                Appointment.status != "cancelled",
+            )
+            .all()
+        )
+
+        # Один прохід: групування за (дата, майстер)
+        grouped: Dict[Tuple[date, int], List[Tuple[time, time]]] = defaultdict(list)
+        past_master_ids: Dict[date, Set[int]] = defaultdict(set)
+        for row in rows:
+            grouped[(row.date, row.master_id)].append((row.start_time, row.end_time))
+            if row.date < today:
+                past_master_ids[row.date].add(row.master_id)
+
+        all_past_ids = set().union(*past_master_ids.values()) if past_master_ids else set()
+        candidates: List[User] = (
+            User.query.filter(User.is_active_master.is_(True) | User.id.in_(all_past_ids))
+            .order_by(User.schedule_display_order, User.full_name)
+            .all()
+        )
+
+        interval_count = len(grid.time_intervals)
+        overview = []
+        for day in dates:
+            if day < today:
+                masters = [master for master in candidates if master.id in past_master_ids.get(day, set())]
+            else:
+                masters = [master for master in candidates if master.is_active_master]
+
+            cells = {}
+            for master in masters:
+                busy = [False] * interval_count
+                minutes = 0
+                appointments = grouped.get((day, master.id), [])
+                for start_time, end_time in appointments:
+                    covered = grid.slot_range(start_time, end_time)
+                    minutes += len(covered) * grid.step // 60
+                    for position in grid.intervals_for(covered):
+                        busy[position] = True
+                cells[master.id] = {"count": len(appointments), "minutes": minutes, "intervals": busy}
+            overview.append({"date": day, "masters": masters, "cells": cells})
+
+        shown_ids = {master_id for day in overview for master_id in day["cells"]}
+        return [master for master in candidates if master.id in shown_ids], overview
+
+    @staticmethod
+    def get_columns(grid: ScheduleGrid, selected_date: date, master_ids: Sequence[int]) -> Dict[int, ScheduleColumn]:
+        """
+        Schedule columns for the given masters, taken from the schedule cache when possible.
+
+        Only masters missing from the cache are loaded from the database.
+        """
+        cache = get_schedule_cache()
+        columns: Dict[int, ScheduleColumn] = {}
+        missing_master_ids: List[int] = []
+        for master_id in master_ids:
+            cached_column = cache.get(selected_date, master_id) if cache else None
+            if cached_column is None:
+                missing_master_ids.append(master_id)
+            else:
+                columns[master_id] = cached_column
+
+        if missing_master_ids:
+            appointments = ScheduleService.get_day_appointments(selected_date, missing_master_ids)
+            built_columns = build_master_columns(grid, missing_master_ids, appointments)
+            for master_id, column in built_columns.items():
+                columns[master_id] = column
+                if cache:
+                    cache.set(selected_date, master_id, column)
+
+        return columns
+
+    @staticmethod
+    def get_date_version(selected_date: date) -> int:
+        """Current change version of the day (0 if nothing was recorded)."""
+        version = db.session.query(func.max(ScheduleChange.id)).filter(ScheduleChange.date == selected_date).scalar()
+        return int(version or 0)
+
+    @staticmethod
+    def get_changed_appointment_ids(selected_date: date, since_version: int) -> Set[int]:
+        """IDs of appointments on the day changed after ``since_version``."""
+        rows = (
+            db.session.query(ScheduleChange.appointment_id)
+            .filter(ScheduleChange.date == selected_date, ScheduleChange.id > since_version)
+            .all()
+        )
+        return {appointment_id for (appointment_id,) in rows}
+
+    @staticmethod
+    def get_day_appointments(selected_date: date, master_ids: Optional[Iterable[int]] = None) -> List[Appointment]:
+        """
+        Returns non-cancelled appointments for the day with client and services eager-loaded.
+
+        Args:
+            selected_date: Day to load
+            master_ids: Optional master filter (all masters when empty)
+
+        Returns:
+            Appointments ordered by start time
+        """
+        query = ScheduleService._day_filter(Appointment.query, selected_date, master_ids)
+        appointments: List[Appointment] = (
+            query.options(
+                db.joinedload(Appointment.client),  # type: ignore[attr-defined]
+                db.selectinload(Appointment.services).joinedload(
+                    AppointmentService.service  # type: ignore[attr-defined]
+                ),
+            )
+            .order_by(Appointment.start_time)
+            .all()
+        )
+        return appointments
+
+    @staticmethod
+    def get_multi_booking_client_ids(selected_date: date, master_ids: Optional[Iterable[int]] = None) -> Set[int]:
+        """IDs of clients with more than one non-cancelled appointment on the day."""
+        query = ScheduleService._day_filter(db.session.query(Appointment.client_id), selected_date, master_ids)
+        rows = query.group_by(Appointment.client_id).having(func.count(Appointment.id) > 1).all()
+        return {client_id for (client_id,) in rows if client_id}
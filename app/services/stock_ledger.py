@@ -0,0 +1,112 @@
+"""
+Point-in-time stock from the stock_movement ledger.
+Stock at the end of a day is the latest monthly stock_snapshot before it plus the
+movements since that snapshot: an indexed range sum over at most a month of
+movements instead of a replay of the whole history.
+"""
+
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import func, select
+
+from app.models import StockMovement, StockSnapshot, db, local_day, month_start
+
+
+def next_month(day: date) -> date:
+    """Перший день наступного місяця."""
+    start = month_start(day)
+    return start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+
+
+class StockLedgerService:
+    """Stock history: point-in-time quantities and monthly snapshots."""
+
+    @staticmethod
+    def stock_on(day: date, product_ids: Optional[Iterable[int]] = None) -> Dict[int, int]:
+        """
+        Stock at the end of ``day`` by product id.
+
+        Products without any movement up to that day are omitted. Without ``product_ids``
+        every product is returned.
+        """
+        ids = None if product_ids is None else list(set(product_ids))
+        if ids == []:
+            return {}
+
+        period = db.session.execute(
+            select(func.max(StockSnapshot.period_start)).where(StockSnapshot.period_start <= day)
+        ).scalar()
+
+        stock: Dict[int, int] = defaultdict(int)
+        if period is not None:
+            snapshots = select(StockSnapshot.product_id, StockSnapshot.quantity).where(
+                StockSnapshot.period_start == period
+            )
+            if ids is not None:
+                snapshots = snapshots.where(StockSnapshot.product_id.in_(ids))
+            for product_id, quantity in db.session.execute(snapshots):
+                stock[product_id] += quantity
+
+        movements = select(StockMovement.product_id, func.sum(StockMovement.quantity)).where(StockMovement.day <= day)
+        if period is not None:
+            movements = movements.where(StockMovement.day >= period)
+        if ids is not None:
+            movements = movements.where(StockMovement.product_id.in_(ids))
+        for product_id, quantity in db.session.execute(movements.group_by(StockMovement.product_id)):
+            stock[product_id] += quantity
+        return dict(stock)
+
+    @staticmethod
+    def take_snapshots(through: Optional[date] = None, rebuild: bool = False) -> int:
+        """
+        Writes the missing monthly snapshots up to the month of ``through`` (today by default).
+
+        Each snapshot is the previous one plus a month of movements. Future months are
+        never snapshotted, so documents dated today cannot precede a snapshot.
+
+        Returns:
+            Number of snapshot rows written
+        """
+        today = local_day(None)
+        through = min(through or today, today)
+        if rebuild:
+            db.session.execute(StockSnapshot.__table__.delete())
+
+        previous = db.session.execute(select(func.max(StockSnapshot.period_start))).scalar()
+        if previous is not None:
+            period = next_month(previous)
+        else:
+            first_day = db.session.execute(select(func.min(StockMovement.day))).scalar()
+            if first_day is None:
+                return 0
+            period = next_month(first_day)
+
+        written = 0
+        while period <= through:
+            written += StockLedgerService._write_snapshot(period, previous)
+            previous, period = period, next_month(period)
+        return written
+
+    @staticmethod
+    def _write_snapshot(period: date, previous: Optional[date]) -> int:
+        balances: Dict[int, int] = defaultdict(int)
+        movements = select(StockMovement.product_id, func.sum(StockMovement.quantity)).where(StockMovement.day < period)
+        if previous is not None:
+            snapshots = select(StockSnapshot.product_id, StockSnapshot.quantity).where(
+                StockSnapshot.period_start == previous
+            )
+            for product_id, quantity in db.session.execute(snapshots):
+                balances[product_id] += quantity
+            movements = movements.where(StockMovement.day >= previous)
+        for product_id, quantity in db.session.execute(movements.group_by(StockMovement.product_id)):
+            balances[product_id] += quantity
+
+        rows = [
+            {"period_start": period, "product_id": product_id, "quantity": quantity}
+            for product_id, quantity in sorted(balances.items())
+        ]
+        if rows:
+            db.session.execute(StockSnapshot.__table__.insert(), rows)
+        return len(rows)
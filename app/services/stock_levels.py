@@ -0,0 +1,128 @@
+"""
+Stock levels listing.
+Products come with their stock level and brand from one joined query per page,
+and the total of the unfiltered listing is counted once and kept until a product
+is inserted or deleted, so paging costs a single query.
+"""
+
+from typing import Any, List, Optional
+
+from flask import Flask, current_app, has_app_context
+from flask_sqlalchemy.pagination import QueryPagination
+from flask_sqlalchemy.query import Query
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models import Brand, Product, StockLevel, db
+from app.services.count_cache import DEFAULT_COUNT_TTL, CountCache
+
+STOCK_PAGE_SIZE = 20
+
+_CLEAR_COUNT = "product_count_clear"
+
+
+def init_app(app: Flask) -> CountCache:
+    """Створює кеш кількості товарів у залишках (``app.extensions["product_count"]``, ключ ``None``)."""
+    cache = CountCache(ttl=app.config.get("PRODUCT_COUNT_TTL", DEFAULT_COUNT_TTL))
+    app.extensions["product_count"] = cache
+    return cache
+
+
+def get_product_count_cache() -> Optional[CountCache]:
+    if not has_app_context():
+        return None
+    cache: Optional[CountCache] = current_app.extensions.get("product_count")
+    return cache
+
+
+class StockLevelsPagination(QueryPagination):
+    """Page of ``(Product, StockLevel, Brand)`` rows; an unfiltered total comes from the count cache."""
+
+    def _query_count(self) -> int:
+        cache = get_product_count_cache()
+        count = None
+        if cache is not None and self._query_args.get("cache_count"):
+            count = cache.get_or_count(None, super()._query_count)
+        return super()._query_count() if count is None else count
+
+
+class StockLevelsService:
+    """Loader shared by the stock levels page and the low stock report."""
+
+    @staticmethod
+    def query(search: str = "", brand_id: int = 0, low_stock: bool = False) -> Query:
+        """``(Product, StockLevel, Brand)`` rows ordered by product name."""
+        query = (
+            db.session.query(Product, StockLevel, Brand)
+            .join(StockLevel, StockLevel.product_id == Product.id)
+            .join(Brand, Brand.id == Product.brand_id)
+        )
+        if search:
+            query = query.filter(
+                db.or_(Product.name.contains(search), Product.sku.contains(search), Brand.name.contains(search))
+            )
+        if brand_id:
+            query = query.filter(Product.brand_id == brand_id)
+        if low_stock:
+            query = query.filter(Product.min_stock_level.isnot(None), StockLevel.quantity <= Product.min_stock_level)
+        return query.order_by(Product.name, Product.id)
+
+    @staticmethod
+    def page(
+        page: int = 1,
+        per_page: int = STOCK_PAGE_SIZE,
+        search: str = "",
+        brand_id: int = 0,
+        low_stock: bool = False,
+    ) -> StockLevelsPagination:
+        """One page of the stock listing; the total is cached only without filters."""
+        return StockLevelsPagination(
+            query=StockLevelsService.query(search, brand_id, low_stock),
+            page=page,
+            per_page=per_page,
+            error_out=False,
+            cache_count=not (search or brand_id or low_stock),
+        )
+
+    @staticmethod
+    def low_stock() -> List[Any]:
+        """All products at or below their minimum stock level."""
+        return StockLevelsService.query(low_stock=True).all()
+
+
+# --- Інвалідація ---
+
+
+def _clear_count() -> None:
+    cache = get_product_count_cache()
+    if cache is not None:
+        cache.clear()
+
+
+@event.listens_for(Session, "after_flush")
+def clear_count_after_flush(session: Session, flush_context: Any) -> None:
+    """Скидає кількість товарів, коли товари додано чи видалено."""
+    if any(isinstance(obj, Product) for obj in (*session.new, *session.deleted)):
+        _clear_count()
+        # Повторюємо після commit: інший запит міг порахувати товари до фіксації транзакції
+        session.info[_CLEAR_COUNT] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def clear_count_on_bulk_delete(orm_execute_state: Any) -> None:
+    """Масовий ``query.delete()`` товарів обходить flush."""
+    mapper = orm_execute_state.bind_mapper
+    if orm_execute_state.is_delete and mapper is not None and mapper.class_ is Product:
+        _clear_count()
+        orm_execute_state.session.info[_CLEAR_COUNT] = True
+
+
+@event.listens_for(Session, "after_commit")
+def clear_count_after_commit(session: Session) -> None:
+    if session.info.pop(_CLEAR_COUNT, False):
+        _clear_count()
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_pending_clear(session: Session) -> None:
+    session.info.pop(_CLEAR_COUNT, None)
@@ -0,0 +1,48 @@
+"""Add denormalized totals to appointment
+
+Revision ID: 5b8e2f4a9c31
+Revises: e41b9a7c6d20
+Create Date: 2025-06-09 11:02:37.615094
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5b8e2f4a9c31"
+down_revision = "e41b9a7c6d20"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("appointment", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("services_total", sa.Numeric(10, 2), nullable=False, server_default="0"))
+        batch_op.add_column(sa.Column("sales_total", sa.Numeric(10, 2), nullable=False, server_default="0"))
+        batch_op.add_column(sa.Column("discounted_total", sa.Numeric(10, 2), nullable=False, server_default="0"))
+
+    # Заповнення для існуючих записів (те саме робить `flask backfill-appointment-totals`)
+    op.execute(
+        """
+        UPDATE appointment SET
+            services_total = ROUND(COALESCE(
+                (SELECT SUM(price) FROM appointment_service WHERE appointment_id = appointment.id), 0), 2),
+            sales_total = ROUND(COALESCE(
+                (SELECT SUM(total_amount) FROM sale WHERE appointment_id = appointment.id), 0), 2)
+        """
+    )
+    op.execute(
+        """
+        UPDATE appointment SET discounted_total = ROUND(
+            (services_total + sales_total) * (1 - COALESCE(discount_percentage, 0) / 100.0), 2)
+        """
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("appointment", schema=None) as batch_op:
+        batch_op.drop_column("discounted_total")
+        batch_op.drop_column("sales_total")
+        batch_op.drop_column("services_total")
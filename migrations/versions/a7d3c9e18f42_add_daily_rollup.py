@@ -0,0 +1,89 @@
+"""Add daily_rollup table for financial reports
+
+Revision ID: a7d3c9e18f42
+Revises: 5b8e2f4a9c31
+Create Date: 2025-06-12 09:47:15.382640
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a7d3c9e18f42"
+down_revision = "5b8e2f4a9c31"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "daily_rollup",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("master_id", sa.Integer(), nullable=False),
+        sa.Column("payment_method_id", sa.Integer(), nullable=True),
+        sa.Column("appointment_count", sa.Integer(), nullable=False),
+        sa.Column("services_total", sa.Numeric(12, 2), nullable=False),
+        sa.Column("service_revenue", sa.Numeric(16, 6), nullable=False),
+        sa.Column("sales_count", sa.Integer(), nullable=False),
+        sa.Column("sales_total", sa.Numeric(12, 2), nullable=False),
+        sa.Column("product_revenue", sa.Numeric(12, 2), nullable=False),
+        sa.Column("cogs", sa.Numeric(12, 2), nullable=False),
+        sa.ForeignKeyConstraint(["master_id"], ["user.id"]),
+        sa.ForeignKeyConstraint(["payment_method_id"], ["payment_method.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("day", "master_id", "payment_method_id", name="uq_daily_rollup_day_master_method"),
+    )
+    with op.batch_alter_table("appointment", schema=None) as batch_op:
+        batch_op.create_index("ix_appointment_date_status", ["date", "status"], unique=False)
+
+    # Заповнення з існуючих даних (те саме робить `flask rebuild-daily-rollup`)
+    op.execute(
+        """
+        INSERT INTO daily_rollup (
+            day, master_id, payment_method_id, appointment_count, services_total, service_revenue,
+            sales_count, sales_total, product_revenue, cogs
+        )
+        SELECT day, master_id, payment_method_id,
+               SUM(appointment_count), ROUND(SUM(services_total), 2), ROUND(SUM(service_revenue), 6),
+               SUM(sales_count), ROUND(SUM(sales_total), 2), ROUND(SUM(product_revenue), 2), ROUND(SUM(cogs), 2)
+        FROM (
+            SELECT a.date AS day, a.master_id, a.payment_method_id,
+                   1 AS appointment_count,
+                   COALESCE(s.services_total, 0) AS services_total,
+                   CASE WHEN a.amount_paid > 0 THEN a.amount_paid
+                        ELSE COALESCE(s.services_cents, 0)
+                             * CAST(ROUND((100 - COALESCE(a.discount_percentage, 0)) * 100) AS INTEGER) / 1000000.0
+                   END AS service_revenue,
+                   0 AS sales_count, 0 AS sales_total, 0 AS product_revenue, 0 AS cogs
+            FROM appointment a
+            LEFT JOIN (
+                SELECT appointment_id, SUM(price) AS services_total,
+                       SUM(CAST(ROUND(price * 100) AS INTEGER)) AS services_cents
+                FROM appointment_service
+                GROUP BY appointment_id
+            ) s ON s.appointment_id = a.id
+            WHERE a.status = 'completed'
+            UNION ALL
+            SELECT date(sa.sale_date), sa.user_id, sa.payment_method_id,
+                   0, 0, 0,
+                   1, sa.total_amount, COALESCE(i.product_revenue, 0), COALESCE(i.cogs, 0)
+            FROM sale sa
+            LEFT JOIN (
+                SELECT sale_id, SUM(price_per_unit * quantity) AS product_revenue,
+                       SUM(cost_price_per_unit * quantity) AS cogs
+                FROM sale_item
+                GROUP BY sale_id
+            ) i ON i.sale_id = sa.id
+        ) AS source
+        GROUP BY day, master_id, payment_method_id
+        """
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("appointment", schema=None) as batch_op:
+        batch_op.drop_index("ix_appointment_date_status")
+    op.drop_table("daily_rollup")
@@ -0,0 +1,57 @@
+"""Add normalized and reversed phone digits to client
+
+Revision ID: a9e4d1c7f250
+Revises: f3c8a2d9b517
+Create Date: 2025-06-21 09:17:44.862530
+
+"""
+
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "a9e4d1c7f250"
+down_revision = "f3c8a2d9b517"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Колонки лишаються nullable: зміна NOT NULL у SQLite перебудовує таблицю
+    # і видаляє тригери повнотекстового індексу client_fts
+    with op.batch_alter_table("client", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("phone_normalized", sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column("phone_reversed", sa.String(length=20), nullable=True))
+
+    # Існуючі клієнти: лише цифри номера (у SQLite немає заміни за регулярним виразом)
+    bind = op.get_bind()
+    client = sa.table(
+        "client", sa.column("id"), sa.column("phone"), sa.column("phone_normalized"), sa.column("phone_reversed")
+    )
+    rows = bind.execute(sa.select(client.c.id, client.c.phone)).fetchall()
+    updates = []
+    for client_id, phone in rows:
+        digits = re.sub(r"\D", "", phone or "")
+        updates.append({"client_id": client_id, "normalized": digits, "reversed": digits[::-1]})
+    if updates:
+        bind.execute(
+            client.update()
+            .where(client.c.id == sa.bindparam("client_id"))
+            .values(phone_normalized=sa.bindparam("normalized"), phone_reversed=sa.bindparam("reversed")),
+            updates,
+        )
+
+    with op.batch_alter_table("client", schema=None) as batch_op:
+        batch_op.create_index("ix_client_phone_normalized", ["phone_normalized"], unique=False)
+        batch_op.create_index("ix_client_phone_reversed", ["phone_reversed"], unique=False)
+
+
+def downgrade():
+    # Без перебудови таблиці (ALTER TABLE DROP COLUMN, SQLite 3.35+), щоб зберегти тригери client_fts
+    with op.batch_alter_table("client", schema=None, recreate="never") as batch_op:
+        batch_op.drop_index("ix_client_phone_reversed")
+        batch_op.drop_index("ix_client_phone_normalized")
+        batch_op.drop_column("phone_reversed")
+        batch_op.drop_column("phone_normalized")
@@ -0,0 +1,96 @@
+"""Add indexed sale_day column to sale
+
+Revision ID: b2e6f0c8d413
+Revises: a7d3c9e18f42
+Create Date: 2025-06-16 10:05:52.918406
+
+"""
+
+from datetime import timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b2e6f0c8d413"
+down_revision = "a7d3c9e18f42"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Колонка лишається nullable: зміна NOT NULL у SQLite перебудовує таблицю sale,
+    # а DROP TABLE sale з увімкненими foreign_keys падає, щойно є позиції продажів.
+    # Значення заповнюють default та sync_sale_day моделі
+    with op.batch_alter_table("sale", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("sale_day", sa.Date(), nullable=True))
+
+    # Існуючі продажі: sale_date зберігається в UTC, день - за місцевим часом сервера,
+    # за тим самим правилом, що й local_day() для нових та змінених продажів
+    bind = op.get_bind()
+    sale = sa.table("sale", sa.column("id"), sa.column("sale_date", sa.DateTime()), sa.column("sale_day", sa.Date()))
+    rows = bind.execute(sa.select(sale.c.id, sale.c.sale_date)).fetchall()
+    updates = [
+        {"sale_id": sale_id, "day": sale_date.replace(tzinfo=timezone.utc).astimezone().date()}
+        for sale_id, sale_date in rows
+    ]
+    if updates:
+        bind.execute(
+            sale.update().where(sale.c.id == sa.bindparam("sale_id")).values(sale_day=sa.bindparam("day")), updates
+        )
+
+    with op.batch_alter_table("sale", schema=None) as batch_op:
+        batch_op.create_index("ix_sale_day_user", ["sale_day", "user_id"], unique=False)
+
+    # daily_rollup (a7d3c9e18f42) розкладав продажі за UTC-датою date(sale_date); перебудовуємо
+    # за sale_day, інакше нічний продаж лишився б в іншому дні й після оновлення врахувався двічі
+    op.execute("DELETE FROM daily_rollup")
+    op.execute(
+        """
+        INSERT INTO daily_rollup (
+            day, master_id, payment_method_id, appointment_count, services_total, service_revenue,
+            sales_count, sales_total, product_revenue, cogs
+        )
+        SELECT day, master_id, payment_method_id,
+               SUM(appointment_count), ROUND(SUM(services_total), 2), ROUND(SUM(service_revenue), 6),
+               SUM(sales_count), ROUND(SUM(sales_total), 2), ROUND(SUM(product_revenue), 2), ROUND(SUM(cogs), 2)
+        FROM (
+            SELECT a.date AS day, a.master_id, a.payment_method_id,
+                   1 AS appointment_count,
+                   COALESCE(s.services_total, 0) AS services_total,
+                   CASE WHEN a.amount_paid > 0 THEN a.amount_paid
+                        ELSE COALESCE(s.services_cents, 0)
+                             * CAST(ROUND((100 - COALESCE(a.discount_percentage, 0)) * 100) AS INTEGER) / 1000000.0
+                   END AS service_revenue,
+                   0 AS sales_count, 0 AS sales_total, 0 AS product_revenue, 0 AS cogs
+            FROM appointment a
+            LEFT JOIN (
+                SELECT appointment_id, SUM(price) AS services_total,
+                       SUM(CAST(ROUND(price * 100) AS INTEGER)) AS services_cents
+                FROM appointment_service
+                GROUP BY appointment_id
+            ) s ON s.appointment_id = a.id
+            WHERE a.status = 'completed'
+            UNION ALL
+            SELECT sa.sale_day, sa.user_id, sa.payment_method_id,
+                   0, 0, 0,
+                   1, sa.total_amount, COALESCE(i.product_revenue, 0), COALESCE(i.cogs, 0)
+            FROM sale sa
+            LEFT JOIN (
+                SELECT sale_id, SUM(price_per_unit * quantity) AS product_revenue,
+                       SUM(cost_price_per_unit * quantity) AS cogs
+                FROM sale_item
+                GROUP BY sale_id
+            ) i ON i.sale_id = sa.id
+        ) AS source
+        GROUP BY day, master_id, payment_method_id
+        """
+    )
+
+
+def downgrade():
+    # Без перебудови таблиці (ALTER TABLE DROP COLUMN, SQLite 3.35+): sale_item посилається на sale
+    with op.batch_alter_table("sale", schema=None, recreate="never") as batch_op:
+        batch_op.drop_index("ix_sale_day_user")
+        batch_op.drop_column("sale_day")
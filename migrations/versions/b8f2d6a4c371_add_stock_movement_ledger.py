@@ -0,0 +1,88 @@
+"""Add stock_movement ledger and stock_snapshot tables
+
+Revision ID: b8f2d6a4c371
+Revises: e7a3b9d2c064
+Create Date: 2025-06-26 11:12:40.518302
+
+"""
+
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b8f2d6a4c371"
+down_revision = "e7a3b9d2c064"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "stock_movement",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column("source_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["product_id"], ["product.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("kind", "source_id", name="uq_stock_movement_source"),
+    )
+    with op.batch_alter_table("stock_movement", schema=None) as batch_op:
+        batch_op.create_index("ix_stock_movement_product_day", ["product_id", "day", "quantity"], unique=False)
+        batch_op.create_index("ix_stock_movement_day", ["day"], unique=False)
+
+    op.create_table(
+        "stock_snapshot",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("period_start", sa.Date(), nullable=False),
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["product_id"], ["product.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("period_start", "product_id", name="uq_stock_snapshot_period_product"),
+    )
+
+    # Журнал з існуючих документів; зрізи пише `flask snapshot-stock`
+    op.execute(
+        """
+        INSERT INTO stock_movement (product_id, day, quantity, kind, source_id, created_at)
+        SELECT i.product_id, r.receipt_date, i.quantity_received, 'receipt', i.id, CURRENT_TIMESTAMP
+        FROM goods_receipt_item i JOIN goods_receipt r ON r.id = i.receipt_id
+        UNION ALL
+        SELECT i.product_id, s.sale_day, -i.quantity, 'sale', i.id, CURRENT_TIMESTAMP
+        FROM sale_item i JOIN sale s ON s.id = i.sale_id
+        UNION ALL
+        SELECT i.product_id, w.write_off_date, -i.quantity, 'write_off', i.id, CURRENT_TIMESTAMP
+        FROM product_write_off_item i JOIN product_write_off w ON w.id = i.product_write_off_id
+        """
+    )
+    # Минулі інвентаризації та ручні правки залишків не відновити по документах:
+    # різниця з поточним залишком записується одним коригуванням на сьогодні
+    op.get_bind().execute(
+        sa.text(
+            """
+            INSERT INTO stock_movement (product_id, day, quantity, kind, source_id, created_at)
+            SELECT l.product_id, :today, l.quantity - COALESCE(m.quantity, 0), 'adjustment', NULL, CURRENT_TIMESTAMP
+            FROM stock_level l
+            LEFT JOIN (
+                SELECT product_id, SUM(quantity) AS quantity FROM stock_movement GROUP BY product_id
+            ) m ON m.product_id = l.product_id
+            WHERE l.quantity <> COALESCE(m.quantity, 0)
+            """
+        ),
+        {"today": date.today()},
+    )
+
+
+def downgrade():
+    op.drop_table("stock_snapshot")
+    with op.batch_alter_table("stock_movement", schema=None) as batch_op:
+        batch_op.drop_index("ix_stock_movement_day")
+        batch_op.drop_index("ix_stock_movement_product_day")
+    op.drop_table("stock_movement")
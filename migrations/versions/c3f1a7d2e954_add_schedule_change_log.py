@@ -0,0 +1,34 @@
+"""Add schedule_change log for schedule API versions
+
+Revision ID: c3f1a7d2e954
+Revises: 2ea257154bf4
+Create Date: 2025-06-02 10:14:03.512877
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c3f1a7d2e954"
+down_revision = "2ea257154bf4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "schedule_change",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("appointment_id", sa.Integer(), nullable=False),
+        sa.Column("changed_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("date", "appointment_id", name="uq_schedule_change_date_appointment"),
+        sqlite_autoincrement=True,
+    )
+
+
+def downgrade():
+    op.drop_table("schedule_change")
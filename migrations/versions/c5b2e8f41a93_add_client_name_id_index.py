@@ -0,0 +1,26 @@
+"""Add (name, id) index for the keyset-paginated client list
+
+Revision ID: c5b2e8f41a93
+Revises: a9e4d1c7f250
+Create Date: 2025-06-22 15:03:26.417985
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c5b2e8f41a93"
+down_revision = "a9e4d1c7f250"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("client", schema=None) as batch_op:
+        batch_op.create_index("ix_client_name_id", ["name", "id"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("client", schema=None) as batch_op:
+        batch_op.drop_index("ix_client_name_id")
@@ -0,0 +1,44 @@
+"""Add report_job table for background reports
+
+Revision ID: d4a1f7b3e6c2
+Revises: b2e6f0c8d413
+Create Date: 2025-06-18 14:21:37.604118
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d4a1f7b3e6c2"
+down_revision = "b2e6f0c8d413"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "report_job",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("report_type", sa.String(length=50), nullable=False),
+        sa.Column("params", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("result", sa.Text(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    with op.batch_alter_table("report_job", schema=None) as batch_op:
+        batch_op.create_index("ix_report_job_status", ["status"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("report_job", schema=None) as batch_op:
+        batch_op.drop_index("ix_report_job_status")
+
+    op.drop_table("report_job")
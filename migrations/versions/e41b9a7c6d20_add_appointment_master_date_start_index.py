@@ -0,0 +1,26 @@
+"""Add composite index on appointment(master_id, date, start_time)
+
+Revision ID: e41b9a7c6d20
+Revises: c3f1a7d2e954
+Create Date: 2025-06-05 09:21:44.104215
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "e41b9a7c6d20"
+down_revision = "c3f1a7d2e954"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("appointment", schema=None) as batch_op:
+        batch_op.create_index("ix_appointment_master_date_start", ["master_id", "date", "start_time"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("appointment", schema=None) as batch_op:
+        batch_op.drop_index("ix_appointment_master_date_start")
@@ -0,0 +1,35 @@
+"""Add partial index for open FIFO batches
+
+Revision ID: e7a3b9d2c064
+Revises: c5b2e8f41a93
+Create Date: 2025-06-24 10:38:51.204673
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e7a3b9d2c064"
+down_revision = "c5b2e8f41a93"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Частковий індекс у SQLite та PostgreSQL; інші СУБД ігнорують *_where
+    # і створюють звичайний індекс за тими ж колонками
+    with op.batch_alter_table("goods_receipt_item", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_goods_receipt_item_open_batches",
+            ["product_id", "receipt_date", "id"],
+            unique=False,
+            sqlite_where=sa.text("quantity_remaining > 0"),
+            postgresql_where=sa.text("quantity_remaining > 0"),
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("goods_receipt_item", schema=None) as batch_op:
+        batch_op.drop_index("ix_goods_receipt_item_open_batches")
@@ -0,0 +1,48 @@
+"""Add client_fts full-text search index
+
+Revision ID: f3c8a2d9b517
+Revises: d4a1f7b3e6c2
+Create Date: 2025-06-20 11:42:09.315274
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f3c8a2d9b517"
+down_revision = "d4a1f7b3e6c2"
+branch_labels = None
+depends_on = None
+
+
+CLIENT_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS client_fts USING fts5("
+    "name, email, notes, content='client', content_rowid='id', tokenize='unicode61 remove_diacritics 0')",
+    "CREATE TRIGGER IF NOT EXISTS client_fts_ai AFTER INSERT ON client BEGIN "
+    "INSERT INTO client_fts(rowid, name, email, notes) VALUES (new.id, new.name, new.email, new.notes); END",
+    "CREATE TRIGGER IF NOT EXISTS client_fts_ad AFTER DELETE ON client BEGIN "
+    "INSERT INTO client_fts(client_fts, rowid, name, email, notes) "
+    "VALUES ('delete', old.id, old.name, old.email, old.notes); END",
+    "CREATE TRIGGER IF NOT EXISTS client_fts_au AFTER UPDATE OF name, email, notes ON client BEGIN "
+    "INSERT INTO client_fts(client_fts, rowid, name, email, notes) "
+    "VALUES ('delete', old.id, old.name, old.email, old.notes); "
+    "INSERT INTO client_fts(rowid, name, email, notes) VALUES (new.id, new.name, new.email, new.notes); END",
+)
+
+
+def upgrade():
+    # FTS5 є лише в SQLite; на інших СУБД пошук працює через LIKE (див. ClientSearchService)
+    if op.get_bind().engine.name != "sqlite":
+        return
+    for statement in CLIENT_FTS_DDL:
+        op.execute(statement)
+    # Індексуємо наявних клієнтів
+    op.execute("INSERT INTO client_fts(client_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().engine.name != "sqlite":
+        return
+    for trigger in ("client_fts_ai", "client_fts_ad", "client_fts_au"):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS client_fts")
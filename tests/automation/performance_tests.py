@@ -18,8 +18,11 @@ from decimal import Decimal
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from memory_profiler import profile
 import tempfile
+import tracemalloc
 import sqlite3
 
+from sqlalchemy import event
+
 from app.models import (
     Appointment,
     AppointmentService,
@@ -32,8 +35,16 @@ from app.models import (
     Product,
     Brand,
     StockLevel,
+    StockMovement,
+    GoodsReceipt,
+    GoodsReceiptItem,
     db,
 )
+from app.services.client_search import CLIENT_PAGE_SIZE, ClientSearchService, encode_cursor
+from app.services.export_service import csv_stream, iter_rows, sales_export, xlsx_stream
+from app.services.fifo import FifoDepletion, open_batches_query
+from app.services.sales_service import SaleItemData, SalesService
+from app.services.stock_ledger import StockLedgerService
 
 
 class TestLargeDatasetPerformance:
@@ -271,6 +282,109 @@ class TestPeakLoadStress:
             db_sales_count >= total_created
         ), f"У БД знайдено {db_sales_count} продажів (очікувалось >= {total_created})"
 
+    def test_concurrent_fifo_sales_no_oversell(self, tmp_path, monkeypatch):
+        """
+        Крок 5.1.2a*: Паралельні продажі одного товару з кількох потоків
+
+        Кожен потік - окремий "воркер" зі своєю сесією над спільною файловою БД;
+        попит перевищує залишок, тож частина продажів має отримати відмову
+        """
+        from app import create_app
+        from app.services.sales_service import InsufficientStockError
+
+        stress_app = create_app(
+            test_config={
+                "TESTING": True,
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'stress.db'}",
+                "WTF_CSRF_ENABLED": False,
+                "SECRET_KEY": "test-secret-key",
+            }
+        )
+        initial_stock = 100
+        with stress_app.app_context():
+            db.create_all()
+            seller = User(username="stress_seller", password="x", full_name="Stress Seller", is_admin=True)
+            brand = Brand(name="Stress")
+            receipt = GoodsReceipt(receipt_date=date(2025, 1, 1), user=seller)
+            db.session.add_all([seller, brand, receipt])
+            db.session.flush()
+            product = Product(name="Stress", sku="STRESS-1", brand_id=brand.id, current_sale_price=Decimal("50.00"))
+            db.session.add(product)
+            db.session.flush()
+            for batch in range(10):
+                db.session.add(
+                    GoodsReceiptItem(
+                        receipt_id=receipt.id,
+                        product_id=product.id,
+                        quantity_received=10,
+                        quantity_remaining=10,
+                        cost_price_per_unit=Decimal(10 + batch),
+                        receipt_date=datetime(2025, 1, 1) + timedelta(hours=batch),
+                    )
+                )
+            StockLevel.query.filter_by(product_id=product.id).one().quantity = initial_stock
+            db.session.commit()
+            seller_id, product_id = seller.id, product.id
+            db.session.remove()
+
+        # Розширюємо вікно між читанням партій і записом, щоб потоки гарантовано перетиналися
+        take = FifoDepletion.take
+
+        def slow_take(fifo, *args):
+            time.sleep(0.002)
+            return take(fifo, *args)
+
+        monkeypatch.setattr(FifoDepletion, "take", slow_take)
+
+        workers, sales_per_worker = 8, 10
+        barrier = threading.Barrier(workers)
+
+        def sell(worker):
+            sold, rejected, errors = 0, 0, []
+            with stress_app.app_context():
+                barrier.wait()
+                for i in range(sales_per_worker):
+                    quantity = 1 + (worker + i) % 3
+                    try:
+                        SalesService.create_sale(
+                            user_id=seller_id,
+                            created_by_user_id=seller_id,
+                            sale_items=[SaleItemData(product_id, quantity)],
+                        )
+                        sold += quantity
+                    except InsufficientStockError:
+                        rejected += 1
+                    except Exception as e:
+                        errors.append(repr(e))
+                db.session.remove()
+            return sold, rejected, errors
+
+        print("\n🧪 Паралельні продажі одного товару...")
+        start_time = time.time()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(sell, range(workers)))
+        total_time = time.time() - start_time
+
+        sold = sum(result[0] for result in results)
+        rejected = sum(result[1] for result in results)
+        errors = [error for result in results for error in result[2]]
+
+        with stress_app.app_context():
+            stock = StockLevel.query.filter_by(product_id=product_id).one().quantity
+            remaining = [item.quantity_remaining for item in GoodsReceiptItem.query.filter_by(product_id=product_id)]
+            sold_in_db = db.session.query(db.func.sum(SaleItem.quantity)).scalar() or 0
+            db.session.remove()
+            db.engine.dispose()
+
+        print(f"✅ Продано {sold} од., відмов {rejected}, помилок {len(errors)} за {total_time:.2f}с")
+        print(f"📦 Залишок {stock}, у партіях {sum(remaining)}")
+
+        assert not errors, errors
+        assert rejected > 0, "Попит мав перевищити залишок"
+        assert sold == sold_in_db == initial_stock - stock, "Продана кількість не збігається з рухом залишку"
+        assert stock >= 0 and min(remaining) >= 0, "Перепродаж: від'ємний залишок"
+        assert sum(remaining) == stock, "Залишок по партіях розійшовся із залишком товару"
+
     def test_concurrent_report_generation(self, app, session, admin_user):
         """
         Крок 5.1.2b: Одночасна генерація звітів
@@ -591,6 +705,81 @@ class TestCriticalOperationsProfiling:
         assert avg_time < 0.5, f"Середній час створення продажу {avg_time:.3f}с (максимум 0.5с)"
         assert max_time < 1.0, f"Максимальний час створення продажу {max_time:.3f}с (максимум 1с)"
 
+    def test_forty_line_sale_fifo(self, app, session, admin_user):
+        """
+        Крок 5.1.4c: Продаж на 40 позицій через спільний FIFO-рушій
+
+        Кількість SQL-запитів не повинна залежати від кількості позицій
+        """
+        print("\n🧪 Продаж на 40 позицій...")
+
+        brand = Brand(name="Bench")
+        receipt = GoodsReceipt(receipt_date=date(2025, 1, 1), user_id=admin_user.id)
+        session.add_all([brand, receipt])
+        session.flush()
+        products = [
+            Product(name=f"Товар {i}", sku=f"BENCH-{i}", brand_id=brand.id, current_sale_price=Decimal("50.00"))
+            for i in range(40)
+        ]
+        session.add_all(products)
+        session.flush()
+        session.execute(
+            GoodsReceiptItem.__table__.insert(),
+            [
+                {
+                    "receipt_id": receipt.id,
+                    "product_id": product.id,
+                    "quantity_received": 10,
+                    "quantity_remaining": 10,
+                    "cost_price_per_unit": Decimal(10 + batch),
+                    "receipt_date": datetime(2025, 1, 1 + batch),
+                }
+                for product in products
+                for batch in range(3)
+            ],
+        )
+        StockLevel.query.filter(StockLevel.product_id.in_([p.id for p in products])).update({"quantity": 30})
+        session.commit()
+        product_ids = [product.id for product in products]
+        admin_id = admin_user.id
+
+        statements = []
+
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            # Вставки позицій продажу - по одній на рядок (unit of work), решта не повинна залежати від кількості
+            if not statement.startswith("INSERT INTO sale_item"):
+                statements.append(statement)
+
+        timings = []
+        statement_counts = []
+        event.listen(db.engine, "before_cursor_execute", count_statement)
+        try:
+            for _ in range(7):
+                statements.clear()
+                start_time = time.perf_counter()
+                sale = SalesService.create_sale(
+                    user_id=admin_id,
+                    created_by_user_id=admin_id,
+                    sale_items=[SaleItemData(product_id, 4) for product_id in product_ids],
+                )
+                timings.append(time.perf_counter() - start_time)
+                statement_counts.append(len(statements))
+                batch_statements = [st.split()[0] for st in statements if "goods_receipt_item" in st]
+                assert sale.total_amount == Decimal("8000.00")
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count_statement)
+
+        remaining = session.execute(
+            db.text("SELECT SUM(quantity_remaining) FROM goods_receipt_item WHERE receipt_id = :r"), {"r": receipt.id}
+        ).scalar()
+        timings.sort()
+        print(f"📊 40 позицій: медіана {timings[len(timings) // 2] * 1000:.2f} мс, SQL-запитів {statement_counts}")
+
+        assert remaining == 40 * (30 - 7 * 4)
+        assert batch_statements == ["SELECT", "UPDATE"], batch_statements  # одна вибірка партій і один executemany
+        assert max(statement_counts) < 25, f"Кількість запитів росте з позиціями: {statement_counts}"
+        assert timings[len(timings) // 2] < 0.5
+
     def test_complex_query_performance(self, app, session, admin_user, regular_user):
         """
         Крок 5.1.4b: Профілювання складних запитів
@@ -653,6 +842,130 @@ class TestCriticalOperationsProfiling:
             ), f"Запит '{query_info['name']}' виконується {avg_time:.3f}с (очікувалось < {expected_time}с)"
 
 
+class TestScheduleGridPerformance:
+    """
+    Профілювання побудови сітки розкладу
+
+    Порівнює попередній перебір усіх слотів для кожного запису з
+    арифметичним розміщенням у ScheduleGrid
+    """
+
+    def test_grid_placement_vs_slot_scan(self):
+        """
+        Розміщення 20 майстрів × 25 записів на 53 слотах
+        """
+        from app.routes.main import generate_time_slots
+        from app.services.schedule_grid import ScheduleGrid
+
+        print("\n🧪 Порівняння побудови сітки розкладу...")
+
+        slots = generate_time_slots(8, 21, 15)
+        appointments = []
+        for master_id in range(1, 21):
+            for i in range(25):
+                start_minutes = 8 * 60 + (i * 35 + master_id * 5) % (12 * 60)
+                end_minutes = start_minutes + 45
+                appointments.append(
+                    (
+                        master_id,
+                        dt_time(start_minutes // 60, start_minutes % 60),
+                        dt_time(end_minutes // 60, end_minutes % 60),
+                    )
+                )
+        details = {"id": 1, "css_class": "status-scheduled"}
+        iterations = 20
+
+        def legacy_build():
+            data = {m: {slot.strftime("%H:%M"): [] for slot in slots} for m in range(1, 21)}
+            for master_id, start, end in appointments:
+                start_str = start.strftime("%H:%M")
+                for slot in slots:
+                    slot_str = slot.strftime("%H:%M")
+                    if start <= slot < end:
+                        entry = details.copy()
+                        entry["display_type"] = "full" if slot_str == start_str else "continuation"
+                        data[master_id][slot_str].append(entry)
+            return data
+
+        def grid_build():
+            grid = ScheduleGrid(slots)
+            columns = {m: grid.new_column() for m in range(1, 21)}
+            for master_id, start, end in appointments:
+                grid.place(columns[master_id], start, end, details)
+            return {m: grid.column_to_dict(column) for m, column in columns.items()}
+
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            legacy_data = legacy_build()
+        legacy_time = (time.perf_counter() - start_time) / iterations
+
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            grid_data = grid_build()
+        grid_time = (time.perf_counter() - start_time) / iterations
+
+        print(f"📊 Побудова сітки ({len(appointments)} записів):")
+        print(f"   Перебір слотів: {legacy_time*1000:.2f} мс")
+        print(f"   ScheduleGrid: {grid_time*1000:.2f} мс")
+
+        occupied = lambda data: {(m, s, len(e)) for m, col in data.items() for s, e in col.items() if e}  # noqa: E731
+        assert occupied(grid_data) == occupied(legacy_data), "Сітка відрізняється від попереднього алгоритму"
+        assert grid_time < legacy_time, f"ScheduleGrid повільніший: {grid_time:.4f}с vs {legacy_time:.4f}с"
+
+    def test_first_free_slot_lookup(self, app, session, test_client):
+        """
+        Найближчий вільний 90-хвилинний слот серед 10 майстрів на 14 днів
+        """
+        from app.services.availability_service import AvailabilityService
+
+        print("\n🧪 Пошук найближчого вільного слоту...")
+
+        masters = [
+            User(username=f"slot_master_{i}", password="x", full_name=f"Майстер {i}", is_active_master=True)
+            for i in range(10)
+        ]
+        service = Service(name="Фарбування 90", description="", duration=90, base_price=500)
+        session.add_all(masters + [service])
+        session.commit()
+
+        # Майже повністю зайняті дні: щогодинні записи з 45-хвилинними вікнами
+        start_day = date.today() + timedelta(days=1)
+        appointments = []
+        for offset in range(14):
+            day = start_day + timedelta(days=offset)
+            for master in masters:
+                for hour in range(8, 21):
+                    appointments.append(
+                        Appointment(
+                            client_id=test_client.id,
+                            master_id=master.id,
+                            date=day,
+                            start_time=dt_time(hour, 0),
+                            end_time=dt_time(hour, 15) if hour < 20 else dt_time(21, 0),
+                        )
+                    )
+        # Останній день має одне 90-хвилинне вікно у першого майстра
+        last_day = start_day + timedelta(days=13)
+        first_master_last_day = appointments[-13 * 10 : -13 * 9]
+        for appointment in first_master_last_day:
+            if appointment.start_time in (dt_time(12, 0), dt_time(13, 0)):
+                appointments.remove(appointment)
+        session.add_all(appointments)
+        session.commit()
+
+        start_time = time.perf_counter()
+        slots = AvailabilityService.find_available_slots([service.id], from_date=start_day, days=14, limit=1)
+        lookup_time = time.perf_counter() - start_time
+
+        print(f"📊 Пошук серед {len(appointments)} записів: {lookup_time*1000:.2f} мс")
+
+        assert len(slots) == 1
+        assert slots[0].date == last_day
+        assert slots[0].master_id == masters[0].id
+        assert slots[0].start_time == dt_time(11, 15)
+        assert lookup_time < 1.0, f"Пошук занадто повільний: {lookup_time:.3f}с"
+
+
 class TestLargeReportsProcessing:
     """
     Кроки 5.2.1: Тест обробки великих обсягів даних в звітах
@@ -755,6 +1068,158 @@ class TestLargeReportsProcessing:
                 generation_time < expected_time
             ), f"Звіт '{scenario['name']}' генерувався {generation_time:.2f}с (максимум {expected_time}с)"
 
+    def test_financial_summary_matches_legacy_report(
+        self, app, session, admin_user, regular_user, test_client, test_service, test_product, payment_methods
+    ):
+        """
+        Крок 5.2.1c: GROUP BY фінансовий звіт дає ті самі цифри, що й попередній перебір у Python
+        """
+        import random
+        from decimal import ROUND_HALF_UP
+
+        from sqlalchemy import event
+
+        from app.models import refresh_daily_rollup
+        from app.services.report_service import ReportService
+
+        print("\n🧪 Порівняння фінансового звіту з попередньою реалізацією...")
+
+        rng = random.Random(42)
+        method_ids = [pm.id for pm in payment_methods] + [None]
+        start_date = date.today() - timedelta(days=59)
+        end_date = date.today()
+
+        appointment_rows = [
+            {
+                "client_id": test_client.id,
+                "master_id": rng.choice([admin_user.id, regular_user.id]),
+                "date": start_date + timedelta(days=rng.randrange(-5, 65)),
+                "start_time": dt_time(9 + i % 10, 0),
+                "end_time": dt_time(10 + i % 10, 0),
+                "status": rng.choice(["completed", "completed", "completed", "scheduled", "cancelled"]),
+                "payment_status": "paid",
+                "amount_paid": rng.choice([None, Decimal("0"), Decimal(f"{rng.randrange(100, 2000)}.{i % 100:02d}")]),
+                "payment_method_id": rng.choice(method_ids),
+                "discount_percentage": rng.choice([Decimal("0"), Decimal("5"), Decimal("10"), Decimal("12.5")]),
+            }
+            for i in range(3000)
+        ]
+        session.execute(Appointment.__table__.insert(), appointment_rows)
+        appointment_ids = [row[0] for row in session.query(Appointment.id).all()]
+        session.execute(
+            AppointmentService.__table__.insert(),
+            [
+                {
+                    "appointment_id": appointment_id,
+                    "service_id": test_service.id,
+                    "price": rng.randrange(5000, 90000) / 100,
+                }
+                for appointment_id in appointment_ids
+                for _ in range(rng.randrange(0, 4))
+            ],
+        )
+
+        session.execute(
+            Sale.__table__.insert(),
+            [
+                {
+                    "sale_date": datetime.combine(start_date + timedelta(days=rng.randrange(-5, 65)), dt_time(12, 0)),
+                    "user_id": admin_user.id,
+                    "created_by_user_id": admin_user.id,
+                    "total_amount": Decimal(f"{rng.randrange(50, 3000)}.{i % 100:02d}"),
+                    "payment_method_id": rng.choice(method_ids),
+                }
+                for i in range(2000)
+            ],
+        )
+        sale_ids = [row[0] for row in session.query(Sale.id).all()]
+        session.execute(
+            SaleItem.__table__.insert(),
+            [
+                {
+                    "sale_id": sale_id,
+                    "product_id": test_product.id,
+                    "quantity": rng.randrange(1, 4),
+                    "price_per_unit": Decimal(f"{rng.randrange(50, 900)}.50"),
+                    "cost_price_per_unit": Decimal(f"{rng.randrange(20, 400)}.25"),
+                }
+                for sale_id in sale_ids
+                for _ in range(rng.randrange(1, 3))
+            ],
+        )
+        # Core-вставки обходять події сесії - перебудовуємо денні зрізи, як `flask rebuild-daily-rollup`
+        refresh_daily_rollup(session.connection(), [start_date + timedelta(days=d) for d in range(-5, 65)])
+        session.commit()
+        session.expire_all()
+
+        def legacy_financial_report():
+            # Попередня реалізація reports.financial_report (перебір ORM-об'єктів)
+            service_revenue = Decimal("0.00")
+            product_revenue = Decimal("0.00")
+            total_cogs = Decimal("0.00")
+            completed_appointments = Appointment.query.filter(
+                Appointment.date >= start_date, Appointment.date <= end_date, Appointment.status == "completed"
+            ).all()
+            payment_methods_from_db = PaymentMethod.query.filter_by(is_active=True).all()
+            totals = {pm.name: Decimal("0.00") for pm in payment_methods_from_db}
+            totals["Не вказано"] = Decimal("0.00")
+            for appointment in completed_appointments:
+                if appointment.amount_paid is not None and appointment.amount_paid > 0:
+                    amount = Decimal(str(appointment.amount_paid))
+                else:
+                    amount = sum(Decimal(str(service.price)) for service in appointment.services)
+                    if appointment.discount_percentage:
+                        amount = amount * (
+                            Decimal("1.0") - Decimal(str(appointment.discount_percentage)) / Decimal("100.0")
+                        )
+                service_revenue += amount
+                method = (
+                    session.get(PaymentMethod, appointment.payment_method_id) if appointment.payment_method_id else None
+                )
+                totals[method.name if method else "Не вказано"] += amount
+            product_sales = Sale.query.filter(
+                db.func.date(Sale.sale_date) >= start_date, db.func.date(Sale.sale_date) <= end_date
+            ).all()
+            for sale in product_sales:
+                method = session.get(PaymentMethod, sale.payment_method_id) if sale.payment_method_id else None
+                totals[method.name if method else "Не вказано"] += Decimal(str(sale.total_amount))
+                for item in sale.items:
+                    product_revenue += Decimal(str(item.price_per_unit)) * Decimal(str(item.quantity))
+                    total_cogs += Decimal(str(item.cost_price_per_unit)) * Decimal(str(item.quantity))
+            return service_revenue, product_revenue, total_cogs, sorted(totals.items())
+
+        statements = []
+
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        start_time = time.perf_counter()
+        legacy = legacy_financial_report()
+        legacy_time = time.perf_counter() - start_time
+
+        session.expire_all()
+        event.listen(db.engine, "before_cursor_execute", count_statement)
+        start_time = time.perf_counter()
+        summary = ReportService.get_financial_summary(start_date, end_date)
+        summary_time = time.perf_counter() - start_time
+        event.remove(db.engine, "before_cursor_execute", count_statement)
+
+        print(f"📊 Фінансовий звіт за 60 днів ({len(appointment_ids)} записів, {len(sale_ids)} продажів):")
+        print(f"   Перебір у Python: {legacy_time*1000:.1f} мс")
+        print(f"   GROUP BY: {summary_time*1000:.1f} мс, запитів: {len(statements)}")
+
+        def cents(value):
+            return Decimal(str(value)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+        service_revenue, product_revenue, total_cogs, breakdown = legacy
+        assert summary["service_revenue"] == cents(service_revenue)
+        assert summary["product_revenue"] == cents(product_revenue)
+        assert summary["total_cogs"] == cents(total_cogs)
+        assert summary["total_revenue"] == cents(service_revenue) + cents(product_revenue)
+        assert summary["payment_breakdown"] == [(name, cents(amount)) for name, amount in breakdown]
+        assert len(statements) <= 5, f"Забагато запитів: {len(statements)}"
+        assert summary_time < legacy_time
+
     def test_large_salary_report_with_aggregation(
         self, app, session, admin_user, regular_user, test_client, test_service, payment_methods
     ):
@@ -1009,6 +1474,421 @@ class TestDatabaseOptimization:
                 execution_time < expected_time
             ), f"Індексований запит '{query_info['name']}' зайняв {execution_time:.3f}с (максимум {expected_time}с)"
 
+    def test_overlap_check_with_years_of_history(self, app, session, test_client):
+        """
+        Крок 5.2.2c: Перевірка накладань на індексі (master_id, date, start_time)
+
+        3 роки історії: 10 майстрів × 8 записів на день
+        """
+        from app.services.overlap_service import OverlapService
+
+        print("\n🧪 Перевірка накладань з багаторічною історією...")
+
+        masters = [User(username=f"overlap_master_{i}", password="x", full_name=f"Майстер {i}") for i in range(10)]
+        session.add_all(masters)
+        session.commit()
+
+        first_day = date.today() - timedelta(days=3 * 365)
+        rows = [
+            {
+                "client_id": test_client.id,
+                "master_id": master.id,
+                "date": first_day + timedelta(days=offset),
+                "start_time": dt_time(9 + slot, 0),
+                "end_time": dt_time(9 + slot, 45),
+                "status": "completed",
+                "payment_status": "paid",
+                "discount_percentage": Decimal("0"),
+            }
+            for offset in range(3 * 365)
+            for master in masters
+            for slot in range(8)
+        ]
+        session.execute(Appointment.__table__.insert(), rows)
+        session.commit()
+
+        plan = session.execute(
+            db.text(
+                "EXPLAIN QUERY PLAN SELECT id FROM appointment WHERE master_id = :m AND date = :d "
+                "AND start_time < :e AND end_time > :s AND status != 'cancelled'"
+            ),
+            {"m": masters[0].id, "d": date.today(), "s": "10:00:00", "e": "11:00:00"},
+        ).fetchall()
+        plan_text = " ".join(str(row[-1]) for row in plan)
+        print(f"📋 План: {plan_text}")
+        assert "ix_appointment_master_date_start" in plan_text, f"Індекс не використовується: {plan_text}"
+
+        check_day = first_day + timedelta(days=500)
+        iterations = 500
+        timings = []
+        for i in range(iterations):
+            start = dt_time(9 + i % 8, 30)
+            start_time = time.perf_counter()
+            overlap = OverlapService.has_overlap(masters[i % 10].id, check_day, start, dt_time(start.hour + 1, 0))
+            timings.append(time.perf_counter() - start_time)
+            assert overlap
+
+        # Сам індексований запит без накладних витрат ORM
+        raw_connection = session.connection().connection.driver_connection
+        sql_timings = []
+        for i in range(iterations):
+            start_time = time.perf_counter()
+            found = raw_connection.execute(
+                "SELECT 1 FROM appointment WHERE master_id = ? AND date = ? AND start_time < ? "
+                "AND end_time > ? AND status != 'cancelled' LIMIT 1",
+                (masters[i % 10].id, check_day.isoformat(), f"{10 + i % 8:02d}:00:00.000000", f"{9 + i % 8:02d}:30:00"),
+            ).fetchone()
+            sql_timings.append(time.perf_counter() - start_time)
+            assert found
+
+        timings.sort()
+        sql_timings.sort()
+        median = timings[len(timings) // 2]
+        sql_median = sql_timings[len(sql_timings) // 2]
+        print(f"📊 Перевірка серед {len(rows)} записів:")
+        print(f"   OverlapService.has_overlap: медіана {median*1000:.3f} мс")
+        print(f"   SQL-запит: медіана {sql_median*1000:.3f} мс")
+
+        assert sql_median < 0.001, f"Запит накладань зайняв {sql_median*1000:.3f} мс (максимум 1 мс)"
+        assert median < 0.005, f"Перевірка накладань зайняла {median*1000:.3f} мс (максимум 5 мс)"
+
+    def test_sale_day_index_plan(self, app, session, admin_user, regular_user):
+        """
+        Крок 5.2.2d: Продажі за день через індекс (sale_day, user_id) замість date(sale_date)
+
+        2 роки історії: 2 продавці × 60 продажів на день
+        """
+        print("\n🧪 Вибірка продажів за день: date(sale_date) проти sale_day...")
+
+        first_day = date.today() - timedelta(days=2 * 365)
+        session.execute(
+            Sale.__table__.insert(),
+            [
+                {
+                    "sale_date": datetime.combine(first_day + timedelta(days=offset), dt_time(9 + i % 10, i % 60)),
+                    "user_id": seller.id,
+                    "created_by_user_id": admin_user.id,
+                    "total_amount": Decimal("100.00"),
+                }
+                for offset in range(2 * 365)
+                for seller in (admin_user, regular_user)
+                for i in range(60)
+            ],
+        )
+        session.commit()
+        check_day = first_day + timedelta(days=400)
+
+        queries = {
+            "date(sale_date)": (
+                "SELECT COUNT(*), SUM(total_amount) FROM sale WHERE date(sale_date) = :d AND user_id = :u"
+            ),
+            "sale_day": "SELECT COUNT(*), SUM(total_amount) FROM sale WHERE sale_day = :d AND user_id = :u",
+        }
+        params = {"d": check_day.isoformat(), "u": regular_user.id}
+        plans = {}
+        medians = {}
+        for name, sql in queries.items():
+            plan = session.execute(db.text(f"EXPLAIN QUERY PLAN {sql}"), params).fetchall()
+            plans[name] = " ".join(str(row[-1]) for row in plan)
+            timings = []
+            for _ in range(50):
+                start_time = time.perf_counter()
+                count, total = session.execute(db.text(sql), params).one()
+                timings.append(time.perf_counter() - start_time)
+                assert count == 60 and total == 6000
+            timings.sort()
+            medians[name] = timings[len(timings) // 2]
+            print(f"📋 {name}: {plans[name]}")
+            print(f"   медіана {medians[name]*1000:.3f} мс")
+
+        assert plans["date(sale_date)"].startswith("SCAN sale"), plans["date(sale_date)"]
+        assert "USING INDEX ix_sale_day_user" in plans["sale_day"], f"Індекс не використовується: {plans['sale_day']}"
+        assert medians["sale_day"] * 10 < medians["date(sale_date)"], "Індексований запит не дав прискорення"
+
+    def test_client_fts_search(self, app, session, admin_user):
+        """
+        Крок 5.2.2e: Пошук клієнтів через FTS5 проти фільтрації всіх клієнтів у Python
+
+        20 000 клієнтів з кириличними іменами
+        """
+        print("\n🧪 Пошук серед 20 000 клієнтів...")
+        admin_id = admin_user.id
+
+        first_names = ["Олена", "Ірина", "Марія", "Оксана", "Юлія", "Анна", "Наталія", "Світлана"]
+        last_names = ["Петренко", "Коваленко", "Шевченко", "Бондаренко", "Ткаченко", "Мельник", "Кравчук"]
+        session.execute(
+            Client.__table__.insert(),
+            [
+                {
+                    "name": f"{first_names[i % 8]} {last_names[i % 7]}{i}",
+                    "phone": f"+38050{i:07d}",
+                    "email": f"client{i}@example.com",
+                    "notes": "Постійна клієнтка" if i % 3 == 0 else None,
+                }
+                for i in range(20_000)
+            ],
+        )
+        session.commit()
+        session.expunge_all()
+
+        def legacy_search(search):
+            words = search.lower().split()
+            return [client for client in Client.query.all() if all(word in client.name.lower() for word in words)][:10]
+
+        timings = {"python": [], "fts": []}
+        for search in ("оЛЕНА", "марія ткач", "коваленко1999"):
+            for _ in range(5):
+                start_time = time.perf_counter()
+                legacy = legacy_search(search)
+                timings["python"].append(time.perf_counter() - start_time)
+                session.expunge_all()
+
+                start_time = time.perf_counter()
+                found = ClientSearchService.search(db.session.get(User, admin_id), search, limit=10)
+                timings["fts"].append(time.perf_counter() - start_time)
+                session.expunge_all()
+                assert len(found) == len(legacy) > 0, search
+
+        plan = session.execute(
+            db.text("EXPLAIN QUERY PLAN SELECT rowid FROM client_fts WHERE client_fts MATCH :q"), {"q": '"олена"*'}
+        ).fetchall()
+        plan_text = " ".join(str(row[-1]) for row in plan)
+        medians = {name: sorted(values)[len(values) // 2] for name, values in timings.items()}
+        print(f"📋 {plan_text}")
+        for name, median in medians.items():
+            print(f"   {name}: медіана {median * 1000:.2f} мс")
+
+        assert "VIRTUAL TABLE INDEX" in plan_text, plan_text
+        assert medians["fts"] * 5 < medians["python"], "FTS-пошук не дав прискорення"
+
+    def test_client_phone_suffix_lookup(self, app, session, admin_user):
+        """
+        Крок 5.2.2f: Пошук клієнта за останніми цифрами номера через phone_reversed
+
+        20 000 клієнтів, закінчення з 4-7 цифр
+        """
+        print("\n🧪 Пошук за закінченням номера серед 20 000 клієнтів...")
+        admin_id = admin_user.id
+
+        session.execute(
+            Client.__table__.insert(),
+            [{"name": f"Клієнт {i}", "phone": f"+38 (050) {i:03d}-{i % 97:02d}-{i % 89:02d}"} for i in range(20_000)],
+        )
+        session.commit()
+        session.expunge_all()
+
+        plan = session.execute(
+            db.text("EXPLAIN QUERY PLAN SELECT id FROM client WHERE phone_reversed >= :r AND phone_reversed < :e"),
+            {"r": "7654", "e": "7654:"},
+        ).fetchall()
+        plan_text = " ".join(str(row[-1]) for row in plan)
+
+        timings = {"substring": [], "suffix": []}
+        for suffix in ("1234", "56789", "9994012", "0000"):
+            for _ in range(5):
+                start_time = time.perf_counter()
+                legacy = {c.id for c in Client.query.all() if c.phone_normalized.endswith(suffix)}
+                timings["substring"].append(time.perf_counter() - start_time)
+                session.expunge_all()
+
+                start_time = time.perf_counter()
+                found = ClientSearchService.by_phone(db.session.get(User, admin_id), suffix, limit=10)
+                timings["suffix"].append(time.perf_counter() - start_time)
+                session.expunge_all()
+                assert {c.id for c in found} <= legacy and len(found) == min(10, len(legacy)), suffix
+
+        medians = {name: sorted(values)[len(values) // 2] for name, values in timings.items()}
+        print(f"📋 {plan_text}")
+        for name, median in medians.items():
+            print(f"   {name}: медіана {median * 1000:.2f} мс")
+
+        assert plan_text.startswith("SEARCH client") and "ix_client_phone_reversed" in plan_text, plan_text
+        assert medians["suffix"] * 10 < medians["substring"], "Пошук за закінченням не дав прискорення"
+
+    def test_client_keyset_pagination(self, app, session, admin_user):
+        """
+        Крок 5.2.2g: Глибока сторінка списку клієнтів: OFFSET проти курсора (name, id)
+
+        50 000 клієнтів, сторінка біля кінця списку
+        """
+        print("\n🧪 Пагінація 50 000 клієнтів...")
+        admin_id = admin_user.id
+
+        session.execute(
+            Client.__table__.insert(),
+            [{"name": f"Клієнт {i % 5000:04d}", "phone": f"+38050{i:07d}"} for i in range(50_000)],
+        )
+        session.commit()
+        session.expunge_all()
+
+        plan = session.execute(
+            db.text("EXPLAIN QUERY PLAN SELECT id FROM client WHERE (name, id) > (:n, :i) ORDER BY name, id LIMIT 51"),
+            {"n": "Клієнт 4900", "i": 0},
+        ).fetchall()
+        plan_text = " ".join(str(row[-1]) for row in plan)
+
+        offset = 49_900
+        cursor_client = Client.query.order_by(Client.name, Client.id).offset(offset - 1).first()
+        cursor = encode_cursor(cursor_client)
+        session.expunge_all()
+
+        timings = {"offset": [], "keyset": []}
+        for _ in range(10):
+            start_time = time.perf_counter()
+            by_offset = Client.query.order_by(Client.name, Client.id).offset(offset).limit(CLIENT_PAGE_SIZE).all()
+            timings["offset"].append(time.perf_counter() - start_time)
+
+            start_time = time.perf_counter()
+            page = ClientSearchService.page(db.session.get(User, admin_id), after=cursor)
+            timings["keyset"].append(time.perf_counter() - start_time)
+            assert [c.id for c in page.clients] == [c.id for c in by_offset]
+            session.expunge_all()
+
+        medians = {name: sorted(values)[len(values) // 2] for name, values in timings.items()}
+        print(f"📋 {plan_text}")
+        for name, median in medians.items():
+            print(f"   {name}: медіана {median * 1000:.2f} мс")
+
+        assert "ix_client_name_id" in plan_text and "TEMP B-TREE" not in plan_text, plan_text
+        assert medians["keyset"] < medians["offset"], "Курсор не швидший за OFFSET на глибокій сторінці"
+
+    def test_open_batches_partial_index_plan(self, app, session, admin_user):
+        """
+        Крок 5.2.2h: Вибірка відкритих партій FIFO через частковий індекс
+
+        Багаторічна історія надходжень: 40 товарів × 1 000 партій, відкриті лише останні 20
+        """
+        print("\n🧪 Відкриті партії серед 40 000 надходжень...")
+
+        brand = Brand(name="Batches")
+        receipt = GoodsReceipt(receipt_date=date(2020, 1, 1), user_id=admin_user.id)
+        session.add_all([brand, receipt])
+        session.flush()
+        products = [Product(name=f"Партія {i}", sku=f"BATCH-{i}", brand_id=brand.id) for i in range(40)]
+        session.add_all(products)
+        session.flush()
+        first_day = datetime(2020, 1, 1)
+        session.execute(
+            GoodsReceiptItem.__table__.insert(),
+            [
+                {
+                    "receipt_id": receipt.id,
+                    "product_id": product.id,
+                    "quantity_received": 10,
+                    "quantity_remaining": 10 if batch >= 980 else 0,
+                    "cost_price_per_unit": Decimal("10.00"),
+                    "receipt_date": first_day + timedelta(days=batch),
+                }
+                for product in products
+                for batch in range(1000)
+            ],
+        )
+        session.commit()
+
+        index = session.execute(
+            db.text("SELECT sql FROM sqlite_master WHERE name = 'ix_goods_receipt_item_open_batches'")
+        ).scalar()
+        assert index is not None and "WHERE quantity_remaining > 0" in index, index
+
+        product_ids = [product.id for product in products[:5]]
+        statement = open_batches_query(product_ids)
+        # IN (...) розгортається лише під час виконання, тож підставляємо значення в текст
+        sql = str(statement.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}))
+        plan = session.execute(db.text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+        plan_text = " ".join(str(row[-1]) for row in plan)
+
+        queries = {
+            "full scan": sql.replace("FROM goods_receipt_item", "FROM goods_receipt_item NOT INDEXED"),
+            "partial index": sql,
+        }
+        medians = {}
+        for name, query in queries.items():
+            timings = []
+            for _ in range(20):
+                start_time = time.perf_counter()
+                rows = session.execute(db.text(query)).fetchall()
+                timings.append(time.perf_counter() - start_time)
+                assert len(rows) == 5 * 20
+            timings.sort()
+            medians[name] = timings[len(timings) // 2]
+
+        print(f"📋 {plan_text}")
+        for name, median in medians.items():
+            print(f"   {name}: медіана {median * 1000:.3f} мс")
+
+        assert "USING INDEX ix_goods_receipt_item_open_batches" in plan_text, plan_text
+        assert "TEMP B-TREE" not in plan_text, f"Сортування FIFO не з індексу: {plan_text}"
+        assert medians["partial index"] * 5 < medians["full scan"], "Частковий індекс не дав прискорення"
+
+    def test_point_in_time_stock_from_snapshots(self, app, session):
+        """
+        Крок 5.2.2i: Залишок на дату з місячного зрізу та суми рухів за індексом
+
+        Журнал за 4 роки: 100 товарів, рух кожні 2 дні
+        """
+        print("\n🧪 Залишок на дату по журналу руху товарів...")
+
+        brand = Brand(name="Ledger")
+        session.add(brand)
+        session.flush()
+        products = [Product(name=f"Журнал {i}", sku=f"LEDGER-{i}", brand_id=brand.id) for i in range(100)]
+        session.add_all(products)
+        session.flush()
+        first_day = date(2021, 1, 1)
+        session.execute(
+            StockMovement.__table__.insert(),
+            [
+                {
+                    "product_id": product.id,
+                    "day": first_day + timedelta(days=offset),
+                    "quantity": 5 if offset % 3 else -7,
+                    "kind": "adjustment",
+                }
+                for product in products
+                for offset in range(0, 4 * 365, 2)
+            ],
+        )
+        session.commit()
+
+        day = date(2024, 11, 20)
+
+        def median_lookup():
+            timings = []
+            for _ in range(10):
+                start_time = time.perf_counter()
+                stock = StockLedgerService.stock_on(day)
+                timings.append(time.perf_counter() - start_time)
+            timings.sort()
+            return stock, timings[len(timings) // 2]
+
+        replayed, full_replay = median_lookup()
+        rows = StockLedgerService.take_snapshots(through=day)
+        session.commit()
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if "stock_movement" in statement:
+                statements.append((statement, parameters))
+
+        event.listen(db.engine, "before_cursor_execute", capture)
+        try:
+            stock, from_snapshot = median_lookup()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", capture)
+
+        statement, parameters = statements[-1]
+        plan = session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        plan_text = " ".join(str(row[-1]) for row in plan)
+
+        print(f"📋 {plan_text}")
+        print(f"   Зрізів: {rows} рядків")
+        print(f"   Повний перебір журналу: медіана {full_replay * 1000:.3f} мс")
+        print(f"   Зріз + рухи місяця: медіана {from_snapshot * 1000:.3f} мс")
+
+        assert stock == replayed
+        assert "INDEX ix_stock_movement" in plan_text and "day>?" in plan_text, plan_text
+        assert from_snapshot * 3 < full_replay, "Зрізи не скоротили вибірку рухів"
+
 
 class TestMemoryMonitoring:
     """
@@ -1166,6 +2046,61 @@ class TestMemoryMonitoring:
         # У тестовому середовищі різниця може бути мінімальною, тому допускаємо невелику похибку
         assert memory_saved >= -1.0, f"Неочікуване зростання пам'яті при очищенні: {memory_saved:.1f} MB"
 
+    @pytest.mark.slow
+    def test_streaming_export_memory(self, app, session, admin_user, regular_user):
+        """
+        Крок 5.2.3c: Потоковий експорт 500 000 продажів у CSV та XLSX
+
+        Пік пам'яті не повинен залежати від кількості рядків експорту
+        """
+        print("\n🧪 Потоковий експорт 500 000 продажів...")
+
+        total_rows = 500_000
+        first_day = date.today() - timedelta(days=365)
+        for batch_start in range(0, total_rows, 50_000):
+            session.execute(
+                Sale.__table__.insert(),
+                [
+                    {
+                        "sale_date": datetime.combine(first_day + timedelta(days=i % 365), dt_time(9 + i % 10, i % 60)),
+                        "user_id": (admin_user.id, regular_user.id)[i % 2],
+                        "created_by_user_id": admin_user.id,
+                        "total_amount": Decimal("100.00"),
+                    }
+                    for i in range(batch_start, batch_start + 50_000)
+                ],
+            )
+        session.commit()
+        session.expunge_all()
+
+        def run_export(stream, limit):
+            header, statement = sales_export(None, None)
+            gc.collect()
+            tracemalloc.start()
+            start_time = time.perf_counter()
+            size = sum(len(chunk) for chunk in stream(header, iter_rows(statement.limit(limit))))
+            elapsed = time.perf_counter() - start_time
+            peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            tracemalloc.stop()
+            return size, elapsed, peak
+
+        results = {}
+        for name, stream in (("csv", csv_stream), ("xlsx", xlsx_stream)):
+            for limit in (total_rows // 10, total_rows):
+                size, elapsed, peak = run_export(stream, limit)
+                results[name, limit] = peak
+                print(
+                    f"📊 {name} {limit} рядків: {size / 1024 / 1024:.1f} MB за {elapsed:.2f}с, "
+                    f"пік пам'яті {peak:.1f} MB"
+                )
+
+        for name in ("csv", "xlsx"):
+            small, full = results[name, total_rows // 10], results[name, total_rows]
+            assert (
+                full < small * 1.5 + 1.0
+            ), f"{name}: пам'ять зростає з розміром експорту ({small:.1f} → {full:.1f} MB)"
+            assert full < 20.0, f"{name}: занадто великий пік пам'яті: {full:.1f} MB"
+
 
 class TestCrashRecovery:
     """
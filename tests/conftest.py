@@ -1,6 +1,7 @@
 import os
 import uuid
 from datetime import date, datetime, time, timedelta
+from time import tzset
 
 import pytest
 from werkzeug.security import generate_password_hash
@@ -617,3 +618,16 @@ def sample_products_with_stock(session):
         assert stock.quantity > 0, f"Stock quantity is not positive for product {product.id}"
 
     return products
+
+
+@pytest.fixture(scope="function")
+def kyiv_time(monkeypatch):
+    """
+    Часовий пояс сервера Europe/Kyiv (UTC+2/UTC+3), щоб нічні за UTC продажі
+    потрапляли в наступний місцевий день.
+    """
+    monkeypatch.setenv("TZ", "Europe/Kyiv")
+    tzset()
+    yield
+    monkeypatch.undo()
+    tzset()
@@ -0,0 +1,88 @@
+"""
+Tests for double-booking rejection in appointment create/edit.
+"""
+
+from datetime import date, time, timedelta
+
+from app.models import Appointment
+
+
+def _form(test_client, master, day, start_time, test_service, **extra):
+    data = {
+        "client_id": test_client.id,
+        "master_id": master.id,
+        "date": day.strftime("%Y-%m-%d"),
+        "start_time": start_time,
+        "services": [str(test_service.id)],
+        "discount_percentage": "0",
+        "amount_paid": "0",
+    }
+    data.update(extra)
+    return data
+
+
+def _book(session, test_client, master, day, start, end):
+    appointment = Appointment(client_id=test_client.id, master_id=master.id, date=day, start_time=start, end_time=end)
+    session.add(appointment)
+    session.commit()
+    return appointment
+
+
+def test_create_rejects_overlap(session, admin_auth_client, test_client, regular_user, test_service):
+    day = date.today() + timedelta(days=3)
+    _book(session, test_client, regular_user, day, time(10, 0), time(11, 0))
+
+    response = admin_auth_client.post(
+        "/appointments/create",
+        data=_form(test_client, regular_user, day, "10:30", test_service, notes="overlap"),
+        follow_redirects=True,
+    )
+
+    assert "Майстер вже має записи в цей час" in response.text
+    assert "10:00-11:00" in response.text
+    assert Appointment.query.filter_by(notes="overlap").count() == 0
+
+
+def test_create_allows_adjacent_and_flagged_overlap(
+    session, admin_auth_client, test_client, regular_user, test_service
+):
+    day = date.today() + timedelta(days=3)
+    _book(session, test_client, regular_user, day, time(10, 0), time(11, 0))
+
+    admin_auth_client.post(
+        "/appointments/create",
+        data=_form(test_client, regular_user, day, "11:00", test_service, notes="adjacent"),
+        follow_redirects=True,
+    )
+    admin_auth_client.post(
+        "/appointments/create",
+        data=_form(test_client, regular_user, day, "10:15", test_service, notes="forced", allow_overlap="y"),
+        follow_redirects=True,
+    )
+
+    assert Appointment.query.filter_by(notes="adjacent").count() == 1
+    assert Appointment.query.filter_by(notes="forced").count() == 1
+
+
+def test_edit_ignores_itself_but_rejects_other_overlap(
+    session, admin_auth_client, test_client, regular_user, test_service
+):
+    day = date.today() + timedelta(days=3)
+    _book(session, test_client, regular_user, day, time(12, 0), time(13, 0))
+    edited = _book(session, test_client, regular_user, day, time(10, 0), time(11, 0))
+
+    response = admin_auth_client.post(
+        f"/appointments/edit/{edited.id}",
+        data=_form(test_client, regular_user, day, "10:15", test_service),
+        follow_redirects=False,
+    )
+    assert response.status_code == 302
+
+    response = admin_auth_client.post(
+        f"/appointments/edit/{edited.id}",
+        data=_form(test_client, regular_user, day, "11:45", test_service),
+        follow_redirects=True,
+    )
+    assert "Майстер вже має записи в цей час" in response.text
+    session.refresh(edited)
+    assert edited.start_time == time(10, 15)
@@ -8,7 +8,7 @@ from datetime import datetime, timezone
 import pytest
 from flask import url_for
 
-from app.models import Brand, InventoryAct, InventoryActItem, Product, StockLevel, User, db
+from app.models import Brand, InventoryAct, InventoryActItem, Product, StockLevel, StockMovement, User, db
 
 
 class TestInventoryActsBasic:
@@ -312,6 +312,21 @@ class TestInventoryActCompletion:
             stock_level = StockLevel.query.filter_by(product_id=item.product_id).first()
             assert stock_level.quantity == item.actual_quantity
 
+    def test_complete_inventory_act_records_adjustments(self, client, admin_user, inventory_act_with_data):
+        """Тест записи расхождений в журнал движения товаров."""
+        with client.session_transaction() as sess:
+            sess["_user_id"] = str(admin_user.id)
+            sess["_fresh"] = True
+            csrf_token = sess.get("csrf_token", "test_token")
+
+        act = inventory_act_with_data
+        client.post(url_for("products.inventory_acts_complete", act_id=act.id), data={"csrf_token": csrf_token})
+
+        adjustments = {
+            movement.source_id: movement.quantity for movement in StockMovement.query.filter_by(kind="adjustment")
+        }
+        assert adjustments == {item.id: item.discrepancy for item in act.items}
+
     def test_complete_already_completed_act(self, client, admin_user, inventory_act_with_data):
         """Тест попытки завершить уже завершенный акт."""
         act = inventory_act_with_data
@@ -367,6 +367,58 @@ def test_schedule_view_master(auth_client):
     assert "Розклад майстрів" in response.get_data(as_text=True)
 
 
+def _count_schedule_queries(client, session, selected_date):
+    """Повертає кількість SQL запитів, виконаних під час рендерингу розкладу."""
+    from sqlalchemy import event
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = client.get(url_for("main.schedule", date=selected_date.strftime("%Y-%m-%d")))
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    assert response.status_code == 200
+    return len(statements)
+
+
+def test_schedule_query_count_is_fixed(session, admin_auth_client, regular_user, test_client, test_service):
+    """Кількість запитів розкладу не залежить від кількості записів та історії."""
+    from datetime import timedelta
+
+    selected_date = date.today() + timedelta(days=1)
+
+    def add_appointments(day, count, start_hour=8):
+        for i in range(count):
+            appointment = Appointment(
+                client_id=test_client.id,
+                master_id=regular_user.id,
+                date=day,
+                start_time=time(start_hour + i % 12, 0),
+                end_time=time(start_hour + i % 12, 30),
+                status="completed" if i % 2 else "scheduled",
+                payment_status="paid" if i % 2 else "unpaid",
+            )
+            session.add(appointment)
+            session.flush()
+            session.add(AppointmentService(appointment_id=appointment.id, service_id=test_service.id, price=100.0))
+        session.commit()
+
+    add_appointments(selected_date, 2)
+    baseline = _count_schedule_queries(admin_auth_client, session, selected_date)
+
+    add_appointments(selected_date, 10)
+    for days_ago in range(1, 6):
+        add_appointments(date.today() - timedelta(days=days_ago), 5)
+    session.expire_all()
+
+    assert _count_schedule_queries(admin_auth_client, session, selected_date) == baseline
+
+
 def test_stats_view_admin(admin_auth_client):
     """Test admin view of the statistics page."""
     response = admin_auth_client.get(url_for("main.stats"))
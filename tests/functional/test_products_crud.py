@@ -1,6 +1,8 @@
 from decimal import Decimal
 from typing import Any
 
+from sqlalchemy import event
+
 from app.models import Brand, Product, StockLevel
 
 
@@ -451,6 +453,41 @@ class TestStockLevels:
         response_text = response.get_data(as_text=True)
         assert "Product from Brand One" in response_text
 
+    def test_stock_levels_page_query_count(self, admin_auth_client: Any, session: Any) -> None:
+        """Test that stock rows do not add queries per product."""
+        brand = Brand()
+        brand.name = "Counted Brand"
+        session.add(brand)
+        session.commit()
+        for i in range(25):
+            product = Product()
+            product.name = f"Counted Product {i:02d}"
+            product.sku = f"COUNT{i:03d}"
+            product.brand_id = brand.id
+            session.add(product)
+        session.commit()
+
+        statements: list = []
+
+        def record(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+            statements.append(statement)
+
+        admin_auth_client.get("/products/stock")  # користувач сесії та загальна кількість
+        engine = session.get_bind().engine
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            counts = []
+            for page in (1, 2):  # 20 та 5 товарів
+                statements.clear()
+                response = admin_auth_client.get(f"/products/stock?page={page}")
+                assert response.status_code == 200
+                counts.append(len(statements))
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert "Counted Product 24" in response.get_data(as_text=True)
+        assert counts == [2, 2], statements  # рядки сторінки та бренди для фільтра
+
 
 class TestInventoryIntegration:
     """Tests for inventory integration features."""
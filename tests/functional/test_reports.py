@@ -3023,3 +3023,38 @@ def test_low_stock_alerts_navigation_links(client, auth, app, test_db):
         # Check for proper URLs in links
         assert 'href="/products/stock"' in html_content
         assert 'href="/products/goods_receipts"' in html_content
+
+
+def test_salary_report_all_masters(admin_auth_client, regular_user, test_appointment):
+    """Всі майстри (master_id 0): таблиця з рядком на кожного майстра за діапазон дат."""
+    test_appointment.status = "completed"
+    db.session.commit()
+    start = (date.today() - timedelta(days=6)).isoformat()
+
+    response = admin_auth_client.post(
+        "/reports/salary",
+        data={"report_date": start, "end_date": date.today().isoformat(), "master_id": 0},
+        follow_redirects=True,
+    )
+
+    assert response.status_code == 200
+    html_content = response.data.decode("utf-8")
+    assert "All Masters" in html_content
+    assert regular_user.full_name in html_content
+    assert "100.00" in html_content
+
+
+def test_admin_salary_report_all_admins(admin_auth_client, admin_user):
+    """Всі адміністратори (admin_id 0): таблиця з рядком на кожного адміністратора."""
+    today = date.today().isoformat()
+
+    response = admin_auth_client.post(
+        "/reports/admin_salary",
+        data={"start_date": today, "end_date": today, "admin_id": 0},
+        follow_redirects=True,
+    )
+
+    assert response.status_code == 200
+    html_content = response.data.decode("utf-8")
+    assert "All Administrators" in html_content
+    assert admin_user.full_name in html_content
@@ -0,0 +1,141 @@
+"""
+Tests for the compact schedule API and the free-slot API.
+"""
+
+from datetime import date, time, timedelta
+
+from app.models import Appointment, AppointmentService
+from app.services.schedule_grid import STATUS_CODES
+
+
+def _get(client, appointment_date, **params):
+    query = "&".join(f"{key}={value}" for key, value in params.items())
+    url = f"/appointments/api/schedule?date={appointment_date.strftime('%Y-%m-%d')}"
+    return client.get(f"{url}&{query}" if query else url)
+
+
+def test_schedule_api_returns_columnar_snapshot(admin_auth_client, test_appointment, regular_user):
+    response = _get(admin_auth_client, test_appointment.date)
+
+    assert response.status_code == 200
+    assert response.headers.get("ETag")
+    data = response.get_json()
+
+    assert data["delta"] is False
+    assert data["slots"][0] == "08:00" and len(data["slots"]) == 53
+    assert regular_user.id in data["masters"]["id"]
+
+    appointments = data["appointments"]
+    index = appointments["id"].index(test_appointment.id)
+    assert data["masters"]["id"][appointments["master"][index]] == regular_user.id
+    assert appointments["slots"][index][0] == data["slots"].index("10:00")
+    assert STATUS_CODES[appointments["status"][index]] == "scheduled"
+    assert appointments["client"][index] == test_appointment.client.name
+    assert appointments["can_edit"][index] == 1
+    assert len({len(column) for column in appointments.values()}) == 1
+
+
+def test_schedule_api_conditional_get(session, admin_auth_client, test_appointment):
+    first = _get(admin_auth_client, test_appointment.date)
+    etag = first.headers["ETag"]
+
+    not_modified = admin_auth_client.get(
+        f"/appointments/api/schedule?date={test_appointment.date.strftime('%Y-%m-%d')}",
+        headers={"If-None-Match": etag},
+    )
+    assert not_modified.status_code == 304
+    assert not_modified.data == b""
+
+    test_appointment.payment_status = "paid"
+    session.commit()
+
+    modified = admin_auth_client.get(
+        f"/appointments/api/schedule?date={test_appointment.date.strftime('%Y-%m-%d')}",
+        headers={"If-None-Match": etag},
+    )
+    assert modified.status_code == 200
+    assert modified.headers["ETag"] != etag
+    assert modified.get_json()["version"] > first.get_json()["version"]
+
+
+def test_schedule_api_service_rename_changes_version(session, admin_auth_client, test_appointment, test_service):
+    first = _get(admin_auth_client, test_appointment.date)
+    version = first.get_json()["version"]
+
+    test_service.name = "Renamed Service"
+    session.commit()
+
+    modified = admin_auth_client.get(
+        f"/appointments/api/schedule?date={test_appointment.date.strftime('%Y-%m-%d')}",
+        headers={"If-None-Match": first.headers["ETag"]},
+    )
+    assert modified.status_code == 200
+    assert modified.get_json()["version"] > version
+    assert _get(admin_auth_client, test_appointment.date, since=version).get_json()["appointments"]["id"] == [
+        test_appointment.id
+    ]
+
+
+def test_schedule_api_delta_since_version(session, admin_auth_client, test_appointment, test_client, test_service):
+    version = _get(admin_auth_client, test_appointment.date).get_json()["version"]
+
+    new_appointment = Appointment(
+        client_id=test_client.id,
+        master_id=test_appointment.master_id,
+        date=test_appointment.date,
+        start_time=time(14, 0),
+        end_time=time(14, 45),
+    )
+    session.add(new_appointment)
+    session.flush()
+    session.add(AppointmentService(appointment_id=new_appointment.id, service_id=test_service.id, price=80.0))
+    test_appointment.status = "cancelled"
+    session.commit()
+
+    data = _get(admin_auth_client, test_appointment.date, since=version).get_json()
+
+    assert data["delta"] is True
+    assert data["appointments"]["id"] == [new_appointment.id]
+    assert data["appointments"]["slots"][0] == [24, 25, 26]
+    assert data["removed"] == [test_appointment.id]
+
+    unchanged = _get(admin_auth_client, test_appointment.date, since=data["version"]).get_json()
+    assert unchanged["appointments"]["id"] == []
+    assert unchanged["removed"] == []
+
+
+def test_schedule_api_invalid_params(admin_auth_client):
+    assert admin_auth_client.get("/appointments/api/schedule?date=2024-13-45").status_code == 400
+    assert admin_auth_client.get("/appointments/api/schedule?since=abc").status_code == 400
+
+
+def test_available_slots_api(session, auth_client, regular_user, test_client, test_service):
+    day = date.today() + timedelta(days=1)
+    session.add(
+        Appointment(
+            client_id=test_client.id,
+            master_id=regular_user.id,
+            date=day,
+            start_time=time(8, 0),
+            end_time=time(9, 30),
+        )
+    )
+    session.commit()
+
+    response = auth_client.get(
+        f"/appointments/api/available-slots?service_ids={test_service.id}&master_id={regular_user.id}"
+        f"&from={day.strftime('%Y-%m-%d')}&days=1&limit=2"
+    )
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["duration"] == test_service.duration
+    assert [slot["start_time"] for slot in data["slots"]] == ["09:30"]
+    assert data["slots"][0]["master_name"] == regular_user.full_name
+    assert data["slots"][0]["date"] == day.strftime("%Y-%m-%d")
+
+
+def test_available_slots_api_invalid_params(auth_client):
+    assert auth_client.get("/appointments/api/available-slots").status_code == 400
+    assert auth_client.get("/appointments/api/available-slots?service_ids=abc").status_code == 400
+    assert auth_client.get("/appointments/api/available-slots?service_ids=999999").status_code == 400
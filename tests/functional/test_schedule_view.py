@@ -473,3 +473,80 @@ def test_masters_with_same_display_order_sorted_alphabetically(session, client):
     assert (
         pos_master_a < pos_master_b < pos_master_c
     ), "Masters with same schedule_display_order should be ordered alphabetically"
+
+
+def test_schedule_columns_are_cached_and_invalidated(session, admin_auth_client, test_appointment):
+    """Повторний перегляд бере колонки з кешу, а зміна запису їх скидає."""
+    from app.services.schedule_cache import get_schedule_cache
+
+    cache = get_schedule_cache()
+    url = f"/schedule?date={test_appointment.date.strftime('%Y-%m-%d')}"
+
+    response = admin_auth_client.get(url)
+    assert response.status_code == 200
+    assert f"Appointment {test_appointment.id} -" in response.get_data(as_text=True)
+    misses_after_first_view = cache.misses
+
+    response = admin_auth_client.get(url)
+    assert response.status_code == 200
+    assert cache.misses == misses_after_first_view
+    assert cache.hits >= 1
+
+    test_appointment.status = "cancelled"
+    session.commit()
+
+    response = admin_auth_client.get(url)
+    assert response.status_code == 200
+    assert cache.misses > misses_after_first_view
+    assert f"Appointment {test_appointment.id} -" not in response.get_data(as_text=True)
+
+
+def test_schedule_week_overview(session, admin_auth_client, regular_user, inactive_master, test_client):
+    """Тижневий розклад рахує записи по днях і застосовує правила вибору майстрів для минулих дат."""
+    from app.routes.main import generate_time_intervals, generate_time_slots
+    from app.services.schedule_grid import ScheduleGrid
+    from app.services.schedule_service import ScheduleService
+
+    today = date.today()
+    yesterday = today - timedelta(days=1)
+    appointments = [
+        (regular_user.id, today, time(9, 0), time(10, 0), "scheduled"),
+        (regular_user.id, today, time(12, 0), time(12, 15), "completed"),
+        (regular_user.id, today, time(15, 0), time(16, 0), "cancelled"),
+        (inactive_master.id, yesterday, time(10, 0), time(10, 30), "completed"),
+    ]
+    for master_id, day, start, end, status in appointments:
+        session.add(
+            Appointment(
+                client_id=test_client.id, master_id=master_id, date=day, start_time=start, end_time=end, status=status
+            )
+        )
+    session.commit()
+
+    grid = ScheduleGrid(generate_time_slots(interval_minutes=15), generate_time_intervals())
+    masters, overview = ScheduleService.get_range_overview(grid, yesterday, 3, today=today)
+
+    assert [day["date"] for day in overview] == [yesterday, today, today + timedelta(days=1)]
+    assert [m.id for m in overview[0]["masters"]] == [inactive_master.id]
+    assert inactive_master.id not in [m.id for m in overview[1]["masters"]]
+    assert regular_user.id in [m.id for m in overview[2]["masters"]]
+    assert {regular_user.id, inactive_master.id} <= {m.id for m in masters}
+
+    today_cell = overview[1]["cells"][regular_user.id]
+    assert today_cell["count"] == 2
+    assert today_cell["minutes"] == 75
+    assert sum(today_cell["intervals"]) == 3  # 9:00, 9:30, 12:00
+
+    response = admin_auth_client.get(f"/schedule/week?start={yesterday.strftime('%Y-%m-%d')}&days=3")
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    assert inactive_master.full_name in html
+    assert f'data-master-id="{regular_user.id}"' in html
+
+
+def test_schedule_week_invalid_params(admin_auth_client):
+    response = admin_auth_client.get("/schedule/week?start=bad-date")
+    assert response.status_code == 302
+
+    response = admin_auth_client.get("/schedule/week?days=500")
+    assert response.status_code == 200
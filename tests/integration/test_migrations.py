@@ -0,0 +1,107 @@
+"""
+Інтеграційні тести міграцій на файловій базі з даними.
+
+Схема будується з моделей, позначається як head і відкочується до ревізії перед
+міграцією, що перевіряється; після вставки рядків міграція застосовується знову.
+"""
+
+import logging
+import os
+from datetime import date, datetime
+
+import pytest
+from flask_migrate import downgrade, stamp, upgrade
+from sqlalchemy import text
+
+from app import create_app
+from app.models import db
+
+MIGRATIONS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "migrations"
+)
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    """Додаток над файловою базою; налаштування логування відновлюються після alembic fileConfig."""
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    disabled = {
+        name: logger.disabled
+        for name, logger in logging.root.manager.loggerDict.items()
+        if isinstance(logger, logging.Logger)
+    }
+
+    app = create_app(
+        test_config={
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'migrations.db'}",
+            "SECRET_KEY": "test-secret-key",
+        }
+    )
+    with app.app_context():
+        db.create_all()
+        stamp(directory=MIGRATIONS_DIR, revision="head")
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+    root.handlers[:], root.level = handlers, level
+    for name, logger in logging.root.manager.loggerDict.items():
+        if isinstance(logger, logging.Logger):
+            logger.disabled = disabled.get(name, False)
+
+
+class TestSaleDayMigration:
+    """Міграція b2e6f0c8d413 (sale.sale_day) на базі з продажами та їх позиціями."""
+
+    def _add_sale(self, sale_date):
+        with db.engine.begin() as connection:
+            connection.execute(
+                text(
+                    "INSERT INTO user (id, username, password, full_name, is_admin, is_active_master) "
+                    "VALUES (1, 'seller', 'x', 'Seller', 1, 0)"
+                )
+            )
+            connection.execute(text("INSERT INTO brand (id, name) VALUES (1, 'Brand')"))
+            connection.execute(text("INSERT INTO product (id, name, sku, brand_id) VALUES (1, 'Cream', 'CR-1', 1)"))
+            connection.execute(
+                text(
+                    "INSERT INTO sale (id, sale_date, user_id, created_by_user_id, total_amount) "
+                    "VALUES (1, :sale_date, 1, 1, 10)"
+                ),
+                {"sale_date": sale_date},
+            )
+            connection.execute(
+                text(
+                    "INSERT INTO sale_item (id, sale_id, product_id, quantity, price_per_unit, cost_price_per_unit) "
+                    "VALUES (1, 1, 1, 1, 10, 5)"
+                )
+            )
+
+    def test_upgrade_with_sale_items_backfills_local_day(self, kyiv_time, file_app):
+        # Від ревізії до daily_rollup: його міграція розкладає продажі за UTC-датою
+        downgrade(directory=MIGRATIONS_DIR, revision="5b8e2f4a9c31")
+        # 23:30 UTC 4 березня - вже 5 березня за київським часом
+        self._add_sale(datetime(2025, 3, 4, 23, 30))
+
+        upgrade(directory=MIGRATIONS_DIR)
+
+        with db.engine.connect() as connection:
+            sale_day = connection.execute(text("SELECT sale_day FROM sale WHERE id = 1")).scalar()
+            items = connection.execute(text("SELECT COUNT(*) FROM sale_item")).scalar()
+            rollup = connection.execute(text("SELECT day, sales_count, cogs FROM daily_rollup")).fetchall()
+        assert date.fromisoformat(sale_day) == date(2025, 3, 5)
+        assert items == 1
+        assert [(date.fromisoformat(day), count, cogs) for day, count, cogs in rollup] == [(date(2025, 3, 5), 1, 5)]
+
+    def test_downgrade_with_sale_items(self, file_app):
+        self._add_sale(datetime(2025, 3, 4, 12, 0))
+
+        downgrade(directory=MIGRATIONS_DIR, revision="a7d3c9e18f42")
+
+        with db.engine.connect() as connection:
+            columns = [row[1] for row in connection.execute(text("PRAGMA table_info(sale)"))]
+            items = connection.execute(text("SELECT COUNT(*) FROM sale_item")).scalar()
+        assert "sale_day" not in columns
+        assert items == 1
@@ -0,0 +1,104 @@
+"""
+Unit tests for denormalized appointment totals (services_total, sales_total, discounted_total).
+"""
+
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from app.models import Appointment, AppointmentService, Sale
+
+
+def _stored(session, appointment_id):
+    return session.execute(
+        text("SELECT services_total, sales_total, discounted_total FROM appointment WHERE id = :id"),
+        {"id": appointment_id},
+    ).one()
+
+
+def _sale(admin_user, appointment_id, amount):
+    return Sale(
+        user_id=admin_user.id,
+        created_by_user_id=admin_user.id,
+        appointment_id=appointment_id,
+        total_amount=Decimal(amount),
+    )
+
+
+class TestAppointmentTotals:
+    """Totals follow AppointmentService/Sale changes through session events."""
+
+    def test_fixture_totals(self, session, test_appointment):
+        assert test_appointment.services_total == Decimal("100.00")
+        assert test_appointment.sales_total == Decimal("0.00")
+        assert test_appointment.discounted_total == Decimal("100.00")
+        assert float(_stored(session, test_appointment.id).services_total) == 100.0
+
+    def test_service_sale_and_discount_changes(self, session, test_appointment, test_service, admin_user):
+        extra = AppointmentService(appointment_id=test_appointment.id, service_id=test_service.id, price=50.5)
+        session.add(extra)
+        session.add(_sale(admin_user, test_appointment.id, "40.00"))
+        test_appointment.discount_percentage = Decimal("10")
+        session.commit()
+
+        assert test_appointment.get_total_price() == 190.5
+        assert test_appointment.get_discounted_price() == Decimal("171.45")
+        assert float(_stored(session, test_appointment.id).discounted_total) == 171.45
+
+        extra.price = 20.0
+        session.commit()
+        assert test_appointment.services_total == Decimal("120.00")
+
+        session.delete(extra)
+        session.commit()
+        assert test_appointment.services_total == Decimal("100.00")
+        assert test_appointment.discounted_total == Decimal("126.00")
+
+    def test_unflushed_service_counts_in_payment_status(self, session, test_appointment, test_service):
+        session.add(AppointmentService(appointment_id=test_appointment.id, service_id=test_service.id, price=60.0))
+        test_appointment.amount_paid = Decimal("100.00")
+
+        test_appointment.update_payment_status()
+
+        assert test_appointment.payment_status == "partially_paid"
+
+    def test_sale_moved_between_appointments(self, session, test_appointment, admin_user):
+        other = Appointment(
+            client_id=test_appointment.client_id,
+            master_id=test_appointment.master_id,
+            date=test_appointment.date,
+            start_time=test_appointment.end_time,
+            end_time=test_appointment.end_time,
+        )
+        session.add(other)
+        sale = _sale(admin_user, test_appointment.id, "30.00")
+        session.add(sale)
+        session.commit()
+        assert test_appointment.sales_total == Decimal("30.00")
+
+        sale.appointment_id = other.id
+        session.commit()
+
+        assert test_appointment.sales_total == Decimal("0.00")
+        assert other.sales_total == Decimal("30.00")
+
+    def test_bulk_delete_refreshes_totals(self, session, test_appointment):
+        AppointmentService.query.filter_by(appointment_id=test_appointment.id).delete()
+        session.commit()
+
+        assert test_appointment.services_total == Decimal("0.00")
+        assert float(_stored(session, test_appointment.id).services_total) == 0.0
+
+    def test_backfill_command(self, app, session, test_appointment, admin_user):
+        session.add(_sale(admin_user, test_appointment.id, "25.00"))
+        session.commit()
+        session.execute(text("UPDATE appointment SET services_total = 0, sales_total = 0, discounted_total = 0"))
+        session.commit()
+
+        result = app.test_cli_runner().invoke(args=["backfill-appointment-totals", "--batch-size", "1"])
+
+        assert result.exit_code == 0
+        assert "Appointment totals backfilled: 1" in result.output
+        stored = _stored(session, test_appointment.id)
+        assert (float(stored.services_total), float(stored.sales_total)) == (100.0, 25.0)
+        assert float(stored.discounted_total) == 125.0
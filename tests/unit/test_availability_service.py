@@ -0,0 +1,95 @@
+"""
+Unit tests for the free-slot finder.
+"""
+
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from app.models import Appointment, Service
+from app.services.availability_service import AvailabilityService, AvailableSlot, free_gaps
+
+
+class TestFreeGaps:
+    """Test the sorted-interval sweep."""
+
+    def test_empty_day_is_one_gap(self):
+        assert free_gaps([], 90, 8 * 60, 21 * 60) == [(480, 1260)]
+
+    def test_gaps_between_busy_intervals(self):
+        busy = [(9 * 60, 10 * 60), (11 * 60, 12 * 60 + 30)]
+
+        assert free_gaps(busy, 60, 8 * 60, 21 * 60) == [(480, 540), (600, 660), (750, 1260)]
+        assert free_gaps(busy, 90, 8 * 60, 21 * 60) == [(750, 1260)]
+
+    def test_overlapping_and_unaligned_intervals(self):
+        busy = [(8 * 60, 9 * 60 + 10), (8 * 60 + 30, 9 * 60), (10 * 60 + 45, 20 * 60 + 40)]
+
+        # 9:10 округлюється до 9:15; 20:40 -> 20:45, після чого до 21:00 лише 15 хв
+        assert free_gaps(busy, 60, 8 * 60, 21 * 60) == [(555, 645)]
+        assert free_gaps(busy, 15, 8 * 60, 21 * 60) == [(555, 645), (1245, 1260)]
+
+    def test_duration_longer_than_day(self):
+        assert free_gaps([], 14 * 60, 8 * 60, 21 * 60) == []
+
+
+class TestAvailabilityService:
+    """Test AvailabilityService.find_available_slots."""
+
+    @pytest.fixture
+    def long_service(self, session):
+        service = Service(name="Фарбування", description="", duration=90, base_price=500)
+        session.add(service)
+        session.commit()
+        return service
+
+    def _book(self, session, master, client, day, start, end, status="scheduled"):
+        session.add(
+            Appointment(
+                client_id=client.id, master_id=master.id, date=day, start_time=start, end_time=end, status=status
+            )
+        )
+
+    def test_total_duration(self, session, test_service, long_service):
+        assert AvailabilityService.get_total_duration([test_service.id, long_service.id]) == (
+            test_service.duration + 90
+        )
+        with pytest.raises(ValueError):
+            AvailabilityService.get_total_duration([999999])
+        with pytest.raises(ValueError):
+            AvailabilityService.get_total_duration([])
+
+    def test_first_free_slot_for_master(self, session, regular_user, test_client, long_service):
+        day = date.today() + timedelta(days=1)
+        self._book(session, regular_user, test_client, day, time(8, 0), time(9, 0))
+        self._book(session, regular_user, test_client, day, time(10, 0), time(12, 0))
+        self._book(session, regular_user, test_client, day, time(12, 0), time(13, 0), status="cancelled")
+        session.commit()
+
+        slots = AvailabilityService.find_available_slots(
+            [long_service.id], master_id=regular_user.id, from_date=day, days=1, limit=5
+        )
+
+        assert slots == [AvailableSlot(regular_user.id, day, time(12, 0), time(13, 30))]
+
+    def test_skips_past_time_and_busy_days(self, session, regular_user, test_client, long_service):
+        day = date.today() + timedelta(days=1)
+        self._book(session, regular_user, test_client, day, time(8, 0), time(21, 0))
+        session.commit()
+
+        now = datetime.combine(day - timedelta(days=1), time(19, 50))
+        slots = AvailabilityService.find_available_slots(
+            [long_service.id], master_id=regular_user.id, from_date=now.date(), days=3, limit=1, now=now
+        )
+
+        assert slots == [AvailableSlot(regular_user.id, day + timedelta(days=1), time(8, 0), time(9, 30))]
+
+    def test_any_master_returns_earliest(self, session, regular_user, active_master, test_client, long_service):
+        day = date.today() + timedelta(days=1)
+        self._book(session, regular_user, test_client, day, time(8, 0), time(11, 0))
+        self._book(session, active_master, test_client, day, time(8, 0), time(9, 0))
+        session.commit()
+
+        slots = AvailabilityService.find_available_slots([long_service.id], from_date=day, days=1, limit=1)
+
+        assert slots == [AvailableSlot(active_master.id, day, time(9, 0), time(10, 30))]
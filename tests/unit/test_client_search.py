@@ -0,0 +1,226 @@
+"""
+Unit tests for full-text client search.
+"""
+
+from datetime import date, time
+
+import pytest
+
+from app.models import Appointment, Client, db
+from app.services.client_search import (
+    CLIENT_PAGE_SIZE,
+    ClientSearchService,
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+    get_client_count_cache,
+    search_terms,
+)
+
+
+def _client(session, name, phone, **fields):
+    client = Client(name=name, phone=phone, **fields)
+    session.add(client)
+    session.commit()
+    return client
+
+
+def _names(user, search, **kwargs):
+    return [client.name for client in ClientSearchService.search(user, search, **kwargs)]
+
+
+def test_search_terms():
+    assert search_terms(" Олена-Марія  o'NEIL_x ") == ["олена", "марія", "o", "neil", "x"]
+
+
+class TestClientSearch:
+    """Test matching, ranking and visibility."""
+
+    def test_cyrillic_case_folding_and_prefixes(self, session, admin_user):
+        _client(session, "Олена Петрова", "+380501111111")
+        _client(session, "Йосип Іваненко", "+380502222222")
+
+        assert _names(admin_user, "оЛЕНА") == ["Олена Петрова"]
+        assert _names(admin_user, "петр ОЛ") == ["Олена Петрова"]
+        assert _names(admin_user, "іван") == ["Йосип Іваненко"]
+        assert _names(admin_user, "иосип") == []  # й та и не змішуються
+
+    def test_index_follows_updates_and_deletes(self, session, admin_user):
+        client = _client(session, "Анна Коваль", "+380503333333")
+
+        client.name = "Ганна Коваль"
+        session.commit()
+        assert _names(admin_user, "анна") == []
+        assert _names(admin_user, "ганна") == ["Ганна Коваль"]
+
+        session.delete(client)
+        session.commit()
+        assert _names(admin_user, "коваль") == []
+
+    def test_name_matches_rank_first_and_limit(self, session, admin_user):
+        _client(session, "Марта Бондар", "+380504444444", notes="Подруга: Оксана")
+        _client(session, "Оксана Бондар", "+380505555555")
+        _client(session, "Оксана Мельник", "+380506666666", email="oksana@example.com")
+
+        results = _names(admin_user, "оксана")
+        assert sorted(results[:2]) == ["Оксана Бондар", "Оксана Мельник"]
+        assert results[2] == "Марта Бондар"
+        assert _names(admin_user, "оксана", limit=1) == results[:1]
+
+    def test_phone_substring(self, session, admin_user):
+        _client(session, "Ірина Шевчук", "+380671234567")
+
+        assert _names(admin_user, "1234") == ["Ірина Шевчук"]
+        assert _names(admin_user, "+38067") == ["Ірина Шевчук"]
+
+    def test_master_sees_only_own_clients(self, session, regular_user, admin_user):
+        own = _client(session, "Софія Ткач", "+380507777777")
+        _client(session, "Софія Лисенко", "+380508888888")
+        for master in (regular_user, regular_user, admin_user):
+            session.add(
+                Appointment(
+                    client_id=own.id, master_id=master.id, date=date.today(), start_time=time(10), end_time=time(11)
+                )
+            )
+        session.commit()
+
+        assert _names(regular_user, "софія") == ["Софія Ткач"]
+        assert [c.name for c in ClientSearchService.visible_clients(regular_user).all()] == ["Софія Ткач"]
+        assert len(_names(admin_user, "софія")) == 2
+
+    def test_core_insert_is_indexed(self, session, admin_user):
+        session.execute(Client.__table__.insert(), [{"name": "Богдан Гнатюк", "phone": "+380509999999"}])
+        session.commit()
+
+        assert _names(admin_user, "гнатюк") == ["Богдан Гнатюк"]
+
+    def test_api_search(self, session, admin_user, admin_auth_client):
+        _client(session, "Дарина Романенко", "+380631010101", email="daryna@example.com")
+
+        response = admin_auth_client.get("/clients/api/search?q=ДАРИН")
+
+        assert [(row["name"], row["email"]) for row in response.get_json()] == [
+            ("Дарина Романенко", "daryna@example.com")
+        ]
+
+
+class TestPhoneLookup:
+    """Test normalized phone columns and suffix lookup."""
+
+    def test_digits_are_kept_in_sync(self, session):
+        client = _client(session, "Остап Вовк", "+38 (050) 123-45-67")
+        assert (client.phone_normalized, client.phone_reversed) == ("380501234567", "765432105083")
+
+        client.phone = "+380671112233"
+        session.commit()
+        assert (client.phone_normalized, client.phone_reversed) == ("380671112233", "332211176083")
+
+        session.execute(Client.__table__.insert(), [{"name": "Core", "phone": "050-000-11-22"}])
+        row = session.execute(db.select(Client.phone_reversed).where(Client.name == "Core")).scalar_one()
+        assert row == "2211000050"
+
+    def test_by_phone_matches_suffix(self, session, admin_user):
+        _client(session, "Остап Вовк", "+38 (050) 123-45-67")
+        _client(session, "Тарас Вовк", "+380674567000")
+
+        assert [c.name for c in ClientSearchService.by_phone(admin_user, "45-67")] == ["Остап Вовк"]
+        assert [c.name for c in ClientSearchService.by_phone(admin_user, "0501234567")] == ["Остап Вовк"]
+        assert [c.name for c in ClientSearchService.by_phone(admin_user, "7000")] == ["Тарас Вовк"]
+        assert ClientSearchService.by_phone(admin_user, "567") == []
+
+    def test_by_phone_endpoint(self, session, admin_auth_client):
+        _client(session, "Остап Вовк", "+380501234567")
+
+        response = admin_auth_client.get("/clients/api/by-phone?phone=123 45 67")
+
+        assert [row["name"] for row in response.get_json()] == ["Остап Вовк"]
+
+    def test_by_phone_respects_visibility(self, session, auth_client):
+        _client(session, "Остап Вовк", "+380501234567")
+
+        assert auth_client.get("/clients/api/by-phone?phone=1234567").get_json() == []
+
+    def test_formatted_duplicate_phone_is_rejected(self, session, admin_auth_client):
+        _client(session, "Остап Вовк", "+380501234567")
+
+        response = admin_auth_client.post(
+            "/clients/create", data={"name": "Двійник", "phone": "+38 050 123 45 67"}, follow_redirects=True
+        )
+
+        assert "Клієнт з таким номером телефону вже існує" in response.data.decode("utf-8")
+        assert Client.query.count() == 1
+
+
+class TestClientPagination:
+    """Test keyset pages, cursors and the cached total."""
+
+    @pytest.fixture
+    def clients(self, session):
+        session.execute(
+            Client.__table__.insert(),
+            [{"name": f"Клієнт {i % 4}", "phone": f"+38050000{i:04d}"} for i in range(10)],
+        )
+        session.commit()
+        return [(c.name, c.id) for c in Client.query.order_by(Client.name, Client.id)]
+
+    def test_walks_forward_and_back(self, clients, admin_user):
+        seen = []
+        page = ClientSearchService.page(admin_user, per_page=3)
+        assert page.prev_cursor is None
+        while True:
+            seen.extend((c.name, c.id) for c in page.clients)
+            if page.next_cursor is None:
+                break
+            page = ClientSearchService.page(admin_user, after=page.next_cursor, per_page=3)
+        assert seen == clients
+        assert len(page.clients) == 1
+
+        back = ClientSearchService.page(admin_user, before=page.prev_cursor, per_page=3)
+        assert [(c.name, c.id) for c in back.clients] == clients[6:9]
+        assert back.next_cursor and back.prev_cursor
+        first = ClientSearchService.page(admin_user, before=encode_cursor(Client.query.get(clients[3][1])), per_page=3)
+        assert [(c.name, c.id) for c in first.clients] == clients[:3]
+        assert first.prev_cursor is None
+
+    def test_master_pages_only_own_clients(self, clients, session, regular_user):
+        own = clients[5][1]
+        session.add(
+            Appointment(
+                client_id=own, master_id=regular_user.id, date=date.today(), start_time=time(10), end_time=time(11)
+            )
+        )
+        session.commit()
+
+        page = ClientSearchService.page(regular_user, per_page=3)
+
+        assert [c.id for c in page.clients] == [own]
+        assert page.next_cursor is None and page.total == 1
+
+    def test_total_is_cached(self, clients, session, admin_user):
+        assert ClientSearchService.page(admin_user).total == 10
+        session.execute(Client.__table__.insert(), [{"name": "Новий", "phone": "+380990000000"}])
+        session.commit()
+        assert ClientSearchService.page(admin_user).total == 10  # приблизне значення до закінчення TTL
+
+        get_client_count_cache().clear()
+        assert ClientSearchService.page(admin_user).total == 11
+
+    def test_index_pages(self, clients, session, admin_user, admin_auth_client):
+        session.execute(
+            Client.__table__.insert(),
+            [{"name": f"Пацієнт {i:02d}", "phone": f"+38067000{i:04d}"} for i in range(CLIENT_PAGE_SIZE)],
+        )
+        session.commit()
+
+        content = admin_auth_client.get("/clients/").data.decode("utf-8")
+        assert f"Приблизно {CLIENT_PAGE_SIZE + 10} клієнтів" in content
+        assert "Пацієнт 39" in content and "Пацієнт 40" not in content
+
+        cursor = ClientSearchService.page(admin_user).next_cursor
+        content = admin_auth_client.get(f"/clients/?after={cursor}").data.decode("utf-8")
+        assert "Пацієнт 40" in content and "before=" in content
+
+    def test_bad_cursor(self, admin_auth_client):
+        with pytest.raises(InvalidCursorError):
+            decode_cursor("not-a-cursor")
+        assert admin_auth_client.get("/clients/?after=%%%").status_code == 400
@@ -0,0 +1,145 @@
+"""
+Unit tests for the daily_rollup table maintained by session events.
+"""
+
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from app.models import AppointmentService, DailyRollup, Sale, SaleItem
+
+
+def _rollup(session):
+    session.expire_all()
+    return {
+        (row.day, row.master_id, row.payment_method_id): row
+        for row in session.query(DailyRollup).order_by(DailyRollup.day).all()
+    }
+
+
+def _sale(admin_user, product, payment_method, day, amount="60.00"):
+    sale = Sale(
+        sale_date=datetime.combine(day, time(15, 30)),
+        user_id=admin_user.id,
+        created_by_user_id=admin_user.id,
+        total_amount=Decimal(amount),
+        payment_method_id=payment_method.id,
+    )
+    sale.items.append(
+        SaleItem(
+            product_id=product.id, quantity=2, price_per_unit=Decimal("30.00"), cost_price_per_unit=Decimal("11.25")
+        )
+    )
+    return sale
+
+
+class TestDailyRollup:
+    """Rollup rows follow appointment and sale changes in the same transaction."""
+
+    def test_completed_appointment(self, session, test_appointment, test_service, payment_methods):
+        assert _rollup(session) == {}
+        cash = next(pm for pm in payment_methods if pm.name == "Готівка")
+
+        test_appointment.status = "completed"
+        test_appointment.payment_method_id = cash.id
+        test_appointment.discount_percentage = Decimal("12.5")
+        session.commit()
+
+        row = _rollup(session)[(test_appointment.date, test_appointment.master_id, cash.id)]
+        assert (row.appointment_count, row.services_total, row.service_revenue) == (
+            1,
+            Decimal("100.00"),
+            Decimal("87.5"),
+        )
+
+        test_appointment.amount_paid = Decimal("90.00")
+        session.add(AppointmentService(appointment_id=test_appointment.id, service_id=test_service.id, price=20.0))
+        session.commit()
+        row = _rollup(session)[(test_appointment.date, test_appointment.master_id, cash.id)]
+        assert (row.services_total, row.service_revenue) == (Decimal("120.00"), Decimal("90"))
+
+        test_appointment.status = "cancelled"
+        session.commit()
+        assert _rollup(session) == {}
+
+    def test_appointment_moved_to_another_day(self, session, test_appointment):
+        test_appointment.status = "completed"
+        session.commit()
+        old_day = test_appointment.date
+
+        test_appointment.date = old_day + timedelta(days=3)
+        session.commit()
+
+        assert list(_rollup(session)) == [(old_day + timedelta(days=3), test_appointment.master_id, None)]
+
+    def test_bulk_service_delete(self, session, test_appointment):
+        test_appointment.status = "completed"
+        session.commit()
+
+        AppointmentService.query.filter_by(appointment_id=test_appointment.id).delete()
+        session.commit()
+
+        row = _rollup(session)[(test_appointment.date, test_appointment.master_id, None)]
+        assert (row.appointment_count, row.services_total) == (1, Decimal("0.00"))
+
+    def test_sales(self, session, admin_user, test_product, payment_methods):
+        card = next(pm for pm in payment_methods if pm.name == "Приват")
+        day = date.today()
+        session.add(_sale(admin_user, test_product, card, day))
+        second = _sale(admin_user, test_product, card, day, "40.00")
+        session.add(second)
+        session.commit()
+
+        row = _rollup(session)[(day, admin_user.id, card.id)]
+        assert (row.sales_count, row.sales_total) == (2, Decimal("100.00"))
+        assert (row.product_revenue, row.cogs) == (Decimal("120.00"), Decimal("45.00"))
+
+        session.delete(second)
+        session.commit()
+        row = _rollup(session)[(day, admin_user.id, card.id)]
+        assert (row.sales_count, row.sales_total, row.cogs) == (1, Decimal("60.00"), Decimal("22.50"))
+
+    def test_rebuild_command(self, app, session, test_appointment, admin_user, test_product, payment_methods):
+        test_appointment.status = "completed"
+        session.add(_sale(admin_user, test_product, payment_methods[0], date.today() - timedelta(days=40)))
+        session.commit()
+        expected = {key: (row.appointment_count, row.sales_total, row.cogs) for key, row in _rollup(session).items()}
+        session.execute(text("DELETE FROM daily_rollup"))
+        session.commit()
+
+        result = app.test_cli_runner().invoke(args=["rebuild-daily-rollup", "--batch-days", "7"])
+
+        assert result.exit_code == 0
+        assert "Daily rollup rebuilt: 41 days, 2 rows" in result.output
+        rebuilt = {key: (row.appointment_count, row.sales_total, row.cogs) for key, row in _rollup(session).items()}
+        assert rebuilt == expected
+
+    def test_naive_sale_date_is_utc(self, kyiv_time, session, admin_user, test_product, payment_methods):
+        naive = _sale(admin_user, test_product, payment_methods[0], date(2025, 3, 4))
+        aware = _sale(admin_user, test_product, payment_methods[0], date(2025, 3, 4))
+        # 23:30 UTC 4 березня - 5 березня за київським часом, як у міграції b2e6f0c8d413
+        naive.sale_date = datetime(2025, 3, 4, 23, 30)
+        aware.sale_date = datetime(2025, 3, 4, 23, 30, tzinfo=timezone.utc)
+        session.add_all([naive, aware])
+        session.commit()
+        assert naive.sale_day == aware.sale_day == date(2025, 3, 5)
+
+        naive.sale_date = datetime(2025, 3, 5, 22, 15)
+        session.commit()
+
+        assert naive.sale_day == date(2025, 3, 6)
+        assert {day for day, _, _ in _rollup(session)} == {date(2025, 3, 5), date(2025, 3, 6)}
+
+    def test_sale_moved_to_another_day(self, session, admin_user, test_product, payment_methods):
+        day = date.today() - timedelta(days=2)
+        sale = _sale(admin_user, test_product, payment_methods[0], day)
+        session.add(sale)
+        session.commit()
+        assert sale.sale_day == day
+
+        sale.sale_date = datetime.combine(day + timedelta(days=1), time(9, 0))
+        session.commit()
+
+        assert sale.sale_day == day + timedelta(days=1)
+        assert list(_rollup(session)) == [(day + timedelta(days=1), admin_user.id, payment_methods[0].id)]
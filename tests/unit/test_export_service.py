@@ -0,0 +1,124 @@
+"""
+Unit tests for streaming CSV/XLSX exports.
+"""
+
+import csv
+import io
+import zipfile
+from datetime import date, datetime, time
+from decimal import Decimal
+from xml.etree import ElementTree
+
+import pytest
+
+from app.models import Sale
+from app.services.export_service import csv_stream, iter_rows, sales_export, xlsx_stream
+
+SHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+def _sheet_rows(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        root = ElementTree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+    rows = []
+    for row in root.iter(f"{SHEET_NS}row"):
+        rows.append([cell.findtext(f".//{SHEET_NS}v") or cell.findtext(f".//{SHEET_NS}t") for cell in row])
+    return rows
+
+
+@pytest.fixture
+def sales(session, admin_user, payment_methods):
+    cash = next(pm for pm in payment_methods if pm.name == "Готівка")
+    for day, amount in ((date(2025, 1, 10), "100.00"), (date(2025, 2, 5), "250.50")):
+        session.add(
+            Sale(
+                sale_date=datetime.combine(day, time(12, 0)),
+                user_id=admin_user.id,
+                created_by_user_id=admin_user.id,
+                total_amount=Decimal(amount),
+                payment_method_id=cash.id,
+            )
+        )
+    session.commit()
+
+
+class TestStreams:
+    """Test the CSV and XLSX writers."""
+
+    def test_csv_stream_yields_chunks_with_bom(self):
+        chunks = list(csv_stream(["a", "b"], ((i, f"рядок {i}") for i in range(5)), chunk_size=2))
+
+        assert len(chunks) == 3
+        text = b"".join(chunks).decode("utf-8")
+        assert text.startswith("\ufeffa,b")
+        assert list(csv.reader(io.StringIO(text.lstrip("\ufeff"))))[-1] == ["4", "рядок 4"]
+
+    def test_xlsx_stream_is_valid_workbook(self):
+        rows = [(1, "Кава & <чай>", None), (2, date(2025, 3, 1), Decimal("9.90"))]
+
+        chunks = list(xlsx_stream(["№", "Назва", "Сума"], iter(rows), "Аркуш", chunk_size=1))
+
+        assert len(chunks) > 1
+        assert _sheet_rows(b"".join(chunks)) == [
+            ["№", "Назва", "Сума"],
+            ["1", "Кава & <чай>", None],
+            ["2", "2025-03-01", "9.90"],
+        ]
+
+    def test_iter_rows_filters_by_sale_day(self, sales):
+        header, statement = sales_export(date(2025, 2, 1), None)
+
+        rows = list(iter_rows(statement, chunk_size=1))
+
+        assert len(header) == len(rows[0])
+        assert [row[-1] for row in rows] == [Decimal("250.50")]
+
+
+class TestExportRoutes:
+    """Test the export endpoints."""
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "/sales/export",
+            "/products/goods_receipts/export",
+            "/products/write_offs/export",
+            "/reports/financial/export",
+        ],
+    )
+    def test_xlsx_export(self, admin_auth_client, url):
+        response = admin_auth_client.get(f"{url}?format=xlsx")
+
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert "attachment" in response.headers["Content-Disposition"]
+        assert len(_sheet_rows(response.data)) == 1  # лише заголовок
+
+    def test_sales_csv_export(self, sales, admin_auth_client):
+        response = admin_auth_client.get("/sales/export?start_date=2025-01-01&end_date=2025-01-31")
+
+        assert response.mimetype == "text/csv"
+        assert "sales_2025-01-01_2025-01-31.csv" in response.headers["Content-Disposition"]
+        rows = list(csv.reader(io.StringIO(response.data.decode("utf-8-sig"))))
+        assert len(rows) == 2
+        assert rows[1][-1] == "100.00"
+
+    def test_financial_csv_export(self, sales, admin_auth_client):
+        response = admin_auth_client.get("/reports/financial/export?start_date=2025-02-05&end_date=2025-02-05")
+
+        rows = list(csv.reader(io.StringIO(response.data.decode("utf-8-sig"))))
+        assert len(rows) == 2
+        assert rows[1][0] == "2025-02-05"
+        assert rows[1][7] == "250.50"
+
+    def test_unknown_format(self, admin_auth_client):
+        assert admin_auth_client.get("/sales/export?format=pdf").status_code == 400
+
+    def test_invalid_date(self, admin_auth_client):
+        assert admin_auth_client.get("/sales/export?start_date=2025-13-01").status_code == 400
+        assert admin_auth_client.get("/reports/financial/export?end_date=tomorrow").status_code == 400
+
+    def test_non_admin_cannot_export(self, auth_client):
+        assert auth_client.get("/reports/financial/export").status_code == 403
+        assert auth_client.get("/sales/export").status_code == 302
@@ -0,0 +1,153 @@
+"""
+Unit tests for the shared FIFO depletion engine.
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.models import Brand, GoodsReceipt, GoodsReceiptItem, Product, StockLevel, WriteOffReason, db
+from app.services import fifo as fifo_module
+from app.services.fifo import FifoDepletion, InsufficientStockError, StockConflictError
+from app.services.inventory_service import InventoryService, WriteOffItemData
+from app.services.sales_service import SaleItemData, SalesService
+
+
+@pytest.fixture
+def stocked_products(session, admin_user):
+    """Three products with two batches each: 5 @ 10.00 (older) and 10 @ 16.00."""
+    brand = Brand(name="FIFO")
+    receipt = GoodsReceipt(receipt_date=date(2025, 1, 1), user_id=admin_user.id)
+    session.add_all([brand, receipt])
+    session.flush()
+    products = []
+    for i in range(3):
+        product = Product(name=f"FIFO {i}", sku=f"FIFO-{i}", brand_id=brand.id, current_sale_price=Decimal("30.00"))
+        session.add(product)
+        session.flush()
+        for day, quantity, cost in ((1, 5, "10.00"), (2, 10, "16.00")):
+            session.add(
+                GoodsReceiptItem(
+                    receipt_id=receipt.id,
+                    product_id=product.id,
+                    quantity_received=quantity,
+                    quantity_remaining=quantity,
+                    cost_price_per_unit=Decimal(cost),
+                    receipt_date=datetime(2025, 1, day),
+                )
+            )
+        StockLevel.query.filter_by(product_id=product.id).one().quantity = 15
+        products.append(product)
+    session.commit()
+    return products
+
+
+def _remaining(product):
+    return [
+        item.quantity_remaining
+        for item in GoodsReceiptItem.query.filter_by(product_id=product.id).order_by(GoodsReceiptItem.receipt_date)
+    ]
+
+
+class TestFifoDepletion:
+    """Test in-memory depletion across lines and batches."""
+
+    def test_lines_of_one_product_continue_where_previous_stopped(self, stocked_products):
+        product = stocked_products[0]
+        fifo = FifoDepletion([product.id, product.id])
+
+        assert fifo.take(product.id, 3) == Decimal("10.00")
+        assert fifo.take(product.id, 4) == Decimal("13.00")  # (2 x 10.00 + 2 x 16.00) / 4
+        fifo.write_back()
+        db.session.commit()
+
+        assert _remaining(product) == [0, 8]
+        assert StockLevel.query.filter_by(product_id=product.id).one().quantity == 8
+
+    def test_shortage_counts_earlier_lines(self, stocked_products):
+        product = stocked_products[0]
+        fifo = FifoDepletion([product.id])
+        fifo.take(product.id, 10)
+
+        with pytest.raises(InsufficientStockError) as error:
+            fifo.take(product.id, 6)
+        assert error.value.available_qty == 5
+
+    def test_sale_uses_one_batch_query_and_one_executemany(self, app, stocked_products, admin_user):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if "goods_receipt_item" in statement:
+                statements.append((statement.split()[0], executemany))
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            sale = SalesService.create_sale(
+                user_id=admin_user.id,
+                created_by_user_id=admin_user.id,
+                sale_items=[SaleItemData(product.id, 7) for product in stocked_products],
+            )
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+
+        assert statements == [("SELECT", False), ("UPDATE", True)]
+        assert sale.total_amount == Decimal("630.00")
+        assert {item.cost_price_per_unit for item in sale.items} == {Decimal("11.71")}
+        assert [_remaining(product) for product in stocked_products] == [[0, 8]] * 3
+
+    def test_failed_write_off_leaves_batches(self, stocked_products, admin_user, session):
+        reason = WriteOffReason(name="Брак")
+        session.add(reason)
+        session.commit()
+        first, second = stocked_products[:2]
+
+        with pytest.raises(InsufficientStockError):
+            InventoryService.create_write_off(
+                user_id=admin_user.id,
+                reason_id=reason.id,
+                write_off_items=[WriteOffItemData(first.id, 5), WriteOffItemData(second.id, 16)],
+            )
+
+        assert _remaining(first) == [5, 10]
+        assert StockLevel.query.filter_by(product_id=first.id).one().quantity == 15
+
+    def test_batch_consumed_concurrently_is_not_overwritten(self, stocked_products, session):
+        product = stocked_products[0]
+        fifo = FifoDepletion([product.id])
+        # Інша транзакція встигла продати 4 одиниці зі старшої партії
+        table = GoodsReceiptItem.__table__
+        session.execute(
+            table.update()
+            .where(table.c.product_id == product.id, table.c.quantity_remaining == 5)
+            .values(quantity_remaining=1)
+        )
+
+        fifo.take(product.id, 3)
+        with pytest.raises(StockConflictError):
+            fifo.write_back()
+        session.rollback()
+
+    def test_sale_is_retried_after_conflict(self, stocked_products, admin_user, monkeypatch):
+        monkeypatch.setattr(fifo_module, "STOCK_RETRY_BACKOFF", 0)
+        original_write_back = FifoDepletion.write_back
+        calls = []
+
+        def conflicting_once(self):
+            calls.append(1)
+            if len(calls) == 1:
+                raise StockConflictError()
+            original_write_back(self)
+
+        monkeypatch.setattr(FifoDepletion, "write_back", conflicting_once)
+        product = stocked_products[0]
+
+        sale = SalesService.create_sale(
+            user_id=admin_user.id, created_by_user_id=admin_user.id, sale_items=[SaleItemData(product.id, 6)]
+        )
+
+        assert len(calls) == 2
+        assert sale.items[0].quantity == 6
+        assert _remaining(product) == [0, 9]
+        assert StockLevel.query.filter_by(product_id=product.id).one().quantity == 9
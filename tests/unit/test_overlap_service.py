@@ -0,0 +1,71 @@
+"""
+Unit tests for double-booking detection.
+"""
+
+from datetime import date, time, timedelta
+
+import pytest
+
+from app.models import Appointment
+from app.services.overlap_service import OverlapService
+
+
+@pytest.fixture
+def booked_day(session, regular_user, test_client):
+    day = date.today() + timedelta(days=2)
+    for start, end, status in [
+        (time(10, 0), time(11, 0), "scheduled"),
+        (time(12, 0), time(13, 30), "completed"),
+        (time(15, 0), time(16, 0), "cancelled"),
+    ]:
+        session.add(
+            Appointment(
+                client_id=test_client.id,
+                master_id=regular_user.id,
+                date=day,
+                start_time=start,
+                end_time=end,
+                status=status,
+            )
+        )
+    session.commit()
+    return day
+
+
+@pytest.mark.parametrize(
+    "start, end, expected",
+    [
+        (time(9, 0), time(10, 0), []),  # закінчується рівно на початку
+        (time(11, 0), time(12, 0), []),  # між записами
+        (time(9, 30), time(10, 15), [time(10, 0)]),
+        (time(10, 15), time(10, 45), [time(10, 0)]),  # всередині
+        (time(9, 0), time(14, 0), [time(10, 0), time(12, 0)]),  # охоплює обидва
+        (time(13, 0), time(13, 15), [time(12, 0)]),
+        (time(15, 0), time(16, 0), []),  # скасований запис не заважає
+    ],
+)
+def test_find_overlaps(booked_day, regular_user, start, end, expected):
+    conflicts = OverlapService.find_overlaps(regular_user.id, booked_day, start, end)
+
+    assert [conflict.start_time for conflict in conflicts] == expected
+    assert OverlapService.has_overlap(regular_user.id, booked_day, start, end) is bool(expected)
+
+
+def test_overlaps_scoped_to_master_and_date(booked_day, regular_user, active_master):
+    assert OverlapService.find_overlaps(active_master.id, booked_day, time(10, 0), time(11, 0)) == []
+    assert OverlapService.find_overlaps(regular_user.id, booked_day + timedelta(days=1), time(10, 0), time(11, 0)) == []
+
+
+def test_exclude_edited_appointment(booked_day, regular_user):
+    own = OverlapService.find_overlaps(regular_user.id, booked_day, time(10, 0), time(11, 0))[0]
+
+    assert (
+        OverlapService.find_overlaps(regular_user.id, booked_day, time(10, 30), time(11, 30), exclude_id=own.id) == []
+    )
+
+
+def test_interval_past_midnight_checks_until_end_of_day(booked_day, regular_user):
+    conflicts = OverlapService.find_overlaps(regular_user.id, booked_day, time(12, 30), time(0, 30))
+
+    assert [conflict.start_time for conflict in conflicts] == [time(12, 0)]
+    assert "12:00-13:30" in OverlapService.describe(conflicts)
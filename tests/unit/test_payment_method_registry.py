@@ -0,0 +1,91 @@
+"""
+Unit tests for the cached payment method registry.
+"""
+
+import dataclasses
+
+import pytest
+from sqlalchemy import event
+
+from app.models import PaymentMethod as PaymentMethodModel
+from app.models import PaymentMethodEnum as PaymentMethod
+from app.models import PaymentMethodValue, get_payment_method_registry
+
+
+@pytest.fixture
+def count_queries(db):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
+def test_values_are_frozen_and_compare_like_enum(app):
+    cash = PaymentMethodValue(1, "Готівка")
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        cash.name = "Інше"
+    assert cash.value == "Готівка"
+    assert cash == PaymentMethodValue(None, "Готівка")
+    assert cash != PaymentMethodValue(1, "Борг")
+
+
+def test_registry_loads_once(session, payment_methods, test_appointment, count_queries):
+    cash = next(pm for pm in payment_methods if pm.name == "Готівка")
+    test_appointment.payment_method_id = cash.id
+    session.commit()
+    assert test_appointment.payment_method_id == cash.id
+    registry = get_payment_method_registry()
+    registry.invalidate()
+    count_queries.clear()
+
+    for _ in range(5):
+        assert test_appointment.payment_method == PaymentMethod.CASH
+        assert PaymentMethod.DEBT.value == "Борг"
+        assert len(list(PaymentMethod)) == 6
+
+    assert len(count_queries) == 1
+    assert registry.loads >= 1
+    assert isinstance(test_appointment.payment_method, PaymentMethodValue)
+
+
+def test_registry_refreshes_on_payment_method_changes(session, payment_methods):
+    registry = get_payment_method_registry()
+    assert registry.by_name("Картка") is None
+
+    session.add(PaymentMethodModel(name="Картка", is_active=True))
+    session.commit()
+    assert registry.by_name("Картка").id is not None
+
+    method = PaymentMethodModel.query.filter_by(name="MONO").first()
+    method.is_active = False
+    session.commit()
+    assert "MONO" not in [pm.name for pm in registry.all(active_only=True)]
+    assert registry.get(method.id).is_active is False
+
+
+def test_registry_drops_rolled_back_rows(session, payment_methods):
+    registry = get_payment_method_registry()
+    nested = session.begin_nested()
+    session.add(PaymentMethodModel(name="Тимчасовий", is_active=True))
+    session.flush()
+    assert registry.by_name("Тимчасовий") is not None
+
+    nested.rollback()
+
+    assert registry.by_name("Тимчасовий") is None
+
+
+def test_setter_resolves_names_through_registry(session, payment_methods, test_appointment):
+    test_appointment.payment_method = "Приват"
+    assert test_appointment.payment_method == PaymentMethod.PRIVAT
+
+    test_appointment.payment_method = PaymentMethod.DEBT
+    assert test_appointment.payment_method.name == "Борг"
+
+    with pytest.raises(ValueError):
+        test_appointment.payment_method = "Невідомий"
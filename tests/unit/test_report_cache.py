@@ -0,0 +1,201 @@
+"""
+Unit tests for the report result cache.
+"""
+
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.models import Client, Sale
+from app.services.report_cache import ReportCache, get_report_cache, init_app
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _builder(value):
+    calls = []
+
+    def build():
+        calls.append(value)
+        return value
+
+    return build, calls
+
+
+class TestReportCache:
+    """Test pinning, TTL expiry and counters."""
+
+    def test_past_range_is_pinned(self):
+        clock = FakeClock()
+        cache = ReportCache(maxsize=10, ttl=60, clock=clock)
+        past = date.today() - timedelta(days=10)
+        build, calls = _builder({"total": 1})
+
+        cache.get_or_build("financial_report", {"start": past}, past, past, build)
+        clock.now += 3600
+        cache.invalidate_days([date.today()])  # зміна сьогоднішніх даних не чіпає закритий період
+
+        assert cache.get_or_build("financial_report", {"start": past}, past, past, build) == {"total": 1}
+        assert len(calls) == 1
+        assert cache.stats()["pinned"] == 1
+
+    def test_range_with_today_expires(self):
+        clock = FakeClock()
+        cache = ReportCache(maxsize=10, ttl=60, clock=clock)
+        today = date.today()
+        build, calls = _builder("report")
+
+        cache.get_or_build("salary_report", {"date": today}, today, today, build)
+        clock.now += 30
+        cache.get_or_build("salary_report", {"date": today}, today, today, build)
+        assert len(calls) == 1
+
+        clock.now += 31
+        cache.get_or_build("salary_report", {"date": today}, today, today, build)
+        assert len(calls) == 2
+
+    def test_invalidate_days_drops_covering_ranges(self):
+        cache = ReportCache(maxsize=10)
+        start = date.today() - timedelta(days=30)
+        end = date.today() - timedelta(days=20)
+        other = date.today() - timedelta(days=5)
+        cache.get_or_build("financial_report", {"p": 1}, start, end, lambda: 1)
+        cache.get_or_build("financial_report", {"p": 2}, other, other, lambda: 2)
+
+        assert cache.invalidate_days([start + timedelta(days=3)]) == 1
+        assert cache.stats()["size"] == 1
+        assert cache.version == 1
+
+    def test_lru_eviction_and_disabled_cache(self):
+        past = date.today() - timedelta(days=1)
+        cache = ReportCache(maxsize=2)
+        for value in range(3):
+            cache.get_or_build("salary_report", {"master_id": value}, past, past, lambda value=value: value)
+        assert cache.stats()["size"] == 2
+
+        disabled = ReportCache(maxsize=0)
+        build, calls = _builder(1)
+        disabled.get_or_build("salary_report", {}, past, past, build)
+        disabled.get_or_build("salary_report", {}, past, past, build)
+        assert len(calls) == 2
+        assert disabled.stats()["size"] == 0
+
+        with pytest.raises(ValueError):
+            ReportCache(maxsize=-1)
+
+    def test_stats(self):
+        cache = ReportCache(maxsize=10)
+        past = date.today() - timedelta(days=1)
+        for _ in range(3):
+            cache.get_or_build("financial_report", {}, past, past, lambda: {"rows": list(range(100))})
+        cache.get_or_build("salary_report", {}, past, past, lambda: None)
+
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (2, 2, 0.5)
+        assert stats["reports"]["financial_report"] == {"hits": 2, "misses": 1, "hit_rate": 2 / 3}
+        assert stats["memory_bytes"] > 100
+
+    def test_init_app_from_config(self, app):
+        app.config["REPORT_CACHE_SIZE"] = 5
+        app.config["REPORT_CACHE_TTL"] = 15
+        cache = init_app(app)
+
+        assert get_report_cache() is cache
+        assert (cache.maxsize, cache.ttl) == (5, 15)
+
+
+class TestReportCacheInvalidation:
+    """Test invalidation after committed writes."""
+
+    @pytest.fixture
+    def cache(self, app):
+        return get_report_cache()
+
+    def test_past_appointment_edit_invalidates_pinned_report(self, session, cache, test_appointment):
+        day = date.today() - timedelta(days=7)
+        test_appointment.date = day
+        test_appointment.status = "completed"
+        session.commit()
+        untouched = day - timedelta(days=30)
+        cache.get_or_build("financial_report", {"day": day}, day, day, lambda: "old")
+        cache.get_or_build("financial_report", {"day": untouched}, untouched, untouched, lambda: "kept")
+
+        test_appointment.amount_paid = Decimal("50.00")
+        session.commit()
+
+        assert cache.get_or_build("financial_report", {"day": day}, day, day, lambda: "new") == "new"
+        assert cache.get_or_build("financial_report", {"day": untouched}, untouched, untouched, lambda: "-") == "kept"
+
+    def test_appointment_time_and_client_edits_invalidate_pinned_report(self, session, cache, test_appointment):
+        day = date.today() - timedelta(days=7)
+        test_appointment.date = day
+        session.commit()
+        other_client = Client(name="Other Client", phone="+380991112233")
+        session.add(other_client)
+        session.commit()
+
+        edits = [
+            ("start_time", time(15, 0)),
+            ("end_time", time(16, 30)),
+            ("client_id", other_client.id),
+        ]
+        for field, value in edits:
+            cache.get_or_build("salary_report", {"day": day}, day, day, lambda: "old")
+            setattr(test_appointment, field, value)
+            session.commit()
+            assert cache.get_or_build("salary_report", {"day": day}, day, day, lambda: "new") == "new", field
+            cache.clear()
+
+    def test_rollback_keeps_cache(self, session, cache, admin_user):
+        day = date.today() - timedelta(days=1)
+        cache.get_or_build("salary_report", {}, day, day, lambda: "cached")
+
+        session.add(Sale(user_id=admin_user.id, created_by_user_id=admin_user.id, total_amount=Decimal("10.00")))
+        session.flush()
+        session.rollback()
+
+        assert cache.stats()["size"] == 1
+
+    def test_user_change_clears_cache(self, session, cache, regular_user):
+        day = date.today() - timedelta(days=1)
+        cache.get_or_build("salary_report", {"master_id": regular_user.id}, day, day, lambda: "cached")
+
+        regular_user.full_name = "Renamed Master"
+        session.commit()
+
+        assert cache.stats()["size"] == 0
+
+
+class TestReportCacheRoutes:
+    """Test cached report routes and the admin statistics page."""
+
+    def test_financial_report_is_cached(self, admin_auth_client):
+        day = (date.today() - timedelta(days=3)).isoformat()
+        for _ in range(2):
+            response = admin_auth_client.post(
+                "/reports/financial", data={"start_date": day, "end_date": day}, follow_redirects=True
+            )
+            assert response.status_code == 200
+
+        stats = get_report_cache().stats()
+        assert stats["reports"]["financial_report"]["hits"] == 1
+
+        response = admin_auth_client.get("/reports/cache")
+        assert response.status_code == 200
+        html_content = response.data.decode("utf-8")
+        assert "financial_report" in html_content
+        assert "50.0%" in html_content
+
+        response = admin_auth_client.post("/reports/cache", follow_redirects=True)
+        assert "Кеш звітів очищено." in response.data.decode("utf-8")
+        assert get_report_cache().stats()["size"] == 0
+
+    def test_cache_page_requires_admin(self, auth_client):
+        assert auth_client.get("/reports/cache").status_code == 403
@@ -0,0 +1,199 @@
+"""
+Unit tests for background report jobs.
+"""
+
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.models import ReportJob, Sale, SaleItem
+from app.services import report_jobs
+from app.services.report_jobs import (
+    JOB_COMPLETED,
+    JOB_FAILED,
+    JOB_PENDING,
+    JOB_RUNNING,
+    ReportJobQueueFull,
+    ReportJobRunner,
+    ReportJobType,
+    init_app,
+    job_csv,
+    job_result,
+)
+from app.services.report_service import ReportService
+
+
+@pytest.fixture
+def runner(app):
+    app.config["REPORT_JOB_WORKERS"] = 0
+    return init_app(app)
+
+
+@pytest.fixture
+def year_range(session, admin_user, test_product):
+    end = date.today()
+    start = end - timedelta(days=364)
+    sale = Sale(
+        sale_date=datetime.combine(end - timedelta(days=100), time(12, 0)),
+        user_id=admin_user.id,
+        created_by_user_id=admin_user.id,
+        total_amount=Decimal("150.00"),
+    )
+    sale.items.append(
+        SaleItem(
+            product_id=test_product.id,
+            quantity=3,
+            price_per_unit=Decimal("50.00"),
+            cost_price_per_unit=Decimal("20.00"),
+        )
+    )
+    session.add(sale)
+    session.commit()
+    return start, end
+
+
+class TestReportJobRunner:
+    """Test job execution, failures and the pending limit."""
+
+    def test_inline_job_stores_result(self, runner, year_range, admin_user):
+        start, end = year_range
+
+        job = runner.submit("financial_report", {"start_date": start, "end_date": end}, admin_user.id)
+
+        assert job.status == JOB_COMPLETED
+        assert job.started_at is not None and job.finished_at is not None
+        expected = ReportService.get_financial_summary(start, end)
+        assert job_result(job) == {key: expected[key] for key in job_result(job)}
+        assert "Загальний дохід,150.00" in job_csv(job)
+
+    def test_failed_job(self, runner, admin_user, monkeypatch):
+        def broken(start_date, end_date):
+            raise RuntimeError("boom")
+
+        monkeypatch.setitem(report_jobs.JOB_TYPES, "financial_report", ReportJobType(broken, dict, lambda r: []))
+        today = date.today()
+
+        job = runner.submit("financial_report", {"start_date": today, "end_date": today}, admin_user.id)
+
+        assert job.status == JOB_FAILED
+        assert job.error == "boom"
+
+    def test_job_failed_as_stale_is_not_overwritten(self, runner, session, admin_user, monkeypatch):
+        def outlived_timeout(start_date, end_date):
+            # Інший процес уже вважає завдання втраченим
+            runner.timeout = -1
+            runner.fail_stale_jobs()
+            return {}
+
+        monkeypatch.setitem(
+            report_jobs.JOB_TYPES, "financial_report", ReportJobType(outlived_timeout, dict, lambda r: [])
+        )
+        today = date.today()
+
+        job = runner.submit("financial_report", {"start_date": today, "end_date": today}, admin_user.id)
+
+        session.refresh(job)
+        assert job.status == JOB_FAILED
+        assert job.error and job.result is None
+
+    def test_pending_limit(self, app, session, admin_user):
+        runner = ReportJobRunner(app, max_workers=0, max_pending=1)
+        session.add(ReportJob(report_type="financial_report", params="{}", status=JOB_PENDING, user_id=admin_user.id))
+        session.commit()
+
+        with pytest.raises(ReportJobQueueFull):
+            runner.submit("financial_report", {"start_date": date.today(), "end_date": date.today()}, admin_user.id)
+
+    def test_stale_jobs_fail_and_free_the_queue(self, app, session, admin_user):
+        runner = ReportJobRunner(app, max_workers=0, max_pending=2, timeout=600)
+        now = datetime.now(timezone.utc)
+        orphaned = [
+            ReportJob(
+                report_type="financial_report",
+                params="{}",
+                status=JOB_PENDING,
+                user_id=admin_user.id,
+                created_at=now - timedelta(hours=2),
+            ),
+            ReportJob(
+                report_type="financial_report",
+                params="{}",
+                status=JOB_RUNNING,
+                user_id=admin_user.id,
+                created_at=now - timedelta(hours=2),
+                started_at=now - timedelta(minutes=15),
+            ),
+        ]
+        queued = ReportJob(report_type="financial_report", params="{}", status=JOB_PENDING, user_id=admin_user.id)
+        session.add_all([*orphaned, queued])
+        session.commit()
+
+        job = runner.submit("financial_report", {"start_date": date.today(), "end_date": date.today()}, admin_user.id)
+
+        assert job.status == JOB_COMPLETED
+        assert [stale.status for stale in orphaned] == [JOB_FAILED, JOB_FAILED]
+        assert all(stale.error and stale.finished_at for stale in orphaned)
+        assert queued.status == JOB_PENDING
+
+    def test_threaded_runner_schedules_job(self, app, admin_user):
+        runner = ReportJobRunner(app, max_workers=1)
+        scheduled = []
+        runner._executor.shutdown()
+        runner._executor = type("Executor", (), {"submit": lambda self, fn, job_id: scheduled.append(job_id)})()
+
+        job = runner.submit("financial_report", {"start_date": date.today(), "end_date": date.today()}, admin_user.id)
+
+        assert job.status == JOB_PENDING
+        assert scheduled == [job.id]
+
+
+class TestReportJobRoutes:
+    """Test enqueueing from the financial report and the job endpoints."""
+
+    def test_long_range_runs_as_job(self, runner, year_range, admin_auth_client):
+        start, end = year_range
+        response = admin_auth_client.post(
+            "/reports/financial", data={"start_date": start.isoformat(), "end_date": end.isoformat()}
+        )
+        assert "Звіт формується у фоні" in response.data.decode("utf-8")
+        job = ReportJob.query.one()
+
+        status = admin_auth_client.get(f"/reports/jobs/{job.id}/status").get_json()
+        assert status["status"] == JOB_COMPLETED
+        assert status["download_url"] == f"/reports/jobs/{job.id}/download"
+
+        result = admin_auth_client.get(status["result_url"])
+        assert result.status_code == 200
+        assert "150,00" in result.data.decode("utf-8")
+
+        download = admin_auth_client.get(status["download_url"])
+        assert download.mimetype == "text/csv"
+        assert "attachment" in download.headers["Content-Disposition"]
+
+    def test_short_range_is_built_in_request(self, runner, admin_auth_client):
+        today = date.today().isoformat()
+        admin_auth_client.post("/reports/financial", data={"start_date": today, "end_date": today})
+        assert ReportJob.query.count() == 0
+
+    def test_foreign_job_is_forbidden(self, session, admin_user, auth_client):
+        job = ReportJob(report_type="financial_report", params="{}", status=JOB_PENDING, user_id=admin_user.id)
+        session.add(job)
+        session.commit()
+
+        assert auth_client.get(f"/reports/jobs/{job.id}/status").status_code == 403
+
+    def test_status_of_orphaned_job_is_failed(self, runner, session, admin_user, admin_auth_client):
+        job = ReportJob(
+            report_type="financial_report",
+            params="{}",
+            status=JOB_PENDING,
+            user_id=admin_user.id,
+            created_at=datetime.now(timezone.utc) - timedelta(seconds=runner.timeout + 60),
+        )
+        session.add(job)
+        session.commit()
+
+        status = admin_auth_client.get(f"/reports/jobs/{job.id}/status").get_json()
+        assert status["status"] == JOB_FAILED
+        assert status["error"]
@@ -0,0 +1,146 @@
+"""
+Unit tests for set-based report aggregation.
+"""
+
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.models import Appointment, AppointmentService, PaymentMethod, Sale, SaleItem
+from app.services.report_service import NOT_SPECIFIED, ReportService
+
+
+def _appointment(session, test_client, master, service, day, prices, **fields):
+    appointment = Appointment(
+        client_id=test_client.id,
+        master_id=master.id,
+        date=day,
+        start_time=time(10, 0),
+        end_time=time(11, 0),
+        status=fields.pop("status", "completed"),
+        **fields,
+    )
+    session.add(appointment)
+    session.flush()
+    for price in prices:
+        session.add(AppointmentService(appointment_id=appointment.id, service_id=service.id, price=price))
+    return appointment
+
+
+def test_financial_summary(session, regular_user, admin_user, test_client, test_service, test_product, payment_methods):
+    cash = next(pm for pm in payment_methods if pm.name == "Готівка")
+    retired = PaymentMethod(name="Стара каса", is_active=False)
+    session.add(retired)
+    day = date.today()
+
+    # Знижка 12.5% з 100.10 + 33.33 = 116.75125
+    _appointment(
+        session, test_client, regular_user, test_service, day, [100.10, 33.33], discount_percentage=Decimal("12.5")
+    )
+    _appointment(
+        session,
+        test_client,
+        regular_user,
+        test_service,
+        day,
+        [500],
+        amount_paid=Decimal("450"),
+        payment_method_id=cash.id,
+    )
+    _appointment(session, test_client, regular_user, test_service, day, [999], status="scheduled")
+    _appointment(session, test_client, regular_user, test_service, day - timedelta(days=40), [999])
+
+    sale = Sale(
+        sale_date=datetime.combine(day, time(12, 0)),
+        user_id=admin_user.id,
+        created_by_user_id=admin_user.id,
+        total_amount=Decimal("90.00"),
+        payment_method_id=retired.id,
+    )
+    session.add(sale)
+    session.flush()
+    session.add(
+        SaleItem(
+            sale_id=sale.id,
+            product_id=test_product.id,
+            quantity=3,
+            price_per_unit=Decimal("30.00"),
+            cost_price_per_unit=Decimal("12.50"),
+        )
+    )
+    session.commit()
+
+    summary = ReportService.get_financial_summary(day - timedelta(days=7), day)
+
+    assert summary["service_revenue"] == Decimal("566.75")
+    assert summary["product_revenue"] == Decimal("90.00")
+    assert summary["total_cogs"] == Decimal("37.50")
+    assert summary["product_gross_profit"] == Decimal("52.50")
+    assert summary["total_revenue"] == Decimal("656.75")
+    breakdown = dict(summary["payment_breakdown"])
+    assert breakdown["Готівка"] == Decimal("450.00")
+    assert breakdown[NOT_SPECIFIED] == Decimal("116.75")
+    assert breakdown["Стара каса"] == Decimal("90.00")
+    assert breakdown["Борг"] == Decimal("0.00")
+    assert [name for name, _ in summary["payment_breakdown"]] == sorted(breakdown)
+
+
+def test_all_masters_salary_matches_single_master_reports(
+    session, regular_user, admin_user, test_client, test_service, payment_methods
+):
+    regular_user.configurable_commission_rate = Decimal("30.00")
+    day = date.today()
+    _appointment(session, test_client, regular_user, test_service, day, [100.10, 33.33])
+    _appointment(session, test_client, regular_user, test_service, day - timedelta(days=2), [250])
+    _appointment(session, test_client, regular_user, test_service, day - timedelta(days=9), [999])
+    _appointment(session, test_client, admin_user, test_service, day, [80], status="scheduled")
+    session.add(
+        Sale(
+            sale_date=datetime.combine(day - timedelta(days=1), time(12, 0)),
+            user_id=regular_user.id,
+            created_by_user_id=admin_user.id,
+            total_amount=Decimal("200.00"),
+        )
+    )
+    session.commit()
+    start = day - timedelta(days=3)
+
+    report = ReportService.get_all_masters_salary(start, day)
+
+    rows = {row.master.id: row for row in report["masters"]}
+    assert set(rows) == {regular_user.id}  # адміністратор без роботи у звіт не потрапляє
+    single = ReportService.get_master_salary(regular_user.id, start, day)
+    row = rows[regular_user.id]
+    assert row.appointment_count == 2
+    assert row.total_services_cost == single["total_services_cost"] == 383.43
+    assert row.services_commission == pytest.approx(single["services_commission"]) == 115.029
+    assert row.products_commission == single["products_commission"] == 18.0
+    assert report["total_salary"] == row.total_salary
+
+
+def test_all_admins_salary_matches_single_admin_reports(session, regular_user, admin_user, test_client, test_service):
+    admin_user.configurable_commission_rate = Decimal("10.00")
+    day = date.today()
+    _appointment(session, test_client, admin_user, test_service, day, [150])
+    for user, amount in ((admin_user, "300.00"), (regular_user, "500.00")):
+        session.add(
+            Sale(
+                sale_date=datetime.combine(day, time(12, 0)),
+                user_id=user.id,
+                created_by_user_id=admin_user.id,
+                total_amount=Decimal(amount),
+            )
+        )
+    session.commit()
+
+    report = ReportService.get_all_admins_salary(day, day)
+
+    assert [row.admin.id for row in report["admins"]] == [admin_user.id]
+    row = report["admins"][0]
+    single = ReportService.get_admin_salary(admin_user.id, day, day)
+    assert row.services_commission == pytest.approx(single["services_commission"]) == 15.0
+    assert row.personal_products_commission == pytest.approx(single["personal_products_commission"]) == 33.0
+    assert row.masters_products_share == single["masters_products_share"] == 5.0
+    assert row.total_salary == pytest.approx(single["total_salary"])
+    assert report["total_masters_products_cost"] == 500.0
@@ -0,0 +1,155 @@
+"""
+Unit tests for the per-(date, master) schedule column cache.
+"""
+
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.models import Appointment, AppointmentService, Sale
+from app.services.schedule_cache import (
+    CacheBackend,
+    LRUCacheBackend,
+    NullCacheBackend,
+    ScheduleCache,
+    get_schedule_cache,
+    init_app,
+)
+
+
+class TestLRUCacheBackend:
+    """Test the in-process LRU backend."""
+
+    def test_evicts_least_recently_used(self):
+        backend = LRUCacheBackend(maxsize=2)
+        backend.set("a", 1)
+        backend.set("b", 2)
+        assert backend.get("a") == 1  # "a" стає найсвіжішим
+
+        backend.set("c", 3)
+
+        assert backend.get("b") is None
+        assert backend.get("a") == 1
+        assert backend.get("c") == 3
+        assert len(backend) == 2
+
+    def test_rejects_invalid_size(self):
+        with pytest.raises(ValueError):
+            LRUCacheBackend(maxsize=0)
+
+    def test_incomplete_backend_cannot_be_created(self):
+        class GetOnlyBackend(CacheBackend):
+            def get(self, key):
+                return None
+
+        with pytest.raises(TypeError):
+            GetOnlyBackend()
+
+
+class TestScheduleCache:
+    """Test counters and backend selection."""
+
+    def test_hit_miss_counters(self):
+        cache = ScheduleCache(LRUCacheBackend(maxsize=10))
+        day = date(2025, 1, 10)
+
+        assert cache.get(day, 1) is None
+        cache.set(day, 1, "column")
+        assert cache.get(day, 1) == "column"
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["size"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_backend_from_config(self, app):
+        app.config["SCHEDULE_CACHE_BACKEND"] = "null"
+        assert isinstance(init_app(app).backend, NullCacheBackend)
+
+        backend = LRUCacheBackend(maxsize=3)
+        app.config["SCHEDULE_CACHE_BACKEND"] = backend
+        assert init_app(app).backend is backend
+        assert get_schedule_cache().backend is backend
+
+
+class TestScheduleCacheInvalidation:
+    """Test after_flush invalidation for appointment-related writes."""
+
+    @pytest.fixture
+    def cache(self, app):
+        return get_schedule_cache()
+
+    def _fill(self, cache, *keys):
+        for day, master_id in keys:
+            cache.set(day, master_id, "column")
+
+    def test_new_appointment_invalidates_its_column(self, session, cache, regular_user, admin_user, test_client):
+        day = date.today() + timedelta(days=1)
+        self._fill(cache, (day, regular_user.id), (day, admin_user.id))
+
+        session.add(
+            Appointment(
+                client_id=test_client.id,
+                master_id=regular_user.id,
+                date=day,
+                start_time=time(10, 0),
+                end_time=time(11, 0),
+            )
+        )
+        session.commit()
+
+        assert cache.backend.get((day, regular_user.id)) is None
+        assert cache.backend.get((day, admin_user.id)) == "column"
+
+    def test_moved_appointment_invalidates_old_and_new_date(self, session, cache, test_appointment):
+        old_day = test_appointment.date
+        new_day = old_day + timedelta(days=3)
+        self._fill(cache, (old_day, test_appointment.master_id), (new_day, test_appointment.master_id))
+
+        test_appointment.date = new_day
+        session.commit()
+
+        assert cache.backend.get((old_day, test_appointment.master_id)) is None
+        assert cache.backend.get((new_day, test_appointment.master_id)) is None
+
+    def test_service_and_sale_changes_invalidate_appointment_column(
+        self, session, cache, test_appointment, test_service, admin_user
+    ):
+        key = (test_appointment.date, test_appointment.master_id)
+
+        self._fill(cache, key)
+        session.add(AppointmentService(appointment_id=test_appointment.id, service_id=test_service.id, price=50.0))
+        session.commit()
+        assert cache.backend.get(key) is None
+
+        self._fill(cache, key)
+        session.add(
+            Sale(
+                user_id=admin_user.id,
+                created_by_user_id=admin_user.id,
+                appointment_id=test_appointment.id,
+                total_amount=Decimal("120.00"),
+            )
+        )
+        session.commit()
+        assert cache.backend.get(key) is None
+
+    def test_unrelated_sale_keeps_cache(self, session, cache, test_appointment, admin_user):
+        key = (test_appointment.date, test_appointment.master_id)
+        self._fill(cache, key)
+
+        session.add(Sale(user_id=admin_user.id, created_by_user_id=admin_user.id, total_amount=Decimal("10.00")))
+        session.commit()
+
+        assert cache.backend.get(key) == "column"
+
+    def test_bulk_delete_clears_cache(self, session, cache, test_appointment):
+        key = (test_appointment.date, test_appointment.master_id)
+        self._fill(cache, key)
+
+        AppointmentService.query.filter_by(appointment_id=test_appointment.id).delete()
+        session.commit()
+
+        assert cache.backend.get(key) is None
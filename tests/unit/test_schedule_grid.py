@@ -0,0 +1,132 @@
+"""
+Unit tests for the interval-indexed schedule grid builder.
+"""
+
+from datetime import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app.routes.main import generate_time_intervals, generate_time_slots
+from app.services.schedule_grid import ScheduleGrid, build_schedule_data, describe_appointment
+
+
+def make_appointment(appointment_id, master_id, start, end, client_id=1, status="scheduled"):
+    """Легковаговий замінник Appointment без бази даних."""
+    return SimpleNamespace(
+        id=appointment_id,
+        master_id=master_id,
+        client_id=client_id,
+        start_time=start,
+        end_time=end,
+        status=status,
+        payment_status="unpaid",
+        amount_paid=None,
+        client=SimpleNamespace(name=f"Клієнт {client_id}", phone="+380000000000"),
+        services=[SimpleNamespace(service=SimpleNamespace(name="Стрижка"))],
+        get_discounted_price=lambda: Decimal("100.00"),
+    )
+
+
+def legacy_placement(slots, intervals, appointment, details):
+    """Попередній алгоритм: перебір усіх слотів для кожного запису."""
+    column = {slot.strftime("%H:%M"): [] for slot in slots}
+    start_slot_str = appointment.start_time.strftime("%H:%M")
+    for slot in slots:
+        slot_str = slot.strftime("%H:%M")
+        if appointment.start_time <= slot < appointment.end_time:
+            if slot_str == start_slot_str:
+                entry = details.copy()
+                entry["display_type"] = "full"
+            else:
+                entry = {"id": details["id"], "display_type": "continuation", "css_class": details["css_class"]}
+            column[slot_str].append(entry)
+
+    if appointment.start_time.minute in [15, 45] or appointment.end_time.minute in [15, 45]:
+        for interval in intervals:
+            if any(appointment.start_time <= sub_slot < appointment.end_time for sub_slot in interval["sub_slots"]):
+                interval["expanded"] = True
+    return column
+
+
+@pytest.fixture
+def viewer():
+    return SimpleNamespace(id=1, is_admin=True)
+
+
+class TestScheduleGrid:
+    """Test slot index arithmetic."""
+
+    def test_rejects_irregular_slots(self):
+        with pytest.raises(ValueError):
+            ScheduleGrid([time(8, 0), time(8, 15), time(8, 40)])
+
+    def test_slot_range_clips_to_working_day(self):
+        grid = ScheduleGrid(generate_time_slots(8, 21, 15))
+
+        assert grid.slot_range(time(7, 0), time(8, 30)) == range(0, 2)
+        assert grid.slot_range(time(20, 45), time(23, 0)) == range(51, 53)
+        assert grid.slot_range(time(8, 10), time(8, 20)) == range(1, 2)
+        assert grid.slot_range(time(9, 0), time(9, 0)) == range(4, 4)
+        assert grid.index_of(time(8, 10)) is None
+
+    @pytest.mark.parametrize(
+        "start,end",
+        [
+            (time(9, 0), time(10, 0)),
+            (time(9, 15), time(9, 45)),
+            (time(10, 10), time(11, 5)),
+            (time(7, 30), time(8, 45)),
+            (time(20, 30), time(22, 0)),
+            (time(12, 0), time(12, 0)),
+        ],
+    )
+    def test_matches_legacy_loop(self, viewer, start, end):
+        slots = generate_time_slots(8, 21, 15)
+        legacy_intervals = generate_time_intervals(8, 21)
+        intervals = generate_time_intervals(8, 21)
+        appointment = make_appointment(1, 1, start, end)
+        master = SimpleNamespace(id=1)
+
+        schedule_data = build_schedule_data(ScheduleGrid(slots, intervals), [master], [appointment], viewer, set())
+        base = describe_appointment(appointment, multi_booking=False, can_edit=True)
+        expected = legacy_placement(slots, legacy_intervals, appointment, base)
+
+        assert schedule_data[1] == expected
+        assert [i["expanded"] for i in intervals] == [i["expanded"] for i in legacy_intervals]
+
+
+class TestBuildScheduleData:
+    """Test schedule_data assembly for the schedule page."""
+
+    def test_skips_masters_not_displayed(self, viewer):
+        grid = ScheduleGrid(generate_time_slots(8, 21, 15))
+        appointments = [
+            make_appointment(1, 1, time(9, 0), time(9, 30)),
+            make_appointment(2, 2, time(9, 0), time(9, 30)),
+        ]
+
+        schedule_data = build_schedule_data(grid, [SimpleNamespace(id=1)], appointments, viewer, set())
+
+        assert list(schedule_data) == [1]
+        assert [entry["id"] for entry in schedule_data[1]["09:00"]] == [1]
+
+    def test_flags_and_permissions(self):
+        grid = ScheduleGrid(generate_time_slots(8, 21, 15))
+        masters = [SimpleNamespace(id=1), SimpleNamespace(id=2)]
+        appointments = [
+            make_appointment(1, 1, time(9, 0), time(9, 30), client_id=5),
+            make_appointment(2, 2, time(10, 0), time(10, 30), client_id=6, status="completed"),
+        ]
+        master_viewer = SimpleNamespace(id=1, is_admin=False)
+
+        schedule_data = build_schedule_data(grid, masters, appointments, master_viewer, {5})
+
+        own = schedule_data[1]["09:00"][0]
+        other = schedule_data[2]["10:00"][0]
+        assert own["can_edit"] is True and own["multi_booking"] is True
+        assert other["can_edit"] is False and other["multi_booking"] is False
+        assert other["css_class"] == "status-completed-debt"
+        assert other["completion_info"] == "(Завершено)"
+        assert schedule_data[1]["09:15"] == [{"id": 1, "display_type": "continuation", "css_class": "status-scheduled"}]
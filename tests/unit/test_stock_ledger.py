@@ -0,0 +1,172 @@
+"""
+Unit tests for the stock movement ledger and monthly snapshots.
+"""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.models import (
+    Brand,
+    GoodsReceipt,
+    GoodsReceiptItem,
+    Product,
+    StockLevel,
+    StockMovement,
+    StockSnapshot,
+    WriteOffReason,
+    db,
+    local_day,
+    month_start,
+)
+from app.services.inventory_service import InventoryService, WriteOffItemData
+from app.services.sales_service import SaleItemData, SalesService
+from app.services.stock_ledger import StockLedgerService, next_month
+
+
+@pytest.fixture
+def products(session):
+    brand = Brand(name="Ledger")
+    session.add(brand)
+    session.flush()
+    items = [
+        Product(name=f"Ledger {i}", sku=f"LEDGER-{i}", brand_id=brand.id, current_sale_price=Decimal("20.00"))
+        for i in range(3)
+    ]
+    session.add_all(items)
+    session.commit()
+    return items
+
+
+def _add_movements(session, movements):
+    session.add_all(
+        StockMovement(product_id=product.id, day=day, quantity=quantity, kind="adjustment")
+        for product, day, quantity in movements
+    )
+    session.commit()
+
+
+def _replayed(day):
+    """Залишок на кінець дня повним перебором журналу."""
+    stock = {}
+    for movement in StockMovement.query.filter(StockMovement.day <= day):
+        stock[movement.product_id] = stock.get(movement.product_id, 0) + movement.quantity
+    return stock
+
+
+class TestMovementRecording:
+    """Test that stock documents append ledger rows."""
+
+    def test_receipt_sale_and_write_off_lines(self, session, products, admin_user):
+        product = products[0]
+        receipt = GoodsReceipt(receipt_date=date(2025, 3, 3), user_id=admin_user.id)
+        receipt.items.append(
+            GoodsReceiptItem(
+                product_id=product.id,
+                quantity_received=10,
+                quantity_remaining=10,
+                cost_price_per_unit=Decimal("8.00"),
+                receipt_date=datetime(2025, 3, 3),
+            )
+        )
+        session.add(receipt)
+        StockLevel.query.filter_by(product_id=product.id).one().quantity = 10
+        session.commit()
+        reason = WriteOffReason(name="Бій")
+        session.add(reason)
+        session.commit()
+
+        sale = SalesService.create_sale(
+            user_id=admin_user.id,
+            created_by_user_id=admin_user.id,
+            sale_items=[SaleItemData(product.id, 3)],
+            sale_date=datetime(2025, 3, 5, 12, 0),
+        )
+        write_off = InventoryService.create_write_off(
+            user_id=admin_user.id,
+            reason_id=reason.id,
+            write_off_items=[WriteOffItemData(product.id, 2)],
+            write_off_date=date(2025, 3, 7),
+        )
+
+        movements = [
+            (movement.kind, movement.day, movement.quantity, movement.source_id)
+            for movement in StockMovement.query.order_by(StockMovement.id)
+        ]
+        assert movements == [
+            ("receipt", date(2025, 3, 3), 10, receipt.items[0].id),
+            ("sale", date(2025, 3, 5), -3, sale.items[0].id),
+            ("write_off", date(2025, 3, 7), -2, write_off.items[0].id),
+        ]
+        assert (
+            sum(quantity for _, _, quantity, _ in movements)
+            == StockLevel.query.filter_by(product_id=product.id).one().quantity
+        )
+
+
+class TestPointInTimeStock:
+    """Test stock_on with and without snapshots."""
+
+    def test_snapshots_do_not_change_answers(self, session, products):
+        first, second, third = products
+        _add_movements(
+            session,
+            [
+                (first, date(2024, 11, 20), 30),
+                (first, date(2024, 12, 31), -5),
+                (second, date(2025, 1, 1), 12),
+                (first, date(2025, 2, 14), -7),
+                (second, date(2025, 2, 28), -2),
+                (third, date(2025, 3, 2), 4),
+            ],
+        )
+        days = [date(2024, 11, 19), date(2024, 12, 31), date(2025, 1, 1), date(2025, 2, 20), date(2025, 3, 31)]
+        before = {day: StockLedgerService.stock_on(day) for day in days}
+        assert before == {day: _replayed(day) for day in days}
+
+        written = StockLedgerService.take_snapshots(through=date(2025, 3, 15))
+        session.commit()
+
+        # Зрізи на 1.12, 1.01, 1.02, 1.03: лише товари з рухами до початку періоду
+        assert written == 1 + 1 + 2 + 2
+        assert {day: StockLedgerService.stock_on(day) for day in days} == before
+        assert StockLedgerService.stock_on(date(2025, 2, 20), [second.id]) == {second.id: 12}
+        assert StockLedgerService.take_snapshots(through=date(2025, 3, 15)) == 0
+
+    def test_future_months_are_not_snapshotted(self, session, products):
+        _add_movements(session, [(products[0], month_start(local_day(None)) - timedelta(days=40), 5)])
+
+        StockLedgerService.take_snapshots(through=local_day(None) + timedelta(days=90))
+
+        latest = db.session.query(db.func.max(StockSnapshot.period_start)).scalar()
+        assert latest == month_start(local_day(None))
+
+    def test_backdated_movement_shifts_later_snapshots(self, session, products):
+        first, second, _ = products
+        _add_movements(session, [(first, date(2024, 1, 10), 10)])
+        StockLedgerService.take_snapshots(through=date(2024, 4, 1))
+        session.commit()
+
+        # Документи заднім числом: товар із зрізами та товар, якого в зрізах ще немає
+        _add_movements(session, [(first, date(2024, 2, 5), -4), (second, date(2024, 2, 6), 3)])
+
+        snapshots = {
+            (snapshot.product_id, snapshot.period_start): snapshot.quantity for snapshot in StockSnapshot.query
+        }
+        assert snapshots == {
+            (first.id, date(2024, 2, 1)): 10,
+            (first.id, date(2024, 3, 1)): 6,
+            (first.id, date(2024, 4, 1)): 6,
+            (second.id, date(2024, 3, 1)): 3,
+            (second.id, date(2024, 4, 1)): 3,
+        }
+        assert (
+            StockLedgerService.stock_on(date(2024, 4, 30))
+            == _replayed(date(2024, 4, 30))
+            == {first.id: 6, second.id: 3}
+        )
+
+    def test_next_month_wraps_year(self):
+        assert next_month(date(2024, 12, 31)) == date(2025, 1, 1)
+        assert next_month(date(2025, 1, 15)) == date(2025, 2, 1)
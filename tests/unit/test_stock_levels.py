@@ -0,0 +1,126 @@
+"""
+Unit tests for the stock levels loader and its cached product count.
+"""
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app.models import Brand, Product, StockLevel, db
+from app.services.count_cache import CountCache
+from app.services.stock_levels import StockLevelsService, get_product_count_cache
+
+
+@pytest.fixture
+def stocked_catalog(session):
+    """45 products of 3 brands; every fifth one is at or below its minimum."""
+    brands = [Brand(name=f"Бренд {i}") for i in range(3)]
+    session.add_all(brands)
+    session.flush()
+    products = [
+        Product(
+            name=f"Товар {i:02d}",
+            sku=f"STOCK-{i:02d}",
+            brand_id=brands[i % 3].id,
+            min_stock_level=5 if i % 5 == 0 else None,
+        )
+        for i in range(45)
+    ]
+    session.add_all(products)
+    session.flush()
+    for i, product in enumerate(products):
+        StockLevel.query.filter_by(product_id=product.id).one().quantity = i % 10
+    session.commit()
+    return products
+
+
+@contextmanager
+def count_selects():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+
+class TestStockLevelsPage:
+    """Test the joined, paginated stock listing."""
+
+    def test_page_rows_need_no_further_queries(self, stocked_catalog):
+        with count_selects() as statements:
+            page = StockLevelsService.page(page=2, per_page=20)
+            rendered = [(product.name, stock.quantity, brand.name) for product, stock, brand in page.items]
+
+        assert len(statements) == 2  # рядки сторінки та кількість
+        assert rendered[0] == ("Товар 20", 0, "Бренд 2")
+        assert len(rendered) == 20
+        assert (page.total, page.pages, page.has_next) == (45, 3, True)
+
+    def test_total_is_cached_until_product_insert_or_delete(self, session, stocked_catalog):
+        StockLevelsService.page()
+        with count_selects() as statements:
+            StockLevelsService.page(page=3)
+        assert len(statements) == 1
+
+        product = Product(name="Новий", sku="STOCK-NEW", brand_id=stocked_catalog[0].brand_id)
+        session.add(product)
+        session.commit()
+        assert StockLevelsService.page().total == 46
+
+        session.delete(product)
+        session.commit()
+        assert StockLevelsService.page().total == 45
+
+    def test_stock_changes_keep_cached_total(self, session, stocked_catalog):
+        StockLevelsService.page()
+        StockLevel.query.filter_by(product_id=stocked_catalog[0].id).one().quantity = 50
+        session.commit()
+
+        with count_selects() as statements:
+            StockLevelsService.page()
+        assert len(statements) == 1
+
+    def test_filtered_total_is_counted(self, stocked_catalog):
+        brand_id = stocked_catalog[1].brand_id
+        StockLevelsService.page(brand_id=brand_id)
+
+        with count_selects() as statements:
+            page = StockLevelsService.page(brand_id=brand_id)
+        assert len(statements) == 2
+        assert page.total == 15
+        assert get_product_count_cache().get_or_count(None, lambda: -1) == -1  # загальна кількість не кешувалась
+
+    def test_low_stock_rows(self, stocked_catalog):
+        rows = StockLevelsService.low_stock()
+
+        # Мінімум 5 мають товари 0, 5, 10, ...; залишок i % 10 - 0 або 5
+        assert [product.sku for product, _, _ in rows] == [f"STOCK-{i:02d}" for i in range(0, 45, 5)]
+        assert all(stock.quantity <= product.min_stock_level for product, stock, _ in rows)
+
+
+class TestCountCache:
+    """Test count expiry."""
+
+    def test_count_expires_after_ttl(self):
+        now = [0.0]
+        cache = CountCache(ttl=60, clock=lambda: now[0])
+        assert cache.get_or_count(None, lambda: 1) == 1
+        assert cache.get_or_count(None, lambda: 2) == 1
+        assert cache.get_or_count("other", lambda: 5) == 5
+        now[0] = 61
+        assert cache.get_or_count(None, lambda: 3) == 3
+
+    def test_zero_ttl_counts_every_page(self, app, stocked_catalog):
+        app.extensions["product_count"] = CountCache(ttl=0)
+        assert StockLevelsService.page().total == 45
+
+        with count_selects() as statements:
+            StockLevelsService.page()
+        assert len(statements) == 2